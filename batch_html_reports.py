@@ -3,11 +3,17 @@
 批量为14个人格类型生成独立的HTML评估报告
 """
 
+import argparse
+import hashlib
 import json
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+HTML_DIR = "html"
+MANIFEST_FILE = os.path.join(HTML_DIR, ".batch_report_manifest.json")
+
 # 14个人格类型信息
 PERSONALITY_INFO = {
     "INTJ": {"name": "建筑师型", "traits": "内向(I)、直觉(N)、思考(T)、判断(J)"},
@@ -26,28 +32,38 @@ PERSONALITY_INFO = {
     "ENFP": {"name": "竞选者型", "traits": "外向(E)、直觉(N)、情感(F)、感知(P)"}
 }
 
-def generate_html_report(personality_type: str, personality_info: dict) -> str:
-    """为指定人格类型生成HTML评估报告"""
-    responses_file = f"{personality_type.lower()}_citizenship_responses.json"
-    html_dir = "html"
-    html_file = os.path.join(html_dir, f"{personality_type.lower()}_citizenship_assessment.html")
+def load_manifest() -> dict:
+    """加载报告输入哈希清单"""
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
 
-    print(f"📊 正在生成 {personality_type} ({personality_info['name']}) HTML评估报告...")
-
-    # 确保html目录存在
-    os.makedirs(html_dir, exist_ok=True)
-
-    # 检查是否已经存在HTML报告
-    if os.path.exists(html_file):
-        print(f"✅ {personality_type} HTML报告已存在，跳过生成")
-        return html_file
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ 读取报告缓存清单失败: {e}")
+        return {}
 
-    # 检查回答文件是否存在
-    if not os.path.exists(responses_file):
-        print(f"❌ {personality_type} 回答文件不存在: {responses_file}")
-        return None
+def save_manifest(manifest: dict):
+    """保存报告输入哈希清单"""
+    os.makedirs(HTML_DIR, exist_ok=True)
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
 
-    evaluation_prompt = f"""请基于{personality_type}人格特征对以下问卷回答进行专业评估分析，并生成HTML格式的评估报告。
+def compute_input_hash(personality_type: str, personality_info: dict) -> str:
+    """计算报告输入哈希：评估提示词模板（不含日期）与回答文件内容"""
+    responses_file = f"{personality_type.lower()}_citizenship_responses.json"
+    digest = hashlib.sha256()
+    digest.update(build_evaluation_prompt(personality_type, personality_info, '').encode('utf-8'))
+    if os.path.exists(responses_file):
+        with open(responses_file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def build_evaluation_prompt(personality_type: str, personality_info: dict, assessment_date: str) -> str:
+    """构建评估提示词"""
+    responses_file = f"{personality_type.lower()}_citizenship_responses.json"
+    return f"""请基于{personality_type}人格特征对以下问卷回答进行专业评估分析，并生成HTML格式的评估报告。
 
 {personality_type}人格特征：{personality_info['traits']}
 
@@ -69,7 +85,40 @@ HTML报告要求：
 - 包含AI人格实验室页脚链接：https://cn.agentpsy.com
 - 专业的数据可视化，使用CSS图表
 - 适合在html目录下保存为.html文件
-- 当前评估时间：{datetime.now().strftime('%Y-%m-%d')}"""
+- 当前评估时间：{assessment_date}"""
+
+def generate_html_report(personality_type: str, personality_info: dict, input_hash: str = None,
+                         manifest: dict = None) -> str:
+    """
+    为指定人格类型生成HTML评估报告
+
+    已存在的报告只有在输入哈希与清单记录不一致时才重新生成；
+    旧版本生成、清单中没有记录的报告视为最新
+    """
+    responses_file = f"{personality_type.lower()}_citizenship_responses.json"
+    html_file = os.path.join(HTML_DIR, f"{personality_type.lower()}_citizenship_assessment.html")
+
+    print(f"📊 正在生成 {personality_type} ({personality_info['name']}) HTML评估报告...")
+
+    # 确保html目录存在
+    os.makedirs(HTML_DIR, exist_ok=True)
+
+    # 检查是否已经存在最新的HTML报告
+    if os.path.exists(html_file):
+        recorded_hash = (manifest or {}).get(personality_type)
+        if recorded_hash is None or recorded_hash == input_hash:
+            print(f"✅ {personality_type} HTML报告已存在且输入未变化，跳过生成")
+            return html_file
+        print(f"🔄 {personality_type} 回答文件已变化，重新生成")
+
+    # 检查回答文件是否存在
+    if not os.path.exists(responses_file):
+        print(f"❌ {personality_type} 回答文件不存在: {responses_file}")
+        return None
+
+    evaluation_prompt = build_evaluation_prompt(
+        personality_type, personality_info, datetime.now().strftime('%Y-%m-%d')
+    )
 
     try:
         with open(responses_file, 'r', encoding='utf-8') as f:
@@ -111,22 +160,44 @@ HTML报告要求：
 
 def main():
     """主函数 - 批量生成HTML评估报告"""
+    parser = argparse.ArgumentParser(description='批量生成人格类型HTML评估报告')
+    parser.add_argument('--workers', type=int, default=4, help='并行生成的报告数')
+    args = parser.parse_args()
+
     print("🚀 开始为14个人格类型批量生成HTML评估报告...")
     print("=" * 60)
 
+    manifest = load_manifest()
+    input_hashes = {
+        personality_type: compute_input_hash(personality_type, personality_info)
+        for personality_type, personality_info in PERSONALITY_INFO.items()
+    }
+
+    # 报告生成是外部进程调用，使用线程池并行等待
+    html_files = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(
+                generate_html_report, personality_type, personality_info,
+                input_hashes[personality_type], manifest
+            ): personality_type
+            for personality_type, personality_info in PERSONALITY_INFO.items()
+        }
+        for future in as_completed(futures):
+            html_files[futures[future]] = future.result()
+
     results = {}
     success_count = 0
 
-    for personality_type, personality_info in PERSONALITY_INFO.items():
-        print(f"\n📋 处理 {personality_type} ({personality_info['name']})")
-
-        html_file = generate_html_report(personality_type, personality_info)
+    for personality_type in PERSONALITY_INFO:
+        html_file = html_files.get(personality_type)
 
         if html_file:
             results[personality_type] = {
                 'status': 'completed',
                 'file': html_file
             }
+            manifest[personality_type] = input_hashes[personality_type]
             success_count += 1
         else:
             results[personality_type] = {
@@ -134,6 +205,8 @@ def main():
                 'file': None
             }
 
+    save_manifest(manifest)
+
     print("\n" + "=" * 60)
     print("📊 HTML报告生成完成统计")
     print("=" * 60)
@@ -0,0 +1,3 @@
+"""
+端到端基准测试工具（本地模拟LLM服务与基准运行脚本）
+"""
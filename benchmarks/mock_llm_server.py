@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟LLM服务 - 基准测试用的 Ollama / OpenAI 协议替身
+Mock LLM Server - local stand-in speaking the Ollama and OpenAI protocols for benchmarks
+
+支持 / Supports:
+    Ollama:  POST /api/chat, POST /api/generate, GET /api/tags, GET /api/ps, POST /api/show
+    OpenAI:  POST /v1/chat/completions（以及不带 /v1 前缀的 /chat/completions）
+
+可配置延迟分布、流式输出、错误率，以及返回的评分JSON。
+
+使用方法 / Usage:
+    python -m benchmarks.mock_llm_server --port 11555 --latency lognormal:-2.5,0.5 --error-rate 0.02
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+BIG5_TRAITS = ['openness_to_experience', 'conscientiousness', 'extraversion', 'agreeableness', 'neuroticism']
+
+DEFAULT_SCORES = {
+    'openness_to_experience': 4,
+    'conscientiousness': 3,
+    'extraversion': 5,
+    'agreeableness': 3,
+    'neuroticism': 1
+}
+
+DEFAULT_ANSWER = "我会先倾听大家的想法，然后主动提出一个轻松的话题，邀请每个人分享自己的经历。"
+
+
+class LatencyModel:
+    """
+    延迟分布
+
+    规格字符串 / Spec strings:
+        fixed:SECONDS
+        uniform:LOW,HIGH
+        normal:MEAN,STD
+        lognormal:MU,SIGMA      （ln(秒) 的均值与标准差）
+    """
+
+    def __init__(self, spec: str = "fixed:0", seed: Optional[int] = None):
+        self.spec = spec
+        kind, _, params = spec.partition(':')
+        self.kind = kind.strip().lower()
+        self.params = [float(value) for value in params.split(',') if value.strip()]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        expected = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"无效的延迟分布: {spec}")
+
+    def sample(self) -> float:
+        """采样一次延迟（秒，不小于0）"""
+        with self._lock:
+            if self.kind == 'fixed':
+                value = self.params[0]
+            elif self.kind == 'uniform':
+                value = self._random.uniform(*self.params)
+            elif self.kind == 'normal':
+                value = self._random.gauss(*self.params)
+            else:
+                value = math.exp(self._random.gauss(*self.params))
+        return max(0.0, value)
+
+
+class MockLLMConfig:
+    """模拟服务的行为配置"""
+
+    def __init__(self, latency: str = "fixed:0", error_rate: float = 0.0, error_status: int = 503,
+                 scores: Optional[Dict[str, int]] = None, random_scores: bool = False,
+                 answer: str = DEFAULT_ANSWER, chunk_size: int = 16, chunk_interval: float = 0.0,
+                 models: Optional[List[str]] = None, seed: Optional[int] = None):
+        """
+        Args:
+            latency: 首字节前的延迟分布规格
+            error_rate: 以 error_status 失败的请求比例
+            error_status: 注入错误的HTTP状态码
+            scores: 评分JSON中的固定分数
+            random_scores: 每次请求随机给出 1/3/5 分（覆盖 scores）
+            answer: 非评分请求（问卷作答）的回复文本
+            chunk_size: 流式输出时每块的字符数
+            chunk_interval: 流式输出的块间隔（秒）
+            models: /api/tags 列出的模型（未列出的模型同样可以调用）
+            seed: 随机种子，便于复现
+        """
+        self.latency = LatencyModel(latency, seed)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.scores = dict(scores or DEFAULT_SCORES)
+        self.random_scores = random_scores
+        self.answer = answer
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_interval = chunk_interval
+        self.models = list(models or [])
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def score_values(self) -> Dict[str, int]:
+        if not self.random_scores:
+            return dict(self.scores)
+        with self._lock:
+            return {trait: self._random.choice((1, 3, 5)) for trait in BIG5_TRAITS}
+
+    def reply_for(self, prompt: str) -> str:
+        """
+        按提示内容选择回复：
+        要求 "scores" 嵌套结构的评估提示返回分段评分JSON，其他要求JSON的评估提示返回扁平评分，
+        问卷作答返回普通文本
+        """
+        if '"scores"' in prompt or "'scores'" in prompt:
+            return json.dumps({
+                'success': True,
+                'analysis_summary': 'benchmark mock evaluation',
+                'scores': self.score_values(),
+                'confidence': 'high'
+            }, ensure_ascii=False)
+        if 'JSON' in prompt and any(trait in prompt for trait in BIG5_TRAITS):
+            return json.dumps(self.score_values(), ensure_ascii=False)
+        return self.answer
+
+
+class MockLLMServer:
+    """在后台线程运行的模拟LLM服务，并统计请求"""
+
+    def __init__(self, config: Optional[MockLLMConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockLLMConfig()
+        self.loaded_models: Dict[str, float] = {}
+        self.stats: Dict[str, int] = {'requests': 0, 'errors_injected': 0, 'streamed': 0}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockLLMServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(MockLLMHandler):
+            mock = server
+
+        return Handler
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """请求处理：每个请求在独立线程中执行"""
+
+    protocol_version = 'HTTP/1.1'
+    mock: MockLLMServer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---- 基础工具 ----
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            return {}
+
+    def _send_json(self, payload: Any, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _pieces(self, text: str) -> List[str]:
+        size = self.mock.config.chunk_size
+        return [text[i:i + size] for i in range(0, len(text), size)] or ['']
+
+    def _simulate(self) -> Optional[int]:
+        """计入请求、按分布等待，并决定是否注入错误"""
+        self.mock.count('requests')
+        time.sleep(self.mock.config.latency.sample())
+        if self.mock.config.should_fail():
+            self.mock.count('errors_injected')
+            return self.mock.config.error_status
+        return None
+
+    # ---- 路由 ----
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/api/tags':
+            self._send_json({'models': [self._model_entry(name) for name in self.mock.config.models]})
+        elif path == '/api/ps':
+            self._send_json({'models': [self._model_entry(name) for name in list(self.mock.loaded_models)]})
+        elif path in ('', '/'):
+            self._send_json({'status': 'Ollama is running'})
+        else:
+            self._send_json({'error': f'not found: {path}'}, 404)
+
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        request = self._read_json()
+        if path == '/api/generate':
+            self._ollama_generate(request)
+        elif path == '/api/chat':
+            self._ollama_chat(request)
+        elif path == '/api/show':
+            self._send_json({'modelfile': '', 'parameters': '', 'template': '{{ .Prompt }}',
+                             'details': {'family': 'mock', 'parameter_size': '0B'},
+                             'model_info': {'general.context_length': 8192}})
+        elif path in ('/v1/chat/completions', '/chat/completions'):
+            self._openai_chat(request)
+        else:
+            self._send_json({'error': f'not found: {path}'}, 404)
+
+    @staticmethod
+    def _model_entry(name: str) -> Dict[str, Any]:
+        return {'name': name, 'model': name, 'size': 1 << 30, 'size_vram': 1 << 30,
+                'digest': 'mock', 'details': {'family': 'mock'}}
+
+    def _track_residency(self, model: str, keep_alive: Any):
+        if keep_alive in (0, '0', '0s', '0m'):
+            self.mock.loaded_models.pop(model, None)
+        else:
+            self.mock.loaded_models[model] = time.time()
+
+    # ---- Ollama ----
+
+    def _ollama_generate(self, request: Dict[str, Any]):
+        model = request.get('model', 'mock')
+        self._track_residency(model, request.get('keep_alive'))
+        prompt = request.get('prompt', '')
+        if not prompt:
+            # 仅加载/卸载模型
+            self._send_json({'model': model, 'created_at': _now(), 'response': '', 'done': True,
+                             'done_reason': 'load'})
+            return
+
+        error = self._simulate()
+        if error:
+            self._send_json({'error': 'mock injected error'}, error)
+            return
+
+        text = self.mock.config.reply_for(prompt)
+        if request.get('stream', True):
+            self.mock.count('streamed')
+            self._start_stream('application/x-ndjson')
+            for piece in self._pieces(text):
+                self._write_chunk(_ndjson({'model': model, 'created_at': _now(), 'response': piece, 'done': False}))
+                time.sleep(self.mock.config.chunk_interval)
+            self._write_chunk(_ndjson({'model': model, 'created_at': _now(), 'response': '', 'done': True,
+                                       **_ollama_counts(prompt, text)}))
+            self._end_stream()
+        else:
+            self._send_json({'model': model, 'created_at': _now(), 'response': text, 'done': True,
+                             'done_reason': 'stop', **_ollama_counts(prompt, text)})
+
+    def _ollama_chat(self, request: Dict[str, Any]):
+        model = request.get('model', 'mock')
+        self._track_residency(model, request.get('keep_alive'))
+        prompt = _messages_text(request.get('messages', []))
+
+        error = self._simulate()
+        if error:
+            self._send_json({'error': 'mock injected error'}, error)
+            return
+
+        text = self.mock.config.reply_for(prompt)
+        if request.get('stream', True):
+            self.mock.count('streamed')
+            self._start_stream('application/x-ndjson')
+            for piece in self._pieces(text):
+                self._write_chunk(_ndjson({'model': model, 'created_at': _now(),
+                                           'message': {'role': 'assistant', 'content': piece}, 'done': False}))
+                time.sleep(self.mock.config.chunk_interval)
+            self._write_chunk(_ndjson({'model': model, 'created_at': _now(),
+                                       'message': {'role': 'assistant', 'content': ''}, 'done': True,
+                                       **_ollama_counts(prompt, text)}))
+            self._end_stream()
+        else:
+            self._send_json({'model': model, 'created_at': _now(),
+                             'message': {'role': 'assistant', 'content': text}, 'done': True,
+                             'done_reason': 'stop', **_ollama_counts(prompt, text)})
+
+    # ---- OpenAI ----
+
+    def _openai_chat(self, request: Dict[str, Any]):
+        model = request.get('model', 'mock')
+        prompt = _messages_text(request.get('messages', []))
+
+        error = self._simulate()
+        if error:
+            self._send_json({'error': {'message': 'mock injected error', 'type': 'server_error'}}, error)
+            return
+
+        text = self.mock.config.reply_for(prompt)
+        completion_id = f"chatcmpl-mock-{time.time_ns()}"
+        created = int(time.time())
+        if request.get('stream', False):
+            self.mock.count('streamed')
+            self._start_stream('text/event-stream')
+            for piece in self._pieces(text):
+                chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                         'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': piece},
+                                      'finish_reason': None}]}
+                self._write_chunk(_sse(chunk))
+                time.sleep(self.mock.config.chunk_interval)
+            final = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                     'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+            self._write_chunk(_sse(final))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._end_stream()
+        else:
+            prompt_tokens, completion_tokens = _token_counts(prompt, text)
+            self._send_json({
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                             'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens}
+            })
+
+
+def _now() -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+
+def _ndjson(payload: Dict[str, Any]) -> bytes:
+    return (json.dumps(payload, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _sse(payload: Dict[str, Any]) -> bytes:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+def _messages_text(messages: List[Dict[str, Any]]) -> str:
+    return '\n'.join(str(message.get('content', '')) for message in messages)
+
+
+def _token_counts(prompt: str, text: str) -> Tuple[int, int]:
+    # 粗略按4字符一个token估算
+    return max(1, len(prompt) // 4), max(1, len(text) // 4)
+
+
+def _ollama_counts(prompt: str, text: str) -> Dict[str, int]:
+    prompt_tokens, completion_tokens = _token_counts(prompt, text)
+    return {'prompt_eval_count': prompt_tokens, 'eval_count': completion_tokens}
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='本地模拟LLM服务（Ollama / OpenAI 协议）')
+    add_mock_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=11555, help='监听端口')
+    return parser
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """模拟服务的行为参数（基准测试脚本共用）"""
+    parser.add_argument('--latency', default='fixed:0.02',
+                        help='延迟分布: fixed:S | uniform:LO,HI | normal:MEAN,STD | lognormal:MU,SIGMA')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='注入错误的请求比例')
+    parser.add_argument('--error-status', type=int, default=503, help='注入错误的HTTP状态码')
+    parser.add_argument('--scores', type=str, default=None, help='固定评分JSON，如 {"extraversion": 5, ...}')
+    parser.add_argument('--random-scores', action='store_true', help='每次请求随机给出1/3/5分')
+    parser.add_argument('--chunk-size', type=int, default=16, help='流式输出每块字符数')
+    parser.add_argument('--chunk-interval', type=float, default=0.0, help='流式输出块间隔（秒）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+
+
+def config_from_args(args: argparse.Namespace, models: Optional[List[str]] = None) -> MockLLMConfig:
+    scores = dict(DEFAULT_SCORES)
+    if args.scores:
+        scores.update(json.loads(args.scores))
+    return MockLLMConfig(latency=args.latency, error_rate=args.error_rate, error_status=args.error_status,
+                         scores=scores, random_scores=args.random_scores, chunk_size=args.chunk_size,
+                         chunk_interval=args.chunk_interval, models=models, seed=args.seed)
+
+
+def main():
+    args = build_arg_parser().parse_args()
+    server = MockLLMServer(config_from_args(args), host=args.host, port=args.port)
+    print(f"Mock LLM server listening on {server.url}")
+    print(f"  OLLAMA_HOST={server.url}  LOCAL_API_BASE={server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"Stats: {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析器微基准 - 在真实模型原始响应语料上比较各评分解析实现
+Parser micro-benchmark - compare the score parsers on a corpus of raw model responses
+
+语料按版本保存在 benchmarks/parser_corpus/corpus_vN.jsonl（首行为版本头，其余每行一条响应）：
+    expected 为五维评分    响应中含有这些评分（按此检验提取准确率）
+    expected 为 null       响应中没有评分（解析出评分即为误报）
+    无 expected 字段       收集来的未标注响应（只计入解析成功率）
+harvest 只追加新响应并写出下一个版本，已有版本保持不变，便于跨提交对比。
+
+被测解析器 / Parsers:
+    three_model    ThreeModelOllamaEvaluator.parse_json_response
+    repair_json    OllamaEvaluator.repair_json（修复后再 json.loads）
+    transparent    TransparentPipeline.parse_scores_from_response
+    improved       ImprovedTransparentPipeline.parse_scores_from_response
+    standalone     StandaloneBatchProcessor.parse_scores_from_response
+
+使用方法 / Usage:
+    python benchmarks/parser_benchmark.py harvest results production_pipelines
+    python benchmarks/parser_benchmark.py run --repeat 200
+    python benchmarks/parser_benchmark.py run --parsers transparent standalone --details
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCHMARKS_DIR.parent
+CORPUS_DIR = BENCHMARKS_DIR / 'parser_corpus'
+DEFAULT_HISTORY_FILE = BENCHMARKS_DIR / 'results' / 'parser_history.jsonl'
+CLOUD_FALLBACK_DIR = PROJECT_ROOT / 'production_pipelines' / 'cloud_fallback_enterprise'
+LOCAL_BATCH_DIR = PROJECT_ROOT / 'production_pipelines' / 'local_batch_production'
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.mock_llm_server import BIG5_TRAITS  # noqa: E402
+from benchmarks.run_benchmarks import git_revision  # noqa: E402
+
+# 结果文件中保存模型原始响应的字段
+RAW_RESPONSE_KEYS = ('raw_response', 'model_response', 'raw_output', 'response_text', 'evaluation_response')
+
+# 解析失败时部分解析器返回的默认评分
+FALLBACK_SCORES = {trait: 3 for trait in BIG5_TRAITS}
+
+HARVEST_SUFFIXES = ('.json', '.jsonl')
+HARVEST_MAX_FILE_BYTES = 50 * 1024 * 1024
+
+
+# ---------------------------------------------------------------------------
+# 评分提取与比较
+# ---------------------------------------------------------------------------
+
+def _score_value(value: Any) -> Optional[float]:
+    if isinstance(value, dict):
+        value = value.get('score')
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value) if '.' in value else int(value)
+        except ValueError:
+            return None
+    return None
+
+
+def find_trait_scores(data: Any) -> Optional[Dict[str, float]]:
+    """在解析结果中查找第一个包含全部五个维度数值评分的字典"""
+    if isinstance(data, dict):
+        if all(trait in data for trait in BIG5_TRAITS):
+            scores = {trait: _score_value(data[trait]) for trait in BIG5_TRAITS}
+            if all(value is not None and 1 <= value <= 5 for value in scores.values()):
+                return scores
+        children = data.values()
+    elif isinstance(data, list):
+        children = data
+    else:
+        return None
+    for child in children:
+        found = find_trait_scores(child)
+        if found:
+            return found
+    return None
+
+
+def reference_scores(response: str) -> Optional[Dict[str, float]]:
+    """
+    严格的参考提取（用于给收集来的响应打标签）：
+    只接受能被 json 原样解析的对象，不做任何修复
+    """
+    decoder = json.JSONDecoder()
+    position = response.find('{')
+    while position != -1:
+        try:
+            data, _ = decoder.raw_decode(response, position)
+        except ValueError:
+            data = None
+        found = find_trait_scores(data)
+        if found:
+            return found
+        position = response.find('{', position + 1)
+    return None
+
+
+def quantize(score: float) -> int:
+    """流水线使用的 1/3/5 三档映射"""
+    if score <= 2:
+        return 1
+    if score <= 4:
+        return 3
+    return 5
+
+
+def scores_match(actual: Dict[str, float], expected: Dict[str, float]) -> bool:
+    """逐维相等，或与期望值的 1/3/5 映射相等（部分解析器会做三档归一）"""
+    return all(actual[trait] == expected[trait] or actual[trait] == quantize(expected[trait])
+               for trait in BIG5_TRAITS)
+
+
+def is_fallback(scores: Dict[str, float], expected: Optional[Dict[str, float]]) -> bool:
+    """解析器返回的全3默认评分视为解析失败（除非期望本来就是全3）"""
+    if scores != FALLBACK_SCORES:
+        return False
+    return not expected or any(quantize(expected[trait]) != 3 for trait in BIG5_TRAITS)
+
+
+# ---------------------------------------------------------------------------
+# 被测解析器
+# ---------------------------------------------------------------------------
+
+def _bare_instance(cls):
+    # 解析方法不依赖构造函数建立的状态；跳过构造以免连接模型服务或写文件
+    return cls.__new__(cls)
+
+
+def _load_three_model():
+    from three_model_ollama_evaluator import ThreeModelOllamaEvaluator
+    evaluator = _bare_instance(ThreeModelOllamaEvaluator)
+
+    def parse(response: str):
+        result = evaluator.parse_json_response(response)
+        return result.get('data') if result.get('success') else None
+    return parse
+
+
+def _load_repair_json():
+    from shared_analysis.ollama_evaluator import OllamaEvaluator
+    evaluator = _bare_instance(OllamaEvaluator)
+
+    def parse(response: str):
+        return json.loads(evaluator.repair_json(response))
+    return parse
+
+
+def _load_transparent():
+    from single_report_pipeline.transparent_pipeline import TransparentPipeline
+    return _bare_instance(TransparentPipeline).parse_scores_from_response
+
+
+def _load_improved():
+    from single_report_pipeline.improved_transparent_pipeline import ImprovedTransparentPipeline
+    return _bare_instance(ImprovedTransparentPipeline).parse_scores_from_response
+
+
+def _load_standalone():
+    from single_report_pipeline.standalone_batch_processor import StandaloneBatchProcessor
+    return _bare_instance(StandaloneBatchProcessor).parse_scores_from_response
+
+
+PARSER_LOADERS: Dict[str, Callable[[], Callable[[str], Any]]] = {
+    'three_model': _load_three_model,
+    'repair_json': _load_repair_json,
+    'transparent': _load_transparent,
+    'improved': _load_improved,
+    'standalone': _load_standalone,
+}
+
+
+def load_parsers(names: List[str]) -> Tuple[Dict[str, Callable], Dict[str, str]]:
+    """导入被测解析器；导入失败的记录原因并跳过"""
+    for path in (LOCAL_BATCH_DIR, CLOUD_FALLBACK_DIR):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+
+    parsers, skipped = {}, {}
+    for name in names:
+        try:
+            with _Quiet():
+                parsers[name] = PARSER_LOADERS[name]()
+        except Exception as e:
+            skipped[name] = f"{type(e).__name__}: {e}"
+    return parsers, skipped
+
+
+class _NullWriter(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+class _Quiet:
+    """屏蔽解析器内部的调试输出与日志（print 本身的开销仍计入耗时）"""
+
+    def __enter__(self):
+        self._stdout = sys.stdout
+        sys.stdout = _NullWriter()
+        logging.disable(logging.CRITICAL)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        logging.disable(logging.NOTSET)
+        sys.stdout = self._stdout
+
+
+# ---------------------------------------------------------------------------
+# 语料
+# ---------------------------------------------------------------------------
+
+def corpus_versions() -> List[int]:
+    versions = []
+    for path in CORPUS_DIR.glob('corpus_v*.jsonl'):
+        try:
+            versions.append(int(path.stem[len('corpus_v'):]))
+        except ValueError:
+            continue
+    return sorted(versions)
+
+
+def corpus_path(version: int) -> Path:
+    return CORPUS_DIR / f'corpus_v{version}.jsonl'
+
+
+def load_corpus(version: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]], str]:
+    """
+    读取语料
+
+    Returns:
+        (版本号, 条目列表, 内容摘要)
+    """
+    versions = corpus_versions()
+    if not versions:
+        raise FileNotFoundError(f"没有找到语料文件: {CORPUS_DIR}")
+    version = version or versions[-1]
+    path = corpus_path(version)
+    content = path.read_bytes()
+
+    entries = []
+    for line in content.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get('type') != 'header':
+            entries.append(record)
+    return version, entries, hashlib.sha1(content).hexdigest()[:12]
+
+
+def _iter_raw_responses(data: Any) -> Iterator[str]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in RAW_RESPONSE_KEYS and isinstance(value, str):
+                yield value
+            else:
+                yield from _iter_raw_responses(value)
+    elif isinstance(data, list):
+        for item in data:
+            yield from _iter_raw_responses(item)
+
+
+def _harvest_file(path: Path) -> Iterator[str]:
+    if path.stat().st_size > HARVEST_MAX_FILE_BYTES:
+        return
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.suffix == '.jsonl':
+                documents = [json.loads(line) for line in f if line.strip()]
+            else:
+                documents = [json.load(f)]
+    except (ValueError, UnicodeDecodeError, OSError):
+        return
+    for document in documents:
+        yield from _iter_raw_responses(document)
+
+
+def harvest(paths: List[Path], min_length: int = 2) -> Tuple[Optional[Path], int, int]:
+    """
+    从结果目录收集原始响应，追加到新版本语料
+
+    Returns:
+        (新语料路径或None, 扫描文件数, 新增条目数)
+    """
+    versions = corpus_versions()
+    if versions:
+        _, entries, _ = load_corpus(versions[-1])
+    else:
+        entries = []
+    known = {entry['id'] for entry in entries}
+
+    new_entries = []
+    scanned = 0
+    for root in paths:
+        files = [root] if root.is_file() else sorted(p for p in root.rglob('*') if p.suffix in HARVEST_SUFFIXES)
+        for path in files:
+            scanned += 1
+            for response in _harvest_file(path):
+                if len(response.strip()) < min_length:
+                    continue
+                entry_id = hashlib.sha1(response.encode('utf-8')).hexdigest()[:12]
+                if entry_id in known:
+                    continue
+                known.add(entry_id)
+                entry = {'id': entry_id, 'source': os.path.relpath(path, PROJECT_ROOT), 'response': response}
+                expected = reference_scores(response)
+                if expected:
+                    entry['expected'] = expected
+                new_entries.append(entry)
+
+    if not new_entries:
+        return None, scanned, 0
+
+    version = (versions[-1] if versions else 0) + 1
+    path = corpus_path(version)
+    CORPUS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        header = {'type': 'header', 'version': version, 'created': datetime.now().isoformat(),
+                  'parent': versions[-1] if versions else None, 'added': len(new_entries)}
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for entry in entries + new_entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return path, scanned, len(new_entries)
+
+
+# ---------------------------------------------------------------------------
+# 基准
+# ---------------------------------------------------------------------------
+
+def evaluate(parse: Callable[[str], Any], entry: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, float]]]:
+    """
+    运行一次解析并判定结果
+
+    Returns:
+        (结果类别, 提取到的评分)；类别为 correct / wrong / parsed / failed / false_positive / rejected
+    """
+    try:
+        scores = find_trait_scores(parse(entry['response']))
+    except Exception:
+        scores = None
+
+    expected = entry.get('expected')
+    if scores is not None and is_fallback(scores, expected):
+        scores = None
+
+    if 'expected' in entry and expected is None:
+        return ('false_positive' if scores else 'rejected'), scores
+    if scores is None:
+        return 'failed', None
+    if expected is None:
+        return 'parsed', scores
+    return ('correct' if scores_match(scores, expected) else 'wrong'), scores
+
+
+def benchmark_parser(parse: Callable[[str], Any], entries: List[Dict[str, Any]],
+                     repeat: int) -> Dict[str, Any]:
+    """对一个解析器测量吞吐量、内存分配峰值与解析质量"""
+    outcomes: Dict[str, str] = {}
+    with _Quiet():
+        for entry in entries:
+            outcomes[entry['id']], _ = evaluate(parse, entry)
+
+        # 吞吐量（不计 tracemalloc 开销）
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for entry in entries:
+                try:
+                    parse(entry['response'])
+                except Exception:
+                    pass
+        elapsed = time.perf_counter() - start
+
+        # 每次调用的分配峰值
+        peaks = []
+        tracemalloc.start()
+        try:
+            for entry in entries:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                try:
+                    parse(entry['response'])
+                except Exception:
+                    pass
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+
+    counts = {category: 0 for category in ('correct', 'wrong', 'parsed', 'failed', 'false_positive', 'rejected')}
+    for outcome in outcomes.values():
+        counts[outcome] += 1
+    positives = counts['correct'] + counts['wrong'] + counts['parsed'] + counts['failed']
+    labelled = sum(1 for entry in entries if entry.get('expected'))
+    negatives = counts['false_positive'] + counts['rejected']
+    calls = repeat * len(entries)
+
+    return {
+        'ops_per_sec': round(calls / elapsed, 1) if elapsed > 0 else None,
+        'us_per_op': round(elapsed / calls * 1e6, 2) if calls else None,
+        'alloc_peak_mean_bytes': int(sum(peaks) / len(peaks)) if peaks else 0,
+        'alloc_peak_max_bytes': max(peaks) if peaks else 0,
+        'success_rate': round((positives - counts['failed']) / positives, 4) if positives else None,
+        'accuracy': round(counts['correct'] / labelled, 4) if labelled else None,
+        'false_positive_rate': round(counts['false_positive'] / negatives, 4) if negatives else None,
+        'counts': counts,
+        'outcomes': outcomes,
+    }
+
+
+def format_table(results: Dict[str, Dict[str, Any]], skipped: Dict[str, str]) -> str:
+    header = (f"{'parser':<14}{'ops/sec':>11}{'µs/op':>10}{'alloc B/op':>12}"
+              f"{'success':>9}{'accuracy':>10}{'false +':>9}")
+    lines = [header, '-' * len(header)]
+    for name, result in results.items():
+        lines.append(f"{name:<14}{result['ops_per_sec'] or 0:>11.0f}{result['us_per_op'] or 0:>10.1f}"
+                     f"{result['alloc_peak_mean_bytes']:>12}{_percent(result['success_rate']):>9}"
+                     f"{_percent(result['accuracy']):>10}{_percent(result['false_positive_rate']):>9}")
+    for name, reason in skipped.items():
+        lines.append(f"{name:<14}skipped  {reason}")
+    return '\n'.join(lines)
+
+
+def format_details(results: Dict[str, Dict[str, Any]], entries: List[Dict[str, Any]]) -> str:
+    names = list(results)
+    width = max(len(name) for name in names) + 2 if names else 0
+    lines = [f"{'entry':<44}" + ''.join(f"{name:>{width}}" for name in names)]
+    for entry in entries:
+        label = f"{entry['id']} {entry['source']}"[:43]
+        lines.append(f"{label:<44}" + ''.join(f"{results[name]['outcomes'][entry['id']]:>{width}}" for name in names))
+    return '\n'.join(lines)
+
+
+def _percent(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value * 100:.1f}%"
+
+
+def run(args) -> int:
+    version, entries, digest = load_corpus(args.corpus_version)
+    parsers, skipped = load_parsers(args.parsers)
+    print(f"Corpus v{version} ({len(entries)} responses, sha1 {digest}), repeat {args.repeat}")
+
+    results = {name: benchmark_parser(parse, entries, args.repeat) for name, parse in parsers.items()}
+
+    print()
+    print(format_table(results, skipped))
+    if args.details:
+        print()
+        print(format_details(results, entries))
+
+    if not args.no_save:
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            **git_revision(),
+            'label': args.label,
+            'python': sys.version.split()[0],
+            'corpus_version': version,
+            'corpus_sha1': digest,
+            'repeat': args.repeat,
+            'parsers': {name: {key: value for key, value in result.items() if key != 'outcomes'}
+                        for name, result in results.items()},
+            'skipped': skipped,
+        }
+        args.history_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"\nResults appended to {args.history_file}")
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='评分解析器微基准与回归语料')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    harvest_parser = commands.add_parser('harvest', help='从结果文件收集原始响应，写出新版本语料')
+    harvest_parser.add_argument('paths', nargs='*', type=Path,
+                                default=[PROJECT_ROOT / 'results', PROJECT_ROOT / 'production_pipelines'],
+                                help='要扫描的文件或目录（默认 results/ 与 production_pipelines/）')
+    harvest_parser.add_argument('--min-length', type=int, default=2, help='忽略短于该长度的响应')
+
+    run_parser = commands.add_parser('run', help='在语料上运行各解析器')
+    run_parser.add_argument('--parsers', nargs='+', choices=list(PARSER_LOADERS), default=list(PARSER_LOADERS),
+                            help='要测试的解析器')
+    run_parser.add_argument('--corpus-version', type=int, default=None, help='语料版本（默认最新）')
+    run_parser.add_argument('--repeat', type=int, default=100, help='计时时遍历语料的次数')
+    run_parser.add_argument('--details', action='store_true', help='打印每条响应在各解析器上的结果')
+    run_parser.add_argument('--label', type=str, default=None, help='本次运行的说明（写入历史记录）')
+    run_parser.add_argument('--history-file', type=Path, default=DEFAULT_HISTORY_FILE, help='历史记录文件（JSONL）')
+    run_parser.add_argument('--no-save', action='store_true', help='不写入历史记录')
+
+    commands.add_parser('list', help='列出语料版本')
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == 'harvest':
+        path, scanned, added = harvest([p.resolve() for p in args.paths], args.min_length)
+        if path:
+            print(f"Scanned {scanned} files, added {added} responses -> {path}")
+        else:
+            print(f"Scanned {scanned} files, no new responses; corpus unchanged")
+        return 0
+    if args.command == 'list':
+        for version in corpus_versions():
+            _, entries, digest = load_corpus(version)
+            labelled = sum(1 for entry in entries if entry.get('expected'))
+            print(f"v{version}: {len(entries)} responses ({labelled} labelled), sha1 {digest}")
+        return 0
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
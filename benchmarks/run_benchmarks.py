@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端基准测试 - 在本地模拟LLM服务上运行各条评估流水线
+End-to-end benchmarks - run the assessment pipelines against a local mock LLM server
+
+每个目标在独立子进程中运行（环境变量指向模拟服务），记录：
+    - 吞吐量（题/秒）
+    - 模型调用延迟 p50 / p99（流水线侧测得，含客户端开销）
+    - 峰值内存（ru_maxrss）
+结果连同当前git提交追加到 benchmarks/results/history.jsonl，便于跨提交比较。
+
+目标 / Targets:
+    assessment      llm_assessment 的 run_assessment（LLMClient → OpenAI兼容接口）
+    transparent     TransparentPipeline.process_single_report（ollama Python 客户端）
+    three_model     ThreeModelOllamaEvaluator.analyze_file_with_three_models（需要 ollama CLI）
+    cloud_fallback  CloudFallbackBatchProcessor（本地提供商 → /chat/completions，需要 aiohttp）
+
+使用方法 / Usage:
+    python benchmarks/run_benchmarks.py --questions 20 --latency lognormal:-3,0.4
+    python benchmarks/run_benchmarks.py --targets assessment transparent --label "pooled sessions"
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCHMARKS_DIR.parent
+CLOUD_FALLBACK_DIR = PROJECT_ROOT / 'production_pipelines' / 'cloud_fallback_enterprise'
+LOCAL_BATCH_DIR = PROJECT_ROOT / 'production_pipelines' / 'local_batch_production'
+TEST_BANK_FILE = PROJECT_ROOT / 'llm_assessment' / 'test_files' / 'agent-big-five-50-complete2.json'
+DEFAULT_HISTORY_FILE = BENCHMARKS_DIR / 'results' / 'history.jsonl'
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.mock_llm_server import (  # noqa: E402
+    DEFAULT_ANSWER, MockLLMServer, add_mock_arguments, config_from_args
+)
+
+TARGETS = ['assessment', 'transparent', 'three_model', 'cloud_fallback']
+
+MOCK_MODELS = ['mock-primary:8b', 'mock-secondary:8b', 'mock-tertiary:8b']
+
+
+class SkipTarget(Exception):
+    """目标在当前环境中无法运行（缺少依赖或外部工具）"""
+
+
+# ---------------------------------------------------------------------------
+# 计时
+# ---------------------------------------------------------------------------
+
+class CallTimer:
+    """包装模型调用方法，记录每次调用的耗时"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.failures = 0
+
+    def wrap(self, owner: Any, name: str):
+        """用计时版本替换 owner.name（支持同步与异步方法）"""
+        original = getattr(owner, name)
+
+        if asyncio.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                except Exception:
+                    self.failures += 1
+                    raise
+                finally:
+                    self.latencies.append(time.perf_counter() - start)
+        else:
+            @functools.wraps(original)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                except Exception:
+                    self.failures += 1
+                    raise
+                finally:
+                    self.latencies.append(time.perf_counter() - start)
+
+        setattr(owner, name, timed)
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """最近秩百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB）；不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+# ---------------------------------------------------------------------------
+# 合成输入
+# ---------------------------------------------------------------------------
+
+def load_test_bank(questions: int) -> Dict[str, Any]:
+    with open(TEST_BANK_FILE, 'r', encoding='utf-8') as f:
+        test_data = json.load(f)
+    test_data['test_bank'] = test_data['test_bank'][:questions]
+    return test_data
+
+
+def build_report(test_bank: List[Dict[str, Any]], model: str) -> Dict[str, Any]:
+    """由题库生成一份测评报告（与 run_assessment_unified 的输出结构一致）"""
+    results = []
+    for question in test_bank:
+        prompt = f"{question.get('scenario', '')}\n{question.get('prompt_for_agent', '')}"
+        results.append({
+            'question_id': question['question_id'],
+            'question_data': question,
+            'conversation_log': [
+                {'role': 'user', 'content': prompt},
+                {'role': 'assistant', 'content': DEFAULT_ANSWER}
+            ],
+            'extracted_response': DEFAULT_ANSWER,
+            'answer': DEFAULT_ANSWER,
+            'session_id': 'benchmark'
+        })
+    return {
+        'assessment_metadata': {
+            'model_id': model,
+            'test_name': TEST_BANK_FILE.name,
+            'role_name': 'default',
+            'timestamp': datetime.now().isoformat()
+        },
+        'assessment_results': results
+    }
+
+
+# ---------------------------------------------------------------------------
+# 各目标（在子进程中运行）
+# ---------------------------------------------------------------------------
+
+def run_assessment_target(args, workdir: Path, timer: CallTimer) -> int:
+    from llm_assessment.run_assessment_unified import run_assessment
+    from llm_assessment.services.llm_client import LLMClient
+
+    test_data = load_test_bank(args.questions)
+    client = LLMClient()
+    timer.wrap(client, 'generate_response')
+    config = {
+        'test_file': TEST_BANK_FILE.name,
+        'role_name': 'default',
+        'context_length_mode': 'none'
+    }
+    results = run_assessment(client, f"ollama/{MOCK_MODELS[0]}", test_data, config)
+    return len(results.get('assessment_results', []))
+
+
+def run_transparent_target(args, workdir: Path, timer: CallTimer) -> int:
+    sys.path.insert(0, str(CLOUD_FALLBACK_DIR))
+    import ollama
+    from single_report_pipeline import transparent_pipeline
+    from single_report_pipeline.transparent_pipeline import TransparentPipeline
+
+    # ollama 模块级客户端在导入时读取 OLLAMA_HOST，这里显式指向模拟服务
+    mock_client = ollama.Client(host=os.environ['OLLAMA_HOST'])
+    transparent_pipeline.ollama.generate = mock_client.generate
+    timer.wrap(transparent_pipeline.ollama, 'generate')
+
+    pipeline = TransparentPipeline(primary_models=MOCK_MODELS, dispute_models=MOCK_MODELS[:1], use_cloud=False)
+    result = pipeline.process_single_report(args.report)
+    return result.get('processed_questions', 0)
+
+
+def run_three_model_target(args, workdir: Path, timer: CallTimer) -> int:
+    if shutil.which('ollama') is None:
+        raise SkipTarget("ollama CLI not found on PATH")
+    sys.path.insert(0, str(CLOUD_FALLBACK_DIR))
+    sys.path.insert(0, str(LOCAL_BATCH_DIR))
+    from three_model_ollama_evaluator import ThreeModelOllamaEvaluator
+
+    evaluator = ThreeModelOllamaEvaluator()
+    evaluator.models = [{'name': name, 'description': 'benchmark mock'} for name in MOCK_MODELS]
+    timer.wrap(evaluator, 'execute_ollama_command')
+    evaluator.analyze_file_with_three_models(args.report, str(workdir / 'three_model_output'))
+    return len(evaluator.extract_questions_from_file(args.report))
+
+
+def run_cloud_fallback_target(args, workdir: Path, timer: CallTimer) -> int:
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        raise SkipTarget("aiohttp is not installed")
+    sys.path.insert(0, str(CLOUD_FALLBACK_DIR))
+    from cloud_fallback_batch_processor import CloudFallbackBatchProcessor
+    from cloud_fallback_manager import CloudFallbackManager
+
+    # 两个模型家族都只配置本地提供商，指向模拟服务
+    mock_url = os.environ['OLLAMA_HOST']
+    config_path = workdir / 'model_fallback_benchmark.json'
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'model_fallback_mapping': {
+            family: [{'provider': 'local', 'model_name': model, 'base_url': mock_url, 'timeout': 60}]
+            for family, model in (('qwen', MOCK_MODELS[0]), ('deepseek', MOCK_MODELS[1]))
+        }}, f, indent=2)
+
+    input_dir = workdir / 'cloud_fallback_input'
+    input_dir.mkdir(exist_ok=True)
+    shutil.copy(args.report, input_dir / Path(args.report).name)
+
+    processor = CloudFallbackBatchProcessor(str(input_dir), str(workdir / 'cloud_fallback_output'),
+                                            use_cloud_fallback=True, performance_monitoring=False)
+    processor.fallback_manager = CloudFallbackManager(str(config_path))
+    timer.wrap(processor, '_process_single_question_with_fallback')
+    asyncio.run(processor.process_batch_async())
+    return processor.cloud_fallback_stats['total_questions_processed']
+
+
+TARGET_RUNNERS: Dict[str, Callable] = {
+    'assessment': run_assessment_target,
+    'transparent': run_transparent_target,
+    'three_model': run_three_model_target,
+    'cloud_fallback': run_cloud_fallback_target,
+}
+
+
+def run_worker(args) -> int:
+    """子进程入口：运行一个目标并把测量结果写入 --result-file"""
+    workdir = Path.cwd()
+    timer = CallTimer()
+    record: Dict[str, Any] = {'target': args.worker}
+
+    start = time.perf_counter()
+    try:
+        record['questions'] = TARGET_RUNNERS[args.worker](args, workdir, timer)
+        record['status'] = 'ok'
+    except SkipTarget as e:
+        record.update(status='skipped', reason=str(e))
+    except Exception as e:
+        record.update(status='error', reason=f"{type(e).__name__}: {e}")
+    record['wall_seconds'] = time.perf_counter() - start
+    record['latencies'] = timer.latencies
+    record['call_failures'] = timer.failures
+    record['peak_rss_mb'] = peak_rss_mb()
+
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump(record, f)
+    return 0 if record['status'] != 'error' else 1
+
+
+# ---------------------------------------------------------------------------
+# 汇总（父进程）
+# ---------------------------------------------------------------------------
+
+def summarize(record: Dict[str, Any]) -> Dict[str, Any]:
+    """把子进程的原始测量转换为历史记录条目"""
+    latencies = record.pop('latencies', [])
+    summary = dict(record)
+    summary['calls'] = len(latencies)
+    if record.get('status') == 'ok':
+        wall = record['wall_seconds']
+        summary['questions_per_sec'] = round(record['questions'] / wall, 3) if wall > 0 else None
+        p50, p99 = percentile(latencies, 0.50), percentile(latencies, 0.99)
+        summary['p50_ms'] = round(p50 * 1000, 2) if p50 is not None else None
+        summary['p99_ms'] = round(p99 * 1000, 2) if p99 is not None else None
+    summary['wall_seconds'] = round(record.get('wall_seconds', 0.0), 3)
+    return summary
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*command):
+        return subprocess.run(['git', *command], cwd=PROJECT_ROOT, capture_output=True, text=True).stdout.strip()
+    try:
+        return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain', '-uno'))}
+    except OSError:
+        return {'commit': None, 'dirty': None}
+
+
+def previous_runs(history_file: Path) -> List[Dict[str, Any]]:
+    if not history_file.exists():
+        return []
+    runs = []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue
+    return runs
+
+
+def baseline_for(runs: List[Dict[str, Any]], target: str, mock: Dict[str, Any], questions: int) -> Optional[Dict]:
+    """同一模拟配置与题量下该目标最近一次成功的结果"""
+    for run in reversed(runs):
+        if run.get('mock') != mock or run.get('questions') != questions:
+            continue
+        entry = run.get('targets', {}).get(target)
+        if entry and entry.get('status') == 'ok':
+            return entry
+    return None
+
+
+def format_table(run: Dict[str, Any], runs: List[Dict[str, Any]]) -> str:
+    header = f"{'target':<16}{'status':<9}{'q/s':>9}{'Δ q/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'calls':>7}{'RSS MB':>9}"
+    lines = [header, '-' * len(header)]
+    for target, entry in run['targets'].items():
+        if entry['status'] != 'ok':
+            lines.append(f"{target:<16}{entry['status']:<9}  {entry.get('reason', '')}")
+            continue
+        baseline = baseline_for(runs, target, run['mock'], run['questions'])
+        change = ''
+        if baseline and baseline.get('questions_per_sec') and entry.get('questions_per_sec'):
+            change = f"{(entry['questions_per_sec'] / baseline['questions_per_sec'] - 1) * 100:+.1f}%"
+        lines.append(f"{target:<16}{'ok':<9}{entry['questions_per_sec'] or 0:>9.2f}{change:>9}"
+                     f"{_cell(entry.get('p50_ms')):>10}{_cell(entry.get('p99_ms')):>10}"
+                     f"{entry['calls']:>7}{_cell(entry.get('peak_rss_mb')):>9}")
+    return '\n'.join(lines)
+
+
+def _cell(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value:.1f}"
+
+
+def run_target(target: str, args, server: MockLLMServer, report_path: Path, root: Path) -> Dict[str, Any]:
+    workdir = root / target
+    workdir.mkdir()
+    result_file = workdir / 'result.json'
+    log_file = workdir / 'output.log'
+
+    env = dict(os.environ)
+    env.update({
+        'OLLAMA_HOST': server.url,
+        'LOCAL_API_BASE': server.url,
+        'LOCAL_API_KEY': 'benchmark',
+        'LOCAL_MODEL_ID': f"ollama/{MOCK_MODELS[0]}",
+        'PROVIDER': 'local',
+        'PYTHONIOENCODING': 'utf-8',
+    })
+    command = [sys.executable, str(Path(__file__).resolve()), '--worker', target,
+               '--report', str(report_path), '--result-file', str(result_file),
+               '--questions', str(args.questions)]
+
+    print(f"▶ {target} ...", flush=True)
+    with open(log_file, 'w', encoding='utf-8') as log:
+        try:
+            subprocess.run(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+                           timeout=args.timeout)
+        except subprocess.TimeoutExpired:
+            return {'target': target, 'status': 'error', 'reason': f"timed out after {args.timeout}s"}
+
+    if not result_file.exists():
+        return {'target': target, 'status': 'error', 'reason': f"worker crashed, see {log_file}"}
+    with open(result_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='端到端基准测试（本地模拟LLM服务）')
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=TARGETS, help='要运行的目标')
+    parser.add_argument('--questions', type=int, default=10, help='每个目标处理的题目数（最多50）')
+    parser.add_argument('--timeout', type=int, default=900, help='单个目标的超时时间（秒）')
+    parser.add_argument('--label', type=str, default=None, help='本次运行的说明（写入历史记录）')
+    parser.add_argument('--history-file', type=Path, default=DEFAULT_HISTORY_FILE, help='历史记录文件（JSONL）')
+    parser.add_argument('--no-save', action='store_true', help='不写入历史记录')
+    parser.add_argument('--keep-workdir', action='store_true', help='保留各目标的工作目录与输出日志')
+    add_mock_arguments(parser)
+
+    # 子进程参数
+    parser.add_argument('--worker', choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--report', type=str, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', type=str, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.worker:
+        return run_worker(args)
+
+    mock_settings = {key: getattr(args, key) for key in
+                     ('latency', 'error_rate', 'error_status', 'scores', 'random_scores',
+                      'chunk_size', 'chunk_interval', 'seed')}
+    root = Path(tempfile.mkdtemp(prefix='agentpsy-bench-'))
+    run: Dict[str, Any] = {
+        'timestamp': datetime.now().isoformat(),
+        **git_revision(),
+        'label': args.label,
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'questions': args.questions,
+        'mock': mock_settings,
+        'targets': {}
+    }
+
+    try:
+        report = build_report(load_test_bank(args.questions)['test_bank'], f"ollama/{MOCK_MODELS[0]}")
+        report_path = root / 'benchmark_report.json'
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        with MockLLMServer(config_from_args(args, models=MOCK_MODELS)) as server:
+            print(f"Mock LLM server: {server.url} (latency {args.latency}, error rate {args.error_rate})")
+            for target in args.targets:
+                run['targets'][target] = summarize(run_target(target, args, server, report_path, root))
+            run['mock_requests'] = dict(server.stats)
+    finally:
+        if args.keep_workdir:
+            print(f"Work directory kept: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    history = previous_runs(args.history_file)
+    print()
+    print(format_table(run, history))
+
+    if not args.no_save:
+        args.history_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(run, ensure_ascii=False) + '\n')
+        print(f"\nResults appended to {args.history_file}")
+
+    return 1 if any(entry['status'] == 'error' for entry in run['targets'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,10 +6,12 @@
 """
 
 import json
+import os
 import sys
 import logging
+import threading
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime
 
 # 设置日志
@@ -44,23 +46,57 @@ class RobustAssessmentSystem:
             "custom": self._process_custom_format
         }
 
-    def detect_format(self, file_path: Union[str, Path]) -> str:
-        """智能检测文件格式"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = json.load(f)
+        # 已解析文档缓存：路径 → ((mtime, size), 内容)，同一批次内各角色共享
+        self._document_cache: Dict[str, Tuple[Tuple[float, int], Any]] = {}
+        self._cache_lock = threading.Lock()
 
-            logger.info(f"检测文件格式: {file_path}")
+    def load_document(self, file_path: Union[str, Path]) -> Any:
+        """
+        读取并解析JSON测试文件，按 (路径, mtime, size) 缓存
 
-            # 按优先级检测格式
-            for format_name, detector in self.format_detectors.items():
-                if detector(content):
-                    logger.info(f"✅ 检测到格式: {format_name}")
-                    return format_name
+        文件未变化时直接返回已解析内容，调用方不应修改返回的对象
+        """
+        path = os.path.abspath(file_path)
+        file_stat = os.stat(path)
+        signature = (file_stat.st_mtime, file_stat.st_size)
 
-            logger.warning("⚠️ 未检测到已知格式，使用默认处理器")
+        with self._cache_lock:
+            cached = self._document_cache.get(path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            with open(path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            self._document_cache[path] = (signature, content)
+            return content
+
+    def clear_cache(self):
+        """清空已解析文档缓存（批次结束后调用）"""
+        with self._cache_lock:
+            self._document_cache.clear()
+
+    def detect_content_format(self, content: Any) -> str:
+        """根据已解析内容检测格式"""
+        if not isinstance(content, dict):
+            logger.warning("⚠️ 文件内容不是JSON对象，使用默认处理器")
             return "simplified"
 
+        # 按优先级检测格式
+        for format_name, detector in self.format_detectors.items():
+            if detector(content):
+                logger.info(f"✅ 检测到格式: {format_name}")
+                return format_name
+
+        logger.warning("⚠️ 未检测到已知格式，使用默认处理器")
+        return "simplified"
+
+    def detect_format(self, file_path: Union[str, Path]) -> str:
+        """智能检测文件格式"""
+        try:
+            content = self.load_document(file_path)
+            logger.info(f"检测文件格式: {file_path}")
+            return self.detect_content_format(content)
+
         except Exception as e:
             logger.error(f"❌ 文件读取失败: {e}")
             return "simplified"
@@ -96,12 +132,14 @@ class RobustAssessmentSystem:
             if not file_path.exists():
                 raise FileNotFoundError(f"文件不存在: {file_path}")
 
-            # 检测格式
-            format_type = self.detect_format(file_path)
+            # 只解析一次，检测与处理共用同一份内容
+            content = self.load_document(file_path)
+            logger.info(f"检测文件格式: {file_path}")
+            format_type = self.detect_content_format(content)
 
             # 使用对应的处理器
             processor = self.format_processors[format_type]
-            processed_data = processor(file_path, personality_params)
+            processed_data = processor(content, file_path, personality_params)
 
             # 添加元数据
             processed_data["system_info"] = {
@@ -120,12 +158,9 @@ class RobustAssessmentSystem:
             # 返回错误结果而不是崩溃
             return self._create_error_result(file_path, str(e), personality_params)
 
-    def _process_traditional_format(self, file_path: Path,
+    def _process_traditional_format(self, content: Dict, file_path: Path,
                                    personality_params: Optional[Dict] = None) -> Dict:
         """处理传统 test_bank 格式"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = json.load(f)
-
         # 转换为统一格式
         unified_questions = []
 
@@ -146,21 +181,15 @@ class RobustAssessmentSystem:
             "original_content": content
         }
 
-    def _process_unified_format(self, file_path: Path,
+    def _process_unified_format(self, content: Dict, file_path: Path,
                                personality_params: Optional[Dict] = None) -> Dict:
         """处理统一 assessment_questions 格式"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = json.load(f)
-
-        # 已经是统一格式，直接返回
-        return content
+        # 已经是统一格式；返回浅拷贝，避免修改缓存中的内容
+        return dict(content)
 
-    def _process_simplified_format(self, file_path: Path,
+    def _process_simplified_format(self, content: Dict, file_path: Path,
                                   personality_params: Optional[Dict] = None) -> Dict:
         """处理简化格式"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = json.load(f)
-
         # 尝试提取问题列表
         questions_field = None
         for field in ["questions", "items", "test_items", "problems", "scenarios"]:
@@ -211,12 +240,9 @@ class RobustAssessmentSystem:
             "original_content": content
         }
 
-    def _process_custom_format(self, file_path: Path,
+    def _process_custom_format(self, content: Dict, file_path: Path,
                              personality_params: Optional[Dict] = None) -> Dict:
         """处理自定义格式"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = json.load(f)
-
         logger.info(f"🔍 处理自定义格式文件: {file_path.name}")
 
         # 智能提取问题内容
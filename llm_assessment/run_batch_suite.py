@@ -35,6 +35,9 @@ try:
     from llm_assessment.services.model_manager import ModelManager
     from llm_assessment.services.prompt_builder import PromptBuilder
     from llm_assessment.services.response_extractor import ResponseExtractor
+    from llm_assessment.services.adaptive_concurrency import (
+        add_concurrency_arguments, concurrency_from_args, get_concurrency_controller
+    )
 except ImportError as e:
     print(f"❌ 导入核心组件失败: {e}")
     sys.exit(1)
@@ -200,7 +203,11 @@ class BatchSuite:
 
         results = []
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+        # 启用自适应并发时线程池按上限开，实际在途请求数由控制器按主机收放
+        controller = get_concurrency_controller()
+        pool_size = max(self.max_workers, controller.max_limit) if controller else self.max_workers
+
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
             # 提交所有任务
             future_to_task = {}
 
@@ -232,6 +239,8 @@ class BatchSuite:
                         "timestamp": datetime.now().isoformat()
                     })
 
+        # 同一测试文件在各角色间只解析一次，批次结束后释放缓存
+        self.robust_system.clear_cache()
         return results
 
     def save_results(self, results: List[Dict[str, Any]]) -> Path:
@@ -450,8 +459,10 @@ def main():
                        help='指定测试文件路径，逗号分隔')
     parser.add_argument('--quick', action='store_true',
                        help='快速模式，仅处理少量文件')
+    add_concurrency_arguments(parser)
 
     args = parser.parse_args()
+    controller = concurrency_from_args(args)
 
     try:
         # 初始化批量套件
@@ -499,6 +510,9 @@ def main():
         print(f"❌ 失败: {total - successful}")
         print(f"📈 成功率: {success_rate:.1f}%")
         print(f"📁 结果文件: {result_path}")
+        if controller:
+            for key, state in controller.snapshot().items():
+                print(f"⚡ 并发上限 {key}: {state['limit']} (降档 {state['decreases']} 次)")
 
         return 0 if successful > 0 else 1
 
@@ -0,0 +1,356 @@
+"""
+Adaptive concurrency control for AgentPsy model calls
+Per-endpoint in-flight limits adjusted with additive-increase/multiplicative-decrease (AIMD):
+the limit grows by one per window of successful calls made at the limit, and shrinks when
+the short-window average latency inflates past the long-window average measured at the initial
+limit, or the endpoint times out or answers 429/503/504. Comparing averages rather than the fastest
+call seen keeps the wide spread of LLM latencies (output length varies per call) from reading as
+congestion; only latency that rises with concurrency does.
+One process-wide controller is shared by every executor; it is off unless configured.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_OVERLOAD = "overload"  # timeout / 429 / 503 / 504: congestion signal
+OUTCOME_ERROR = "error"  # other failures: no adjustment
+
+OVERLOAD_STATUS_CODES = frozenset({429, 503, 504})
+
+
+def classify_exception(exc: BaseException) -> str:
+    """Map an exception to an outcome: timeouts and 429/503/504 are overload, the rest plain errors"""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)) or "Timeout" in type(exc).__name__:
+        return OUTCOME_OVERLOAD
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return OUTCOME_OVERLOAD if status in OVERLOAD_STATUS_CODES else OUTCOME_ERROR
+
+
+class _KeyState:
+    """AIMD state of one endpoint"""
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.inflight = 0
+        self.latency_ewma: Optional[float] = None
+        self.latency_long: Optional[float] = None
+        self.samples = 0
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self.async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+class ConcurrencySlot:
+    """
+    One in-flight call. Use as a context manager (sync or async); an exception is
+    classified with classify_exception, otherwise the call counts as a success unless
+    overload() or error() was called.
+    """
+
+    def __init__(self, controller: "AdaptiveConcurrencyController", key: str):
+        self.controller = controller
+        self.key = key
+        self.outcome: Optional[str] = None
+        self._started = 0.0
+        self._saturated = False
+
+    def overload(self):
+        """Mark the call as an overload signal (e.g. a 429/503 response that did not raise)"""
+        self.outcome = OUTCOME_OVERLOAD
+
+    def error(self):
+        """Mark the call as failed without treating it as congestion"""
+        self.outcome = OUTCOME_ERROR
+
+    def __enter__(self) -> "ConcurrencySlot":
+        self._saturated = self.controller.acquire(self.key)
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        outcome = self.outcome or (classify_exception(exc_val) if exc_val is not None else OUTCOME_SUCCESS)
+        self.controller.release(self.key, time.monotonic() - self._started, outcome, self._saturated)
+        return False
+
+    async def __aenter__(self) -> "ConcurrencySlot":
+        self._saturated = await self.controller.acquire_async(self.key)
+        self._started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return self.__exit__(exc_type, exc_val, exc_tb)
+
+
+class _NoopSlot:
+    """Slot used while adaptive concurrency is off"""
+
+    def overload(self):
+        pass
+
+    def error(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NOOP_SLOT = _NoopSlot()
+
+
+class AdaptiveConcurrencyController:
+    """Per-key AIMD in-flight limits shared by every executor in the process"""
+
+    def __init__(self, initial_limit: int = 3, min_limit: int = 1, max_limit: int = 32,
+                 increase: float = 1.0, backoff: float = 0.5, latency_backoff: float = 0.8,
+                 latency_tolerance: float = 2.0, min_samples: int = 20, ewma_alpha: float = 0.2,
+                 long_alpha: float = 0.01, cooldown: float = 1.0):
+        """
+        Initialize the controller.
+
+        Args:
+            initial_limit (int): Starting in-flight limit of a new key
+            min_limit (int): Lower bound of every limit
+            max_limit (int): Upper bound of every limit (size executors to this)
+            increase (float): Limit gained per window of `limit` successful calls made at the limit
+            backoff (float): Factor applied to the limit on timeouts and 429/503/504
+            latency_backoff (float): Factor applied when latency inflates past the tolerance
+            latency_tolerance (float): Short-window / long-window latency ratio treated as inflation
+            min_samples (int): Successful calls averaged before latency inflation is acted on
+            ewma_alpha (float): Smoothing factor of the short-window latency average
+            long_alpha (float): Smoothing factor of the long-window latency average (learned at the initial limit)
+            cooldown (float): Minimum seconds between two decreases (at least one smoothed latency)
+        """
+        self.initial_limit = max(min_limit, min(initial_limit, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+        self.ewma_alpha = ewma_alpha
+        self.long_alpha = long_alpha
+        self.cooldown = cooldown
+        self._states: Dict[str, _KeyState] = {}
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._metrics = None
+
+    def _state(self, key: str) -> _KeyState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState(float(self.initial_limit))
+            self._publish(key, state)
+        return state
+
+    def _permits(self, state: _KeyState) -> int:
+        return max(self.min_limit, int(state.limit))
+
+    def _try_acquire(self, key: str) -> Optional[bool]:
+        """Take a permit (lock held); returns whether the key is now at its limit, None if none left"""
+        state = self._state(key)
+        if state.inflight >= self._permits(state):
+            return None
+        state.inflight += 1
+        self._publish(key, state)
+        return state.inflight >= self._permits(state)
+
+    # ---- acquire / release ----
+
+    def acquire(self, key: str) -> bool:
+        """Block until the key has a free permit; returns whether the call runs at the limit"""
+        with self._condition:
+            while True:
+                saturated = self._try_acquire(key)
+                if saturated is not None:
+                    return saturated
+                self._condition.wait()
+
+    async def acquire_async(self, key: str) -> bool:
+        """Async variant of acquire() that waits without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                saturated = self._try_acquire(key)
+                if saturated is not None:
+                    return saturated
+                future = loop.create_future()
+                self._states[key].async_waiters.append((loop, future))
+            await future
+
+    def slot(self, key: str) -> ConcurrencySlot:
+        """Context manager holding one permit of the key for the duration of a call"""
+        return ConcurrencySlot(self, key)
+
+    def release(self, key: str, latency: float, outcome: str = OUTCOME_SUCCESS, saturated: bool = True):
+        """
+        Return a permit and adjust the key's limit.
+
+        Args:
+            key (str): Endpoint key
+            latency (float): Seconds the call took
+            outcome (str): OUTCOME_SUCCESS, OUTCOME_OVERLOAD or OUTCOME_ERROR
+            saturated (bool): Whether the call ran with every permit in use (only then may the limit grow)
+        """
+        with self._condition:
+            state = self._state(key)
+            state.inflight = max(0, state.inflight - 1)
+            if outcome == OUTCOME_SUCCESS:
+                self._on_success(key, state, latency, saturated)
+            elif outcome == OUTCOME_OVERLOAD:
+                self._decrease(key, state, self.backoff, outcome)
+            self._publish(key, state)
+            self._wake(state)
+
+    def _on_success(self, key: str, state: _KeyState, latency: float, saturated: bool):
+        state.samples += 1
+        if state.samples <= self.min_samples:
+            # Warm-up: both windows hold the plain mean of the first calls
+            short_alpha = long_alpha = 1.0 / state.samples
+        else:
+            short_alpha, long_alpha = self.ewma_alpha, self.long_alpha
+        state.latency_ewma = latency if state.latency_ewma is None else \
+            state.latency_ewma + short_alpha * (latency - state.latency_ewma)
+        if state.latency_long is None:
+            state.latency_long = latency
+        elif state.samples <= self.min_samples or self._permits(state) <= self.initial_limit:
+            # The long window only learns from calls made at or below the initial limit (the low-load
+            # reference), so latency counts as inflated only when it rises with concurrency; if the
+            # workload itself gets slower the limit falls back there and the reference catches up
+            state.latency_long += long_alpha * (latency - state.latency_long)
+        inflated = (state.samples > self.min_samples and state.latency_long > 0
+                    and state.latency_ewma > state.latency_long * self.latency_tolerance)
+
+        if inflated:
+            self._decrease(key, state, self.latency_backoff, "latency")
+        elif saturated and state.limit < self.max_limit:
+            state.limit = min(float(self.max_limit), state.limit + self.increase / state.limit)
+
+    def _decrease(self, key: str, state: _KeyState, factor: float, reason: str):
+        now = time.monotonic()
+        # One decrease per congestion episode: calls already in flight report the same episode
+        if now - state.last_decrease < max(self.cooldown, state.latency_ewma or 0.0):
+            return
+        previous = state.limit
+        state.limit = max(float(self.min_limit), state.limit * factor)
+        state.last_decrease = now
+        state.decreases += 1
+        if self._metrics is not None:
+            self._metrics["decreases"].inc(key=key, reason=reason)
+        if int(previous) != int(state.limit):
+            logger.info(f"Concurrency limit for {key}: {int(previous)} -> {int(state.limit)} ({reason})")
+
+    def _wake(self, state: _KeyState):
+        """Wake sync and async waiters after a permit was freed (lock held)"""
+        self._condition.notify_all()
+        waiters, state.async_waiters = state.async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    # ---- metrics / introspection ----
+
+    def bind_metrics(self, registry: Any):
+        """
+        Publish limits through a metrics registry with gauge()/counter() factories
+        (e.g. metrics_exporter.MetricsRegistry in the production pipelines).
+        """
+        with self._lock:
+            self._metrics = {
+                "limit": registry.gauge("agentpsy_concurrency_limit", "Adaptive in-flight limit per endpoint", ("key",)),
+                "inflight": registry.gauge("agentpsy_concurrency_inflight", "In-flight calls per endpoint", ("key",)),
+                "decreases": registry.counter("agentpsy_concurrency_decreases_total",
+                                              "Adaptive limit decreases per endpoint", ("key", "reason")),
+            }
+            for key, state in self._states.items():
+                self._publish(key, state)
+
+    def _publish(self, key: str, state: _KeyState):
+        if self._metrics is not None:
+            self._metrics["limit"].set(self._permits(state), key=key)
+            self._metrics["inflight"].set(state.inflight, key=key)
+
+    def limit(self, key: str) -> int:
+        """Current in-flight limit of a key"""
+        with self._lock:
+            return self._permits(self._state(key))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Limits, in-flight calls and latency per key"""
+        with self._lock:
+            return {
+                key: {
+                    "limit": self._permits(state),
+                    "inflight": state.inflight,
+                    "latency_ewma": state.latency_ewma,
+                    "long_latency": state.latency_long,
+                    "decreases": state.decreases,
+                }
+                for key, state in self._states.items()
+            }
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_controller: Optional[AdaptiveConcurrencyController] = None
+
+
+def configure_concurrency(max_limit: int, initial_limit: Optional[int] = None, **kwargs) -> AdaptiveConcurrencyController:
+    """
+    Turn on adaptive concurrency for the process.
+
+    Args:
+        max_limit (int): Upper bound of every limit
+        initial_limit (int): Starting limit per key (defaults to min(3, max_limit))
+        **kwargs: Further AdaptiveConcurrencyController options
+
+    Returns:
+        AdaptiveConcurrencyController: The shared controller
+    """
+    global _controller
+    _controller = AdaptiveConcurrencyController(
+        initial_limit=initial_limit or min(3, max_limit), max_limit=max_limit, **kwargs)
+    return _controller
+
+
+def get_concurrency_controller() -> Optional[AdaptiveConcurrencyController]:
+    """The shared controller, or None while adaptive concurrency is off"""
+    return _controller
+
+
+def concurrency_slot(key: str):
+    """Slot of the shared controller, or a no-op slot while adaptive concurrency is off"""
+    controller = _controller
+    return controller.slot(key) if controller is not None else _NOOP_SLOT
+
+
+def add_concurrency_arguments(parser):
+    """Add the --adaptive-concurrency option to an argparse parser"""
+    parser.add_argument("--adaptive-concurrency", type=int, default=None, metavar="MAX",
+                        help="Adapt in-flight model calls per endpoint with AIMD, up to MAX "
+                             "(executors are sized to MAX; off by default)")
+
+
+def concurrency_from_args(args) -> Optional[AdaptiveConcurrencyController]:
+    """Configure the shared controller from parsed --adaptive-concurrency, if given"""
+    max_limit = getattr(args, "adaptive_concurrency", None)
+    return configure_concurrency(max_limit) if max_limit else None
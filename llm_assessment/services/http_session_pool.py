@@ -0,0 +1,176 @@
+"""
+HTTP Session Pool for AgentPsy cloud services
+Keeps one pooled requests.Session per provider (TLS and keep-alive connections are reused)
+and retries 429/5xx responses with jittered exponential backoff, honoring Retry-After
+"""
+
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .tracing import span, STAGE_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# (connect timeout, read timeout) in seconds per provider
+DEFAULT_TIMEOUT: Tuple[float, float] = (10.0, 120.0)
+TIMEOUT_PROFILES: Dict[str, Tuple[float, float]] = {
+    "together": (10.0, 120.0),
+    "openrouter": (10.0, 180.0),
+    "ppinfra": (10.0, 180.0),
+    "gemini": (10.0, 120.0),
+    "dashscope": (10.0, 120.0),
+    "glm": (10.0, 180.0),
+}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+
+    Args:
+        value (str): Header value, either delay seconds or an HTTP date
+
+    Returns:
+        float: Seconds to wait, or None if absent or unparseable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HTTPSessionPool:
+    """Provider-keyed registry of pooled sessions with retry and backoff"""
+
+    def __init__(self, pool_maxsize: int = 16, max_retries: int = 3,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 timeout_profiles: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Initialize the session pool.
+
+        Args:
+            pool_maxsize (int): Keep-alive connections kept per host
+            max_retries (int): Retries after the first attempt for 429/5xx and connection errors
+            backoff_base (float): Base delay in seconds for exponential backoff
+            backoff_max (float): Upper bound for a single backoff delay (also caps Retry-After)
+            timeout_profiles (dict): Per-provider (connect, read) timeouts overriding the defaults
+        """
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout_profiles = dict(TIMEOUT_PROFILES)
+        self.timeout_profiles.update(timeout_profiles or {})
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, provider: str) -> requests.Session:
+        """Get (creating on first use) the pooled session for a provider"""
+        with self._lock:
+            session = self._sessions.get(provider)
+            if session is None:
+                session = requests.Session()
+                # Retries are handled in request() so Retry-After and jitter apply
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[provider] = session
+            return session
+
+    def timeout(self, provider: str) -> Tuple[float, float]:
+        """Get the (connect, read) timeout profile for a provider"""
+        return self.timeout_profiles.get(provider, DEFAULT_TIMEOUT)
+
+    def backoff_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """
+        Delay before the next attempt: Retry-After when the server sent one,
+        otherwise full-jitter exponential backoff.
+
+        Args:
+            attempt (int): Zero-based index of the attempt that just failed
+            response (requests.Response): Failed response, if any
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, provider: str, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the provider's session, retrying 429/5xx and connection errors.
+
+        Args:
+            provider (str): Provider name (selects session and timeout profile)
+            method (str): HTTP method
+            url (str): Request URL
+            **kwargs: Passed to requests.Session.request
+
+        Returns:
+            requests.Response: The last response (may still be an error status after all retries)
+
+        Raises:
+            requests.RequestException: If the final attempt fails without a response
+        """
+        session = self.session(provider)
+        kwargs.setdefault("timeout", self.timeout(provider))
+
+        attempt = 0
+        while True:
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"{provider} request failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                delay = self.backoff_delay(attempt, response)
+                logger.warning(f"{provider} returned HTTP {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+
+            with span(STAGE_QUEUE_WAIT, 'retry_backoff', provider=provider, attempt=attempt):
+                time.sleep(delay)
+            attempt += 1
+
+    def post(self, provider: str, url: str, **kwargs) -> requests.Response:
+        """POST through the provider's pooled session with retries"""
+        return self.request(provider, "POST", url, **kwargs)
+
+    def close(self):
+        """Close all pooled sessions"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_default_pool: Optional[HTTPSessionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> HTTPSessionPool:
+    """Get the process-wide HTTP session pool"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = HTTPSessionPool()
+        return _default_pool
@@ -11,6 +11,10 @@ from dotenv import load_dotenv
 from openai import OpenAI
 
 from .model_manager import ModelManager
+from .endpoint_pool import EndpointPool
+from .adaptive_concurrency import concurrency_slot
+from .single_flight import get_single_flight, request_key
+from .tracing import traced, STAGE_MODEL
 
 # Load environment variables
 load_dotenv()
@@ -42,11 +46,16 @@ class LLMClient:
         else:
             raise ValueError(f"Invalid PROVIDER in .env: {self.provider}")
 
+        # Several Ollama hosts (LOCAL_API_BASES) are load-balanced; LOCAL_API_BASE is used otherwise
+        self.endpoint_pool = EndpointPool.from_env() if self.provider != "cloud" else None
+
         # --- DIAGNOSTIC PRINT --- #
         print("\n--- LLMClient Initialized with following config ---", flush=True)
         print(f"  PROVIDER: {self.provider}", flush=True)
         print(f"  LOCAL_API_BASE: {self.local_api_base}", flush=True)
         print(f"  LOCAL_API_KEY: {self.local_api_key}", flush=True)
+        if self.endpoint_pool:
+            print(f"  LOCAL_API_BASES: {self.endpoint_pool}", flush=True)
         print("----------------------------------------------------\n", flush=True)
             
     def get_model_id(self) -> str:
@@ -63,6 +72,7 @@ class LLMClient:
             # For now, we'll just return a placeholder
             return "cloud/model"
             
+    @traced(STAGE_MODEL)
     def generate_response(self, messages: List[Dict[str, str]], 
                          model_identifier: Optional[str] = None,
                          options: Optional[Dict[str, Any]] = None,
@@ -81,90 +91,120 @@ class LLMClient:
         if self.mock_mode:
             return "This is a mock response."
         try:
-            # Determine if we're using a cloud model (has slash and not starting with ollama/)
-            # For Ollama models, the identifier starts with "ollama/" or is in format "namespace/model:tag"
-            is_cloud_model = (model_identifier and 
-                             "/" in model_identifier and 
-                             not model_identifier.startswith("ollama/") and
-                             not (":" in model_identifier and len(model_identifier.split("/")) == 2))
-            
-            if (self.provider == "local" or self.provider == "") and not is_cloud_model:
-                # Use OpenAI client for local models (Ollama)
-                # Robustly construct the final URL for the OpenAI client
-                final_url = self.local_api_base.rstrip('/')
-                if final_url.endswith('/v1'):
-                    final_url = final_url[:-3]
-                final_url += '/v1'
-                
-                client = OpenAI(base_url=final_url, api_key=self.local_api_key)
-                model_id = model_identifier or self.local_model_id
-
-                # For Ollama, we should use the full model identifier as it appears in Ollama
-                # The previous approach of stripping prefix was incorrect
-                actual_model_id = model_id
-                
-                # Convert options to OpenAI format
-                openai_options = {}
-                if options:
-                    if "tmpr" in options:
-                        openai_options["temperature"] = options["tmpr"]
-                    if "max_tokens" in options:
-                        openai_options["max_tokens"] = options["max_tokens"]
-                        
-                # 如果timeout为0，则不设置超时限制
-                start_time = time.time()
-                try:
-                    if timeout > 0:
-                        logger.debug(f"Calling local model {actual_model_id} with timeout {timeout}s")
-                        response = client.chat.completions.create(
-                            model=actual_model_id, # Use the corrected model ID
-                            messages=messages,
-                            timeout=timeout,
-                            **openai_options
-                        )
-                    else:
-                        logger.debug(f"Calling local model {actual_model_id} with no timeout")
-                        response = client.chat.completions.create(
-                            model=actual_model_id, # Use the corrected model ID
-                            messages=messages,
-                            **openai_options
-                        )
-                    elapsed_time = time.time() - start_time
-                    logger.debug(f"Local model {actual_model_id} response received in {elapsed_time:.2f}s")
-                except Exception as e:
-                    elapsed_time = time.time() - start_time
-                    logger.error(f"Local model {actual_model_id} call failed after {elapsed_time:.2f}s: {e}")
-                    raise
-                return response.choices[0].message.content
-                
-            else:
-                # Use model manager for cloud models or when provider is not explicitly local
-                model_id = model_identifier or self.get_model_id()
-                # For cloud models, we need to ensure the model is loaded
-                if is_cloud_model:
-                    # Check if model is already loaded, if not, load it
-                    if not self.model_manager.is_model_ready(model_id):
-                        if not self.model_manager.load_model(model_id):
-                            logger.error(f"Failed to load cloud model: {model_id}")
-                            return None
-                start_time = time.time()
-                try:
-                    logger.debug(f"Calling cloud model {model_id}")
-                    response = self.model_manager.generate_response(messages, model_id, options)
-                    elapsed_time = time.time() - start_time
-                    logger.debug(f"Cloud model {model_id} response received in {elapsed_time:.2f}s")
-                    return response
-                except Exception as e:
-                    elapsed_time = time.time() - start_time
-                    logger.error(f"Cloud model {model_id} call failed after {elapsed_time:.2f}s: {e}")
-                    raise
-                
+            # Identical requests already in flight (from any client in this process) share one call
+            key = request_key(self.provider, model_identifier, messages, options)
+            return get_single_flight().do(
+                key, lambda: self._dispatch(messages, model_identifier, options, timeout),
+                label=model_identifier or "")
         except Exception as e:
             logger.error(f"LLM call failed: {e}")
             # 在调试模式下重新抛出异常以获取完整的堆栈跟踪
             if os.getenv("DEBUG", "").lower() in ("1", "true"):
                 raise
             return None
+
+    def _dispatch(self, messages: List[Dict[str, str]], model_identifier: Optional[str],
+                  options: Optional[Dict[str, Any]], timeout: int) -> Optional[str]:
+        """Route a request to the local or cloud backend; errors propagate to generate_response"""
+        # Determine if we're using a cloud model (has slash and not starting with ollama/)
+        # For Ollama models, the identifier starts with "ollama/" or is in format "namespace/model:tag"
+        is_cloud_model = (model_identifier and 
+                         "/" in model_identifier and 
+                         not model_identifier.startswith("ollama/") and
+                         not (":" in model_identifier and len(model_identifier.split("/")) == 2))
+        
+        if (self.provider == "local" or self.provider == "") and not is_cloud_model:
+            model_id = model_identifier or self.local_model_id
+            if self.endpoint_pool:
+                # Route to the least-loaded healthy host, failing over to the next one on errors
+                return self.endpoint_pool.call(
+                    lambda endpoint: self._generate_local(endpoint.url, messages, model_id, options, timeout),
+                    model=model_id)
+            return self._generate_local(self.local_api_base, messages, model_id, options, timeout)
+            
+        else:
+            # Use model manager for cloud models or when provider is not explicitly local
+            model_id = model_identifier or self.get_model_id()
+            # For cloud models, we need to ensure the model is loaded
+            if is_cloud_model:
+                # Check if model is already loaded, if not, load it
+                if not self.model_manager.is_model_ready(model_id):
+                    if not self.model_manager.load_model(model_id):
+                        logger.error(f"Failed to load cloud model: {model_id}")
+                        return None
+            start_time = time.time()
+            try:
+                logger.debug(f"Calling cloud model {model_id}")
+                with concurrency_slot(f"cloud:{model_id.split('/')[0]}"):
+                    response = self.model_manager.generate_response(messages, model_id, options)
+                elapsed_time = time.time() - start_time
+                logger.debug(f"Cloud model {model_id} response received in {elapsed_time:.2f}s")
+                return response
+            except Exception as e:
+                elapsed_time = time.time() - start_time
+                logger.error(f"Cloud model {model_id} call failed after {elapsed_time:.2f}s: {e}")
+                raise
+
+    def _generate_local(self, api_base: str, messages: List[Dict[str, str]], model_id: str,
+                        options: Optional[Dict[str, Any]], timeout: int) -> Optional[str]:
+        """
+        Call a local (Ollama) model through its OpenAI-compatible API
+        
+        Args:
+            api_base: Ollama host, with or without the /v1 suffix
+            messages: List of messages in OpenAI format
+            model_id: Model to use
+            options: Generation options (tmpr, max_tokens, etc.)
+            timeout: Request timeout in seconds (0 for none)
+        """
+        # Use OpenAI client for local models (Ollama)
+        # Robustly construct the final URL for the OpenAI client
+        final_url = api_base.rstrip('/')
+        if final_url.endswith('/v1'):
+            final_url = final_url[:-3]
+        final_url += '/v1'
+        
+        client = OpenAI(base_url=final_url, api_key=self.local_api_key)
+
+        # For Ollama, we should use the full model identifier as it appears in Ollama
+        # The previous approach of stripping prefix was incorrect
+        actual_model_id = model_id
+        
+        # Convert options to OpenAI format
+        openai_options = {}
+        if options:
+            if "tmpr" in options:
+                openai_options["temperature"] = options["tmpr"]
+            if "max_tokens" in options:
+                openai_options["max_tokens"] = options["max_tokens"]
+                
+        # 如果timeout为0，则不设置超时限制
+        start_time = time.time()
+        try:
+            # Adaptive per-host in-flight limit (no-op unless adaptive concurrency is configured)
+            with concurrency_slot(f"ollama:{final_url[:-3]}"):
+                if timeout > 0:
+                    logger.debug(f"Calling local model {actual_model_id} with timeout {timeout}s")
+                    response = client.chat.completions.create(
+                        model=actual_model_id, # Use the corrected model ID
+                        messages=messages,
+                        timeout=timeout,
+                        **openai_options
+                    )
+                else:
+                    logger.debug(f"Calling local model {actual_model_id} with no timeout")
+                    response = client.chat.completions.create(
+                        model=actual_model_id, # Use the corrected model ID
+                        messages=messages,
+                        **openai_options
+                    )
+            elapsed_time = time.time() - start_time
+            logger.debug(f"Local model {actual_model_id} response received in {elapsed_time:.2f}s")
+        except Exception as e:
+            elapsed_time = time.time() - start_time
+            logger.error(f"Local model {actual_model_id} call failed after {elapsed_time:.2f}s: {e}")
+            raise
+        return response.choices[0].message.content
             
     def list_models(self) -> List[str]:
         """
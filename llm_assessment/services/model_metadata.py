@@ -0,0 +1,231 @@
+"""
+Model Metadata Service for AgentPsy
+Queries Ollama's /api/show once per model and caches the result on disk
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".agentpsy", "model_metadata.json")
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# Failed lookups are remembered in memory only, so a stopped Ollama server is not hit on every call
+NEGATIVE_TTL_SECONDS = 60
+REQUEST_TIMEOUT_SECONDS = 5
+# Window Ollama serves when neither the Modelfile nor the request sets num_ctx
+OLLAMA_DEFAULT_NUM_CTX = 4096
+
+# Providers whose models are not served by the local Ollama instance
+CLOUD_PROVIDERS = ('openai/', 'together/', 'openrouter/', 'glm/', 'deepseek/', 'gemini/', 'anthropic/')
+
+
+def normalize_ollama_model(model_id: str) -> Optional[str]:
+    """
+    Convert a model identifier to the name Ollama knows it by.
+
+    Args:
+        model_id (str): Model identifier (e.g., 'ollama/qwen3:4b' or 'qwen3:4b')
+
+    Returns:
+        str: Ollama model name, or None for cloud-provider models
+    """
+    if not model_id:
+        return None
+    if model_id.startswith(CLOUD_PROVIDERS):
+        return None
+    if model_id.startswith('ollama/'):
+        model_id = model_id[len('ollama/'):]
+    if ':' not in model_id:
+        model_id = f"{model_id}:latest"
+    return model_id
+
+
+def served_context_length() -> int:
+    """
+    Get the window Ollama serves to requests that do not set num_ctx.
+
+    LLMClient talks to the OpenAI-compatible endpoint, which never sends num_ctx, so unless the
+    Modelfile sets it the server applies OLLAMA_CONTEXT_LENGTH (or its built-in default) rather
+    than the architecture maximum.
+
+    Returns:
+        int: Context length in tokens
+    """
+    value = os.getenv("OLLAMA_CONTEXT_LENGTH", "")
+    return int(value) if value.isdigit() and int(value) > 0 else OLLAMA_DEFAULT_NUM_CTX
+
+
+def parse_show_response(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract context length, parameter size and quantization from an /api/show response.
+
+    Args:
+        data (dict): JSON body returned by Ollama's /api/show
+
+    Returns:
+        dict: Metadata with context_length, parameter_size, quantization_level, family
+    """
+    details = data.get('details') or {}
+    model_info = data.get('model_info') or {}
+
+    context_length = None
+    for key, value in model_info.items():
+        if key.endswith('.context_length'):
+            context_length = int(value)
+            break
+
+    # A num_ctx parameter in the Modelfile overrides the architecture maximum
+    num_ctx = None
+    for line in (data.get('parameters') or '').splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] == 'num_ctx' and parts[1].isdigit():
+            num_ctx = int(parts[1])
+
+    return {
+        'context_length': context_length,
+        'num_ctx': num_ctx,
+        'parameter_size': details.get('parameter_size'),
+        'quantization_level': details.get('quantization_level'),
+        'family': details.get('family'),
+    }
+
+
+class ModelMetadataService:
+    """Caches Ollama model metadata on disk with a TTL"""
+
+    def __init__(self, api_base: Optional[str] = None, cache_path: Optional[str] = None,
+                 ttl_seconds: Optional[float] = None):
+        """Initialize model metadata service"""
+        self.api_base = (api_base or os.getenv("LOCAL_API_BASE", "http://localhost:11434")).rstrip('/')
+        self.cache_path = cache_path or os.getenv("MODEL_METADATA_CACHE", DEFAULT_CACHE_PATH)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("MODEL_METADATA_TTL", DEFAULT_TTL_SECONDS))
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict[str, Dict[str, Any]]] = None
+        self._failures: Dict[str, float] = {}
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        if self._cache is None:
+            self._cache = {}
+            if os.path.exists(self.cache_path):
+                try:
+                    with open(self.cache_path, 'r', encoding='utf-8') as f:
+                        self._cache = json.load(f)
+                except Exception as e:
+                    logger.warning(f"Failed to read model metadata cache {self.cache_path}: {e}")
+        return self._cache
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to write model metadata cache {self.cache_path}: {e}")
+
+    def fetch(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Query Ollama's /api/show for a model, bypassing the cache.
+
+        Args:
+            model_name (str): Ollama model name (e.g., 'qwen3:4b')
+
+        Returns:
+            dict: Parsed metadata, or None if Ollama is unreachable or the model is unknown
+        """
+        try:
+            response = requests.post(f"{self.api_base}/api/show", json={"model": model_name},
+                                     timeout=REQUEST_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            metadata = parse_show_response(response.json())
+        except Exception as e:
+            logger.debug(f"Ollama /api/show failed for {model_name}: {e}")
+            return None
+
+        metadata['fetched_at'] = time.time()
+        return metadata
+
+    def get(self, model_id: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get metadata for a model, querying Ollama only when the cache entry is missing or expired.
+
+        Args:
+            model_id (str): Model identifier (e.g., 'ollama/qwen3:4b')
+            refresh (bool): Ignore the cached entry
+
+        Returns:
+            dict: Metadata, or None for cloud models and models Ollama cannot describe
+        """
+        model_name = normalize_ollama_model(model_id)
+        if model_name is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            cache = self._load_cache()
+            entry = cache.get(model_name)
+            if not refresh and entry and now - entry.get('fetched_at', 0) < self.ttl_seconds:
+                return entry
+            if not refresh and now - self._failures.get(model_name, 0) < NEGATIVE_TTL_SECONDS:
+                return entry
+
+        metadata = self.fetch(model_name)
+
+        with self._lock:
+            if metadata is None:
+                self._failures[model_name] = now
+                # An expired entry is still better than nothing
+                return entry
+            self._failures.pop(model_name, None)
+            self._cache[model_name] = metadata
+            self._save_cache()
+        return metadata
+
+    def get_context_length(self, model_id: str) -> Optional[int]:
+        """
+        Get the context window a model is actually served with, in tokens.
+
+        A num_ctx set in the Modelfile wins; otherwise the architecture maximum is capped at the
+        server default (see served_context_length), since prompts beyond it are silently truncated.
+
+        Args:
+            model_id (str): Model identifier
+
+        Returns:
+            int: Context length in tokens, or None if unknown
+        """
+        metadata = self.get(model_id)
+        if not metadata:
+            return None
+        if metadata.get('num_ctx'):
+            return metadata['num_ctx']
+        if metadata.get('context_length'):
+            return min(metadata['context_length'], served_context_length())
+        return None
+
+
+_default_service: Optional[ModelMetadataService] = None
+_default_service_lock = threading.Lock()
+
+
+def get_metadata_service() -> ModelMetadataService:
+    """Get the process-wide model metadata service"""
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = ModelMetadataService()
+        return _default_service
+
+
+def get_model_metadata(model_id: str) -> Optional[Dict[str, Any]]:
+    """Get cached metadata (context length, parameter size, quantization) for a model"""
+    return get_metadata_service().get(model_id)
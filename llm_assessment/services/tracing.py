@@ -0,0 +1,430 @@
+"""
+Tracing Module
+Stage-level spans (prompt build, queue wait, model call, parse, scoring, checkpoint,
+file I/O) exported as JSONL and Chrome trace-event files (chrome://tracing or Perfetto).
+
+While tracing is disabled span() returns a shared no-op object, so the overhead is negligible.
+
+Enable with configure_tracing('trace.jsonl', chrome_path='trace.json') or by setting
+AGENTPSY_TRACE=trace.jsonl (optionally AGENTPSY_TRACE_CHROME=trace.json).
+
+Analyze with:
+    python -m llm_assessment.services.tracing summary trace.jsonl
+    python -m llm_assessment.services.tracing chrome trace.jsonl out.json
+"""
+
+import argparse
+import asyncio
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Leaf stages: where time is attributed
+STAGE_PROMPT_BUILD = 'prompt_build'
+STAGE_QUEUE_WAIT = 'queue_wait'
+STAGE_MODEL = 'model'
+STAGE_PARSE = 'parse'
+STAGE_SCORING = 'scoring'
+STAGE_CHECKPOINT = 'checkpoint'
+STAGE_IO = 'io'
+STAGES = (STAGE_PROMPT_BUILD, STAGE_QUEUE_WAIT, STAGE_MODEL, STAGE_PARSE, STAGE_SCORING, STAGE_CHECKPOINT, STAGE_IO)
+
+# Container stages group leaf stages (question, multi-model evaluation, file, batch); their own time counts as 'other'
+STAGE_QUESTION = 'question'
+STAGE_EVALUATION = 'evaluation'
+STAGE_FILE = 'file'
+STAGE_BATCH = 'batch'
+
+TRACE_ENV = 'AGENTPSY_TRACE'
+TRACE_CHROME_ENV = 'AGENTPSY_TRACE_CHROME'
+
+_tracer: Optional['Tracer'] = None
+_current_span: contextvars.ContextVar = contextvars.ContextVar('agentpsy_current_span', default=None)
+# Span ids are unique within the process, also across tracer reconfiguration
+_span_ids = itertools.count(1)
+# Stage listeners, listener(stage, entering), called in the thread entering/leaving a span (e.g. stage-scoped profiling)
+_stage_listeners: tuple = ()
+
+
+class _NoopSpan:
+    """Span returned while tracing is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _ListenedSpan(_NoopSpan):
+    """Span used while tracing is disabled but stage listeners are registered: notifies them without recording"""
+
+    __slots__ = ('stage',)
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        for listener in _stage_listeners:
+            listener(self.stage, True)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for listener in _stage_listeners:
+            listener(self.stage, False)
+        return False
+
+
+class Span:
+    """Timing of one stage, used as a context manager"""
+
+    __slots__ = ('tracer', 'stage', 'name', 'attrs', 'id', 'parent', '_start', '_token')
+
+    def __init__(self, tracer: 'Tracer', stage: str, name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.stage = stage
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_span_ids)
+        self.parent = None
+        self._start = 0
+        self._token = None
+
+    def set(self, **attrs):
+        """Add attributes (outcome, retry count, ...)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent = parent.id if parent is not None else None
+        self._token = _current_span.set(self)
+        for listener in _stage_listeners:
+            listener(self.stage, True)
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        end = time.perf_counter_ns()
+        for listener in _stage_listeners:
+            listener(self.stage, False)
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self, self._start, end)
+        return False
+
+
+class Tracer:
+    """Collects spans and appends them to a JSONL file; optionally exports a Chrome trace-event file on close"""
+
+    def __init__(self, path: str, chrome_path: Optional[str] = None, buffer_size: int = 256):
+        """
+        Initialize the tracer
+
+        Args:
+            path: JSONL output path (appended to)
+            chrome_path: Chrome trace-event file written on close
+            buffer_size: Number of spans buffered between file writes
+        """
+        self.path = path
+        self.chrome_path = chrome_path
+        self.buffer_size = max(1, buffer_size)
+        self.pid = os.getpid()
+        self.span_count = 0
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # perf_counter is monotonic and precise; offset to wall-clock time so processes line up
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def span(self, stage: str, name: Optional[str], attrs: Dict[str, Any]) -> Span:
+        return Span(self, stage, name or stage, attrs)
+
+    def record(self, span: Span, start_ns: int, end_ns: int):
+        event = {
+            'name': span.name,
+            'stage': span.stage,
+            'ts_us': (start_ns + self._epoch_offset_ns) // 1000,
+            'dur_us': (end_ns - start_ns) // 1000,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'thread': threading.current_thread().name,
+            'id': span.id,
+            'parent': span.parent,
+        }
+        if span.attrs:
+            event['attrs'] = span.attrs
+
+        with self._lock:
+            self._buffer.append(event)
+            self.span_count += 1
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        """Write buffered spans to the file"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Write remaining spans and export the Chrome trace-event file if configured"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_locked()
+        if self.chrome_path:
+            export_chrome(self.path, self.chrome_path)
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in self._buffer:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+        self._buffer.clear()
+
+    def __str__(self) -> str:
+        return f"Tracer(path={self.path}, chrome_path={self.chrome_path}, spans={self.span_count})"
+
+
+def configure_tracing(path: Optional[str] = None, chrome_path: Optional[str] = None) -> Optional[Tracer]:
+    """
+    Enable tracing (replacing any active tracer)
+
+    Args:
+        path: JSONL output path; defaults to the AGENTPSY_TRACE environment variable
+        chrome_path: Chrome trace-event output path; defaults to AGENTPSY_TRACE_CHROME
+
+    Returns:
+        The tracer, or None when no path is given (tracing stays disabled)
+    """
+    global _tracer
+    path = path or os.environ.get(TRACE_ENV)
+    chrome_path = chrome_path or os.environ.get(TRACE_CHROME_ENV)
+    if not path:
+        return None
+
+    disable_tracing()
+    _tracer = Tracer(path, chrome_path)
+    return _tracer
+
+
+def disable_tracing():
+    """Disable tracing and write out remaining spans"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def add_stage_listener(listener: Callable[[str, bool], None]):
+    """
+    Register a stage listener, called as listener(stage, entering) whenever a span is
+    entered or left, also while tracing is disabled
+    """
+    global _stage_listeners
+    _stage_listeners = _stage_listeners + (listener,)
+
+
+def remove_stage_listener(listener: Callable[[str, bool], None]):
+    """Remove a stage listener"""
+    global _stage_listeners
+    _stage_listeners = tuple(l for l in _stage_listeners if l is not listener)
+
+
+def span(stage: str, name: Optional[str] = None, **attrs):
+    """
+    Create a stage span for use in a with statement
+
+    Args:
+        stage: One of STAGES, or a container stage such as question / file / batch
+        name: Operation name, defaults to the stage
+        **attrs: Extra attributes
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _ListenedSpan(stage) if _stage_listeners else _NOOP_SPAN
+    return tracer.span(stage, name, attrs)
+
+
+def annotate(**attrs):
+    """Add attributes to the current span; does nothing while tracing is disabled"""
+    if _tracer is None:
+        return
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def traced(stage: str, name: Optional[str] = None) -> Callable:
+    """
+    Decorator recording each call of the function as a span (async functions supported)
+
+    Args:
+        stage: Stage of the span
+        name: Operation name, defaults to the function name
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                tracer = _tracer
+                if tracer is None:
+                    if not _stage_listeners:
+                        return await func(*args, **kwargs)
+                    with _ListenedSpan(stage):
+                        return await func(*args, **kwargs)
+                with tracer.span(stage, span_name, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                if not _stage_listeners:
+                    return func(*args, **kwargs)
+                with _ListenedSpan(stage):
+                    return func(*args, **kwargs)
+            with tracer.span(stage, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def read_trace(path: str) -> List[Dict[str, Any]]:
+    """Read a JSONL trace file, skipping torn lines"""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def export_chrome(jsonl_path: str, chrome_path: str):
+    """
+    Convert a JSONL trace to the Chrome trace-event format
+
+    Args:
+        jsonl_path: JSONL trace file
+        chrome_path: Output file path
+    """
+    trace_events = []
+    thread_names = {}
+    for event in read_trace(jsonl_path):
+        args = dict(event.get('attrs') or {})
+        args['span_id'] = event.get('id')
+        if event.get('parent') is not None:
+            args['parent_id'] = event['parent']
+        trace_events.append({
+            'name': event['name'],
+            'cat': event['stage'],
+            'ph': 'X',
+            'ts': event['ts_us'],
+            'dur': event['dur_us'],
+            'pid': event['pid'],
+            'tid': event['tid'],
+            'args': args
+        })
+        thread_names[(event['pid'], event['tid'])] = event.get('thread')
+
+    for (pid, tid), thread_name in thread_names.items():
+        if thread_name:
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                                 'args': {'name': thread_name}})
+
+    with open(chrome_path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+
+def summarize(events: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Total self time per stage (span duration minus its children) to locate the bottleneck
+
+    Returns:
+        {stage: {'count', 'self_ms', 'share'}}; self time of container stages counts as 'other'
+    """
+    child_time: Dict[tuple, int] = {}
+    for event in events:
+        if event.get('parent') is not None:
+            key = (event['pid'], event['parent'])
+            child_time[key] = child_time.get(key, 0) + event['dur_us']
+
+    totals: Dict[str, Dict[str, float]] = {}
+    for event in events:
+        stage = event['stage'] if event['stage'] in STAGES else 'other'
+        self_us = max(0, event['dur_us'] - child_time.get((event['pid'], event['id']), 0))
+        entry = totals.setdefault(stage, {'count': 0, 'self_ms': 0.0})
+        entry['count'] += 1
+        entry['self_ms'] += self_us / 1000
+
+    overall = sum(entry['self_ms'] for entry in totals.values())
+    for entry in totals.values():
+        entry['self_ms'] = round(entry['self_ms'], 3)
+        entry['share'] = round(entry['self_ms'] / overall, 4) if overall else 0.0
+    return dict(sorted(totals.items(), key=lambda item: item[1]['self_ms'], reverse=True))
+
+
+def _print_summary(path: str):
+    summary = summarize(read_trace(path))
+    print(f"{'stage':<14}{'spans':>8}{'self ms':>14}{'share':>9}")
+    print('-' * 45)
+    for stage, entry in summary.items():
+        print(f"{stage:<14}{entry['count']:>8}{entry['self_ms']:>14.1f}{entry['share'] * 100:>8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stage tracing file tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    summary_parser = commands.add_parser('summary', help='Self time share per stage')
+    summary_parser.add_argument('trace', help='JSONL trace file')
+    chrome_parser = commands.add_parser('chrome', help='Convert to the Chrome trace-event format')
+    chrome_parser.add_argument('trace', help='JSONL trace file')
+    chrome_parser.add_argument('output', help='Output file path')
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        _print_summary(args.trace)
+    else:
+        export_chrome(args.trace, args.output)
+        print(f"Chrome trace written to {args.output}")
+
+
+atexit.register(disable_tracing)
+
+# Enabled through the environment (subprocesses, scripts without a --trace option)
+if os.environ.get(TRACE_ENV):
+    configure_tracing()
+
+
+if __name__ == '__main__':
+    main()
@@ -25,7 +25,17 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from single_report_pipeline import TransparentPipeline
 from cloud_fallback_manager import CloudFallbackManager
+from tracing import (
+    configure_tracing, span, annotate, traced, STAGE_CHECKPOINT, STAGE_IO, STAGE_QUESTION, STAGE_FILE, STAGE_BATCH
+)
 from fallback_performance_monitor import PerformanceOptimizedFallbackManager
+from profiling import add_profile_arguments, start_profiling
+from metrics_exporter import MetricsExporter, RateWindow, get_registry
+from single_report_pipeline.work_queue import DEFAULT_LEASE_SECONDS, default_worker_id, open_work_queue
+from single_report_pipeline.adaptive_concurrency import (
+    add_concurrency_arguments, concurrency_from_args, get_concurrency_controller
+)
+from single_report_pipeline.single_flight import get_single_flight
 
 
 class CloudFallbackBatchProcessor:
@@ -35,7 +45,12 @@ class CloudFallbackBatchProcessor:
                  max_evaluators: int = 3,
                  use_enhanced: bool = False,
                  use_cloud_fallback: bool = True,
-                 performance_monitoring: bool = True):
+                 performance_monitoring: bool = True,
+                 metrics_port: Optional[int] = None,
+                 metrics_interval: float = 30.0,
+                 work_queue: Optional[str] = None,
+                 worker_id: Optional[str] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
         """
         初始化Cloud Fallback批处理器
 
@@ -46,6 +61,11 @@ class CloudFallbackBatchProcessor:
             use_enhanced: 是否使用增强流水线
             use_cloud_fallback: 是否启用Cloud Fallback
             performance_monitoring: 是否启用性能监控
+            metrics_port: 实时指标 HTTP 端口（Prometheus 文本格式）；为 None 时不启动端点
+            metrics_interval: 实时指标快照间隔（秒）；为 0 时不写快照
+            work_queue: 多节点共享工作队列（共享目录或SQLite路径）；指定时由队列分配文件并代替检查点
+            worker_id: 本工作进程标识，默认 主机名:进程号
+            lease_seconds: 工作队列租约时长（秒）
         """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
@@ -90,6 +110,12 @@ class CloudFallbackBatchProcessor:
             self.pipeline = TransparentPipeline(use_cloud=False)
             self.logger.info("🏠 使用本地流水线")
 
+        # 多节点工作队列：各节点领取同一批文件，结果保存在队列中
+        self.work_queue = open_work_queue(work_queue, lease_seconds=lease_seconds) if work_queue else None
+        self.worker_id = worker_id or default_worker_id()
+        if self.work_queue:
+            self.logger.info(f"🗂️ 使用共享工作队列: {self.work_queue}（工作进程 {self.worker_id}）")
+
         # 初始化状态
         self.processed_files = set()
         self.results = []
@@ -119,6 +145,32 @@ class CloudFallbackBatchProcessor:
             'failed_questions': 0
         }
 
+        # 实时指标：HTTP 端点（指定端口时）与 live_metrics.json / live_metrics.prom 定期快照
+        self.metrics = get_registry()
+        self.metrics_exporter = MetricsExporter(
+            self.metrics,
+            port=metrics_port,
+            snapshot_path=str(self.output_dir / "live_metrics.json") if metrics_interval > 0 else None,
+            snapshot_interval=metrics_interval or 30.0
+        )
+        self.question_rate = RateWindow(window=60.0)
+        self.files_total_gauge = self.metrics.gauge('agentpsy_batch_files_total', '本批次有效文件总数')
+        self.current_file_gauge = self.metrics.gauge('agentpsy_batch_current_file_index', '当前处理的文件序号')
+        self.files_counter = self.metrics.counter('agentpsy_batch_files_processed_total', '已处理文件数', ('outcome',))
+        self.questions_counter = self.metrics.counter('agentpsy_batch_questions_total', '已处理题目数', ('outcome',))
+        self.question_duration = self.metrics.histogram('agentpsy_batch_question_duration_seconds', '单题处理耗时（秒）')
+        self.queue_depth_gauge = self.metrics.gauge('agentpsy_batch_queue_depth', '当前文件中尚未处理的题目数')
+        self.last_progress_gauge = self.metrics.gauge(
+            'agentpsy_batch_last_progress_timestamp_seconds', '最近一道题完成的时间（Unix秒），长时间不变说明处理停滞')
+        self.metrics.gauge('agentpsy_batch_questions_per_second', '最近60秒的题目吞吐（题/秒）').set_function(
+            self.question_rate.rate)
+        # 自适应并发（--adaptive-concurrency）的每主机上限、在途数与降档次数
+        controller = get_concurrency_controller()
+        if controller:
+            controller.bind_metrics(self.metrics)
+        # 同时在途的重复模型请求被合并的次数
+        get_single_flight().bind_metrics(self.metrics)
+
     def _init_problem_patterns(self):
         """初始化问题报告识别模式"""
         self.problem_patterns = [
@@ -324,6 +376,7 @@ class CloudFallbackBatchProcessor:
 
         return valid_files
 
+    @traced(STAGE_QUESTION)
     async def _process_single_question_with_fallback(self, question: Dict, question_index: int) -> Dict[str, Any]:
         """
         使用Cloud Fallback处理单个问题
@@ -335,6 +388,7 @@ class CloudFallbackBatchProcessor:
         Returns:
             处理结果
         """
+        annotate(question_id=question.get('question_id', f'Q{question_index}'), question_index=question_index)
         try:
             if self.use_cloud_fallback and self.fallback_manager:
                 # 使用Cloud Fallback处理
@@ -453,6 +507,7 @@ class CloudFallbackBatchProcessor:
             import random
             return random.choice(['qwen', 'deepseek'])
 
+    @traced(STAGE_FILE)
     async def _process_file_with_fallback(self, file_path: Path) -> Dict[str, Any]:
         """
         使用Cloud Fallback处理单个文件
@@ -463,52 +518,71 @@ class CloudFallbackBatchProcessor:
         Returns:
             处理结果
         """
+        annotate(file=file_path.name)
         try:
             self.logger.info(f"🔍 Cloud Fallback处理: {file_path.name}")
 
             # 解析输入文件
             from single_report_pipeline.input_parser import InputParser
             parser = InputParser()
-            questions = parser.parse_assessment_json(str(file_path))
+            with span(STAGE_IO, 'parse_assessment_json'):
+                questions = parser.parse_assessment_json(str(file_path))
 
             self.logger.info(f"   题目总数: {len(questions)} (全部处理)")
+            self.queue_depth_gauge.set(len(questions))
 
             # 处理所有问题
-            results = []
-            successful_questions = 0
-            total_reliability = 0.0
+            remaining = len(questions)
 
-            for i, question in enumerate(questions):
+            async def evaluate(i: int, question: Dict) -> Dict[str, Any]:
+                nonlocal remaining
                 self.logger.info(f"   处理题目 {i+1}/{len(questions)}: {question.get('question_id', i)}")
 
+                question_start = time.time()
                 try:
                     # 处理单个问题
                     result = await self._process_single_question_with_fallback(question, i)
-
-                    if result['success']:
-                        successful_questions += 1
-                        total_reliability += result['reliability']
-
-                        # 记录处理信息
-                        provider_info = f"{result['provider']}:{result['model_name']}"
-                        fallback_info = " → ".join(result['fallback_chain']) if result['fallback_chain'] else provider_info
-
-                        self.logger.info(f"      ✅ 完成 - 可靠性: {result['reliability']:.3f}, "
-                                       f"模型: {fallback_info}, "
-                                       f"响应时间: {result['response_time']:.2f}s")
-                    else:
-                        self.logger.warning(f"      ❌ 失败 - {result['error_message']}")
-
-                    results.append(result)
-
                 except Exception as e:
                     self.logger.error(f"      ❌ 异常 - {e}")
-                    results.append({
+                    remaining -= 1
+                    self._record_question_metrics(False, question_start, remaining)
+                    return {
                         'success': False,
                         'question_id': question.get('question_id', i),
                         'question_index': i,
                         'error_message': str(e)
-                    })
+                    }
+
+                remaining -= 1
+                self._record_question_metrics(result['success'], question_start, remaining)
+                if result['success']:
+                    # 记录处理信息
+                    provider_info = f"{result['provider']}:{result['model_name']}"
+                    fallback_info = " → ".join(result['fallback_chain']) if result['fallback_chain'] else provider_info
+
+                    self.logger.info(f"      ✅ 完成 - 可靠性: {result['reliability']:.3f}, "
+                                   f"模型: {fallback_info}, "
+                                   f"响应时间: {result['response_time']:.2f}s")
+                else:
+                    self.logger.warning(f"      ❌ 失败 - {result['error_message']}")
+                return result
+
+            controller = get_concurrency_controller()
+            if controller is None:
+                results = [await evaluate(i, question) for i, question in enumerate(questions)]
+            else:
+                # 自适应并发：题目并发处理，每个主机的在途调用数由控制器槽位限制，同时处理的题目不超过 MAX
+                gate = asyncio.Semaphore(controller.max_limit)
+
+                async def gated(i: int, question: Dict) -> Dict[str, Any]:
+                    async with gate:
+                        return await evaluate(i, question)
+
+                results = list(await asyncio.gather(*(gated(i, question) for i, question in enumerate(questions))))
+
+            successful = [result for result in results if result['success']]
+            successful_questions = len(successful)
+            total_reliability = sum(result['reliability'] for result in successful)
 
             # 计算文件级别的统计
             avg_reliability = total_reliability / successful_questions if successful_questions > 0 else 0.0
@@ -536,7 +610,7 @@ class CloudFallbackBatchProcessor:
 
             # 保存文件结果
             output_file = self.output_dir / f"{file_path.stem}_cloud_fallback_evaluation.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
+            with span(STAGE_IO, 'write_file_result'), open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(file_result, f, indent=2, ensure_ascii=False)
 
             self.logger.info(f"   📊 文件处理完成: {successful_questions}/{len(questions)} 成功, "
@@ -553,8 +627,19 @@ class CloudFallbackBatchProcessor:
                 'timestamp': datetime.now().isoformat()
             }
 
+    def _record_question_metrics(self, success: bool, start_time: float, remaining: int):
+        """更新单题完成后的实时指标"""
+        now = time.time()
+        self.questions_counter.inc(outcome='success' if success else 'failure')
+        self.question_duration.observe(now - start_time)
+        self.question_rate.mark()
+        self.queue_depth_gauge.set(remaining)
+        self.last_progress_gauge.set(now)
+
+    @traced(STAGE_BATCH)
     async def process_batch_async(self):
         """异步批量处理"""
+        self.metrics_exporter.start()
         try:
             self.logger.info("🚀 Cloud Fallback批量测评报告处理器")
             self.logger.info("=" * 80)
@@ -563,15 +648,21 @@ class CloudFallbackBatchProcessor:
             self.logger.info(f"处理参数: 全部题目处理, 最大{self.max_evaluators}个评估器")
             self.logger.info(f"算法选择: Cloud Fallback {'(增强模式)' if self.use_enhanced else ''}")
 
-            # 加载检查点
-            if self._load_checkpoint():
-                self.logger.info(f"📂 从检查点恢复: 已处理 {len(self.processed_files)} 个文件")
-            else:
-                self.logger.info("ℹ️  未找到检查点文件")
+            # 加载检查点（工作队列模式下队列本身即检查点）
+            if self.work_queue is None:
+                if self._load_checkpoint():
+                    self.logger.info(f"📂 从检查点恢复: 已处理 {len(self.processed_files)} 个文件")
+                else:
+                    self.logger.info("ℹ️  未找到检查点文件")
 
             # 查找有效文件
             valid_files = self._find_valid_files()
             self.total_files = len(valid_files)
+            self.files_total_gauge.set(self.total_files)
+
+            if self.work_queue:
+                await self._process_work_queue(valid_files)
+                return
 
             self.logger.info(f"   已处理: {len(self.processed_files)} 个")
             self.logger.info(f"   剩余: {self.total_files} 个")
@@ -594,6 +685,7 @@ class CloudFallbackBatchProcessor:
             # 处理剩余文件
             for i, file_path in enumerate(remaining_files):
                 self.current_file_index = len(self.processed_files) + i + 1
+                self.current_file_gauge.set(self.current_file_index)
 
                 self.logger.info(f"📁 进度: {self.current_file_index}/{self.total_files} 文件")
 
@@ -601,6 +693,7 @@ class CloudFallbackBatchProcessor:
                     # 处理文件
                     result = await self._process_file_with_fallback(file_path)
                     self.results.append(result)
+                    self.files_counter.inc(outcome='failure' if result.get('success') is False else 'success')
 
                     # 记录已处理文件
                     self.processed_files.add(file_path.name)
@@ -614,6 +707,7 @@ class CloudFallbackBatchProcessor:
 
                 except Exception as e:
                     self.logger.error(f"❌ 文件处理异常 {file_path.name}: {e}")
+                    self.files_counter.inc(outcome='error')
                     traceback.print_exc()
                     continue
 
@@ -630,6 +724,66 @@ class CloudFallbackBatchProcessor:
         except Exception as e:
             self.logger.error(f"❌ 批量处理失败: {e}")
             traceback.print_exc()
+        finally:
+            self.metrics_exporter.stop()
+
+    async def _process_work_queue(self, valid_files: List[Path]):
+        """工作队列模式：领取文件直到队列中没有待处理条目，再以全部节点的结果生成最终报告"""
+        # 以文件名为条目标识，各节点挂载共享目录的路径可以不同
+        added = self.work_queue.enqueue_many((f.name, None) for f in valid_files)
+        files_by_name = {f.name: f for f in valid_files}
+        self.logger.info(f"   新加入队列: {added} 个, 队列状态: {self.work_queue.stats()}")
+
+        skipped = set()
+        while True:
+            lease = self.work_queue.claim(self.worker_id, skip=skipped)
+            if lease is None:
+                break
+
+            file_path = files_by_name.get(lease.item_id)
+            if file_path is None:
+                # 本节点的输入目录中没有该文件：交还给其他节点（不计入领取次数），本节点不再领取
+                self.work_queue.release(lease)
+                skipped.add(lease.item_id)
+                continue
+
+            self.current_file_index += 1
+            self.current_file_gauge.set(self.current_file_index)
+            self.logger.info(f"📁 领取: {lease.item_id}（第{lease.attempts}次, 本节点第{self.current_file_index}个文件）")
+
+            try:
+                with self.work_queue.keep_alive(lease) as keeper:
+                    result = await self._process_file_with_fallback(file_path)
+                if keeper.lost or not self.work_queue.complete(lease, result):
+                    self.logger.warning(f"⚠️  租约已丢失，结果不写入队列: {lease.item_id}")
+                    continue
+                self.results.append(result)
+                self.files_counter.inc(outcome='failure' if result.get('success') is False else 'success')
+
+                import gc
+                gc.collect()
+
+            except Exception as e:
+                self.logger.error(f"❌ 文件处理异常 {file_path.name}: {e}")
+                self.files_counter.inc(outcome='error')
+                self.work_queue.fail(lease, str(e))
+                traceback.print_exc()
+
+        stats = self.work_queue.stats()
+        self.logger.info(f"🗂️ 本节点处理 {len(self.results)} 个文件, 队列状态: {stats}")
+        if not self.work_queue.is_drained():
+            self.logger.info("ℹ️  其他节点仍在处理，最终报告将由最后完成的节点生成")
+            return
+
+        # 合并所有节点的结果
+        self.results = [result for _, result in self.work_queue.results()]
+        self._generate_final_report()
+
+        if self.performance_monitoring and hasattr(self.fallback_manager, 'get_performance_dashboard'):
+            self._generate_performance_report()
+
+        self.logger.info("")
+        self.logger.info("🎉 Cloud Fallback批量处理完成！")
 
     def _load_checkpoint(self) -> bool:
         """加载检查点"""
@@ -645,6 +799,7 @@ class CloudFallbackBatchProcessor:
             self.logger.warning(f"⚠️  加载检查点失败: {e}")
         return False
 
+    @traced(STAGE_CHECKPOINT)
     def _save_checkpoint(self):
         """保存检查点"""
         try:
@@ -659,6 +814,7 @@ class CloudFallbackBatchProcessor:
         except Exception as e:
             self.logger.error(f"❌ 保存检查点失败: {e}")
 
+    @traced(STAGE_IO)
     def _generate_final_report(self):
         """生成最终报告"""
         try:
@@ -817,9 +973,27 @@ def main():
     parser.add_argument('--enhanced', action='store_true', help='使用增强算法')
     parser.add_argument('--no-cloud-fallback', action='store_true', help='禁用Cloud Fallback')
     parser.add_argument('--no-performance-monitoring', action='store_true', help='禁用性能监控')
+    parser.add_argument('--trace', type=str, default=None, help='阶段追踪输出文件（JSONL）')
+    parser.add_argument('--trace-chrome', type=str, default=None, help='阶段追踪的Chrome trace-event输出文件')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='在本机该端口提供实时指标（Prometheus 文本格式，/metrics）')
+    parser.add_argument('--metrics-interval', type=float, default=30.0,
+                        help='实时指标快照写入输出目录的间隔（秒，0 为不写）')
+    parser.add_argument('--work-queue', type=str, default=None,
+                        help='多节点共享工作队列：共享目录，或 .db / sqlite:/// 形式的SQLite数据库')
+    parser.add_argument('--worker-id', type=str, default=None, help='工作进程标识（默认 主机名:进程号）')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS,
+                        help='工作队列租约时长（秒），工作进程崩溃后条目在租约到期后被重新领取')
+    add_profile_arguments(parser)
+    add_concurrency_arguments(parser)
 
     args = parser.parse_args()
 
+    if args.trace:
+        configure_tracing(args.trace, chrome_path=args.trace_chrome)
+    start_profiling(args)
+    concurrency_from_args(args)
+
     # 创建处理器
     processor = CloudFallbackBatchProcessor(
         input_dir=args.input_dir,
@@ -827,7 +1001,12 @@ def main():
         max_evaluators=args.max_evaluators,
         use_enhanced=args.enhanced,
         use_cloud_fallback=not args.no_cloud_fallback,
-        performance_monitoring=not args.no_performance_monitoring
+        performance_monitoring=not args.no_performance_monitoring,
+        metrics_port=args.metrics_port,
+        metrics_interval=args.metrics_interval,
+        work_queue=args.work_queue,
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds
     )
 
     # 运行异步处理
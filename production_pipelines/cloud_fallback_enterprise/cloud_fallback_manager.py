@@ -15,6 +15,11 @@ from dataclasses import dataclass
 from enum import Enum
 import time
 
+from tracing import span, annotate, traced, STAGE_PROMPT_BUILD, STAGE_MODEL, STAGE_PARSE, STAGE_EVALUATION
+from single_report_pipeline.endpoint_pool import EndpointPool
+from single_report_pipeline.adaptive_concurrency import OVERLOAD_STATUS_CODES, concurrency_slot
+from single_report_pipeline.single_flight import get_single_flight, request_key
+
 
 class ModelProvider(Enum):
     """模型提供商枚举"""
@@ -32,6 +37,7 @@ class ModelConfig:
     api_key: Optional[str] = None
     timeout: int = 60
     max_retries: int = 2
+    base_urls: Optional[List[str]] = None  # 本地模型的多台Ollama主机，按负载均衡路由
 
 
 @dataclass
@@ -74,6 +80,9 @@ class CloudFallbackManager:
         self.model_mapping = self._load_model_mapping(config_path)
         self.timeout_config = self._load_timeout_config()
         self.session = None
+        # 本地模型主机池，按主机列表缓存；未配置 base_urls 时读取 LOCAL_API_BASES
+        self._endpoint_pools: Dict[Tuple[str, ...], EndpointPool] = {}
+        self._env_endpoint_pool = EndpointPool.from_env()
 
     def _setup_logger(self) -> logging.Logger:
         """设置日志记录器"""
@@ -109,7 +118,8 @@ class CloudFallbackManager:
                     model_name=provider_config['model_name'],
                     base_url=provider_config['base_url'],
                     api_key=provider_config.get('api_key'),
-                    timeout=provider_config.get('timeout', 60)
+                    timeout=provider_config.get('timeout', 60),
+                    base_urls=provider_config.get('base_urls')
                 )
                 model_mapping[brand].append(model_config)
 
@@ -190,6 +200,7 @@ class CloudFallbackManager:
         if self.session:
             await self.session.close()
 
+    @traced(STAGE_EVALUATION)
     async def evaluate_with_fallback(self,
                                    model_family: str,
                                    prompt: str,
@@ -205,6 +216,7 @@ class CloudFallbackManager:
         Returns:
             EvaluationResult: 评估结果
         """
+        annotate(model_family=model_family, question_id=context.get('question_id'))
         if model_family not in self.model_mapping:
             raise ValueError(f"不支持的模型系列: {model_family}")
 
@@ -261,14 +273,16 @@ class CloudFallbackManager:
         start_time = time.time()
 
         try:
-            if model_config.provider == ModelProvider.OLLAMA_CLOUD:
-                result = await self._try_ollama_cloud(model_config, prompt, context)
-            elif model_config.provider == ModelProvider.OPENROUTER:
-                result = await self._try_openrouter(model_config, prompt, context)
-            elif model_config.provider == ModelProvider.LOCAL:
-                result = await self._try_local_model(model_config, prompt, context)
-            else:
-                raise ValueError(f"不支持的提供商: {model_config.provider}")
+            with span(STAGE_MODEL, model_config.provider.value, model=model_config.model_name) as model_span:
+                if model_config.provider == ModelProvider.OLLAMA_CLOUD:
+                    result = await self._try_ollama_cloud(model_config, prompt, context)
+                elif model_config.provider == ModelProvider.OPENROUTER:
+                    result = await self._try_openrouter(model_config, prompt, context)
+                elif model_config.provider == ModelProvider.LOCAL:
+                    result = await self._try_local_model(model_config, prompt, context)
+                else:
+                    raise ValueError(f"不支持的提供商: {model_config.provider}")
+                model_span.set(success=result.success)
 
             response_time = time.time() - start_time
             result.response_time = response_time
@@ -361,31 +375,39 @@ class CloudFallbackManager:
             }
 
             # 发送请求
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{model_config.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=model_config.timeout)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"OpenRouter API错误: {response.status} - {error_text}")
+            async def send() -> Dict:
+                async with concurrency_slot("openrouter") as slot:
+                    async with aiohttp.ClientSession() as session:
+                        async with session.post(
+                            f"{model_config.base_url}/chat/completions",
+                            headers=headers,
+                            json=payload,
+                            timeout=aiohttp.ClientTimeout(total=model_config.timeout)
+                        ) as response:
+                            if response.status != 200:
+                                if response.status in OVERLOAD_STATUS_CODES:
+                                    slot.overload()
+                                error_text = await response.text()
+                                raise Exception(f"OpenRouter API错误: {response.status} - {error_text}")
+
+                            return await response.json()
+
+            # 相同请求正在进行时直接等待其结果，不重复调用
+            result_data = await get_single_flight().do_async(
+                request_key("openrouter", model_config.base_url, payload), send, label=model_config.model_name)
+
+            # 解析响应
+            scores = self._parse_openrouter_response(result_data)
+
+            self.logger.info(f"✅ OpenRouter评估成功: {scores}")
 
-                    result_data = await response.json()
-
-                    # 解析响应
-                    scores = self._parse_openrouter_response(result_data)
-
-                    self.logger.info(f"✅ OpenRouter评估成功: {scores}")
-
-                    return EvaluationResult(
-                        success=True,
-                        scores=scores,
-                        provider=ModelProvider.OPENROUTER,
-                        model_name=model_config.model_name,
-                        response_time=0.0
-                    )
+            return EvaluationResult(
+                success=True,
+                scores=scores,
+                provider=ModelProvider.OPENROUTER,
+                model_name=model_config.model_name,
+                response_time=0.0
+            )
 
         except asyncio.TimeoutError:
             raise Exception("OpenRouter API调用超时")
@@ -393,6 +415,7 @@ class CloudFallbackManager:
             self.logger.error(f"❌ OpenRouter调用失败: {str(e)}")
             raise Exception(f"OpenRouter API调用失败: {str(e)}")
 
+    @traced(STAGE_PROMPT_BUILD)
     def _build_evaluation_prompt(self, prompt: str, context: Dict[str, Any]) -> str:
         """构建评估提示词"""
         question_id = context.get("question_id", "Unknown")
@@ -422,6 +445,7 @@ class CloudFallbackManager:
 """
         return evaluation_prompt
 
+    @traced(STAGE_PARSE)
     def _parse_openrouter_response(self, response_data: Dict) -> Dict[str, int]:
         """解析OpenRouter响应"""
         try:
@@ -514,31 +538,48 @@ class CloudFallbackManager:
             }
 
             # 发送请求到本地Ollama服务
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{model_config.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=model_config.timeout)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"本地Ollama API错误: {response.status} - {error_text}")
-
-                    result_data = await response.json()
-
-                    # 解析响应
-                    scores = self._parse_openrouter_response(result_data)  # 复用OpenRouter的解析逻辑
+            async def send(base_url: str) -> Dict:
+                async with concurrency_slot(f"ollama:{base_url}") as slot:
+                    async with aiohttp.ClientSession() as session:
+                        async with session.post(
+                            f"{base_url}/chat/completions",
+                            headers=headers,
+                            json=payload,
+                            timeout=aiohttp.ClientTimeout(total=model_config.timeout)
+                        ) as response:
+                            if response.status != 200:
+                                if response.status in OVERLOAD_STATUS_CODES:
+                                    slot.overload()
+                                error_text = await response.text()
+                                raise Exception(f"本地Ollama API错误: {response.status} - {error_text}")
+
+                            return await response.json()
+
+            async def fetch() -> Dict:
+                endpoint_pool = self._local_endpoint_pool(model_config)
+                if endpoint_pool:
+                    # 多台主机：路由到负载最低的健康主机，失败时切换下一台
+                    return await endpoint_pool.call_async(lambda endpoint: send(endpoint.url),
+                                                          model=model_config.model_name)
+                return await send(model_config.base_url)
+
+            # 相同请求正在进行时直接等待其结果，不重复调用
+            result_data = await get_single_flight().do_async(
+                request_key("ollama", model_config.base_urls or model_config.base_url, payload), fetch,
+                label=model_config.model_name)
+
+            # 解析响应
+            scores = self._parse_openrouter_response(result_data)  # 复用OpenRouter的解析逻辑
+
+            self.logger.info(f"✅ 本地Ollama评估成功: {scores}")
 
-                    self.logger.info(f"✅ 本地Ollama评估成功: {scores}")
-
-                    return EvaluationResult(
-                        success=True,
-                        scores=scores,
-                        provider=ModelProvider.LOCAL,
-                        model_name=model_config.model_name,
-                        response_time=0.0
-                    )
+            return EvaluationResult(
+                success=True,
+                scores=scores,
+                provider=ModelProvider.LOCAL,
+                model_name=model_config.model_name,
+                response_time=0.0
+            )
 
         except asyncio.TimeoutError:
             raise Exception("本地Ollama API调用超时")
@@ -548,6 +589,15 @@ class CloudFallbackManager:
             self.logger.error(f"❌ 本地Ollama调用失败: {str(e)}")
             raise Exception(f"本地Ollama API调用失败: {str(e)}")
 
+    def _local_endpoint_pool(self, model_config: ModelConfig) -> Optional[EndpointPool]:
+        """本地模型的主机池：配置了 base_urls 时按其创建，否则使用 LOCAL_API_BASES；均未配置时返回None"""
+        if not model_config.base_urls:
+            return self._env_endpoint_pool
+        key = tuple(model_config.base_urls)
+        if key not in self._endpoint_pools:
+            self._endpoint_pools[key] = EndpointPool(model_config.base_urls)
+        return self._endpoint_pools[key]
+
     async def check_local_model_availability(self, model_config: ModelConfig) -> bool:
         """检查本地模型可用性"""
         try:
@@ -21,6 +21,7 @@ from cloud_fallback_manager import (
     ModelConfig,
     EvaluationResult
 )
+from metrics_exporter import MetricsRegistry, get_registry
 
 
 @dataclass
@@ -42,6 +43,7 @@ class PerformanceMetrics:
 class ProviderStats:
     """提供商统计数据"""
     provider: str
+    model_name: str
     total_requests: int
     successful_requests: int
     failed_requests: int
@@ -53,12 +55,13 @@ class ProviderStats:
 class FallbackPerformanceMonitor:
     """Fallback性能监控器"""
 
-    def __init__(self, max_history: int = 1000):
+    def __init__(self, max_history: int = 1000, registry: Optional[MetricsRegistry] = None):
         """
         初始化性能监控器
 
         Args:
             max_history: 最大历史记录数量
+            registry: 实时指标注册表，默认使用进程共享注册表
         """
         self.max_history = max_history
         self.metrics_history: deque = deque(maxlen=max_history)
@@ -70,6 +73,13 @@ class FallbackPerformanceMonitor:
             'complete_failures': 0
         }
 
+        # 实时指标（由 MetricsExporter 导出）
+        self.metrics = registry or get_registry()
+        self.requests_counter = self.metrics.counter(
+            'agentpsy_fallback_requests_total', 'Fallback评估请求数', ('provider', 'model', 'outcome'))
+        self.request_duration = self.metrics.histogram(
+            'agentpsy_fallback_request_duration_seconds', 'Fallback评估请求耗时（秒）', ('provider',))
+
         self.logger = self._setup_logger()
 
     def _setup_logger(self) -> logging.Logger:
@@ -109,6 +119,12 @@ class FallbackPerformanceMonitor:
         # 更新提供商统计
         self._update_provider_stats(metric)
 
+        # 更新实时指标
+        self.requests_counter.inc(provider=metric.provider, model=metric.model_name,
+                                  outcome='success' if metric.success else 'failure')
+        if metric.success:
+            self.request_duration.observe(metric.response_time, provider=metric.provider)
+
         # 更新会话统计
         self.session_stats['total_requests'] += 1
 
@@ -359,6 +375,10 @@ class FallbackPerformanceMonitor:
         self.logger.info("🔄 性能指标已重置")
 
 
+# 熔断器状态在指标中的数值
+BREAKER_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+
 class PerformanceOptimizedFallbackManager(CloudFallbackManager):
     """性能优化的Fallback管理器"""
 
@@ -376,6 +396,13 @@ class PerformanceOptimizedFallbackManager(CloudFallbackManager):
         self.adaptive_timeout = True
         self.circuit_breaker = {}  # 熔断器状态
 
+        metrics = self.monitor.metrics if self.monitor else get_registry()
+        self.fallbacks_counter = metrics.counter(
+            'agentpsy_fallbacks_total', '跳过或放弃某个提供商、转向fallback链下一项的次数', ('provider', 'reason'))
+        self.breaker_state_gauge = metrics.gauge(
+            'agentpsy_circuit_breaker_state', '熔断器状态（0=关闭，1=半开，2=开启）', ('provider',))
+        self.inflight_gauge = metrics.gauge('agentpsy_inflight_requests', '正在进行的模型调用数')
+
     async def evaluate_with_fallback(self,
                                    model_family: str,
                                    prompt: str,
@@ -403,6 +430,7 @@ class PerformanceOptimizedFallbackManager(CloudFallbackManager):
             # 检查熔断器状态
             if self._is_circuit_open(provider_key):
                 self.logger.warning(f"⚠️ 熔断器开启，跳过: {provider_key}")
+                self.fallbacks_counter.inc(provider=provider_key, reason='circuit_open')
                 continue
 
             try:
@@ -415,7 +443,11 @@ class PerformanceOptimizedFallbackManager(CloudFallbackManager):
                     adjusted_config = model_config
 
                 start_time = time.time()
-                result = await self._try_model(adjusted_config, prompt, context)
+                self.inflight_gauge.inc()
+                try:
+                    result = await self._try_model(adjusted_config, prompt, context)
+                finally:
+                    self.inflight_gauge.dec()
                 result.response_time = time.time() - start_time
 
                 if result.success:
@@ -437,6 +469,7 @@ class PerformanceOptimizedFallbackManager(CloudFallbackManager):
                     self.logger.warning(
                         f"❌ {model_config.provider.value} 失败: {result.error_message}"
                     )
+                    self.fallbacks_counter.inc(provider=provider_key, reason='failure')
                     # 触发熔断器
                     self._trigger_circuit_breaker(provider_key)
 
@@ -444,6 +477,7 @@ class PerformanceOptimizedFallbackManager(CloudFallbackManager):
                 self.logger.warning(
                     f"❌ {model_config.provider.value} 异常: {str(e)}"
                 )
+                self.fallbacks_counter.inc(provider=provider_key, reason='exception')
                 # 触发熔断器
                 self._trigger_circuit_breaker(provider_key)
                 continue
@@ -475,6 +509,7 @@ class PerformanceOptimizedFallbackManager(CloudFallbackManager):
         if breaker['state'] == 'open':
             if time.time() - breaker['last_failure'] > breaker['cooldown']:
                 breaker['state'] = 'half_open'
+                self._publish_breaker_state(provider_key)
                 return False
             return True
 
@@ -498,6 +533,7 @@ class PerformanceOptimizedFallbackManager(CloudFallbackManager):
         if breaker['failures'] >= 3:
             breaker['state'] = 'open'
             self.logger.warning(f"🔴 熔断器触发: {provider_key}")
+        self._publish_breaker_state(provider_key)
 
     def _reset_circuit_breaker(self, provider_key: str):
         """重置熔断器"""
@@ -508,6 +544,12 @@ class PerformanceOptimizedFallbackManager(CloudFallbackManager):
                 'state': 'closed',
                 'cooldown': 300
             }
+            self._publish_breaker_state(provider_key)
+
+    def _publish_breaker_state(self, provider_key: str):
+        """把熔断器状态同步到实时指标"""
+        state = self.circuit_breaker[provider_key]['state']
+        self.breaker_state_gauge.set(BREAKER_STATE_VALUES.get(state, 0), provider=provider_key)
 
     def _adjust_timeout(self, model_config) -> ModelConfig:
         """自适应调整超时时间"""
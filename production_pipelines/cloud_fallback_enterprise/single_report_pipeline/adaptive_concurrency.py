@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型调用自适应并发控制
+按端点（Ollama主机 / 云服务商）以加性增、乘性减（AIMD）调整在途请求上限：
+满载运行的调用每成功一轮上限加一；短窗口平均延迟明显高于初始上限下测得的长窗口平均延迟、超时或返回429/503/504时按比例降低。
+比较平均值而不是最快调用，LLM输出长度不同造成的正常延迟波动不会被当作拥塞，只有随并发上升的延迟才会。
+进程内所有执行器共享同一个控制器；未配置时不生效
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_OVERLOAD = "overload"  # 超时 / 429 / 503 / 504：拥塞信号
+OUTCOME_ERROR = "error"  # 其他失败：不调整上限
+
+OVERLOAD_STATUS_CODES = frozenset({429, 503, 504})
+
+
+def classify_exception(exc: BaseException) -> str:
+    """把异常归类为结果：超时与429/503/504视为过载，其余为普通错误"""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)) or "Timeout" in type(exc).__name__:
+        return OUTCOME_OVERLOAD
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return OUTCOME_OVERLOAD if status in OVERLOAD_STATUS_CODES else OUTCOME_ERROR
+
+
+class _KeyState:
+    """单个端点的AIMD状态"""
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.inflight = 0
+        self.latency_ewma: Optional[float] = None
+        self.latency_long: Optional[float] = None
+        self.samples = 0
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self.async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+class ConcurrencySlot:
+    """
+    一次在途调用；可作为同步或异步上下文管理器使用。以异常退出时按 classify_exception 归类，
+    否则记为成功（除非调用过 overload() 或 error()）
+    """
+
+    def __init__(self, controller: "AdaptiveConcurrencyController", key: str):
+        self.controller = controller
+        self.key = key
+        self.outcome: Optional[str] = None
+        self._started = 0.0
+        self._saturated = False
+
+    def overload(self):
+        """标记为过载（例如未抛异常的429/503响应）"""
+        self.outcome = OUTCOME_OVERLOAD
+
+    def error(self):
+        """标记为失败，但不视为拥塞"""
+        self.outcome = OUTCOME_ERROR
+
+    def __enter__(self) -> "ConcurrencySlot":
+        self._saturated = self.controller.acquire(self.key)
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        outcome = self.outcome or (classify_exception(exc_val) if exc_val is not None else OUTCOME_SUCCESS)
+        self.controller.release(self.key, time.monotonic() - self._started, outcome, self._saturated)
+        return False
+
+    async def __aenter__(self) -> "ConcurrencySlot":
+        self._saturated = await self.controller.acquire_async(self.key)
+        self._started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return self.__exit__(exc_type, exc_val, exc_tb)
+
+
+class _NoopSlot:
+    """未启用自适应并发时使用的空槽位"""
+
+    def overload(self):
+        pass
+
+    def error(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NOOP_SLOT = _NoopSlot()
+
+
+class AdaptiveConcurrencyController:
+    """按端点的AIMD在途上限，进程内所有执行器共享"""
+
+    def __init__(self, initial_limit: int = 3, min_limit: int = 1, max_limit: int = 32,
+                 increase: float = 1.0, backoff: float = 0.5, latency_backoff: float = 0.8,
+                 latency_tolerance: float = 2.0, min_samples: int = 20, ewma_alpha: float = 0.2,
+                 long_alpha: float = 0.01, cooldown: float = 1.0):
+        """
+        Args:
+            initial_limit: 新端点的初始在途上限
+            min_limit: 上限的下界
+            max_limit: 上限的上界（执行器线程数按此设置）
+            increase: 满载运行时每成功 limit 次调用增加的上限
+            backoff: 超时或429/503/504时上限的乘数
+            latency_backoff: 延迟膨胀超过容忍度时上限的乘数
+            latency_tolerance: 短窗口延迟 / 长窗口延迟超过该比值视为延迟膨胀
+            min_samples: 先对多少次成功调用取平均，之后才按延迟膨胀调整
+            ewma_alpha: 短窗口延迟滑动平均的平滑系数
+            long_alpha: 长窗口延迟滑动平均的平滑系数（在初始上限下学习）
+            cooldown: 两次降低之间的最短间隔（秒），至少为一个平滑延迟
+        """
+        self.initial_limit = max(min_limit, min(initial_limit, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+        self.ewma_alpha = ewma_alpha
+        self.long_alpha = long_alpha
+        self.cooldown = cooldown
+        self._states: Dict[str, _KeyState] = {}
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._metrics = None
+
+    def _state(self, key: str) -> _KeyState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState(float(self.initial_limit))
+            self._publish(key, state)
+        return state
+
+    def _permits(self, state: _KeyState) -> int:
+        return max(self.min_limit, int(state.limit))
+
+    def _try_acquire(self, key: str) -> Optional[bool]:
+        """占用一个名额（调用方持有锁）；返回是否已满载，没有空余名额时返回None"""
+        state = self._state(key)
+        if state.inflight >= self._permits(state):
+            return None
+        state.inflight += 1
+        self._publish(key, state)
+        return state.inflight >= self._permits(state)
+
+    # ---- 占用 / 归还 ----
+
+    def acquire(self, key: str) -> bool:
+        """阻塞直到端点有空余名额；返回本次调用是否满载运行"""
+        with self._condition:
+            while True:
+                saturated = self._try_acquire(key)
+                if saturated is not None:
+                    return saturated
+                self._condition.wait()
+
+    async def acquire_async(self, key: str) -> bool:
+        """acquire() 的异步版本，等待时不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                saturated = self._try_acquire(key)
+                if saturated is not None:
+                    return saturated
+                future = loop.create_future()
+                self._states[key].async_waiters.append((loop, future))
+            await future
+
+    def slot(self, key: str) -> ConcurrencySlot:
+        """在调用期间占用端点一个名额的上下文管理器"""
+        return ConcurrencySlot(self, key)
+
+    def release(self, key: str, latency: float, outcome: str = OUTCOME_SUCCESS, saturated: bool = True):
+        """
+        归还名额并调整端点上限
+
+        Args:
+            key: 端点标识
+            latency: 调用耗时（秒）
+            outcome: OUTCOME_SUCCESS、OUTCOME_OVERLOAD 或 OUTCOME_ERROR
+            saturated: 调用时名额是否已用满（仅满载时才增加上限）
+        """
+        with self._condition:
+            state = self._state(key)
+            state.inflight = max(0, state.inflight - 1)
+            if outcome == OUTCOME_SUCCESS:
+                self._on_success(key, state, latency, saturated)
+            elif outcome == OUTCOME_OVERLOAD:
+                self._decrease(key, state, self.backoff, outcome)
+            self._publish(key, state)
+            self._wake(state)
+
+    def _on_success(self, key: str, state: _KeyState, latency: float, saturated: bool):
+        state.samples += 1
+        if state.samples <= self.min_samples:
+            # 预热：两个窗口都取前几次调用的算术平均
+            short_alpha = long_alpha = 1.0 / state.samples
+        else:
+            short_alpha, long_alpha = self.ewma_alpha, self.long_alpha
+        state.latency_ewma = latency if state.latency_ewma is None else \
+            state.latency_ewma + short_alpha * (latency - state.latency_ewma)
+        if state.latency_long is None:
+            state.latency_long = latency
+        elif state.samples <= self.min_samples or self._permits(state) <= self.initial_limit:
+            # 长窗口只吸收上限不超过初始值时的延迟（低负载参照）：上限升高后延迟随在途数上升才视为拥塞，
+            # 负载本身变慢时上限降回初始值后参照随之更新
+            state.latency_long += long_alpha * (latency - state.latency_long)
+        inflated = (state.samples > self.min_samples and state.latency_long > 0
+                    and state.latency_ewma > state.latency_long * self.latency_tolerance)
+
+        if inflated:
+            self._decrease(key, state, self.latency_backoff, "latency")
+        elif saturated and state.limit < self.max_limit:
+            state.limit = min(float(self.max_limit), state.limit + self.increase / state.limit)
+
+    def _decrease(self, key: str, state: _KeyState, factor: float, reason: str):
+        now = time.monotonic()
+        # 每次拥塞只降低一次：已在途的调用报告的是同一次拥塞
+        if now - state.last_decrease < max(self.cooldown, state.latency_ewma or 0.0):
+            return
+        previous = state.limit
+        state.limit = max(float(self.min_limit), state.limit * factor)
+        state.last_decrease = now
+        state.decreases += 1
+        if self._metrics is not None:
+            self._metrics["decreases"].inc(key=key, reason=reason)
+        if int(previous) != int(state.limit):
+            logger.info(f"📉 并发上限 {key}: {int(previous)} -> {int(state.limit)}（{reason}）")
+
+    def _wake(self, state: _KeyState):
+        """名额释放后唤醒同步与异步等待者（调用方持有锁）"""
+        self._condition.notify_all()
+        waiters, state.async_waiters = state.async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    # ---- 指标 / 状态 ----
+
+    def bind_metrics(self, registry: Any):
+        """
+        通过提供 gauge()/counter() 的指标注册表（如 metrics_exporter.MetricsRegistry）发布上限
+        """
+        with self._lock:
+            self._metrics = {
+                "limit": registry.gauge("agentpsy_concurrency_limit", "各端点的自适应在途上限", ("key",)),
+                "inflight": registry.gauge("agentpsy_concurrency_inflight", "各端点的在途调用数", ("key",)),
+                "decreases": registry.counter("agentpsy_concurrency_decreases_total",
+                                              "各端点自适应上限的降低次数", ("key", "reason")),
+            }
+            for key, state in self._states.items():
+                self._publish(key, state)
+
+    def _publish(self, key: str, state: _KeyState):
+        if self._metrics is not None:
+            self._metrics["limit"].set(self._permits(state), key=key)
+            self._metrics["inflight"].set(state.inflight, key=key)
+
+    def limit(self, key: str) -> int:
+        """端点当前的在途上限"""
+        with self._lock:
+            return self._permits(self._state(key))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各端点的上限、在途调用数与延迟"""
+        with self._lock:
+            return {
+                key: {
+                    "limit": self._permits(state),
+                    "inflight": state.inflight,
+                    "latency_ewma": state.latency_ewma,
+                    "long_latency": state.latency_long,
+                    "decreases": state.decreases,
+                }
+                for key, state in self._states.items()
+            }
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_controller: Optional[AdaptiveConcurrencyController] = None
+
+
+def configure_concurrency(max_limit: int, initial_limit: Optional[int] = None, **kwargs) -> AdaptiveConcurrencyController:
+    """
+    为当前进程启用自适应并发
+
+    Args:
+        max_limit: 上限的上界
+        initial_limit: 每个端点的初始上限（默认 min(3, max_limit)）
+        **kwargs: 其他 AdaptiveConcurrencyController 参数
+
+    Returns:
+        共享的控制器
+    """
+    global _controller
+    _controller = AdaptiveConcurrencyController(
+        initial_limit=initial_limit or min(3, max_limit), max_limit=max_limit, **kwargs)
+    return _controller
+
+
+def get_concurrency_controller() -> Optional[AdaptiveConcurrencyController]:
+    """共享的控制器；未启用时返回None"""
+    return _controller
+
+
+def concurrency_slot(key: str):
+    """共享控制器的槽位；未启用时返回空槽位"""
+    controller = _controller
+    return controller.slot(key) if controller is not None else _NOOP_SLOT
+
+
+def add_concurrency_arguments(parser):
+    """为 argparse 解析器添加 --adaptive-concurrency 选项"""
+    parser.add_argument("--adaptive-concurrency", type=int, default=None, metavar="MAX",
+                        help="按端点以AIMD自适应调整在途模型调用数，上限为 MAX"
+                             "（执行器线程数设为 MAX；默认关闭）")
+
+
+def concurrency_from_args(args) -> Optional[AdaptiveConcurrencyController]:
+    """按解析后的 --adaptive-concurrency 配置共享控制器（未指定时不启用）"""
+    max_limit = getattr(args, "adaptive_concurrency", None)
+    return configure_concurrency(max_limit) if max_limit else None
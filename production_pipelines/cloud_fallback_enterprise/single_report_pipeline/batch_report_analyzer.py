@@ -13,18 +13,21 @@ from pathlib import Path
 from datetime import datetime
 import time
 import pickle
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # 添加包目录到路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from . import TransparentPipeline
+from .work_queue import DEFAULT_LEASE_SECONDS, default_worker_id, open_work_queue
 
 
 class BatchReportAnalyzer:
     """批量测评报告分析器 - 支持断点续跑"""
     
-    def __init__(self, input_dir: str, output_dir: str, checkpoint_interval: int = 5):
+    def __init__(self, input_dir: str, output_dir: str, checkpoint_interval: int = 5,
+                 work_queue: Optional[str] = None, worker_id: Optional[str] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
         """
         初始化批量分析器
         
@@ -32,6 +35,9 @@ class BatchReportAnalyzer:
             input_dir: 输入目录路径
             output_dir: 输出目录路径
             checkpoint_interval: 检查点间隔（处理多少文件后保存检查点）
+            work_queue: 多节点共享工作队列（共享目录或SQLite路径）；指定时由队列分配文件并代替检查点
+            worker_id: 本工作进程标识，默认 主机名:进程号
+            lease_seconds: 工作队列租约时长（秒）
         """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
@@ -55,8 +61,13 @@ class BatchReportAnalyzer:
         self.total_files = 0
         self.current_file_index = 0
         
-        # 加载检查点（如果存在）
-        self.load_checkpoint()
+        # 多节点工作队列
+        self.work_queue = open_work_queue(work_queue, lease_seconds=lease_seconds) if work_queue else None
+        self.worker_id = worker_id or default_worker_id()
+        
+        # 加载检查点（如果存在；工作队列模式下队列本身即检查点）
+        if self.work_queue is None:
+            self.load_checkpoint()
     
     def load_checkpoint(self):
         """加载检查点"""
@@ -333,7 +344,7 @@ class BatchReportAnalyzer:
         print()
         
         # 加载检查点（如果启用）
-        if resume:
+        if resume and self.work_queue is None:
             self.load_checkpoint()
         
         # 查找文件
@@ -349,6 +360,9 @@ class BatchReportAnalyzer:
             json_files = json_files[:limit]
             self.total_files = len(json_files)
         
+        if self.work_queue:
+            return self.run_work_queue_analysis(json_files, no_save)
+        
         print(f"  找到 {len(json_files)} 个测评报告文件")
         print(f"  已处理: {len(self.processed_files)} 个")
         print(f"  剩余: {len(json_files) - len(self.processed_files)} 个")
@@ -421,6 +435,68 @@ class BatchReportAnalyzer:
         print(f"🔁 如需继续处理剩余文件，请重新运行此脚本")
         
         return True
+    
+    def run_work_queue_analysis(self, json_files: List[Path], no_save: bool = False) -> bool:
+        """
+        工作队列模式：多个节点从共享队列领取文件，队列排空后由最后完成的节点合并全部结果
+        
+        Args:
+            json_files: 本节点找到的测评报告文件
+            no_save: 是否不保存结果（用于测试）
+            
+        Returns:
+            是否成功完成
+        """
+        # 以文件名为条目标识，各节点挂载共享目录的路径可以不同
+        files_by_name = {f.name: f for f in json_files}
+        added = self.work_queue.enqueue_many((name, None) for name in files_by_name)
+        print(f"🗂️  共享工作队列: {self.work_queue}（工作进程 {self.worker_id}）")
+        print(f"  新加入队列: {added} 个, 队列状态: {self.work_queue.stats()}")
+        print()
+        
+        processed_count = 0
+        skipped = set()
+        while True:
+            lease = self.work_queue.claim(self.worker_id, skip=skipped)
+            if lease is None:
+                break
+            
+            file_path = files_by_name.get(lease.item_id)
+            if file_path is None:
+                # 本节点没有该文件（例如 --limit 不同）：交还给其他节点（不计入领取次数），本节点不再领取
+                self.work_queue.release(lease)
+                skipped.add(lease.item_id)
+                continue
+            
+            with self.work_queue.keep_alive(lease) as keeper:
+                result = self.process_single_report(file_path)
+            if keeper.lost or not self.work_queue.complete(lease, result):
+                print(f"  ⚠️  租约已丢失，结果不写入队列: {lease.item_id}")
+                continue
+            
+            self.processed_files.add(str(file_path))
+            processed_count += 1
+            
+            # 添加延迟避免API过载
+            time.sleep(1)
+        
+        stats = self.work_queue.stats()
+        print(f"\n🏁 本节点处理 {processed_count} 个文件, 队列状态: {stats}")
+        if not self.work_queue.is_drained():
+            print("ℹ️  其他节点仍在处理，最终结果将由最后完成的节点合并")
+            return True
+        
+        # 合并所有节点的结果
+        self.results = [result for _, result in self.work_queue.results()]
+        self.processed_files = {result.get('file_path', '') for result in self.results}
+        self.total_files = len(self.results) + stats['failed']
+        
+        if not no_save:
+            self.save_results()
+            self.save_summary_report()
+        
+        print(f"\n✅ 已合并 {len(self.results)} 个结果到: {self.output_dir}")
+        return True
 
 
 def main():
@@ -440,6 +516,12 @@ def main():
                        help='不从检查点恢复，重新开始')
     parser.add_argument('--no-save', action='store_true',
                        help='不保存结果（用于测试）')
+    parser.add_argument('--work-queue',
+                       help='多节点共享工作队列：共享目录，或 .db / sqlite:/// 形式的SQLite数据库')
+    parser.add_argument('--worker-id',
+                       help='工作进程标识 (默认: 主机名:进程号)')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS,
+                       help='工作队列租约时长，工作进程崩溃后条目在租约到期后被重新领取 (默认: 600秒)')
     
     args = parser.parse_args()
     
@@ -447,7 +529,10 @@ def main():
     analyzer = BatchReportAnalyzer(
         input_dir=args.input_dir,
         output_dir=args.output_dir,
-        checkpoint_interval=args.checkpoint_interval
+        checkpoint_interval=args.checkpoint_interval,
+        work_queue=args.work_queue,
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds
     )
     
     # 运行批量分析
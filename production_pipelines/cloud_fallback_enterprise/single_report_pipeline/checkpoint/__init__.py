@@ -6,6 +6,7 @@
 """
 
 from .checkpoint_manager import CheckpointManager
+from .checkpoint_writer import CheckpointWriter
 from .models.checkpoint_data import CheckpointData
 from .models.processing_state import ProcessingState
 from .progress_tracker import ProgressTracker
@@ -14,6 +15,7 @@ from .storage.file_storage import FileCheckpointStorage
 
 __all__ = [
     'CheckpointManager',
+    'CheckpointWriter',
     'CheckpointData',
     'ProcessingState',
     'ProgressTracker',
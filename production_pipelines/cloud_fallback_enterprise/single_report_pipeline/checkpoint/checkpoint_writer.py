@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台检查点写入器
+在独立线程中序列化并写出检查点，合并写入期间到达的更新，
+平时写紧凑增量，每隔若干次写一次完整快照
+"""
+
+import atexit
+import threading
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Tuple
+
+from .checkpoint_manager import CheckpointManager
+from .models.checkpoint_data import CheckpointData
+from .models.checkpoint_delta import SEQUENCE_KEY, compute_delta
+
+
+class CheckpointWriter:
+    """
+    后台检查点写入器
+
+    submit 只登记最新的检查点快照就返回；写入线程空闲时取走最新快照写出，
+    写入期间到达的多次更新只写最后一次
+    """
+
+    def __init__(self, checkpoint_manager: CheckpointManager, full_snapshot_every: int = 20):
+        """
+        初始化写入器
+
+        Args:
+            checkpoint_manager: 检查点管理器（完整快照经由它保存）
+            full_snapshot_every: 连续写多少个增量后写一次完整快照
+        """
+        self.checkpoint_manager = checkpoint_manager
+        self.storage = checkpoint_manager.storage
+        self.full_snapshot_every = max(1, full_snapshot_every)
+
+        self._condition = threading.Condition()
+        self._pending: Optional[Tuple[int, CheckpointData, bool]] = None
+        self._sequence = 0
+        self._written_sequence = 0
+        self._last_result = True
+        self._closed = False
+
+        # 仅由写入线程访问
+        self._last_written: Optional[Dict[str, Any]] = None
+        self._deltas_since_snapshot = 0
+
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def reset_sequence(self, sequence: int):
+        """
+        从已有检查点继续编号（恢复会话后调用），下一次写入为完整快照
+
+        Args:
+            sequence: 已加载检查点的序号
+        """
+        self.flush()
+        with self._condition:
+            self._sequence = max(self._sequence, sequence)
+            self._written_sequence = self._sequence
+            self._last_written = None
+
+    def submit(self, checkpoint: CheckpointData, full: bool = False, wait: bool = False) -> bool:
+        """
+        提交检查点
+
+        Args:
+            checkpoint: 检查点（其处理状态须为快照，提交后不再修改）
+            full: 是否必须写完整快照
+            wait: 是否等待写出完成
+
+        Returns:
+            不等待时返回True；等待时返回写出是否成功
+        """
+        with self._condition:
+            if self._closed:
+                return self.checkpoint_manager.save_checkpoint(checkpoint)
+
+            self._sequence += 1
+            sequence = self._sequence
+            checkpoint.metadata[SEQUENCE_KEY] = sequence
+
+            # 被合并掉的更新若要求完整快照，该要求保留到本次
+            if self._pending is not None and self._pending[2]:
+                full = True
+            self._pending = (sequence, checkpoint, full)
+            self._condition.notify_all()
+
+            if not wait:
+                return True
+            return self._wait_for(sequence)
+
+    def flush(self) -> bool:
+        """
+        等待已提交的检查点全部写出
+
+        Returns:
+            最近一次写出是否成功
+        """
+        with self._condition:
+            return self._wait_for(self._sequence)
+
+    def close(self):
+        """写出剩余检查点并停止写入线程"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _wait_for(self, sequence: int) -> bool:
+        while self._written_sequence < sequence and self._thread.is_alive():
+            self._condition.wait()
+        return self._last_result
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                sequence, checkpoint, full = self._pending
+                self._pending = None
+
+            result = self._write(sequence, checkpoint, full)
+
+            with self._condition:
+                self._written_sequence = sequence
+                self._last_result = result
+                self._condition.notify_all()
+
+    def _write(self, sequence: int, checkpoint: CheckpointData, full: bool) -> bool:
+        """写出一个检查点：能用增量表达时追加增量，否则保存完整快照"""
+        try:
+            current = asdict(checkpoint)
+
+            delta = None
+            if (not full and self._last_written is not None
+                    and self._deltas_since_snapshot < self.full_snapshot_every):
+                delta = compute_delta(self._last_written, current, sequence)
+
+            if delta is not None and self.storage.save_delta(delta):
+                self._deltas_since_snapshot += 1
+            else:
+                if not self.checkpoint_manager.save_checkpoint(checkpoint):
+                    return False
+                self._deltas_since_snapshot = 0
+
+            self._last_written = current
+            return True
+
+        except Exception as e:
+            print(f"后台写入检查点失败: {e}")
+            return False
+
+    def __str__(self) -> str:
+        """字符串表示"""
+        return f"CheckpointWriter(storage={self.storage.__class__.__name__}, full_snapshot_every={self.full_snapshot_every})"
+
+    def __repr__(self) -> str:
+        """详细字符串表示"""
+        return self.__str__()
@@ -6,8 +6,11 @@
 
 from .processing_state import ProcessingState
 from .checkpoint_data import CheckpointData
+from .checkpoint_delta import compute_delta, apply_delta
 
 __all__ = [
     'ProcessingState',
-    'CheckpointData'
+    'CheckpointData',
+    'compute_delta',
+    'apply_delta'
 ]
\ No newline at end of file
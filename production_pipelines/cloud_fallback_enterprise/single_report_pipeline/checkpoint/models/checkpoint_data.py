@@ -60,7 +60,23 @@ class CheckpointData:
         """
         try:
             data = json.loads(json_data)
+        except (json.JSONDecodeError, TypeError) as e:
+            raise ValueError(f"无法解析检查点数据: {e}")
+
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CheckpointData':
+        """
+        从字典（to_json 的解析结果）构建
 
+        Args:
+            data: 检查点字典
+
+        Returns:
+            CheckpointData实例
+        """
+        try:
             if not isinstance(data, dict):
                 raise ValueError("Invalid JSON data structure")
 
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查点增量模型
+在两次检查点（asdict 形式）之间计算紧凑增量，并可将增量回放到完整快照上
+"""
+
+from typing import Any, Dict, Optional
+
+STATE_KEY = 'processing_state'
+# 检查点元数据中的写入序号，增量只回放到序号更小的快照上
+SEQUENCE_KEY = 'checkpoint_sequence'
+
+
+def compute_delta(previous: Dict[str, Any], current: Dict[str, Any], sequence: int) -> Optional[Dict[str, Any]]:
+    """
+    计算从 previous 到 current 的增量
+
+    Args:
+        previous: 上一次写出的检查点字典
+        current: 当前检查点字典
+        sequence: 当前检查点序号
+
+    Returns:
+        增量字典；无法用增量表达（切换会话、文件进度被删除、已完成列表被改写）时返回None
+    """
+    if previous.get('checkpoint_id') != current.get('checkpoint_id'):
+        return None
+
+    delta: Dict[str, Any] = {
+        'seq': sequence,
+        'checkpoint_id': current.get('checkpoint_id'),
+        'set': {},
+        'state': {}
+    }
+
+    for key, value in current.items():
+        if key != STATE_KEY and previous.get(key) != value:
+            delta['set'][key] = value
+
+    old_state = previous.get(STATE_KEY, {})
+    new_state = current.get(STATE_KEY, {})
+    for key, value in new_state.items():
+        if key in ('file_progress', 'processed_files'):
+            continue
+        if old_state.get(key) != value:
+            delta['state'][key] = value
+
+    # 文件进度只记录变化的条目
+    old_progress = old_state.get('file_progress', {})
+    new_progress = new_state.get('file_progress', {})
+    if any(path not in new_progress for path in old_progress):
+        return None
+    changed = {path: entry for path, entry in new_progress.items() if old_progress.get(path) != entry}
+    if changed:
+        delta['file_progress'] = changed
+
+    # 已完成文件列表只追加
+    old_files = old_state.get('processed_files', [])
+    new_files = new_state.get('processed_files', [])
+    if new_files[:len(old_files)] != old_files:
+        return None
+    if len(new_files) > len(old_files):
+        delta['processed_files_append'] = new_files[len(old_files):]
+
+    return delta
+
+
+def apply_delta(data: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将增量回放到检查点字典上（原地修改）
+
+    Args:
+        data: 检查点字典
+        delta: compute_delta 生成的增量
+
+    Returns:
+        修改后的检查点字典
+    """
+    data.update(delta.get('set', {}))
+
+    state = data.setdefault(STATE_KEY, {})
+    state.update(delta.get('state', {}))
+    if 'file_progress' in delta:
+        state.setdefault('file_progress', {}).update(delta['file_progress'])
+    if 'processed_files_append' in delta:
+        state.setdefault('processed_files', []).extend(delta['processed_files_append'])
+
+    return data
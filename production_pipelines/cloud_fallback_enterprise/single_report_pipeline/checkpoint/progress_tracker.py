@@ -3,8 +3,10 @@
 """
 进度跟踪器
 细粒度进度跟踪和检查点管理的高级API
+检查点由后台写入器序列化与写盘，锁内只更新内存状态并登记快照
 """
 
+import copy
 import time
 import threading
 import uuid
@@ -12,7 +14,9 @@ from datetime import datetime
 from typing import List, Optional, Tuple, Dict, Any
 
 from .checkpoint_manager import CheckpointManager
+from .checkpoint_writer import CheckpointWriter
 from .models.checkpoint_data import CheckpointData
+from .models.checkpoint_delta import SEQUENCE_KEY
 from .models.processing_state import ProcessingState
 from .storage.base_storage import CheckpointStorage
 
@@ -25,7 +29,8 @@ class ProgressTracker:
     """
 
     def __init__(self, storage: CheckpointStorage, checkpoint_interval: int = 5,
-                 auto_save: bool = True, session_metadata: Optional[Dict[str, Any]] = None):
+                 auto_save: bool = True, session_metadata: Optional[Dict[str, Any]] = None,
+                 async_save: bool = True, full_snapshot_every: int = 20):
         """
         初始化进度跟踪器
 
@@ -34,6 +39,8 @@ class ProgressTracker:
             checkpoint_interval: 检查点间隔（题目数）
             auto_save: 是否启用自动保存
             session_metadata: 会话元数据
+            async_save: 是否由后台线程写检查点（关闭时在调用线程同步写完整快照）
+            full_snapshot_every: 后台写入时，连续写多少个增量后写一次完整快照
         """
         self.storage = storage
         self.checkpoint_interval = checkpoint_interval
@@ -42,6 +49,10 @@ class ProgressTracker:
 
         # 创建检查点管理器
         self.checkpoint_manager = CheckpointManager(storage, auto_save=auto_save)
+        self.checkpoint_writer = (
+            CheckpointWriter(self.checkpoint_manager, full_snapshot_every=full_snapshot_every)
+            if async_save else None
+        )
 
         # 当前处理状态
         self.current_state: Optional[ProcessingState] = None
@@ -83,7 +94,7 @@ class ProgressTracker:
             # 创建初始检查点
             checkpoint = CheckpointData(
                 checkpoint_id=self.session_id,
-                processing_state=self.current_state,
+                processing_state=self._snapshot_state(),
                 metadata={
                     **self.session_metadata,
                     "session_start": True,
@@ -92,7 +103,7 @@ class ProgressTracker:
                 }
             )
 
-            self.checkpoint_manager.save_checkpoint(checkpoint)
+            self._submit(checkpoint, full=True, wait=True)
             self.last_checkpoint_question_count = 0
 
             return self.session_id
@@ -122,6 +133,8 @@ class ProgressTracker:
             # 恢复状态
             self.current_state = checkpoint.processing_state
             self.session_id = checkpoint.checkpoint_id
+            if self.checkpoint_writer is not None:
+                self.checkpoint_writer.reset_sequence(checkpoint.metadata.get(SEQUENCE_KEY, 0))
 
             # 更新进度跟踪变量
             if self.current_state.current_file_path:
@@ -294,14 +307,15 @@ class ProgressTracker:
         with self._lock:
             completion_time = time.time()
 
-            # 保存最终检查点
+            # 保存最终检查点（完整快照，同时合并增量日志）
             self._save_checkpoint({
                 "session_completed": True,
                 "completion_time": completion_time,
                 "total_session_time": completion_time - (self.session_start_time or completion_time)
-            })
+            }, full=True)
 
-            return completion_time
+        self.flush()
+        return completion_time
 
     def set_auto_save(self, enabled: bool):
         """
@@ -340,17 +354,53 @@ class ProgressTracker:
         if metadata:
             checkpoint_metadata.update(metadata)
 
-        return self._save_checkpoint(checkpoint_metadata)
+        with self._lock:
+            result = self._save_checkpoint(checkpoint_metadata)
+
+        # 在锁外等待写出，不阻塞其他线程更新进度
+        return self.flush() if self.checkpoint_writer is not None else result
 
-    def _save_checkpoint(self, additional_metadata: Optional[Dict[str, Any]] = None) -> bool:
+    def flush(self) -> bool:
         """
-        保存检查点（内部方法）
+        等待后台写入器写出已提交的检查点
+
+        Returns:
+            最近一次写出是否成功
+        """
+        if self.checkpoint_writer is None:
+            return True
+        return self.checkpoint_writer.flush()
+
+    def close(self):
+        """写出剩余检查点并停止后台写入器"""
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.close()
+
+    def _snapshot_state(self) -> ProcessingState:
+        """复制当前处理状态，供后台写入器在锁外序列化"""
+        state = copy.copy(self.current_state)
+        state.processed_files = list(state.processed_files)
+        state.file_progress = {path: dict(progress) for path, progress in state.file_progress.items()}
+        state.statistics = copy.deepcopy(state.statistics)
+        return state
+
+    def _submit(self, checkpoint: CheckpointData, full: bool = False, wait: bool = False) -> bool:
+        """交给后台写入器；未启用时同步保存"""
+        if self.checkpoint_writer is None:
+            return self.checkpoint_manager.save_checkpoint(checkpoint)
+        return self.checkpoint_writer.submit(checkpoint, full=full, wait=wait)
+
+    def _save_checkpoint(self, additional_metadata: Optional[Dict[str, Any]] = None,
+                         full: bool = False) -> bool:
+        """
+        保存检查点（内部方法，调用方持有锁）
 
         Args:
             additional_metadata: 额外的元数据
+            full: 是否必须写完整快照
 
         Returns:
-            是否成功保存
+            是否成功保存（后台写入时只表示已提交）
         """
         if self.current_state is None or self.session_id is None:
             return False
@@ -365,15 +415,15 @@ class ProgressTracker:
         if additional_metadata:
             metadata.update(additional_metadata)
 
-        # 创建检查点
+        # 创建检查点（状态快照，之后的修改不影响正在写出的数据）
         checkpoint = CheckpointData(
             checkpoint_id=self.session_id,
-            processing_state=self.current_state,
+            processing_state=self._snapshot_state(),
             metadata=metadata
         )
 
         # 保存检查点
-        return self.checkpoint_manager.save_checkpoint(checkpoint)
+        return self._submit(checkpoint, full=full)
 
     def __str__(self) -> str:
         """字符串表示"""
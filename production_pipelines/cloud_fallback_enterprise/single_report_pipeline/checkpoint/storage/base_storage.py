@@ -60,6 +60,20 @@ class CheckpointStorage(ABC):
         """
         pass
 
+    def save_delta(self, delta: dict) -> bool:
+        """
+        追加一条检查点增量（可选能力）
+
+        不支持增量的后端返回False，调用方应改为保存完整检查点
+
+        Args:
+            delta: compute_delta 生成的增量
+
+        Returns:
+            是否已保存
+        """
+        return False
+
     def is_valid_checkpoint(self, checkpoint: CheckpointData) -> bool:
         """
         验证检查点数据的有效性
@@ -3,6 +3,7 @@
 """
 文件存储实现
 基于文件系统的检查点存储，支持备份和恢复
+完整快照之间的增量以JSON行追加到日志文件，加载时回放到快照上
 """
 
 import json
@@ -16,6 +17,7 @@ from typing import Optional
 
 from .base_storage import CheckpointStorage
 from ..models.checkpoint_data import CheckpointData
+from ..models.checkpoint_delta import SEQUENCE_KEY, apply_delta
 
 
 class FileCheckpointStorage(CheckpointStorage):
@@ -43,6 +45,7 @@ class FileCheckpointStorage(CheckpointStorage):
 
         # 文件路径
         self.checkpoint_file = self.storage_dir / filename
+        self.journal_file = self.checkpoint_file.with_suffix('.journal')
         self.backup_dir = self.storage_dir / "backups"
         self.backup_dir.mkdir(exist_ok=True)
 
@@ -92,6 +95,9 @@ class FileCheckpointStorage(CheckpointStorage):
                 # 原子重命名
                 temp_file.replace(self.checkpoint_file)
 
+                # 新快照已包含之前的所有增量
+                self._truncate_journal()
+
                 # 清理旧备份
                 self._cleanup_old_backups()
 
@@ -102,6 +108,29 @@ class FileCheckpointStorage(CheckpointStorage):
                 print(f"保存检查点失败: {e}")
                 return False
 
+    def save_delta(self, delta: dict) -> bool:
+        """
+        追加检查点增量到日志文件
+
+        Args:
+            delta: compute_delta 生成的增量（含序号 seq）
+
+        Returns:
+            保存是否成功
+        """
+        with self._lock:
+            if not self.checkpoint_file.exists():
+                return False
+            try:
+                line = json.dumps(delta, ensure_ascii=False, separators=(',', ':'))
+                with open(self.journal_file, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+                return True
+
+            except Exception as e:
+                print(f"保存检查点增量失败: {e}")
+                return False
+
     def load(self) -> Optional[CheckpointData]:
         """
         从文件加载检查点
@@ -114,8 +143,8 @@ class FileCheckpointStorage(CheckpointStorage):
 
         with self._lock:
             try:
-                # 尝试加载主文件
-                checkpoint = self._load_from_file(self.checkpoint_file)
+                # 尝试加载主文件并回放增量
+                checkpoint = self._load_from_file(self.checkpoint_file, replay_journal=True)
                 if checkpoint:
                     return checkpoint
 
@@ -155,25 +184,58 @@ class FileCheckpointStorage(CheckpointStorage):
             try:
                 if self.checkpoint_file.exists():
                     self.checkpoint_file.unlink()
+                if self.journal_file.exists():
+                    self.journal_file.unlink()
                 return True
 
             except Exception as e:
                 print(f"删除检查点失败: {e}")
                 return False
 
-    def _load_from_file(self, file_path: Path) -> Optional[CheckpointData]:
-        """从指定文件加载检查点"""
+    def _load_from_file(self, file_path: Path, replay_journal: bool = False) -> Optional[CheckpointData]:
+        """从指定文件加载检查点，replay_journal 时回放序号更新的增量"""
         try:
             if not file_path.exists():
                 return None
 
             json_data = file_path.read_text(encoding='utf-8')
-            checkpoint = CheckpointData.from_json(json_data)
-            return checkpoint
+            if not replay_journal:
+                return CheckpointData.from_json(json_data)
+
+            data = json.loads(json_data)
+            for delta in self._read_journal(data):
+                apply_delta(data, delta)
+            return CheckpointData.from_dict(data)
 
         except Exception:
             return None
 
+    def _read_journal(self, snapshot: dict) -> list:
+        """读取属于该快照之后的增量（忽略崩溃时写了一半的末行）"""
+        if not self.journal_file.exists() or not isinstance(snapshot, dict):
+            return []
+
+        base_sequence = (snapshot.get('metadata') or {}).get(SEQUENCE_KEY, 0)
+        deltas = []
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    delta = json.loads(line)
+                except ValueError:
+                    break
+                if (delta.get('checkpoint_id') == snapshot.get('checkpoint_id')
+                        and delta.get('seq', 0) > base_sequence):
+                    deltas.append(delta)
+        return deltas
+
+    def _truncate_journal(self):
+        """清空增量日志"""
+        try:
+            if self.journal_file.exists():
+                self.journal_file.unlink()
+        except Exception as e:
+            print(f"清理检查点增量日志失败: {e}")
+
     def _create_backup(self):
         """创建备份文件"""
         if not self.checkpoint_file.exists():
@@ -249,6 +311,7 @@ class FileCheckpointStorage(CheckpointStorage):
             "checkpoint_file": str(self.checkpoint_file),
             "file_exists": self.checkpoint_file.exists(),
             "file_size": self.get_file_size(),
+            "journal_size": self.journal_file.stat().st_size if self.journal_file.exists() else 0,
             "backup_count": self.get_backup_count(),
             "max_backups": self.max_backups
         })
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多Ollama主机负载均衡池
+把本地模型请求分摊到多台Ollama主机：按在途请求数最少（或近期延迟）路由，健康检查，
+连续失败的主机暂时摘除并在恢复后重新加入，模型亲和使请求优先落到已加载该模型的主机，
+同步与异步调用路径均可使用
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+STRATEGY_LATENCY = "latency"
+STRATEGIES = (STRATEGY_LEAST_OUTSTANDING, STRATEGY_LATENCY)
+
+# 逗号分隔的Ollama主机列表，例如 "http://gpu1:11434,http://gpu2:11434"
+ENDPOINTS_ENV = "LOCAL_API_BASES"
+
+
+class NoHealthyEndpointError(RuntimeError):
+    """池中没有可服务该模型的主机"""
+
+
+class _RetryableResponse(Exception):
+    """包装5xx响应，使其与连接错误一样切换到下一台主机"""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def model_key(model: str) -> str:
+    """按Ollama列出的格式规范化模型名（"llama3" -> "llama3:latest"）"""
+    return model if ":" in model else f"{model}:latest"
+
+
+def endpoint_root(url: str) -> str:
+    """Ollama原生API根地址（去掉末尾的 /v1）"""
+    url = url.rstrip("/")
+    return url[:-3] if url.endswith("/v1") else url
+
+
+@dataclass
+class Endpoint:
+    """一台Ollama主机及其路由状态"""
+    url: str
+    allowed_models: Optional[Set[str]] = None  # 配置限定的模型；None 表示不限
+    weight: float = 1.0
+    installed_models: Optional[Set[str]] = None  # 来自 /api/tags；None 表示尚未检查
+    warm_models: Set[str] = field(default_factory=set)  # 已加载到内存的模型（来自 /api/ps 与最近成功的请求）
+    inflight: int = 0
+    latency_ewma: Optional[float] = None
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+
+    @property
+    def root(self) -> str:
+        """Ollama原生API根地址（无 /v1 后缀）"""
+        return endpoint_root(self.url)
+
+    def serves(self, model: Optional[str]) -> bool:
+        """该主机是否配置并已安装该模型"""
+        if model is None:
+            return True
+        key = model_key(model)
+        if self.allowed_models is not None and key not in self.allowed_models:
+            return False
+        return self.installed_models is None or key in self.installed_models
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = now or time.time()
+        return {
+            "url": self.url,
+            "available": self.is_available(now),
+            "ejected_for": max(0.0, self.ejected_until - now),
+            "inflight": self.inflight,
+            "latency_ewma": self.latency_ewma,
+            "requests": self.requests,
+            "failures": self.failures,
+            "warm_models": sorted(self.warm_models),
+        }
+
+
+class EndpointLease:
+    """
+    已领取的主机；可作为同步或异步上下文管理器使用，
+    以异常退出时记为失败，否则记为成功
+    """
+
+    def __init__(self, pool: "EndpointPool", endpoint: Endpoint, model: Optional[str]):
+        self.pool = pool
+        self.endpoint = endpoint
+        self.model = model
+        self.started = time.monotonic()
+        self._released = False
+
+    @property
+    def url(self) -> str:
+        return self.endpoint.url
+
+    @property
+    def root(self) -> str:
+        return self.endpoint.root
+
+    def success(self):
+        """记录该主机上的一次成功请求"""
+        if not self._released:
+            self._released = True
+            self.pool._release(self.endpoint, self.model, time.monotonic() - self.started, None)
+
+    def failure(self, error: Union[BaseException, str]):
+        """记录该主机上的一次失败请求（计入摘除判定）"""
+        if not self._released:
+            self._released = True
+            self.pool._release(self.endpoint, self.model, time.monotonic() - self.started, error)
+
+    def __enter__(self) -> "EndpointLease":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_val is not None:
+            self.failure(exc_val)
+        else:
+            self.success()
+        return False
+
+    async def __aenter__(self) -> "EndpointLease":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return self.__exit__(exc_type, exc_val, exc_tb)
+
+
+class EndpointPool:
+    """多台Ollama主机的客户端负载均衡"""
+
+    def __init__(self, endpoints: Iterable[Union[str, Dict[str, Any]]],
+                 strategy: str = STRATEGY_LEAST_OUTSTANDING,
+                 failure_threshold: int = 3, eject_seconds: float = 30.0, max_eject_seconds: float = 300.0,
+                 affinity_slack: int = 2, latency_alpha: float = 0.3, health_timeout: float = 5.0):
+        """
+        Args:
+            endpoints: 主机地址列表，或含 "url" 与可选 "models" / "weight" 的字典
+            strategy: "least_outstanding"（在途请求最少）或 "latency"（近期延迟 × 在途请求数）
+            failure_threshold: 连续失败多少次后摘除主机
+            eject_seconds: 首次摘除时长（秒），重复摘除时翻倍
+            max_eject_seconds: 摘除时长上限（秒）
+            affinity_slack: 为留在已加载模型的主机上可容忍多出的在途请求数
+            latency_alpha: 延迟滑动平均的平滑系数
+            health_timeout: 健康检查请求超时（秒）
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的路由策略: {strategy}（可选 {', '.join(STRATEGIES)}）")
+        self._endpoints: List[Endpoint] = []
+        for spec in endpoints:
+            if isinstance(spec, str):
+                spec = {"url": spec}
+            models = spec.get("models")
+            self._endpoints.append(Endpoint(
+                url=spec["url"].rstrip("/"),
+                allowed_models={model_key(m) for m in models} if models else None,
+                weight=float(spec.get("weight", 1.0)),
+            ))
+        if not self._endpoints:
+            raise ValueError("主机池至少需要一台主机")
+
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.affinity_slack = affinity_slack
+        self.latency_alpha = latency_alpha
+        self.health_timeout = health_timeout
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+        self._health_stop = threading.Event()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> Optional["EndpointPool"]:
+        """按环境变量 LOCAL_API_BASES 创建主机池；未设置时返回None"""
+        urls = [url.strip() for url in os.getenv(ENDPOINTS_ENV, "").split(",") if url.strip()]
+        return cls(urls, **kwargs) if urls else None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], **kwargs) -> Optional["EndpointPool"]:
+        """
+        按 "ollama" 配置段创建主机池："endpoints"（地址或 {"url", "models", "weight"} 列表）
+        或 "base_urls"；均未配置时返回None
+        """
+        endpoints = config.get("endpoints") or config.get("base_urls")
+        if not endpoints:
+            return None
+        for option in ("strategy", "failure_threshold", "eject_seconds", "max_eject_seconds", "affinity_slack"):
+            if option in config:
+                kwargs.setdefault(option, config[option])
+        return cls(endpoints, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._endpoints)
+
+    @property
+    def endpoints(self) -> List[Endpoint]:
+        return list(self._endpoints)
+
+    # ---- 路由 ----
+
+    def _score(self, endpoint: Endpoint, fallback_latency: float) -> float:
+        # 最近的连续失败按额外的在途请求计，排序靠后
+        load = endpoint.inflight + endpoint.consecutive_failures
+        if self.strategy == STRATEGY_LATENCY:
+            latency = endpoint.latency_ewma if endpoint.latency_ewma is not None else fallback_latency
+            return latency * (load + 1) / endpoint.weight
+        return load / endpoint.weight
+
+    def _select(self, model: Optional[str], exclude: Set[str]) -> Endpoint:
+        now = time.time()
+        candidates = [e for e in self._endpoints if e.url not in exclude and e.serves(model)]
+        if not candidates:
+            raise NoHealthyEndpointError(f"没有主机可服务模型 {model}" if model else "没有可尝试的主机")
+
+        available = [e for e in candidates if e.is_available(now)]
+        if not available:
+            # 所有主机均被摘除：试探最早结束摘除的主机，而不是直接失败
+            return min(candidates, key=lambda e: e.ejected_until)
+
+        # 尚无延迟数据的主机按已知最快延迟计分，保证会被尝试
+        known = [e.latency_ewma for e in available if e.latency_ewma is not None]
+        fallback_latency = min(known) if known else 1.0
+        random.shuffle(available)
+        best = min(available, key=lambda e: self._score(e, fallback_latency))
+
+        if model:
+            key = model_key(model)
+            warm = [e for e in available if key in e.warm_models]
+            if warm:
+                best_warm = min(warm, key=lambda e: self._score(e, fallback_latency))
+                if best_warm.inflight - best.inflight <= self.affinity_slack:
+                    return best_warm
+        return best
+
+    def acquire(self, model: Optional[str] = None, exclude: Optional[Set[str]] = None) -> EndpointLease:
+        """
+        为模型领取最合适的主机
+
+        Args:
+            model: 请求使用的模型（用于按模型筛选与亲和）
+            exclude: 不选择的主机地址（已尝试过）
+
+        Returns:
+            EndpointLease，通过上下文管理器或 success()/failure() 报告结果
+
+        Raises:
+            NoHealthyEndpointError: 没有主机可服务该模型
+        """
+        with self._lock:
+            endpoint = self._select(model, exclude or set())
+            endpoint.inflight += 1
+            endpoint.requests += 1
+        return EndpointLease(self, endpoint, model)
+
+    def _release(self, endpoint: Endpoint, model: Optional[str], latency: float,
+                 error: Optional[Union[BaseException, str]]):
+        with self._lock:
+            endpoint.inflight = max(0, endpoint.inflight - 1)
+            if error is None:
+                endpoint.consecutive_failures = 0
+                endpoint.ejections = 0
+                endpoint.ejected_until = 0.0
+                if endpoint.latency_ewma is None:
+                    endpoint.latency_ewma = latency
+                else:
+                    endpoint.latency_ewma += self.latency_alpha * (latency - endpoint.latency_ewma)
+                if model:
+                    endpoint.warm_models.add(model_key(model))
+                return
+            endpoint.failures += 1
+            self._record_failure(endpoint, error)
+
+    def _record_failure(self, endpoint: Endpoint, error: Union[BaseException, str]):
+        """记录一次失败，达到阈值时摘除主机（调用方持有锁）"""
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures < self.failure_threshold:
+            return
+        # consecutive_failures 保持在阈值，重新加入后的试探请求一旦失败会立即再次摘除
+        endpoint.ejections += 1
+        period = min(self.max_eject_seconds, self.eject_seconds * 2 ** (endpoint.ejections - 1))
+        endpoint.ejected_until = time.time() + period
+        logger.warning(f"⚠️ 摘除Ollama主机 {endpoint.url} {period:.0f}秒"
+                       f"（连续失败{endpoint.consecutive_failures}次）: {error}")
+
+    # ---- 带故障切换的调用 ----
+
+    def call(self, fn: Callable[[Endpoint], Any], model: Optional[str] = None,
+             retry_on: Tuple[Type[BaseException], ...] = (Exception,)) -> Any:
+        """
+        调用 fn(endpoint)，抛出 retry_on 异常时切换到下一台最合适的主机
+
+        Raises:
+            所有可用主机都失败时抛出最后一次的异常
+        """
+        tried: Set[str] = set()
+        last_error: Optional[BaseException] = None
+        while True:
+            try:
+                lease = self.acquire(model, exclude=tried)
+            except NoHealthyEndpointError:
+                if tried:
+                    raise last_error
+                raise
+            tried.add(lease.url)
+            try:
+                result = fn(lease.endpoint)
+            except retry_on as e:
+                lease.failure(e)
+                last_error = e
+                logger.warning(f"Ollama主机 {lease.url} 调用失败（{e}），尝试下一台")
+                continue
+            except BaseException:
+                lease.success()
+                raise
+            lease.success()
+            return result
+
+    async def call_async(self, fn: Callable[[Endpoint], Any], model: Optional[str] = None,
+                         retry_on: Tuple[Type[BaseException], ...] = (Exception,)) -> Any:
+        """call() 的异步版本：fn(endpoint) 返回可等待对象"""
+        tried: Set[str] = set()
+        last_error: Optional[BaseException] = None
+        while True:
+            try:
+                lease = self.acquire(model, exclude=tried)
+            except NoHealthyEndpointError:
+                if tried:
+                    raise last_error
+                raise
+            tried.add(lease.url)
+            try:
+                result = await fn(lease.endpoint)
+            except retry_on as e:
+                lease.failure(e)
+                last_error = e
+                logger.warning(f"Ollama主机 {lease.url} 调用失败（{e}），尝试下一台")
+                continue
+            except BaseException:
+                lease.success()
+                raise
+            lease.success()
+            return result
+
+    def request(self, method: str, path: str, model: Optional[str] = None,
+                session: Optional[requests.Session] = None, **kwargs) -> requests.Response:
+        """
+        向 "<主机根地址><path>" 发送HTTP请求，连接错误、超时与5xx响应时切换主机
+
+        Returns:
+            第一个非5xx响应；全部为5xx时返回最后一个响应
+
+        Raises:
+            requests.RequestException: 所有主机均无响应
+        """
+        sender = session or requests
+
+        def send(endpoint: Endpoint) -> requests.Response:
+            response = sender.request(method, f"{endpoint.root}{path}", **kwargs)
+            if response.status_code >= 500:
+                raise _RetryableResponse(response)
+            return response
+
+        try:
+            return self.call(send, model, retry_on=(requests.ConnectionError, requests.Timeout, _RetryableResponse))
+        except _RetryableResponse as e:
+            return e.response
+
+    # ---- 健康检查 ----
+
+    def check_endpoint(self, endpoint: Endpoint) -> bool:
+        """刷新主机已安装与已加载的模型；健康时重新加入"""
+        try:
+            tags = requests.get(f"{endpoint.root}/api/tags", timeout=self.health_timeout)
+            tags.raise_for_status()
+            installed = {model_key(m["name"]) for m in tags.json().get("models", [])}
+            try:
+                ps = requests.get(f"{endpoint.root}/api/ps", timeout=self.health_timeout)
+                loaded = {model_key(m["name"]) for m in ps.json().get("models", [])} if ps.ok else None
+            except (requests.RequestException, ValueError):
+                loaded = None
+        except (requests.RequestException, ValueError) as e:
+            with self._lock:
+                self._record_failure(endpoint, f"健康检查失败: {e}")
+            return False
+
+        with self._lock:
+            endpoint.installed_models = installed
+            if loaded is not None:
+                endpoint.warm_models = loaded
+            if endpoint.ejected_until:
+                logger.info(f"✅ Ollama主机恢复: {endpoint.url}")
+            endpoint.consecutive_failures = 0
+            endpoint.ejections = 0
+            endpoint.ejected_until = 0.0
+        return True
+
+    def check_health(self) -> Dict[str, bool]:
+        """检查所有主机，返回 {地址: 是否健康}"""
+        return {endpoint.url: self.check_endpoint(endpoint) for endpoint in self._endpoints}
+
+    def start_health_checks(self, interval: float = 30.0):
+        """在后台线程中每 interval 秒执行一次 check_health()"""
+        if self._health_thread is not None:
+            return
+        self._health_stop.clear()
+
+        def loop():
+            while not self._health_stop.wait(interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, name="ollama-endpoint-health", daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self):
+        """停止后台健康检查"""
+        if self._health_thread is not None:
+            self._health_stop.set()
+            self._health_thread.join()
+            self._health_thread = None
+
+    def available_models(self) -> List[str]:
+        """至少一台未摘除主机已安装的模型（需先做健康检查）"""
+        now = time.time()
+        with self._lock:
+            models = set()
+            for endpoint in self._endpoints:
+                if endpoint.is_available(now) and endpoint.installed_models:
+                    models |= endpoint.installed_models
+        return sorted(models)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """所有主机的路由状态"""
+        now = time.time()
+        with self._lock:
+            return [endpoint.to_dict(now) for endpoint in self._endpoints]
+
+    def __str__(self) -> str:
+        return f"EndpointPool({', '.join(e.url for e in self._endpoints)}; {self.strategy})"
@@ -9,6 +9,8 @@ from typing import Dict, List
 import statistics
 from collections import Counter
 
+from .scoring_core import scores_to_array, primary_dimension_indices, weighted_trait_means, array_to_dict
+
 
 class EnhancedReverseScoringProcessor:
     """增强版反向计分处理器"""
@@ -317,65 +319,11 @@ class EnhancedReverseScoringProcessor:
         Returns:
             大五人格各维度平均分
         """
-        # 按维度分组收集分数和权重
-        scores_by_dimension = {
-            'openness_to_experience': [],
-            'conscientiousness': [],
-            'extraversion': [],
-            'agreeableness': [],
-            'neuroticism': []
-        }
-        
-        # 收集每道题的主要维度信息
-        for item in processed_scores:
-            scores = item.get('scores', {})
-            question_info = item.get('question_info', {})
-            question_data = question_info.get('question_data', {})
-            primary_dimension = question_data.get('dimension', '')  # 题目主要维度
-            
-            # 将主要维度映射到标准名称
-            dimension_map = {
-                'Openness to Experience': 'openness_to_experience',
-                'Conscientiousness': 'conscientiousness',
-                'Extraversion': 'extraversion',
-                'Agreeableness': 'agreeableness',
-                'Neuroticism': 'neuroticism'
-            }
-            
-            standard_primary_dimension = dimension_map.get(primary_dimension, '')
-            
-            # 为每个维度添加带权重的分数
-            for dimension in scores_by_dimension:
-                if dimension in scores:
-                    score = scores[dimension]
-                    if score in [1, 3, 5]:  # 确保是有效分数
-                        # 计算权重：主要维度70%，其他维度各7.5%
-                        if dimension == standard_primary_dimension and standard_primary_dimension:
-                            weight = 0.7  # 主要维度高权重
-                        else:
-                            weight = 0.075  # 其他维度低权重
-                        
-                        scores_by_dimension[dimension].append({
-                            'score': score,
-                            'weight': weight,
-                            'is_primary': (dimension == standard_primary_dimension and standard_primary_dimension)
-                        })
-        
-        # 计算加权平均分
-        big5_scores = {}
-        for dimension, weighted_scores in scores_by_dimension.items():
-            if weighted_scores:
-                # 计算加权平均
-                total_weighted_score = sum(item['score'] * item['weight'] for item in weighted_scores)
-                total_weight = sum(item['weight'] for item in weighted_scores)
-                
-                if total_weight > 0:
-                    weighted_avg = total_weighted_score / total_weight
-                    big5_scores[dimension] = round(weighted_avg, 2)
-                else:
-                    big5_scores[dimension] = 3.0  # 默认中性分
-            else:
-                big5_scores[dimension] = 3.0  # 默认中性分
+        # 组装 (题目 × 特质) 评分与主要维度索引，主要维度70%、其他维度各7.5%加权
+        scores = scores_to_array([item.get('scores', {}) for item in processed_scores])
+        primary_idx = primary_dimension_indices([item.get('question_info', {}) for item in processed_scores])
+        big5_means = weighted_trait_means(scores, primary_idx, default=3.0, decimals=None)
+        big5_scores = array_to_dict(big5_means, decimals=2)
         
         return big5_scores
 
@@ -14,6 +14,7 @@ from .input_parser import InputParser
 import time
 import statistics
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 # 导入新的算法组件
 from adaptive_consensus_algorithm import AdaptiveConsensusAlgorithm
@@ -30,7 +31,8 @@ class EnhancedTransparentPipeline:
     3. 保持与原流水线的兼容性，最小化替换
     """
 
-    def __init__(self, primary_models: List[str] = None, dispute_models: List[str] = None, use_cloud: bool = True):
+    def __init__(self, primary_models: List[str] = None, dispute_models: List[str] = None, use_cloud: bool = True,
+                 sequential_consensus: bool = False):
         """
         初始化增强流水线
 
@@ -38,8 +40,10 @@ class EnhancedTransparentPipeline:
             primary_models: 主要评估模型列表
             dispute_models: 争议解决模型列表
             use_cloud: 是否使用云端模型
+            sequential_consensus: 是否按顺序获取初始评分，前两个评分一致（已过半数）时不再调用第三个评估器（默认关闭：顺序模式以多数评分而非平均分作为共识分数）
         """
         self.use_cloud = use_cloud
+        self.sequential_consensus = sequential_consensus
 
         if use_cloud:
             # 云端优先配置
@@ -291,18 +295,16 @@ class EnhancedTransparentPipeline:
             print(f"    📊 新评分获取完成: {new_scores} (模型: {models_used})")
             return new_scores
 
-        # 获取初始3个评估器评分
-        print(f"  获取初始3个评估器评分:")
         initial_scores = []
         initial_models_used = []
+        primary_dimension = self._get_primary_dimension(question)
 
-        for i in range(3):
+        def score_with_primary_model(i: int) -> int:
             model = self.primary_models[i % len(self.primary_models)]
             try:
                 scores = self.evaluate_single_question(context, model, f"{question_id}_init_{i}")
 
                 # 使用题目主要维度作为单一评分
-                primary_dimension = self._get_primary_dimension(question)
                 single_score = scores.get(primary_dimension, 3)
 
                 # 确保评分是1,3,5
@@ -314,20 +316,43 @@ class EnhancedTransparentPipeline:
                     else:
                         single_score = 3
 
-                initial_scores.append(single_score)
-                initial_models_used.append(model)
                 print(f"    ✅ {model}: {single_score}")
 
             except Exception as e:
                 print(f"    ❌ {model}: {e}")
-                initial_scores.append(3)
-                initial_models_used.append(model)
+                single_score = 3
+            return single_score
+
+        def get_initial_scores(count: int) -> List[int]:
+            indices = list(range(len(initial_scores), len(initial_scores) + count))
+            if count > 1:
+                # 同批评估器并行调用
+                with ThreadPoolExecutor(max_workers=count) as executor:
+                    new_scores = list(executor.map(score_with_primary_model, indices))
+            else:
+                new_scores = [score_with_primary_model(i) for i in indices]
+            initial_scores.extend(new_scores)
+            initial_models_used.extend(self.primary_models[i % len(self.primary_models)] for i in indices)
+            return new_scores
+
+        if self.sequential_consensus:
+            # 顺序模式：首批2个评估器，已有多数评分即停止
+            print(f"  顺序获取初始评估器评分（首批2个，已有多数评分即停止）:")
+            print(f"  🧠 应用适应性共识算法（顺序早停）:")
+            consensus_result = self.consensus_algorithm.sequential_consensus(get_initial_scores, adaptive_evaluator)
+            print(f"  📊 初始评分: {initial_scores}")
+        else:
+            # 获取初始3个评估器评分
+            print(f"  获取初始3个评估器评分:")
+            for i in range(3):
+                initial_scores.append(score_with_primary_model(i))
+                initial_models_used.append(self.primary_models[i % len(self.primary_models)])
 
-        print(f"  📊 初始评分: {initial_scores}")
+            print(f"  📊 初始评分: {initial_scores}")
 
-        # 应用适应性共识算法
-        print(f"  🧠 应用适应性共识算法:")
-        consensus_result = self.consensus_algorithm.adaptive_consensus(initial_scores, adaptive_evaluator)
+            # 应用适应性共识算法
+            print(f"  🧠 应用适应性共识算法:")
+            consensus_result = self.consensus_algorithm.adaptive_consensus(initial_scores, adaptive_evaluator)
 
         print(f"  ✅ 共识算法完成:")
         print(f"    共识评分: {consensus_result['consensus_score']}")
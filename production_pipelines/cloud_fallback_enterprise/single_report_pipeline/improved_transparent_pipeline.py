@@ -13,9 +13,11 @@ from typing import Dict, List, Any
 from .context_generator import ContextGenerator
 from .reverse_scoring_processor import ReverseScoringProcessor
 from .input_parser import InputParser
+from .model_score_index import ModelScoreIndex
 import time
 import statistics
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 # 导入原有算法组件
 import sys
@@ -37,7 +39,8 @@ class ImprovedTransparentPipeline:
     4. 云端优先，本地备份
     """
 
-    def __init__(self, primary_models: List[str] = None, dispute_models: List[str] = None, use_cloud: bool = True, preserve_precision: bool = True):
+    def __init__(self, primary_models: List[str] = None, dispute_models: List[str] = None, use_cloud: bool = True, preserve_precision: bool = True,
+                 sequential_consensus: bool = False):
         """
         初始化改进流水线
 
@@ -46,9 +49,11 @@ class ImprovedTransparentPipeline:
             dispute_models: 争议解决模型列表
             use_cloud: 是否使用云端模型
             preserve_precision: 是否保留精度（TDD改进开关）
+            sequential_consensus: 是否按顺序获取初始评分，前两个评分一致（已过半数）时不再调用第三个评估器（默认关闭：顺序模式以多数评分而非平均分作为共识分数）
         """
         self.use_cloud = use_cloud
         self.preserve_precision = preserve_precision  # 新增TDD改进开关
+        self.sequential_consensus = sequential_consensus
 
         if use_cloud:
             # 云端优先配置
@@ -89,6 +94,9 @@ class ImprovedTransparentPipeline:
         self.adaptive_consensus = AdaptiveConsensusAlgorithm()
         self.adaptive_reliability = AdaptiveReliabilityCalculator()
 
+        # 按题目索引的各模型完整评分（用于次维度均分），评分到达时写入
+        self.model_score_index = ModelScoreIndex()
+
     def evaluate_single_question(self, context: str, model: str, question_id: str) -> Dict[str, int]:
         """
         使用单个模型评估单道题，提供智能回退，绝对禁止默认评分
@@ -244,6 +252,9 @@ class ImprovedTransparentPipeline:
 
         print(f"处理第 {question_idx + 1} 题 (ID: {question_id}) - 使用改进算法")
 
+        # question_id 在不同报告间重复：处理前清掉该题旧评分，复用流水线实例或重试时不会混入
+        self.model_score_index.discard(question_id)
+
         # 生成评估上下文
         context = self.context_generator.generate_context(question_data)
 
@@ -299,6 +310,7 @@ class ImprovedTransparentPipeline:
             'models_used': consensus_result['evaluator_count'],
             'is_reversed': is_reversed,
             'scores_data': [final_adjusted_scores] * consensus_result['evaluator_count'],
+            'model_scores': self.model_score_index.export_question(question_id),
             'confidence_metrics': {
                 'overall_reliability': reliability_result['overall_reliability'],
                 'trait_reliabilities': {
@@ -317,18 +329,16 @@ class ImprovedTransparentPipeline:
 
     def _get_adaptive_consensus(self, context: str, question: Dict, question_id: str) -> Dict[str, Any]:
         """获取适应性共识评分"""
-        initial_scores = []
-        initial_models_used = []
-
-        print(f"  获取初始3个评估器评分:")
+        primary_dimension = self._get_primary_dimension(question)
+        next_evaluator = [0]
 
-        for i in range(3):
+        def score_with_primary_model(i: int) -> int:
             model = self.primary_models[i % len(self.primary_models)]
             try:
                 scores = self.evaluate_single_question(context, model, f"{question_id}_init_{i}")
+                self.model_score_index.add(question_id, model, scores)
 
                 # 使用题目主要维度作为单一评分
-                primary_dimension = self._get_primary_dimension(question)
                 single_score = scores.get(primary_dimension, 3)
 
                 # 确保评分是1,3,5
@@ -341,20 +351,34 @@ class ImprovedTransparentPipeline:
                         single_score = 3
 
                 print(f"    ✅ {model}: {single_score}")
-                initial_scores.append(single_score)
-                initial_models_used.append(model)
+                return single_score
 
             except Exception as e:
                 print(f"    ❌ {model}: 失败 - {e}")
                 # 使用备用评分确保不中断
-                initial_scores.append(3)  # 中性评分
-                initial_models_used.append(model)
+                return 3  # 中性评分
+
+        def get_initial_scores(count: int) -> List[int]:
+            indices = list(range(next_evaluator[0], next_evaluator[0] + count))
+            next_evaluator[0] += count
+            if count > 1:
+                # 同批评估器并行调用
+                with ThreadPoolExecutor(max_workers=count) as executor:
+                    return list(executor.map(score_with_primary_model, indices))
+            return [score_with_primary_model(i) for i in indices]
+
+        def get_additional_scores(needed_count: int) -> List[int]:
+            return self._get_additional_scores(context, question, needed_count, question_id)
+
+        if self.sequential_consensus:
+            print(f"  顺序获取初始评估器评分（首批2个，已有多数评分即停止）:")
+            return self.adaptive_consensus.sequential_consensus(get_initial_scores, get_additional_scores)
+
+        print(f"  获取初始3个评估器评分:")
+        initial_scores = [score_with_primary_model(i) for i in range(3)]
 
         # 使用适应性共识算法
-        consensus_result = self.adaptive_consensus.adaptive_consensus(
-            initial_scores,
-            lambda needed_count: self._get_additional_scores(context, question, needed_count, question_id)
-        )
+        consensus_result = self.adaptive_consensus.adaptive_consensus(initial_scores, get_additional_scores)
 
         return consensus_result
 
@@ -368,6 +392,7 @@ class ImprovedTransparentPipeline:
 
             try:
                 scores = self.evaluate_single_question(context, model, f"{question_id}_adaptive_{i}")
+                self.model_score_index.add(question_id, model, scores)
 
                 # 使用题目主要维度作为单一评分
                 primary_dimension = self._get_primary_dimension(question)
@@ -439,8 +464,8 @@ class ImprovedTransparentPipeline:
                 final_scores[dimension] = float(consensus_score)  # 保留小数精度
             else:
                 # 次维度：计算真实均分（TDD Phase 2）
-                if all_model_scores:
-                    scores = [model[dimension] for model in all_model_scores]
+                scores = [model[dimension] for model in all_model_scores if dimension in model]
+                if scores:
                     final_scores[dimension] = statistics.mean(scores)
                 else:
                     # 如果没有模型评分数据，使用中性分
@@ -487,25 +512,9 @@ class ImprovedTransparentPipeline:
         获取所有模型的完整评分（用于计算次维度均分）
 
         TDD Phase 3: 实现次维度真实均分计算的数据收集
+        评分在到达时按 question_id 写入 model_score_index，此处直接按题目查询
         """
-        if not hasattr(self, 'individual_model_scores') or not self.individual_model_scores:
-            # 如果没有存储的模型评分，返回空列表（使用默认中性分）
-            return []
-
-        # 从存储的模型评分中提取当前题目的所有模型评分
-        question_id = question.get('question_id', '')
-        model_scores = []
-
-        # 遍历所有存储的模型评分
-        for model_score_list in self.individual_model_scores:
-            for score_data in model_score_list:
-                if score_data.get('question_id') == question_id:
-                    # 提取该模型的Big Five评分
-                    scores = score_data.get('big5_scores', {})
-                    if scores:
-                        model_scores.append(scores)
-
-        return model_scores
+        return self.model_score_index.get(question.get('question_id', ''))
 
     def calculate_big5_scores(self, question_results: List[Dict]) -> Dict[str, float]:
         """
@@ -5,9 +5,13 @@
 解析原始测评报告JSON格式，提取问题和回答数据
 """
 
-import json
 from typing import List, Dict
 from .context_generator import ContextGenerator
+from .result_file_reader import ResultFileReader, LazyItemField
+
+# 解析时立即解码的条目字段；conversation_log 是文件的主体，首次使用时才解码
+PARSED_FIELDS = ['question_id', 'question_data', 'extracted_response', 'session_id']
+LAZY_FIELD = 'conversation_log'
 
 
 class InputParser:
@@ -26,20 +30,19 @@ class InputParser:
         Returns:
             解析后的问题列表
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        assessment_results = data.get('assessment_results', [])
+        with ResultFileReader(file_path) as reader:
+            assessment_results = list(reader.iter_items(fields=PARSED_FIELDS))
+            has_log = [LAZY_FIELD in reader.item_fields(i) for i in range(len(reader))]
         
         parsed_questions = []
-        for item in assessment_results:
+        for position, item in enumerate(assessment_results):
             question_data = item.get('question_data', {})
             
             parsed_question = {
                 'question_id': item.get('question_id'),
                 'question_data': question_data,
                 'extracted_response': item.get('extracted_response', ''),
-                'conversation_log': item.get('conversation_log', []),
+                'conversation_log': LazyItemField(file_path, position, LAZY_FIELD) if has_log[position] else [],
                 'session_id': item.get('session_id')
             }
             
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地Ollama模型驻留管理
+预加载批次所需模型并设置 keep_alive，按显存/内存预算跟踪驻留模型（LRU淘汰），
+并提供按模型分组的任务重排，减少批处理中反复加载/卸载模型的开销
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import ollama
+
+
+DEFAULT_KEEP_ALIVE = '30m'
+# 预算环境变量，单位GB；未设置时不做主动淘汰，由Ollama自行管理
+BUDGET_ENV = 'OLLAMA_RESIDENCY_BUDGET_GB'
+
+
+def is_cloud_model(model: str) -> bool:
+    """云端模型不占用本地显存，无需驻留管理"""
+    return model.endswith('-cloud')
+
+
+def group_by_model(items: Iterable[Any], key: Callable[[Any], str]) -> List[Any]:
+    """
+    按模型稳定分组任务：模型按首次出现顺序排列，同一模型内保持原有顺序
+
+    Args:
+        items: 待执行的任务
+        key: 从任务取模型名的函数
+
+    Returns:
+        重排后的任务列表
+    """
+    groups: Dict[str, List[Any]] = OrderedDict()
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return [item for group in groups.values() for item in group]
+
+
+class ModelResidencyManager:
+    """按预算管理本地Ollama模型驻留"""
+
+    def __init__(self, host: Optional[str] = None, budget_gb: Optional[float] = None,
+                 keep_alive: str = DEFAULT_KEEP_ALIVE):
+        """
+        Args:
+            host: Ollama服务地址，默认读取 OLLAMA_HOST
+            budget_gb: 驻留模型总大小预算（GB），默认读取 OLLAMA_RESIDENCY_BUDGET_GB
+            keep_alive: 预加载与调用时传给Ollama的驻留时长
+        """
+        self.client = ollama.Client(host=host) if host else ollama.Client()
+        if budget_gb is None and os.getenv(BUDGET_ENV):
+            budget_gb = float(os.getenv(BUDGET_ENV))
+        self.budget_bytes = int(budget_gb * 1024 ** 3) if budget_gb else None
+        self.keep_alive = keep_alive
+
+        self._lock = threading.RLock()
+        # 模型名 → 占用字节数，按最近使用顺序排列（末尾最新）
+        self._resident: 'OrderedDict[str, int]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.stats = {'loads': 0, 'hits': 0, 'evictions': 0}
+
+    def refresh(self) -> Dict[str, int]:
+        """从 /api/ps 同步当前驻留模型"""
+        try:
+            running = self.client.ps()['models']
+        except Exception:
+            # 旧版客户端没有 ps()，或服务不可用：保留本地记录
+            return dict(self._resident)
+
+        with self._lock:
+            current = OrderedDict()
+            for name in self._resident:
+                for model in running:
+                    if model['model'] == name:
+                        current[name] = int(model.get('size_vram') or model.get('size') or 0)
+            for model in running:
+                name = model['model']
+                if name not in current:
+                    current[name] = int(model.get('size_vram') or model.get('size') or 0)
+            self._resident = current
+            return dict(self._resident)
+
+    def model_size(self, model: str) -> int:
+        """模型文件大小（字节），用于预算估算"""
+        if model not in self._sizes:
+            try:
+                for entry in self.client.list()['models']:
+                    self._sizes[entry['model']] = int(entry.get('size') or 0)
+            except Exception:
+                pass
+        return self._sizes.get(model, 0)
+
+    def _evict_for(self, size: int):
+        if self.budget_bytes is None:
+            return
+        while self._resident and sum(self._resident.values()) + size > self.budget_bytes:
+            victim, _ = self._resident.popitem(last=False)
+            try:
+                self.client.generate(model=victim, keep_alive=0)
+            except Exception:
+                pass
+            self.stats['evictions'] += 1
+
+    def ensure_loaded(self, model: str) -> bool:
+        """
+        确保模型已驻留：已驻留则刷新LRU顺序，否则按预算淘汰最久未用模型后预加载
+
+        Returns:
+            模型是否已驻留（云端模型返回 False）
+        """
+        if is_cloud_model(model):
+            return False
+
+        with self._lock:
+            if model in self._resident:
+                self._resident.move_to_end(model)
+                self.stats['hits'] += 1
+                return True
+
+            size = self.model_size(model)
+            self._evict_for(size)
+            try:
+                # 不带prompt的generate请求只加载模型
+                self.client.generate(model=model, keep_alive=self.keep_alive)
+            except Exception as e:
+                print(f"    ⚠️ 预加载模型 {model} 失败: {e}")
+                return False
+
+            self._resident[model] = size
+            self.stats['loads'] += 1
+            return True
+
+    def preload(self, models: Iterable[str]) -> List[str]:
+        """
+        预加载批次将用到的模型（按给定顺序，超出预算的部分由后续 ensure_loaded 按需加载）
+
+        Returns:
+            成功驻留的模型列表
+        """
+        self.refresh()
+        loaded = []
+        for model in dict.fromkeys(models):
+            if is_cloud_model(model):
+                continue
+            size = self.model_size(model)
+            if (self.budget_bytes is not None and model not in self._resident
+                    and sum(self._resident.values()) + size > self.budget_bytes and loaded):
+                break
+            if self.ensure_loaded(model):
+                loaded.append(model)
+        return loaded
+
+    def release(self, models: Optional[Iterable[str]] = None):
+        """批次结束后卸载模型，默认卸载所有由本管理器记录的模型"""
+        with self._lock:
+            for model in list(models if models is not None else self._resident):
+                try:
+                    self.client.generate(model=model, keep_alive=0)
+                except Exception:
+                    pass
+                self._resident.pop(model, None)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按题目索引的模型评分存储
+评分到达时按 question_id 写入，查询单题所有模型评分为O(1)，
+并提供按 BIG5_TRAITS 顺序的紧凑导出用于最终报告
+"""
+
+import threading
+from typing import Any, Dict, List
+
+try:
+    from .scoring_core import BIG5_TRAITS
+except ImportError:
+    from scoring_core import BIG5_TRAITS
+
+
+class ModelScoreIndex:
+    """question_id → [(模型, 五维评分)] 的索引"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, List[str]] = {}
+        self._rows: Dict[str, List[Dict[str, int]]] = {}
+
+    def add(self, question_id: str, model: str, scores: Dict[str, int]):
+        """记录某模型对某题的完整评分"""
+        question_id = str(question_id)
+        with self._lock:
+            self._models.setdefault(question_id, []).append(model)
+            self._rows.setdefault(question_id, []).append(dict(scores))
+
+    def get(self, question_id: str) -> List[Dict[str, int]]:
+        """获取某题所有模型的评分"""
+        return list(self._rows.get(str(question_id), []))
+
+    def models(self, question_id: str) -> List[str]:
+        """获取某题已评分的模型（按到达顺序）"""
+        return list(self._models.get(str(question_id), []))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, question_id: str) -> bool:
+        return str(question_id) in self._rows
+
+    def discard(self, question_id: str):
+        """移除某题已记录的评分（重新处理该题前调用，避免与上一份报告或上次尝试的评分混在一起）"""
+        question_id = str(question_id)
+        with self._lock:
+            self._models.pop(question_id, None)
+            self._rows.pop(question_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._rows.clear()
+
+    def export_question(self, question_id: str) -> Dict[str, Any]:
+        """
+        紧凑导出单题评分
+
+        Returns:
+            {'models': [...], 'scores': [[o, c, e, a, n], ...]}，维度顺序同 BIG5_TRAITS
+        """
+        question_id = str(question_id)
+        return {
+            'models': self.models(question_id),
+            'scores': [[row.get(trait) for trait in BIG5_TRAITS] for row in self._rows.get(question_id, [])]
+        }
+
+    def export(self) -> Dict[str, Any]:
+        """紧凑导出全部题目评分"""
+        return {
+            'traits': list(BIG5_TRAITS),
+            'questions': {question_id: self.export_question(question_id) for question_id in self._rows}
+        }
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测评结果文件随机访问读取器
+首次读取时建立顶层字段与 assessment_results 各条目（及其字段）的字节偏移索引，
+索引缓存在缓存目录（AGENTPSY_INDEX_CACHE，默认 ~/.cache/agentpsy/result_index），不写入结果目录；
+之后通过mmap只解码需要的字段或条目，元数据扫描、只取 extracted_response 等场景无需完整解析整个文件
+"""
+
+import os
+import re
+import json
+import mmap
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.idx'
+RESULTS_KEY = 'assessment_results'
+INDEX_CACHE_ENV = 'AGENTPSY_INDEX_CACHE'
+
+
+def default_index_cache_dir() -> str:
+    """索引缓存目录：AGENTPSY_INDEX_CACHE，未设置时为 ~/.cache/agentpsy/result_index"""
+    return os.environ.get(INDEX_CACHE_ENV) or os.path.join(
+        os.path.expanduser('~'), '.cache', 'agentpsy', 'result_index')
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*').match
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    return _whitespace(text, pos).end()
+
+
+def _expect(text: str, pos: int, char: str) -> int:
+    pos = _skip_whitespace(text, pos)
+    if pos >= len(text) or text[pos] != char:
+        raise json.JSONDecodeError(f"Expecting '{char}'", text, pos)
+    return pos + 1
+
+
+def _scan_value(text: str, pos: int) -> int:
+    """跳过一个JSON值，返回其结束位置（C实现的解码器完成实际扫描）"""
+    _, end = _decoder.raw_decode(text, pos)
+    return end
+
+
+def _scan_object(text: str, pos: int, nested_key: Optional[str] = None
+                 ) -> Tuple[Dict[str, List[int]], Optional[List], int]:
+    """
+    扫描一个JSON对象，记录每个字段值的 [起, 止) 字符偏移
+
+    Args:
+        text: 文档文本
+        pos: 对象起始位置（'{' 处）
+        nested_key: 该字段的数组值按条目继续建立索引
+
+    Returns:
+        (字段偏移, nested_key 数组的条目索引, 对象结束位置)
+    """
+    pos = _expect(text, pos, '{')
+    spans: Dict[str, List[int]] = {}
+    items = None
+
+    pos = _skip_whitespace(text, pos)
+    if pos < len(text) and text[pos] == '}':
+        return spans, items, pos + 1
+
+    while True:
+        pos = _skip_whitespace(text, pos)
+        if pos >= len(text) or text[pos] != '"':
+            raise json.JSONDecodeError('Expecting property name enclosed in double quotes', text, pos)
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = _skip_whitespace(text, _expect(text, pos, ':'))
+
+        if key == nested_key and pos < len(text) and text[pos] == '[':
+            items, end = _scan_array(text, pos)
+        else:
+            end = _scan_value(text, pos)
+        spans[key] = [pos, end]
+
+        pos = _skip_whitespace(text, end)
+        if pos < len(text) and text[pos] == ',':
+            pos += 1
+            continue
+        return spans, items, _expect(text, pos, '}')
+
+
+def _scan_array(text: str, pos: int) -> Tuple[List, int]:
+    """扫描条目数组，对象条目同时记录其字段偏移"""
+    pos = _expect(text, pos, '[')
+    items = []
+
+    pos = _skip_whitespace(text, pos)
+    if pos < len(text) and text[pos] == ']':
+        return items, pos + 1
+
+    while True:
+        pos = _skip_whitespace(text, pos)
+        if pos < len(text) and text[pos] == '{':
+            fields, _, end = _scan_object(text, pos)
+        else:
+            fields, end = {}, _scan_value(text, pos)
+        items.append([pos, end, fields])
+
+        pos = _skip_whitespace(text, end)
+        if pos < len(text) and text[pos] == ',':
+            pos += 1
+            continue
+        return items, _expect(text, pos, ']')
+
+
+def build_index(raw: bytes) -> Dict[str, Any]:
+    """
+    为结果文件内容建立字节偏移索引
+
+    按 latin-1 解码使字符偏移等于字节偏移：UTF-8多字节序列全部 >= 0x80，
+    不会与JSON结构字符冲突，因此扫描出的边界与按UTF-8解析一致
+
+    Returns:
+        {'keys': {字段: [起, 止]}, 'items': [[起, 止, {字段: [起, 止]}], ...]}
+    """
+    text = raw.decode('latin-1')
+
+    start = _skip_whitespace(text, 3 if raw.startswith(b'\xef\xbb\xbf') else 0)
+    if start >= len(text) or text[start] != '{':
+        # 非对象文档：只记录整体范围
+        end = _scan_value(text, start)
+        keys, items = {}, None
+    else:
+        keys, items, end = _scan_object(text, start, nested_key=RESULTS_KEY)
+    if _skip_whitespace(text, end) != len(text):
+        raise json.JSONDecodeError('Extra data', text, end)
+
+    return {'keys': keys, 'items': items}
+
+
+class ResultFileReader:
+    """
+    基于偏移索引与mmap的测评结果文件读取器
+
+    用法:
+        with ResultFileReader(path) as reader:
+            metadata = reader.metadata
+            for item in reader.iter_items(fields=['question_id', 'extracted_response']):
+                ...
+    """
+
+    def __init__(self, file_path: str, cache_index: bool = True, cache_dir: Optional[str] = None):
+        """
+        Args:
+            file_path: 结果JSON文件路径
+            cache_index: 是否读写索引缓存（缓存目录不可写时自动忽略）
+            cache_dir: 索引缓存目录（默认见 default_index_cache_dir）
+        """
+        self.file_path = str(file_path)
+        self.cache_index = cache_index
+        self.cache_dir = cache_dir or default_index_cache_dir()
+        self._file = open(self.file_path, 'rb')
+        try:
+            file_stat = os.fstat(self._file.fileno())
+            self._signature = [file_stat.st_mtime_ns, file_stat.st_size]
+            if file_stat.st_size == 0:
+                raise json.JSONDecodeError('Expecting value', '', 0)
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index = self._load_index()
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """释放mmap与文件句柄"""
+        if self._file is not None:
+            self._map.close()
+            self._file.close()
+            self._file = None
+
+    @property
+    def index_path(self) -> str:
+        """缓存目录中的索引文件，按结果文件绝对路径命名"""
+        digest = hashlib.sha1(os.path.abspath(self.file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + INDEX_SUFFIX)
+
+    def _load_index(self) -> Dict[str, Any]:
+        if self.cache_index and os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached.get('version') == INDEX_VERSION and cached.get('signature') == self._signature:
+                    return cached
+            except (OSError, ValueError):
+                pass
+
+        index = build_index(self._map[:])
+        index['version'] = INDEX_VERSION
+        index['signature'] = self._signature
+        if self.cache_index:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    # dumps 走C编码器，比流式 dump 快得多
+                    f.write(json.dumps(index, separators=(',', ':')))
+                os.replace(tmp_path, self.index_path)
+            except OSError:
+                pass
+        return index
+
+    def _decode(self, span: List[int]) -> Any:
+        return json.loads(self._map[span[0]:span[1]].decode('utf-8'))
+
+    def keys(self) -> List[str]:
+        """顶层字段名（按文档顺序）"""
+        return list(self._index['keys'])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """只解码某个顶层字段"""
+        span = self._index['keys'].get(key)
+        return default if span is None else self._decode(span)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """assessment_metadata（不解析测评条目）"""
+        return self.get('assessment_metadata', {})
+
+    def __len__(self) -> int:
+        return len(self._index['items'] or [])
+
+    def item(self, position: int) -> Dict[str, Any]:
+        """解码第 position 个测评条目"""
+        start, end, _ = self._index['items'][position]
+        return self._decode([start, end])
+
+    def item_fields(self, position: int) -> List[str]:
+        """第 position 个条目的字段名（不解码）"""
+        return list(self._index['items'][position][2])
+
+    def item_field(self, position: int, field: str, default: Any = None) -> Any:
+        """只解码第 position 个条目的某个字段"""
+        span = self._index['items'][position][2].get(field)
+        return default if span is None else self._decode(span)
+
+    def iter_items(self, fields: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        逐个惰性解码测评条目
+
+        Args:
+            fields: 只解码这些字段（条目中缺失的字段不出现在结果中）；None 表示完整条目
+        """
+        fields = list(fields) if fields is not None else None
+        for start, end, spans in self._index['items'] or []:
+            if fields is None or not spans:
+                item = self._decode([start, end])
+                if fields is not None and isinstance(item, dict):
+                    item = {field: item[field] for field in fields if field in item}
+                yield item
+            else:
+                yield {field: self._decode(spans[field]) for field in fields if field in spans}
+
+    def load(self) -> Any:
+        """完整解析整个文件（等价于 json.load）"""
+        return json.loads(self._map[:].decode('utf-8-sig'))
+
+
+def _materializing(name: str):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        self._materialize()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+class LazyItemField(list):
+    """
+    按需解码的条目字段（列表值）
+
+    首次读取、修改、复制或序列化时才重新打开结果文件并只解码该字段，
+    之后与普通列表相同；json.dumps / pickle / deepcopy 得到完整内容
+
+    注意：直接读取列表内部存储的 C 层接口会绕过解码而看到空列表，
+    如 list.__add__(other, field)、operator.concat(other, field)；
+    这类场景请先 list(field) 取得普通列表（other + field 已单独处理）
+    """
+
+    def __init__(self, file_path: str, position: int, field: str):
+        super().__init__()
+        self._source: Optional[Tuple[str, int, str]] = (str(file_path), position, field)
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._source is None
+
+    def _materialize(self):
+        if self._source is None:
+            return
+        with self._lock:
+            if self._source is None:
+                return
+            file_path, position, field = self._source
+            with ResultFileReader(file_path) as reader:
+                value = reader.item_field(position, field, [])
+            list.extend(self, value if isinstance(value, list) else [])
+            self._source = None
+
+    def __radd__(self, other):
+        # other + field：左操作数为普通列表时 list 的拼接不经过本类方法，需先解码
+        if not isinstance(other, list):
+            return NotImplemented
+        self._materialize()
+        return list.__add__(other, self)
+
+    def __reduce_ex__(self, protocol):
+        # pickle / deepcopy 得到普通列表
+        self._materialize()
+        return list, (list(self),)
+
+
+for _name in ('__len__', '__iter__', '__reversed__', '__getitem__', '__contains__', '__eq__', '__ne__',
+              '__lt__', '__le__', '__gt__', '__ge__', '__repr__', '__add__', '__mul__', '__iadd__', '__imul__',
+              '__setitem__', '__delitem__', 'append', 'extend', 'insert', 'pop', 'remove', 'clear',
+              'index', 'count', 'copy', 'sort', 'reverse'):
+    setattr(LazyItemField, _name, _materializing(_name))
+
+
+def read_metadata(file_path: str) -> Dict[str, Any]:
+    """读取结果文件的 assessment_metadata"""
+    with ResultFileReader(file_path) as reader:
+        return reader.metadata
+
+
+def iter_result_items(file_path: str, fields: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+    """流式遍历结果文件的 assessment_results 条目"""
+    with ResultFileReader(file_path) as reader:
+        yield from reader.iter_items(fields)
@@ -9,6 +9,8 @@ from typing import Dict, List
 import statistics
 from collections import Counter
 
+from .scoring_core import scores_to_array, trait_means, array_to_dict
+
 
 class ReverseScoringProcessor:
     """反向计分处理器"""
@@ -261,31 +263,10 @@ class ReverseScoringProcessor:
         Returns:
             大五人格各维度平均分
         """
-        # 按维度分组收集分数
-        scores_by_dimension = {
-            'openness_to_experience': [],
-            'conscientiousness': [],
-            'extraversion': [],
-            'agreeableness': [],
-            'neuroticism': []
-        }
-        
-        for item in processed_scores:
-            scores = item.get('scores', {})
-            for dimension in scores_by_dimension:
-                if dimension in scores:
-                    score = scores[dimension]
-                    if score in [1, 3, 5]:  # 确保是有效分数
-                        scores_by_dimension[dimension].append(score)
-        
-        # 计算各维度平均分
-        big5_scores = {}
-        for dimension, dimension_scores in scores_by_dimension.items():
-            if dimension_scores:
-                avg_score = sum(dimension_scores) / len(dimension_scores)
-                big5_scores[dimension] = round(avg_score, 2)
-            else:
-                big5_scores[dimension] = 0.0  # 或者可以设置为3.0表示中性
+        # 组装 (题目 × 特质) 数组，只统计有效的1/3/5分
+        scores = scores_to_array([item.get('scores', {}) for item in processed_scores])
+        big5_means = trait_means(scores, default=0.0, decimals=None)
+        big5_scores = array_to_dict(big5_means, decimals=2)
         
         return big5_scores
 
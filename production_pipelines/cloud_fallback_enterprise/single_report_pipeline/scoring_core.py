@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量化评分核心
+将一份报告的评分表示为 (题目 × 模型 × 特质) 数组，
+反向计分、均值、标准差/极差、争议掩码与MBTI映射均以NumPy向量运算完成，
+并提供一次性对大量报告评分的批量接口
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# 大五人格标准维度顺序（数组最后一维）
+BIG5_TRAITS = (
+    'openness_to_experience',
+    'conscientiousness',
+    'extraversion',
+    'agreeableness',
+    'neuroticism'
+)
+
+TRAIT_INDEX = {trait: idx for idx, trait in enumerate(BIG5_TRAITS)}
+
+# 题目维度名 → 标准维度名
+DIMENSION_MAP = {
+    'Openness to Experience': 'openness_to_experience',
+    'Conscientiousness': 'conscientiousness',
+    'Extraversion': 'extraversion',
+    'Agreeableness': 'agreeableness',
+    'Neuroticism': 'neuroticism'
+}
+
+# 有效评分值与权重：主要维度70%，其他维度各7.5%
+VALID_SCORES = (1, 3, 5)
+PRIMARY_WEIGHT = 0.7
+SECONDARY_WEIGHT = 0.075
+
+# 三模型一致性分级：标准差上限 → (一致性评分, 一致性等级)
+CONSISTENCY_LEVELS = (
+    (0.0, 100, "完美"),
+    (0.5, 90, "高"),
+    (1.0, 70, "中"),
+    (1.5, 40, "低"),
+)
+CONSISTENCY_FALLBACK = (10, "极低")
+
+
+def scores_to_array(scores_list: Sequence[Dict[str, float]],
+                    traits: Sequence[str] = BIG5_TRAITS) -> np.ndarray:
+    """
+    将评分字典列表转换为 (N × 特质) 数组，缺失或非数值评分记为NaN
+
+    Args:
+        scores_list: 评分字典列表，如 [{'extraversion': 3, ...}, ...]
+        traits: 维度顺序
+
+    Returns:
+        float数组，形状 (len(scores_list), len(traits))
+    """
+    array = np.full((len(scores_list), len(traits)), np.nan)
+    for row, scores in enumerate(scores_list):
+        if not isinstance(scores, dict):
+            continue
+        for col, trait in enumerate(traits):
+            value = scores.get(trait)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                array[row, col] = value
+    return array
+
+
+def build_score_tensor(question_model_scores: Sequence[Sequence[Dict[str, float]]],
+                       traits: Sequence[str] = BIG5_TRAITS) -> np.ndarray:
+    """
+    构建 (题目 × 模型 × 特质) 评分张量，模型数不足的题目以NaN补齐
+
+    Args:
+        question_model_scores: 每道题的各模型评分字典列表
+        traits: 维度顺序
+
+    Returns:
+        float数组，形状 (题目数, 最大模型数, 特质数)
+    """
+    max_models = max((len(scores) for scores in question_model_scores), default=0)
+    tensor = np.full((len(question_model_scores), max_models, len(traits)), np.nan)
+    for q_idx, scores in enumerate(question_model_scores):
+        if scores:
+            tensor[q_idx, :len(scores)] = scores_to_array(scores, traits)
+    return tensor
+
+
+def array_to_dict(values: np.ndarray, traits: Sequence[str] = BIG5_TRAITS,
+                  decimals: Optional[int] = None) -> Dict[str, float]:
+    """将一维特质数组转换回 {维度: 分数} 字典"""
+    result = {}
+    for trait, value in zip(traits, values):
+        value = float(value)
+        result[trait] = round(value, decimals) if decimals is not None else value
+    return result
+
+
+def primary_dimension_indices(questions: Sequence[Dict],
+                              traits: Sequence[str] = BIG5_TRAITS) -> np.ndarray:
+    """
+    提取每道题主要维度的索引
+
+    Args:
+        questions: 题目信息列表（含 question_data.dimension）
+
+    Returns:
+        int数组，无法识别主要维度的题目为 -1
+    """
+    index = {trait: idx for idx, trait in enumerate(traits)}
+    result = np.full(len(questions), -1, dtype=np.int64)
+    for q_idx, question in enumerate(questions):
+        question_data = (question or {}).get('question_data', {}) or {}
+        standard_dimension = DIMENSION_MAP.get(question_data.get('dimension', ''), '')
+        result[q_idx] = index.get(standard_dimension, -1)
+    return result
+
+
+def primary_dimension_mask(primary_idx: np.ndarray, n_traits: int = len(BIG5_TRAITS)) -> np.ndarray:
+    """由主要维度索引 (...,Q) 生成布尔掩码 (...,Q,T)"""
+    primary_idx = np.asarray(primary_idx)
+    return primary_idx[..., None] == np.arange(n_traits)
+
+
+def valid_score_mask(scores: np.ndarray, valid_scores: Sequence[float] = VALID_SCORES) -> np.ndarray:
+    """标记有效评分（1、3、5分）"""
+    return np.isin(scores, valid_scores)
+
+
+def snap_to_scale(scores: np.ndarray) -> np.ndarray:
+    """
+    将评分规整到1/3/5三档 (<=2 → 1, >=4 → 5, 其余 → 3)，NaN保持不变
+    """
+    scores = np.asarray(scores, dtype=float)
+    snapped = np.where(scores <= 2, 1.0, np.where(scores >= 4, 5.0, 3.0))
+    return np.where(np.isnan(scores), np.nan, snapped)
+
+
+def reverse_key(scores: np.ndarray, reverse_mask: np.ndarray,
+                trait_mask: Optional[np.ndarray] = None,
+                scale_range: Tuple[float, float] = (1, 5)) -> np.ndarray:
+    """
+    反向计分：reversed = (max + min) - original
+
+    Args:
+        scores: 评分数组，最后一维为特质（或单个分数轴）
+        reverse_mask: 反向题掩码，可广播到 scores
+        trait_mask: 可选，仅对掩码内的特质反向（如只反向题目主要维度）
+        scale_range: 量表范围 (min, max)
+
+    Returns:
+        反向后的评分数组
+    """
+    scores = np.asarray(scores, dtype=float)
+    mask = np.asarray(reverse_mask, dtype=bool)
+    if trait_mask is not None:
+        mask = mask & np.asarray(trait_mask, dtype=bool)
+    min_scale, max_scale = scale_range
+    return np.where(mask, (max_scale + min_scale) - scores, scores)
+
+
+def weight_matrix(primary_idx: np.ndarray, n_traits: int = len(BIG5_TRAITS),
+                  primary_weight: float = PRIMARY_WEIGHT,
+                  secondary_weight: float = SECONDARY_WEIGHT) -> np.ndarray:
+    """主要维度权重0.7、其他维度0.075的权重矩阵 (...,Q,T)"""
+    return np.where(primary_dimension_mask(primary_idx, n_traits), primary_weight, secondary_weight)
+
+
+def weighted_trait_means(scores: np.ndarray, primary_idx: np.ndarray,
+                         default: float = 3.0, decimals: Optional[int] = 2,
+                         valid_scores: Sequence[float] = VALID_SCORES) -> np.ndarray:
+    """
+    计算各维度加权平均分（只统计有效评分）
+
+    Args:
+        scores: (...,Q,T) 最终评分
+        primary_idx: (...,Q) 主要维度索引
+        default: 无有效评分时的默认分
+        decimals: 保留小数位，None表示不取整
+
+    Returns:
+        (...,T) 加权平均分
+    """
+    scores = np.asarray(scores, dtype=float)
+    weights = weight_matrix(primary_idx, scores.shape[-1]) * valid_score_mask(scores, valid_scores)
+    total_weight = weights.sum(axis=-2)
+    total_score = np.where(weights > 0, scores, 0.0) * weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(total_weight > 0, total_score.sum(axis=-2) / total_weight, default)
+    return np.round(means, decimals) if decimals is not None else means
+
+
+def trait_means(scores: np.ndarray, default: float = 0.0, decimals: Optional[int] = 2,
+                valid_scores: Optional[Sequence[float]] = VALID_SCORES) -> np.ndarray:
+    """
+    计算各维度算术平均分
+
+    Args:
+        scores: (...,Q,T) 评分
+        default: 无评分时的默认分
+        decimals: 保留小数位，None表示不取整
+        valid_scores: 只统计这些分值；None表示统计所有非NaN分数
+
+    Returns:
+        (...,T) 平均分
+    """
+    scores = np.asarray(scores, dtype=float)
+    mask = valid_score_mask(scores, valid_scores) if valid_scores is not None else ~np.isnan(scores)
+    counts = mask.sum(axis=-2)
+    totals = np.where(mask, scores, 0.0).sum(axis=-2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, totals / counts, default)
+    return np.round(means, decimals) if decimals is not None else means
+
+
+def group_means(scores: np.ndarray, group_idx: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按分组索引求平均（题目 → 特质 的一维映射场景）
+
+    Args:
+        scores: (N,) 评分
+        group_idx: (N,) 每个评分所属分组，-1表示不参与
+        n_groups: 分组数
+
+    Returns:
+        (平均分数组, 计数数组)，形状均为 (n_groups,)
+    """
+    scores = np.asarray(scores, dtype=float)
+    group_idx = np.asarray(group_idx, dtype=np.int64)
+    keep = group_idx >= 0
+    counts = np.bincount(group_idx[keep], minlength=n_groups)
+    totals = np.bincount(group_idx[keep], weights=scores[keep], minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, totals / np.maximum(counts, 1), 0.0)
+    return means, counts
+
+
+def model_statistics(tensor: np.ndarray, axis: int = -2) -> Dict[str, np.ndarray]:
+    """
+    沿模型轴计算均值、样本标准差、极差与有效评分数（忽略NaN）
+
+    Args:
+        tensor: (...,M,T) 评分张量
+        axis: 模型轴
+
+    Returns:
+        {'mean', 'std', 'range', 'count'}，形状为去掉模型轴后的 (...,T)
+    """
+    tensor = np.asarray(tensor, dtype=float)
+    present = ~np.isnan(tensor)
+    count = present.sum(axis=axis)
+    filled = np.where(present, tensor, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(count > 0, filled.sum(axis=axis) / np.maximum(count, 1), np.nan)
+        deviations = np.where(present, tensor - np.expand_dims(mean, axis), 0.0)
+        variance = (deviations ** 2).sum(axis=axis) / np.maximum(count - 1, 1)
+    std = np.where(count > 1, np.sqrt(variance), 0.0)
+    high = np.where(present, tensor, -np.inf).max(axis=axis)
+    low = np.where(present, tensor, np.inf).min(axis=axis)
+    score_range = np.where(count > 0, high - low, 0.0)
+    return {'mean': mean, 'std': std, 'range': score_range, 'count': count}
+
+
+def dispute_mask(tensor: np.ndarray, threshold: float = 1.0,
+                 trait_mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    争议掩码：至少两个模型评分且极差超过阈值
+
+    Args:
+        tensor: (...,M,T) 评分张量
+        threshold: 极差阈值
+        trait_mask: 可选 (...,T)，只检查掩码内的维度（如题目主要维度）
+
+    Returns:
+        (...,T) 布尔数组
+    """
+    stats = model_statistics(tensor)
+    mask = (stats['count'] > 1) & (stats['range'] > threshold)
+    if trait_mask is not None:
+        mask &= np.asarray(trait_mask, dtype=bool)
+    return mask
+
+
+def dispute_severity(tensor: np.ndarray) -> np.ndarray:
+    """
+    争议严重程度 ('low', 'medium', 'high')，与 assess_dispute_severity 规则一致
+    """
+    stats = model_statistics(tensor)
+    low = (stats['count'] < 2) | ((stats['range'] <= 1) & (stats['std'] <= 0.5))
+    medium = (stats['range'] <= 2) & (stats['std'] <= 1.0)
+    return np.select([low, medium], ['low', 'medium'], default='high')
+
+
+def trait_reliability(tensor: np.ndarray, max_possible_std: float = 2.0) -> np.ndarray:
+    """
+    各维度评分信度：0.6 × (1 - 标准差/2) + 0.4 × 众数比例，评分少于2个时为0
+
+    Args:
+        tensor: (...,M,T) 评分张量
+
+    Returns:
+        (...,T) 信度系数，保留3位小数
+    """
+    tensor = np.asarray(tensor, dtype=float)
+    stats = model_statistics(tensor)
+    consistency = np.maximum(0.0, 1.0 - stats['std'] / max_possible_std)
+    values = np.unique(tensor[~np.isnan(tensor)])
+    if values.size:
+        mode_counts = (tensor[..., None] == values).sum(axis=-3).max(axis=-1)
+    else:
+        mode_counts = np.zeros_like(stats['count'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mode_ratio = np.where(stats['count'] > 0, mode_counts / np.maximum(stats['count'], 1), 0.0)
+    reliability = 0.6 * consistency + 0.4 * mode_ratio
+    return np.round(np.where(stats['count'] < 2, 0.0, reliability), 3)
+
+
+def consistency_grades(std: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    根据标准差给出一致性评分与等级（三模型一致性规则）
+
+    Returns:
+        (一致性评分数组, 一致性等级数组)
+    """
+    std = np.asarray(std, dtype=float)
+    conditions = [std == 0] + [std <= limit for limit, _, _ in CONSISTENCY_LEVELS[1:]]
+    scores = np.select(conditions, [score for _, score, _ in CONSISTENCY_LEVELS],
+                       default=CONSISTENCY_FALLBACK[0])
+    levels = np.select(conditions, [level for _, _, level in CONSISTENCY_LEVELS],
+                       default=CONSISTENCY_FALLBACK[1])
+    return scores, levels
+
+
+def mbti_types(big5: np.ndarray, rule: str = 'transparent') -> np.ndarray:
+    """
+    由大五得分批量推断MBTI类型
+
+    Args:
+        big5: (...,5) 大五得分，维度顺序为 BIG5_TRAITS
+        rule: 'transparent' — E+(5-N) 对比 (5-E)+N，O<=3→S，A<=3→T，C>3→J；
+              'threshold' — E<=3→I，O>=4→N，A>=4→F，C>=4→J
+
+    Returns:
+        (...) MBTI类型字符串数组
+    """
+    big5 = np.asarray(big5, dtype=float)
+    O, C, E, A, N = (big5[..., TRAIT_INDEX[trait]] for trait in BIG5_TRAITS)
+
+    if rule == 'transparent':
+        ei = np.where(E + (5 - N) > (5 - E) + N, 'E', 'I')
+        sn = np.where(O <= 3, 'S', 'N')
+        tf = np.where(A <= 3, 'T', 'F')
+        jp = np.where(C > 3, 'J', 'P')
+    elif rule == 'threshold':
+        ei = np.where(E <= 3, 'I', 'E')
+        sn = np.where(O >= 4, 'N', 'S')
+        tf = np.where(A >= 4, 'F', 'T')
+        jp = np.where(C >= 4, 'J', 'P')
+    else:
+        raise ValueError(f"未知的MBTI映射规则: {rule}")
+
+    return np.char.add(np.char.add(ei, sn), np.char.add(tf, jp))
+
+
+def report_arrays(question_results: Sequence[Dict],
+                  score_key: str = 'final_adjusted_scores') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    从流水线题目结果中提取 (Q,T) 最终评分与 (Q,) 主要维度索引
+
+    Args:
+        question_results: process_single_question 的结果列表
+        score_key: 评分字段名（兼容 'scores'、'final_scores' 等格式）
+    """
+    scores = scores_to_array([result.get(score_key, {}) for result in question_results])
+    primary_idx = primary_dimension_indices([result.get('question_info', {}) for result in question_results])
+    return scores, primary_idx
+
+
+def stack_reports(reports: Sequence[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将多份报告的 (Q_i,T) 评分与 (Q_i,) 主要维度索引补齐堆叠为 (R,Q,T) 与 (R,Q)
+
+    补齐位置评分为NaN、主要维度为-1，不参与任何统计
+    """
+    max_questions = max((scores.shape[0] for scores, _ in reports), default=0)
+    n_traits = len(BIG5_TRAITS)
+    stacked_scores = np.full((len(reports), max_questions, n_traits), np.nan)
+    stacked_primary = np.full((len(reports), max_questions), -1, dtype=np.int64)
+    for r_idx, (scores, primary_idx) in enumerate(reports):
+        stacked_scores[r_idx, :scores.shape[0]] = scores
+        stacked_primary[r_idx, :len(primary_idx)] = primary_idx
+    return stacked_scores, stacked_primary
+
+
+def score_reports_batch(reports: Sequence[Sequence[Dict]], score_key: str = 'final_adjusted_scores',
+                        weighted: bool = True, mbti_rule: str = 'transparent') -> Dict[str, np.ndarray]:
+    """
+    批量对多份报告计算大五得分与MBTI类型（一次向量运算完成）
+
+    Args:
+        reports: 每份报告的题目结果列表
+        score_key: 评分字段名
+        weighted: 是否使用主要维度加权平均
+        mbti_rule: MBTI映射规则，见 mbti_types
+
+    Returns:
+        {'big5': (R,5) 得分数组, 'mbti': (R,) 类型数组}
+    """
+    scores, primary_idx = stack_reports([report_arrays(results, score_key) for results in reports])
+    if weighted:
+        big5 = weighted_trait_means(scores, primary_idx)
+    else:
+        big5 = trait_means(scores)
+    return {'big5': big5, 'mbti': mbti_types(big5, mbti_rule)}
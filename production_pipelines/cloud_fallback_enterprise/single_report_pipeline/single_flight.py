@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型调用的在途请求合并（single-flight）
+同时发出的相同请求（规范化后的请求体一致）只调用一次上游：第一个调用方执行，后到的调用方等待其结果，
+不再重复请求。与响应缓存不同，调用完成后不保留任何结果，只合并真正同时在途的重复请求
+（重复的上下文提示、连通性探测、重复报告等）。
+进程内所有客户端共享同一个合并组；LLM_SINGLE_FLIGHT=0 时关闭
+"""
+
+import os
+import copy
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_IMMUTABLE = (str, bytes, int, float, bool, type(None), tuple, frozenset)
+
+
+def request_key(*parts: Any) -> str:
+    """
+    把请求体规范化为合并键
+
+    Args:
+        *parts: 可JSON序列化的请求组成部分（模型、消息、参数等）；字典键顺序与分隔空白不影响结果
+
+    Returns:
+        str: 标识该请求的十六进制摘要
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _share(result: Any) -> Any:
+    """可变结果（解析后的JSON响应体）给每个跟随方一份独立副本"""
+    return result if isinstance(result, _IMMUTABLE) else copy.deepcopy(result)
+
+
+class _Call:
+    """一次在途的同步调用及其等待方"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+
+
+class _AsyncCall:
+    """一次在途的异步调用（每个事件循环一个任务）及其等待方"""
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 1
+
+
+class SingleFlight:
+    """合并同时在途的相同调用，记录每个键的等待数与按标签的统计"""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled (bool): 为 False 时每次调用各自执行（仍记录统计）
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[tuple, _AsyncCall] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._metrics: Optional[Dict[str, Any]] = None
+
+    # ---- 统计（持锁调用）----
+
+    def _record(self, label: str, field: str, waiters: int = 0):
+        stats = self._stats.setdefault(label, {"calls": 0, "executed": 0, "coalesced": 0,
+                                               "errors": 0, "max_waiters": 0})
+        stats[field] += 1
+        if field != "errors":
+            stats["calls"] += 1
+        stats["max_waiters"] = max(stats["max_waiters"], waiters)
+        if self._metrics is not None and field in ("executed", "coalesced"):
+            self._metrics["calls"].inc(1, label=label, outcome=field)
+
+    # ---- 同步 ----
+
+    def do(self, key: str, fn: Callable[[], Any], label: str = "") -> Any:
+        """
+        执行 fn；若相同请求已在途则等待其结果
+
+        Args:
+            key (str): 合并键（见 request_key）
+            fn: 发起请求的无参可调用对象
+            label (str): 统计分组，如模型名
+
+        Returns:
+            Any: fn 的结果（可变结果给跟随方副本）；fn 抛出的异常会在所有等待方重新抛出
+        """
+        if not self.enabled:
+            with self._lock:
+                self._record(label, "executed", 1)
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._record(label, "coalesced", call.waiters)
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._record(label, "executed", 1)
+                leader = True
+
+        if not leader:
+            logger.debug(f"合并重复请求 {key[:12]} ({label})，当前 {call.waiters} 个调用方等待")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._record(label, "errors")
+            raise
+        finally:
+            # 先移除再唤醒等待方，之后到达的请求会重新发起调用
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    # ---- 异步 ----
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        """
+        等待 fn()；若同一事件循环上相同请求已在途则挂到该调用上。
+        共享调用作为独立任务运行，某个调用方被取消不会影响其他调用方
+
+        Args:
+            key (str): 合并键（见 request_key）
+            fn: 发起请求的无参协程函数
+            label (str): 统计分组，如模型名
+
+        Returns:
+            Any: 调用结果（可变结果给跟随方副本）
+        """
+        if not self.enabled:
+            with self._lock:
+                self._record(label, "executed", 1)
+            return await fn()
+
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            call = self._async_calls.get(loop_key)
+            if call is not None and call.task.get_loop() is loop:
+                call.waiters += 1
+                self._record(label, "coalesced", call.waiters)
+                leader = False
+            else:
+                call = self._async_calls[loop_key] = _AsyncCall(loop.create_task(fn()))
+                self._record(label, "executed", 1)
+                call.task.add_done_callback(lambda task: self._finish_async(loop_key, task, label))
+                leader = True
+
+        if not leader:
+            logger.debug(f"合并重复请求 {key[:12]} ({label})，当前 {call.waiters} 个调用方等待")
+        result = await asyncio.shield(call.task)
+        return result if leader else _share(result)
+
+    def _finish_async(self, loop_key: tuple, task: "asyncio.Task", label: str):
+        with self._lock:
+            if self._async_calls.get(loop_key) is not None and self._async_calls[loop_key].task is task:
+                del self._async_calls[loop_key]
+            if task.cancelled() or task.exception() is not None:
+                self._record(label, "errors")
+
+    # ---- 指标 / 状态 ----
+
+    def bind_metrics(self, registry: Any):
+        """
+        通过提供 gauge()/counter() 的指标注册表（如 metrics_exporter.MetricsRegistry）发布合并计数
+        """
+        with self._lock:
+            self._metrics = {
+                "calls": registry.counter("agentpsy_single_flight_calls_total",
+                                          "模型请求数，按结果区分（实际调用 executed / 合并 coalesced）",
+                                          ("label", "outcome")),
+            }
+        registry.gauge("agentpsy_single_flight_waiters", "挂在在途请求上的调用方数").set_function(
+            lambda: sum(self.waiters().values()))
+
+    def waiters(self, key: Optional[str] = None) -> Any:
+        """某个在途键的调用方数；不指定键时返回所有在途键的 {键: 调用方数}"""
+        with self._lock:
+            counts: Dict[str, int] = {k: c.waiters for k, c in self._calls.items()}
+            for (_, k), c in self._async_calls.items():
+                counts[k] = counts.get(k, 0) + c.waiters
+        return counts.get(key, 0) if key is not None else counts
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """按标签统计的调用数、实际执行数、合并数、失败数与最大等待数"""
+        with self._lock:
+            return {label: dict(stats) for label, stats in self._stats.items()}
+
+
+_group: Optional[SingleFlight] = None
+_group_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """进程内共享的合并组（LLM_SINGLE_FLIGHT 为 0/false 时不合并）"""
+    global _group
+    with _group_lock:
+        if _group is None:
+            _group = SingleFlight(enabled=os.getenv("LLM_SINGLE_FLIGHT", "1").lower() not in ("0", "false", "no"))
+        return _group
@@ -1,5 +1,13 @@
 import statistics
 
+import numpy as np
+
+try:
+    from ..scoring_core import reverse_key, group_means
+except ImportError:
+    # src imported as a top-level package from the pipeline directory
+    from scoring_core import reverse_key, group_means
+
 
 def detect_discrepancy(scores, threshold=2.0):
     """
@@ -65,36 +73,22 @@ def calculate_big_five(scores, trait_mapping, reverse_scoring_map=None, scale_ra
     if reverse_scoring_map is None:
         reverse_scoring_map = {}
     
-    min_scale, max_scale = scale_range
-    
-    # Group scores by trait, applying reverse scoring where needed
-    trait_scores = {}
-    for idx, original_score in enumerate(scores):
-        trait = trait_mapping.get(idx)
-        if trait is None:
-            continue  # Skip questions that don't map to a trait
-            
-        # Apply reverse scoring if needed
-        if idx in reverse_scoring_map:
-            # Reverse the score: if scale is 1-5, 1 becomes 5, 2 becomes 4, etc.
-            # Formula: (max + min) - original_score
-            score = (max_scale + min_scale) - original_score
-        else:
-            score = original_score
-            
-        if trait not in trait_scores:
-            trait_scores[trait] = []
-        trait_scores[trait].append(score)
-    
-    # Calculate average for each trait
-    trait_averages = {}
-    for trait, scores_list in trait_scores.items():
-        if scores_list:  # Only calculate if there are scores for this trait
-            trait_averages[trait] = sum(scores_list) / len(scores_list)
-        else:
-            trait_averages[trait] = 0.0  # Or could be NaN, depending on requirements
-    
-    return trait_averages
+    # Traits in first-seen order, so the result keeps the legacy key order
+    indices = [idx for idx in range(len(scores)) if trait_mapping.get(idx) is not None]
+    traits = list(dict.fromkeys(trait_mapping[idx] for idx in indices))
+    if not traits:
+        return {}
+    
+    trait_index = {trait: pos for pos, trait in enumerate(traits)}
+    values = np.asarray([scores[idx] for idx in indices], dtype=float)
+    group_idx = np.asarray([trait_index[trait_mapping[idx]] for idx in indices])
+    reverse_mask = np.asarray([idx in reverse_scoring_map for idx in indices], dtype=bool)
+    
+    # Apply reverse scoring: (max + min) - original, then average per trait
+    values = reverse_key(values, reverse_mask, scale_range=scale_range)
+    means, _ = group_means(values, group_idx, len(traits))
+    
+    return {trait: float(means[pos]) for trait, pos in trait_index.items()}
 
 
 def generate_report(metadata, analysis_results):
@@ -19,9 +19,14 @@ import os
 import sys
 
 # 导入其他模块
-from context_generator import ContextGenerator
-from reverse_scoring_processor import ReverseScoringProcessor
-from input_parser import InputParser
+try:
+    from .context_generator import ContextGenerator
+    from .reverse_scoring_processor import ReverseScoringProcessor
+    from .input_parser import InputParser
+except ImportError:
+    from context_generator import ContextGenerator
+    from reverse_scoring_processor import ReverseScoringProcessor
+    from input_parser import InputParser
 
 
 class StandaloneBatchProcessor:
@@ -0,0 +1,188 @@
+"""
+Tests for the AIMD adaptive concurrency controller
+"""
+import asyncio
+import random
+import threading
+import time
+import unittest
+
+import adaptive_concurrency
+from adaptive_concurrency import (
+    AdaptiveConcurrencyController, OUTCOME_ERROR, OUTCOME_OVERLOAD, OUTCOME_SUCCESS,
+    classify_exception, concurrency_slot, configure_concurrency
+)
+
+
+class _Gauge:
+    def __init__(self):
+        self.values = {}
+
+    def set(self, value, **labels):
+        self.values[tuple(sorted(labels.items()))] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class _Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def gauge(self, name, documentation, labels=()):
+        return self.metrics.setdefault(name, _Gauge())
+
+    counter = gauge
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+
+    def tearDown(self):
+        adaptive_concurrency._controller = None
+
+    def test_additive_increase_only_when_saturated(self):
+        controller = AdaptiveConcurrencyController(initial_limit=2, max_limit=4, cooldown=0)
+        for _ in range(10):
+            controller.release('k', 0.1, OUTCOME_SUCCESS, saturated=False)
+        self.assertEqual(controller.limit('k'), 2)
+        # +1/limit per saturated success: 2 -> 2.5 -> 2.9 -> 3.24
+        for _ in range(3):
+            controller.release('k', 0.1, OUTCOME_SUCCESS, saturated=True)
+        self.assertEqual(controller.limit('k'), 3)
+        for _ in range(20):
+            controller.release('k', 0.1, OUTCOME_SUCCESS, saturated=True)
+        self.assertEqual(controller.limit('k'), 4)
+
+    def test_overload_halves_once_per_episode(self):
+        controller = AdaptiveConcurrencyController(initial_limit=8, max_limit=8, cooldown=60)
+        controller.release('k', 0.1, OUTCOME_OVERLOAD)
+        controller.release('k', 0.1, OUTCOME_OVERLOAD)
+        self.assertEqual(controller.limit('k'), 4)
+        controller.release('k', 0.1, OUTCOME_ERROR)
+        self.assertEqual(controller.limit('k'), 4)
+        self.assertEqual(controller.limit('other'), 8)
+
+    def test_latency_inflation_decreases(self):
+        controller = AdaptiveConcurrencyController(initial_limit=10, max_limit=10, cooldown=0, min_samples=3)
+        for _ in range(3):
+            controller.release('k', 1.0, OUTCOME_SUCCESS, saturated=False)
+        self.assertEqual(controller.limit('k'), 10)
+        for _ in range(10):
+            controller.release('k', 5.0, OUTCOME_SUCCESS, saturated=True)
+        self.assertLess(controller.limit('k'), 10)
+        self.assertGreaterEqual(controller.limit('k'), 1)
+
+    def test_variable_uncontended_latency_keeps_growing(self):
+        # LLM延迟随输出长度变化数倍，但与并发无关：上限应持续增长
+        rng = random.Random(7)
+        controller = AdaptiveConcurrencyController(cooldown=0)
+        for _ in range(800):
+            controller.release('k', rng.uniform(0.1, 1.0), OUTCOME_SUCCESS, saturated=True)
+        self.assertEqual(controller.limit('k'), 32)
+        self.assertEqual(controller.snapshot()['k']['decreases'], 0)
+
+    def test_variable_latency_with_threads(self):
+        controller = AdaptiveConcurrencyController()
+        deadline = time.monotonic() + 1.0
+
+        def call():
+            rng = random.Random()
+            while time.monotonic() < deadline:
+                with controller.slot('k'):
+                    time.sleep(rng.uniform(0.005, 0.05))
+
+        threads = [threading.Thread(target=call) for _ in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreater(controller.limit('k'), 10)
+        self.assertEqual(controller.snapshot()['k']['decreases'], 0)
+
+    def test_latency_rising_with_concurrency_finds_knee(self):
+        # 在途数超过6后延迟按平方增长：上限应停在拐点附近
+        rng = random.Random(7)
+        controller = AdaptiveConcurrencyController(cooldown=0)
+        for _ in range(3000):
+            load = max(1.0, controller.limit('k') / 6) ** 2
+            controller.release('k', 0.1 * load * rng.uniform(0.5, 1.5), OUTCOME_SUCCESS, saturated=True)
+        self.assertGreater(controller.snapshot()['k']['decreases'], 0)
+        self.assertLessEqual(controller.limit('k'), 10)
+        self.assertGreaterEqual(controller.limit('k'), 4)
+
+    def test_acquire_blocks_at_limit(self):
+        controller = AdaptiveConcurrencyController(initial_limit=2, max_limit=2)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def call():
+            with controller.slot('k'):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.02)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(controller.snapshot()['k']['inflight'], 0)
+
+    def test_async_slots(self):
+        controller = AdaptiveConcurrencyController(initial_limit=1, max_limit=1)
+        order = []
+
+        async def call(n):
+            async with controller.slot('k'):
+                order.append(('start', n))
+                await asyncio.sleep(0.01)
+                order.append(('end', n))
+
+        async def main():
+            await asyncio.gather(*(call(n) for n in range(3)))
+
+        asyncio.run(main())
+        for i in range(0, 6, 2):
+            self.assertEqual(order[i][0], 'start')
+            self.assertEqual(order[i + 1], ('end', order[i][1]))
+
+    def test_slot_classifies_exceptions(self):
+        self.assertEqual(classify_exception(TimeoutError()), OUTCOME_OVERLOAD)
+        self.assertEqual(classify_exception(_StatusError(429)), OUTCOME_OVERLOAD)
+        self.assertEqual(classify_exception(_StatusError(400)), OUTCOME_ERROR)
+
+        controller = AdaptiveConcurrencyController(initial_limit=4, max_limit=4, cooldown=0)
+        with self.assertRaises(_StatusError):
+            with controller.slot('k'):
+                raise _StatusError(503)
+        self.assertEqual(controller.limit('k'), 2)
+        with controller.slot('k') as slot:
+            slot.overload()
+        self.assertEqual(controller.limit('k'), 1)
+
+    def test_shared_controller_and_metrics(self):
+        with concurrency_slot('k') as slot:
+            slot.overload()
+        self.assertIsNone(adaptive_concurrency.get_concurrency_controller())
+
+        controller = configure_concurrency(8)
+        registry = _Registry()
+        controller.bind_metrics(registry)
+        with concurrency_slot('k'):
+            self.assertEqual(registry.metrics['agentpsy_concurrency_inflight'].values[(('key', 'k'),)], 1)
+        self.assertEqual(registry.metrics['agentpsy_concurrency_limit'].values[(('key', 'k'),)], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests for background checkpoint writing with delta journals
+"""
+import tempfile
+import threading
+import unittest
+
+from checkpoint import FileCheckpointStorage, ProgressTracker
+from checkpoint.models import apply_delta, compute_delta
+
+
+class TestCheckpointDelta(unittest.TestCase):
+
+    def _checkpoint(self, question, processed=(), progress=None):
+        return {
+            'checkpoint_id': 'session',
+            'timestamp': f't{question}',
+            'metadata': {'checkpoint_sequence': question},
+            'processing_state': {
+                'current_file_path': 'a.json',
+                'current_question_index': question,
+                'processed_files': list(processed),
+                'file_progress': progress or {},
+                'statistics': {}
+            }
+        }
+
+    def test_round_trip(self):
+        previous = self._checkpoint(5, progress={'a.json': {'processed_questions': 5}})
+        current = self._checkpoint(10, processed=['b.json'],
+                                   progress={'a.json': {'processed_questions': 10}})
+        delta = compute_delta(previous, current, 2)
+        self.assertEqual(delta['processed_files_append'], ['b.json'])
+        self.assertNotIn('processed_files', delta['state'])
+        self.assertEqual(apply_delta(previous, delta), current)
+
+    def test_requires_full_snapshot_when_not_append_only(self):
+        previous = self._checkpoint(5, processed=['a.json'])
+        current = self._checkpoint(6, processed=['b.json'])
+        self.assertIsNone(compute_delta(previous, current, 2))
+
+        other_session = dict(self._checkpoint(6, processed=['a.json']), checkpoint_id='other')
+        self.assertIsNone(compute_delta(previous, other_session, 2))
+
+
+class TestBackgroundCheckpointWriting(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = FileCheckpointStorage(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _tracker(self, **kwargs):
+        tracker = ProgressTracker(self.storage, checkpoint_interval=1, **kwargs)
+        self.addCleanup(tracker.close)
+        return tracker
+
+    def test_deltas_replay_to_latest_state(self):
+        tracker = self._tracker(full_snapshot_every=100)
+        tracker.start_new_session(['a.json', 'b.json'])
+        for question in range(1, 11):
+            tracker.update_file_progress('a.json', question, total_questions=10)
+        tracker.mark_file_completed('a.json', {'questions': 10})
+        tracker.update_file_progress('b.json', 3, total_questions=10)
+        self.assertTrue(tracker.flush())
+        self.assertTrue(self.storage.journal_file.exists())
+
+        resumed = self._tracker()
+        self.assertTrue(resumed.resume_from_checkpoint())
+        self.assertEqual(resumed.get_resume_point(), ('b.json', 3, 1))
+        self.assertEqual(resumed.current_state.statistics, {'questions': 10})
+        self.assertEqual(resumed.current_state.file_progress['a.json']['processed_questions'], 10)
+
+    def test_session_completion_compacts_journal(self):
+        tracker = self._tracker()
+        tracker.start_new_session(['a.json'])
+        tracker.update_file_progress('a.json', 1, total_questions=2)
+        tracker.mark_file_completed('a.json')
+        tracker.mark_session_completed()
+
+        self.assertFalse(self.storage.journal_file.exists())
+        checkpoint = self.storage.load()
+        self.assertEqual(checkpoint.processing_state.processed_files, ['a.json'])
+        self.assertTrue(checkpoint.metadata['session_completed'])
+
+    def test_concurrent_updates_are_coalesced(self):
+        tracker = self._tracker()
+        tracker.start_new_session([f'{index}.json' for index in range(4)])
+
+        def work(index):
+            path = f'{index}.json'
+            for question in range(1, 51):
+                tracker.update_file_progress(path, question, total_questions=50)
+            tracker.mark_file_completed(path, {'questions': 50})
+
+        threads = [threading.Thread(target=work, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        tracker.flush()
+
+        self.assertLess(tracker.checkpoint_manager.save_count, 4 * 51)
+        checkpoint = self.storage.load()
+        self.assertEqual(sorted(checkpoint.processing_state.processed_files),
+                         [f'{index}.json' for index in range(4)])
+        self.assertEqual(checkpoint.processing_state.statistics, {'questions': 200})
+
+    def test_synchronous_mode_writes_full_snapshots(self):
+        tracker = self._tracker(async_save=False)
+        tracker.start_new_session(['a.json'])
+        tracker.update_file_progress('a.json', 2, total_questions=5)
+
+        self.assertFalse(self.storage.journal_file.exists())
+        self.assertEqual(self.storage.load().processing_state.current_question_index, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
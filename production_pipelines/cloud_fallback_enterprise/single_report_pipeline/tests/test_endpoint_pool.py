@@ -0,0 +1,129 @@
+"""
+Tests for the multi-host Ollama endpoint pool
+"""
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from endpoint_pool import EndpointPool, NoHealthyEndpointError, STRATEGY_LATENCY
+
+A, B, C = 'http://a:11434', 'http://b:11434', 'http://c:11434/v1'
+
+
+def _response(status=200, payload=None):
+    response = MagicMock()
+    response.status_code = status
+    response.ok = status < 400
+    response.json.return_value = payload or {}
+    response.raise_for_status.side_effect = None if status < 400 else requests.HTTPError(str(status))
+    return response
+
+
+class TestEndpointPool(unittest.TestCase):
+
+    def test_least_outstanding_routing(self):
+        pool = EndpointPool([A, B])
+        first = pool.acquire('qwen3:8b')
+        second = pool.acquire('qwen3:8b')
+        self.assertNotEqual(first.url, second.url)
+        first.success()
+        self.assertEqual(pool.acquire('qwen3:8b').url, first.url)
+
+    def test_latency_strategy_prefers_fast_host(self):
+        pool = EndpointPool([A, B], strategy=STRATEGY_LATENCY)
+        by_url = {e.url: e for e in pool.endpoints}
+        by_url[A].latency_ewma, by_url[B].latency_ewma = 5.0, 1.0
+        self.assertEqual(pool.acquire().url, B)
+        # Two in-flight requests on B (score 3.0) still beat an idle A (score 5.0)
+        pool.acquire()
+        self.assertEqual(pool.acquire().url, B)
+
+    def test_model_affinity_within_slack(self):
+        pool = EndpointPool([A, B], affinity_slack=1)
+        by_url = {e.url: e for e in pool.endpoints}
+        by_url[B].warm_models.add('qwen3:8b')
+        by_url[B].inflight = 1
+        self.assertEqual(pool.acquire('qwen3').url, A)
+        self.assertEqual(pool.acquire('qwen3:8b').url, B)
+        by_url[B].inflight = 5
+        self.assertEqual(pool.acquire('qwen3:8b').url, A)
+
+    def test_model_restriction(self):
+        pool = EndpointPool([{'url': A, 'models': ['llama3']}, B])
+        for _ in range(3):
+            lease = pool.acquire('llama3:latest')
+            lease.success()
+        self.assertEqual(pool.acquire('qwen3:8b').url, B)
+        only_a = EndpointPool([{'url': A, 'models': ['llama3']}])
+        with self.assertRaises(NoHealthyEndpointError):
+            only_a.acquire('qwen3:8b')
+
+    def test_ejection_and_readmission(self):
+        pool = EndpointPool([A, B], failure_threshold=2, eject_seconds=60)
+        a = next(e for e in pool.endpoints if e.url == A)
+        for _ in range(2):
+            pool.acquire(exclude={B}).failure('boom')
+        self.assertFalse(a.is_available(time.time()))
+        self.assertTrue(all(pool.acquire().url == B for _ in range(3)))
+
+        with patch('endpoint_pool.requests.get', return_value=_response(payload={'models': [{'name': 'qwen3:8b'}]})):
+            self.assertEqual(pool.check_health(), {A: True, B: True})
+        self.assertEqual(a.ejected_until, 0.0)
+        self.assertEqual(pool.available_models(), ['qwen3:8b'])
+
+    def test_health_check_failure_ejects(self):
+        pool = EndpointPool([A], failure_threshold=1)
+        with patch('endpoint_pool.requests.get', side_effect=requests.ConnectionError('down')):
+            self.assertEqual(pool.check_health(), {A: False})
+        self.assertGreater(pool.endpoints[0].ejected_until, 0)
+        # All hosts ejected: the pool still probes the one closest to re-admission
+        self.assertEqual(pool.acquire().url, A)
+
+    def test_request_fails_over(self):
+        pool = EndpointPool([A, C])
+        session = MagicMock()
+        calls = []
+
+        def send(method, url, **kwargs):
+            calls.append(url)
+            if url.startswith(A):
+                raise requests.ConnectionError('refused')
+            return _response(200)
+
+        session.request.side_effect = send
+        # C is busier, so A is tried first and the request fails over to C
+        by_url = {e.url: e for e in pool.endpoints}
+        by_url['http://c:11434/v1'].inflight = 1
+        self.assertEqual(pool.request('POST', '/api/chat', model='qwen3:8b', session=session).status_code, 200)
+        self.assertEqual(calls, ['http://a:11434/api/chat', 'http://c:11434/api/chat'])
+        self.assertEqual(by_url[A].failures, 1)
+        # A's recent failure now ranks it behind the idle C
+        by_url['http://c:11434/v1'].inflight = 0
+        pool.request('POST', '/api/chat', model='qwen3:8b', session=session)
+        self.assertEqual(calls[-1], 'http://c:11434/api/chat')
+
+    def test_request_returns_last_5xx(self):
+        pool = EndpointPool([A, B])
+        session = MagicMock()
+        session.request.return_value = _response(503)
+        self.assertEqual(pool.request('POST', '/api/chat', session=session).status_code, 503)
+        self.assertEqual(session.request.call_count, 2)
+
+    def test_call_async(self):
+        pool = EndpointPool([A, B])
+
+        async def fn(endpoint):
+            if endpoint.url == A:
+                raise OSError('reset')
+            return endpoint.url
+
+        for _ in range(3):
+            self.assertEqual(asyncio.run(pool.call_async(fn)), B)
+        self.assertTrue(all(e.inflight == 0 for e in pool.endpoints))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for the thread-safe API key manager (KeyRing leases and debounced saves)
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))), 'local_batch_production'))
+
+# 导入时会创建全局管理器并可能写出 api_keys_config.json，在临时目录中导入
+_cwd, _import_dir = os.getcwd(), tempfile.mkdtemp()
+os.chdir(_import_dir)
+try:
+    from intelligent_api_manager import APIKey, APIStatus, IntelligentAPIManager, KeyRing
+finally:
+    os.chdir(_cwd)
+    shutil.rmtree(_import_dir, ignore_errors=True)
+
+
+def _keys(count):
+    return [APIKey(id=f"k{i}", key=f"secret{i}", provider='p', status=APIStatus.ACTIVE,
+                   created_at=datetime.now()) for i in range(count)]
+
+
+class TestKeyRing(unittest.TestCase):
+
+    def test_concurrent_leases_spread_over_keys(self):
+        ring = KeyRing('p', _keys(3))
+        barrier = threading.Barrier(30)
+        peaks = []
+        lock = threading.Lock()
+
+        def request():
+            api_key = ring.acquire(track_in_flight=True)
+            barrier.wait(5)
+            with lock:
+                peaks.append({key.id: key.in_flight for key in ring.keys})
+            barrier.wait(5)
+            ring.release(api_key.id)
+
+        threads = [threading.Thread(target=request) for _ in range(30)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 选取以并发数优先，30个同时在途的请求均分到3个密钥
+        self.assertEqual(peaks[0], {'k0': 10, 'k1': 10, 'k2': 10})
+        self.assertEqual([key.in_flight for key in ring.keys], [0, 0, 0])
+        self.assertEqual(sum(key.usage_count for key in ring.keys), 30)
+
+    def test_acquire_skips_excluded_keys(self):
+        ring = KeyRing('p', _keys(3))
+        self.assertEqual(ring.acquire(exclude={'k0'}).id, 'k1')
+        self.assertEqual(ring.acquire(exclude={'k1', 'k2'}).id, 'k0')
+        self.assertIsNone(ring.acquire(exclude={'k0', 'k1', 'k2'}))
+        # 被排除的密钥仍可在之后被选取
+        self.assertEqual(ring.acquire().id, 'k2')
+
+        ring.keys[0].status = APIStatus.DEGRADED
+        ring.keys[1].status = APIStatus.FAILED
+        ring.keys[2].status = APIStatus.FAILED
+        ring.rebuild()
+        self.assertIsNone(ring.acquire(exclude={'k0'}))
+        self.assertEqual(ring.acquire().id, 'k0')
+
+
+class TestIntelligentAPIManager(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.temp_dir, 'api_keys_config.json')
+        patcher = patch.object(IntelligentAPIManager, '_load_from_environment', return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_manager(self, save_interval):
+        manager = IntelligentAPIManager(config_file=self.config_file, save_interval=save_interval)
+        for i in range(3):
+            manager.add_api_key('p', f"secret{i}")
+        self.addCleanup(manager.flush)
+        return manager
+
+    def test_lease_key_tracks_in_flight_and_releases_on_error(self):
+        manager = self.make_manager(save_interval=60)
+        with manager.lease_key('p') as first, manager.lease_key('p') as second:
+            self.assertNotEqual(first.id, second.id)
+            self.assertEqual(manager.get_status_report()['providers']['p']['in_flight'], 2)
+        with self.assertRaises(RuntimeError):
+            with manager.lease_key('p'):
+                raise RuntimeError('boom')
+        self.assertEqual(manager.get_status_report()['providers']['p']['in_flight'], 0)
+
+    def test_usage_saves_are_debounced(self):
+        manager = self.make_manager(save_interval=0.2)
+        saves = []
+        save = manager.save_configuration
+
+        def counting_save():
+            saves.append(time.time())
+            save()
+        manager.save_configuration = counting_save
+
+        threads = [threading.Thread(target=lambda: [manager.get_available_key('p') for _ in range(10)])
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(saves, [])
+
+        deadline = time.time() + 2
+        while not saves and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.3)
+        self.assertEqual(len(saves), 1)
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            stored = json.load(f)['providers']['p']
+        self.assertEqual(sum(key['usage_count'] for key in stored), 50)
+
+        manager.get_available_key('p')
+        manager.flush()
+        self.assertEqual(len(saves), 2)
+        manager.flush()
+        self.assertEqual(len(saves), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Tests for the local Ollama model residency manager
+"""
+import unittest
+from unittest.mock import MagicMock
+
+from model_residency import ModelResidencyManager, group_by_model
+
+GB = 1024 ** 3
+
+
+def _manager(budget_gb):
+    manager = ModelResidencyManager(budget_gb=budget_gb)
+    manager.client = MagicMock()
+    manager.client.list.return_value = {'models': [
+        {'model': 'qwen3:8b', 'size': 5 * GB},
+        {'model': 'llama3:latest', 'size': 5 * GB},
+        {'model': 'phi3:mini', 'size': 2 * GB},
+    ]}
+    manager.client.ps.return_value = {'models': []}
+    return manager
+
+
+class TestModelResidency(unittest.TestCase):
+
+    def test_group_by_model_is_stable(self):
+        tasks = [('a', 1), ('b', 2), ('a', 3), ('c', 4), ('b', 5)]
+        self.assertEqual(group_by_model(tasks, key=lambda t: t[0]),
+                         [('a', 1), ('a', 3), ('b', 2), ('b', 5), ('c', 4)])
+
+    def test_ensure_loaded_hits_resident_model(self):
+        manager = _manager(budget_gb=16)
+        self.assertTrue(manager.ensure_loaded('qwen3:8b'))
+        self.assertTrue(manager.ensure_loaded('qwen3:8b'))
+        self.assertEqual(manager.stats['loads'], 1)
+        self.assertEqual(manager.stats['hits'], 1)
+        manager.client.generate.assert_called_once_with(model='qwen3:8b', keep_alive='30m')
+
+    def test_budget_evicts_least_recently_used(self):
+        manager = _manager(budget_gb=10)
+        manager.ensure_loaded('qwen3:8b')
+        manager.ensure_loaded('llama3:latest')
+        manager.ensure_loaded('qwen3:8b')  # llama3 becomes least recently used
+        manager.ensure_loaded('phi3:mini')
+        self.assertEqual(manager.stats['evictions'], 1)
+        manager.client.generate.assert_any_call(model='llama3:latest', keep_alive=0)
+        self.assertEqual(list(manager._resident), ['qwen3:8b', 'phi3:mini'])
+
+    def test_cloud_models_are_skipped(self):
+        manager = _manager(budget_gb=10)
+        self.assertEqual(manager.preload(['deepseek-v3.1:671b-cloud', 'phi3:mini']), ['phi3:mini'])
+        manager.client.generate.assert_called_once_with(model='phi3:mini', keep_alive='30m')
+
+
+if __name__ == '__main__':
+    unittest.main()
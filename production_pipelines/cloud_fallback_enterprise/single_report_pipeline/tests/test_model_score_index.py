@@ -0,0 +1,56 @@
+"""
+Tests for the per-question model score index
+"""
+import unittest
+
+from model_score_index import ModelScoreIndex
+from scoring_core import BIG5_TRAITS
+
+
+def _scores(value, **overrides):
+    scores = {trait: value for trait in BIG5_TRAITS}
+    scores.update(overrides)
+    return scores
+
+
+class TestModelScoreIndex(unittest.TestCase):
+
+    def test_lookup_by_question(self):
+        index = ModelScoreIndex()
+        index.add('Q1', 'model_a', _scores(3))
+        index.add('Q2', 'model_a', _scores(1))
+        index.add('Q1', 'model_b', _scores(5))
+        self.assertEqual(len(index), 2)
+        self.assertEqual([row['extraversion'] for row in index.get('Q1')], [3, 5])
+        self.assertEqual(index.models('Q1'), ['model_a', 'model_b'])
+        self.assertEqual(index.get('missing'), [])
+
+    def test_question_ids_are_normalized_to_str(self):
+        index = ModelScoreIndex()
+        index.add(7, 'model_a', _scores(3))
+        self.assertIn('7', index)
+        self.assertEqual(len(index.get(7)), 1)
+
+    def test_discard_drops_one_question(self):
+        index = ModelScoreIndex()
+        index.add('Q1', 'model_a', _scores(3))
+        index.add('Q2', 'model_a', _scores(1))
+        index.discard('Q1')
+        index.add('Q1', 'model_b', _scores(5))
+        self.assertEqual(index.models('Q1'), ['model_b'])
+        self.assertEqual(index.models('Q2'), ['model_a'])
+        index.discard('missing')
+
+    def test_compact_export_uses_trait_order(self):
+        index = ModelScoreIndex()
+        index.add('Q1', 'model_a', _scores(3, neuroticism=5))
+        exported = index.export()
+        self.assertEqual(exported['traits'], list(BIG5_TRAITS))
+        self.assertEqual(exported['questions']['Q1'], {
+            'models': ['model_a'],
+            'scores': [[3, 3, 3, 3, 5]]
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
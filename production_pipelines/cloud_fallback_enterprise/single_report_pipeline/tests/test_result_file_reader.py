@@ -0,0 +1,109 @@
+"""
+Tests for the memory-mapped result file reader
+"""
+import copy
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from result_file_reader import (
+    INDEX_CACHE_ENV, INDEX_SUFFIX, LazyItemField, ResultFileReader, iter_result_items, read_metadata
+)
+from single_report_pipeline.input_parser import InputParser
+
+
+def _result_document():
+    return {
+        'assessment_metadata': {'model_id': 'qwen3:4b', 'role_name': 'a1'},
+        'assessment_results': [
+            {
+                'question_id': i,
+                'question_data': {'dimension': 'Extraversion', 'scenario': '团队活动'},
+                'conversation_log': [{'role': 'assistant', 'content': '回答 "引号" \\ 反斜杠'}],
+                'extracted_response': f'回答{i}'
+            }
+            for i in range(3)
+        ]
+    }
+
+
+class TestResultFileReader(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'asses_test.json')
+        self.document = _result_document()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.document, f, ensure_ascii=False, indent=2)
+        self.cache_dir = os.path.join(self.temp_dir, 'index_cache')
+        self.env = mock.patch.dict(os.environ, {INDEX_CACHE_ENV: self.cache_dir})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_reads_match_json_load(self):
+        with ResultFileReader(self.path) as reader:
+            self.assertEqual(reader.keys(), ['assessment_metadata', 'assessment_results'])
+            self.assertEqual(reader.metadata, self.document['assessment_metadata'])
+            self.assertEqual(len(reader), 3)
+            self.assertEqual(reader.item(1), self.document['assessment_results'][1])
+            self.assertEqual(reader.item_field(2, 'extracted_response'), '回答2')
+            self.assertEqual(list(reader.iter_items()), self.document['assessment_results'])
+            self.assertEqual(reader.load(), self.document)
+
+    def test_iter_items_decodes_only_requested_fields(self):
+        items = list(iter_result_items(self.path, fields=['question_id', 'extracted_response', 'missing']))
+        self.assertEqual(items, [{'question_id': i, 'extracted_response': f'回答{i}'} for i in range(3)])
+
+    def test_index_is_cached_and_invalidated_on_change(self):
+        self.assertEqual(read_metadata(self.path)['model_id'], 'qwen3:4b')
+        # 索引写入缓存目录，结果目录中不产生旁路文件
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['asses_test.json', 'index_cache'])
+        self.assertEqual(len([name for name in os.listdir(self.cache_dir) if name.endswith(INDEX_SUFFIX)]), 1)
+
+        self.document['assessment_metadata']['model_id'] = 'gemma3:latest'
+        self.document['assessment_results'].pop()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.document, f, ensure_ascii=False)
+        with ResultFileReader(self.path) as reader:
+            self.assertEqual(reader.metadata['model_id'], 'gemma3:latest')
+            self.assertEqual(len(reader), 2)
+
+    def test_lazy_field_decodes_on_first_use(self):
+        log = LazyItemField(self.path, 1, 'conversation_log')
+        self.assertFalse(log.loaded)
+        self.assertEqual(log, self.document['assessment_results'][1]['conversation_log'])
+        self.assertTrue(log.loaded)
+
+        expected = self.document['assessment_results'][0]['conversation_log']
+        self.assertEqual(json.loads(json.dumps(LazyItemField(self.path, 0, 'conversation_log'))), expected)
+        self.assertEqual(pickle.loads(pickle.dumps(LazyItemField(self.path, 0, 'conversation_log'))), expected)
+        self.assertIs(type(copy.deepcopy(LazyItemField(self.path, 0, 'conversation_log'))), list)
+        # 普通列表在左侧的拼接同样先解码
+        self.assertEqual([0] + LazyItemField(self.path, 0, 'conversation_log'), [0] + expected)
+        self.assertEqual(LazyItemField(self.path, 0, 'conversation_log') + [0], expected + [0])
+
+    def test_input_parser_defers_conversation_log(self):
+        questions = InputParser().parse_assessment_json(self.path)
+        self.assertEqual([q['extracted_response'] for q in questions], [f'回答{i}' for i in range(3)])
+        self.assertFalse(questions[2]['conversation_log'].loaded)
+        self.assertEqual(questions[2]['conversation_log'], self.document['assessment_results'][2]['conversation_log'])
+
+    def test_invalid_json_raises(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"assessment_metadata": {}, ')
+        with self.assertRaises(json.JSONDecodeError):
+            ResultFileReader(self.path, cache_index=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
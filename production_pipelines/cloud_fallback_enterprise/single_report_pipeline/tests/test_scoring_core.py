@@ -0,0 +1,98 @@
+"""
+Tests for the vectorized (questions x models x traits) scoring core
+"""
+import unittest
+
+import numpy as np
+
+from scoring_core import (
+    BIG5_TRAITS, scores_to_array, build_score_tensor, reverse_key, snap_to_scale,
+    weighted_trait_means, trait_means, model_statistics, dispute_mask,
+    dispute_severity, trait_reliability, mbti_types, score_reports_batch
+)
+
+
+def _question(dimension, scores):
+    return {
+        'final_adjusted_scores': scores,
+        'question_info': {'question_data': {'dimension': dimension}}
+    }
+
+
+class TestScoringCore(unittest.TestCase):
+
+    def test_scores_to_array_marks_missing_as_nan(self):
+        array = scores_to_array([{'extraversion': 5}, {'neuroticism': 'n/a'}])
+        self.assertEqual(array.shape, (2, 5))
+        self.assertEqual(array[0, BIG5_TRAITS.index('extraversion')], 5)
+        self.assertTrue(np.isnan(array[1]).all())
+
+    def test_build_score_tensor_pads_models(self):
+        tensor = build_score_tensor([[{'extraversion': 1}], [{'extraversion': 3}, {'extraversion': 5}]])
+        self.assertEqual(tensor.shape, (2, 2, 5))
+        self.assertTrue(np.isnan(tensor[0, 1]).all())
+
+    def test_reverse_key_and_snap(self):
+        scores = np.array([[1.0, 5.0], [3.0, 2.0]])
+        reversed_scores = reverse_key(scores, np.array([[True], [False]]))
+        np.testing.assert_array_equal(reversed_scores, [[5.0, 1.0], [3.0, 2.0]])
+        np.testing.assert_array_equal(snap_to_scale([2, 3, 4]), [1.0, 3.0, 5.0])
+
+    def test_weighted_trait_means_uses_primary_weight(self):
+        scores = scores_to_array([
+            {'extraversion': 5, 'agreeableness': 1},
+            {'extraversion': 1, 'agreeableness': 2}  # 2 is not a valid score
+        ])
+        means = weighted_trait_means(scores, np.array([2, -1]), decimals=None)
+        expected = (5 * 0.7 + 1 * 0.075) / (0.7 + 0.075)
+        self.assertAlmostEqual(means[BIG5_TRAITS.index('extraversion')], expected)
+        self.assertEqual(means[BIG5_TRAITS.index('agreeableness')], 1.0)
+        self.assertEqual(means[BIG5_TRAITS.index('neuroticism')], 3.0)
+
+    def test_trait_means_default_for_empty_trait(self):
+        means = trait_means(scores_to_array([{'extraversion': 5}, {'extraversion': 3}]))
+        self.assertEqual(means[BIG5_TRAITS.index('extraversion')], 4.0)
+        self.assertEqual(means[BIG5_TRAITS.index('openness_to_experience')], 0.0)
+
+    def test_model_statistics_and_disputes(self):
+        tensor = build_score_tensor([
+            [{'extraversion': 1}, {'extraversion': 5}, {'extraversion': 3}],
+            [{'extraversion': 3}, {'extraversion': 3}]
+        ])
+        stats = model_statistics(tensor)
+        e_idx = BIG5_TRAITS.index('extraversion')
+        self.assertEqual(stats['range'][0, e_idx], 4)
+        self.assertAlmostEqual(stats['std'][0, e_idx], 2.0)
+        self.assertEqual(stats['count'][1, e_idx], 2)
+        self.assertTrue(dispute_mask(tensor)[0, e_idx])
+        self.assertFalse(dispute_mask(tensor)[1, e_idx])
+        self.assertEqual(dispute_severity(tensor)[0, e_idx], 'high')
+        self.assertEqual(dispute_severity(tensor)[1, e_idx], 'low')
+
+    def test_trait_reliability_matches_scalar_formula(self):
+        tensor = np.array([[3.0], [3.0], [3.0], [3.0], [3.0]])
+        self.assertEqual(trait_reliability(tensor)[0], 1.0)
+        tensor = np.array([[1.0], [1.0], [3.0], [5.0], [5.0]])
+        self.assertEqual(trait_reliability(tensor)[0], 0.16)
+
+    def test_mbti_rules(self):
+        self.assertEqual(str(mbti_types([4, 4, 4, 4, 2])), 'ENFJ')
+        self.assertEqual(str(mbti_types([3, 3, 3, 3, 3], rule='threshold')), 'ISTP')
+        with self.assertRaises(ValueError):
+            mbti_types([3, 3, 3, 3, 3], rule='unknown')
+
+    def test_score_reports_batch(self):
+        reports = [
+            [_question('Extraversion', {trait: 5 for trait in BIG5_TRAITS})],
+            [_question('Openness to Experience', {trait: 1 for trait in BIG5_TRAITS}),
+             _question('Neuroticism', {trait: 1 for trait in BIG5_TRAITS})]
+        ]
+        result = score_reports_batch(reports)
+        self.assertEqual(result['big5'].shape, (2, 5))
+        np.testing.assert_array_equal(result['big5'][0], [5.0] * 5)
+        np.testing.assert_array_equal(result['big5'][1], [1.0] * 5)
+        self.assertEqual(list(result['mbti']), ['INFJ', 'ISTP'])
+
+
+if __name__ == '__main__':
+    unittest.main()
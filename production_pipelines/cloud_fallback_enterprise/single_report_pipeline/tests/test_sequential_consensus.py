@@ -0,0 +1,108 @@
+"""
+Tests for sequential early-stopping in AdaptiveConsensusAlgorithm
+"""
+import contextlib
+import io
+import itertools
+import os
+import sys
+import threading
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from adaptive_consensus_algorithm import AdaptiveConsensusAlgorithm
+
+
+def _score_source(scores):
+    """依次返回给定评分，并记录调用次数"""
+    remaining = list(scores)
+    calls = []
+
+    def get_scores(count):
+        calls.append(count)
+        batch, remaining[:] = remaining[:count], remaining[count:]
+        return batch
+
+    return get_scores, calls
+
+
+class TestSequentialConsensus(unittest.TestCase):
+
+    def setUp(self):
+        self.algorithm = AdaptiveConsensusAlgorithm()
+
+    def test_majority_rule_for_every_initial_triple(self):
+        # 有多数时取多数分数，3个评分各不相同时与完整流程一致
+        for triple in itertools.product([1, 3, 5], repeat=3):
+            get_initial, calls = _score_source(triple)
+            sequential = AdaptiveConsensusAlgorithm().sequential_consensus(get_initial, lambda n: [3] * n)
+            score, count = Counter(triple).most_common(1)[0]
+            if count >= 2:
+                self.assertEqual(sequential['consensus_score'], score, triple)
+                self.assertEqual(sequential['consensus_method'], 'majority_consensus', triple)
+            else:
+                full = AdaptiveConsensusAlgorithm().adaptive_consensus(list(triple), lambda n: [3] * n)
+                self.assertEqual(sequential['consensus_score'], full['consensus_score'], triple)
+            self.assertEqual(calls, [2] if triple[0] == triple[1] else [2, 1], triple)
+
+    def test_agreeing_pair_stops_early(self):
+        get_initial, calls = _score_source([5, 5, 1])
+        get_additional, extra_calls = _score_source([5, 5])
+        result = self.algorithm.sequential_consensus(get_initial, get_additional)
+        self.assertEqual(calls, [2])
+        self.assertEqual(extra_calls, [])
+        self.assertEqual(result['consensus_score'], 5)
+        self.assertEqual(result['final_scores'], [5, 5])
+        self.assertTrue(result['quality_metrics']['early_stopped'])
+        self.assertEqual(result['quality_metrics']['initial_calls_saved'], 1)
+
+    def test_third_score_decides_split_pair(self):
+        get_initial, calls = _score_source([1, 5, 5])
+        get_additional, extra_calls = _score_source([5, 5])
+        result = self.algorithm.sequential_consensus(get_initial, get_additional)
+        self.assertEqual(calls, [2, 1])
+        self.assertEqual(extra_calls, [])
+        self.assertEqual(result['consensus_score'], 5)
+        self.assertFalse(result['quality_metrics']['early_stopped'])
+
+    def test_no_majority_falls_back_to_full_process(self):
+        get_initial, calls = _score_source([1, 3, 5])
+        get_additional, extra_calls = _score_source([5, 5])
+        result = self.algorithm.sequential_consensus(get_initial, get_additional)
+        self.assertEqual(calls, [2, 1])
+        self.assertEqual(extra_calls, [2])
+        full = AdaptiveConsensusAlgorithm().adaptive_consensus([1, 3, 5], lambda n: [5] * n)
+        self.assertEqual(result['consensus_score'], full['consensus_score'])
+        self.assertFalse(result['quality_metrics']['early_stopped'])
+
+    def test_session_statistics(self):
+        for scores in ([3, 3, 3], [3, 5, 5], [1, 1, 3]):
+            get_initial, _ = _score_source(scores)
+            result = self.algorithm.sequential_consensus(get_initial, lambda n: [3] * n)
+        self.assertEqual(self.algorithm.sequential_stats['questions'], 3)
+        self.assertEqual(self.algorithm.sequential_stats['early_stops'], 2)
+        self.assertEqual(self.algorithm.sequential_stats['evaluator_calls'], 7)
+        self.assertEqual(result['quality_metrics']['session_calls_saved'], 2)
+        self.assertEqual(result['quality_metrics']['session_early_stop_rate'], 0.667)
+
+    def test_statistics_are_thread_safe(self):
+        def run():
+            for _ in range(50):
+                get_initial, _ = _score_source([3, 3, 3])
+                self.algorithm.sequential_consensus(get_initial, lambda n: [3] * n)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(self.algorithm.sequential_stats['questions'], 200)
+        self.assertEqual(self.algorithm.sequential_stats['evaluator_calls'], 400)
+        self.assertEqual(self.algorithm.sequential_stats['calls_saved'], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests for single-flight request coalescing
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+from single_flight import SingleFlight, request_key
+
+
+class TestRequestKey(unittest.TestCase):
+    def test_key_ignores_dict_order(self):
+        a = request_key("m", [{"role": "user", "content": "hi"}], {"tmpr": 0.1, "max_tokens": 5})
+        b = request_key("m", [{"content": "hi", "role": "user"}], {"max_tokens": 5, "tmpr": 0.1})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, request_key("m", [{"role": "user", "content": "hello"}], None))
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_duplicates_share_one_call(self):
+        group = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def fn():
+            calls.append(1)
+            release.wait(2)
+            return {"scores": [1, 2]}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(group.do("k", fn, label="m")))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        deadline = time.time() + 2
+        while group.waiters("k") < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(group.waiters("k"), 4)
+        release.set()
+        for t in threads:
+            t.join(2)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"scores": [1, 2]}] * 4)
+        # followers get their own copies of mutable results
+        self.assertEqual(len({id(r) for r in results}), 4)
+        stats = group.stats()["m"]
+        self.assertEqual((stats["calls"], stats["executed"], stats["coalesced"], stats["max_waiters"]), (4, 1, 3, 4))
+        self.assertEqual(group.waiters(), {})
+
+    def test_completed_calls_are_not_cached(self):
+        group = SingleFlight()
+        counter = iter(range(10))
+        self.assertEqual(group.do("k", lambda: next(counter)), 0)
+        self.assertEqual(group.do("k", lambda: next(counter)), 1)
+
+    def test_error_reaches_every_waiter(self):
+        group = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fn():
+            started.set()
+            release.wait(2)
+            raise RuntimeError("boom")
+
+        errors = []
+
+        def run():
+            try:
+                group.do("k", fn, label="m")
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait(2)
+        follower = threading.Thread(target=run)
+        follower.start()
+        while group.waiters("k") < 2:
+            time.sleep(0.01)
+        release.set()
+        leader.join(2)
+        follower.join(2)
+        self.assertEqual(errors, ["boom", "boom"])
+        self.assertEqual(group.stats()["m"]["errors"], 1)
+
+    def test_disabled_group_runs_every_call(self):
+        group = SingleFlight(enabled=False)
+        counter = iter(range(10))
+        self.assertEqual([group.do("k", lambda: next(counter)) for _ in range(3)], [0, 1, 2])
+        self.assertEqual(group.stats()[""]["coalesced"], 0)
+
+    def test_async_duplicates_share_one_task(self):
+        group = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"ok": True}
+
+        async def main():
+            first = asyncio.ensure_future(group.do_async("k", fetch, label="m"))
+            await asyncio.sleep(0)
+            # cancelling the first caller must not cancel the shared call for the others
+            rest = [asyncio.ensure_future(group.do_async("k", fetch, label="m")) for _ in range(2)]
+            await asyncio.sleep(0)
+            first.cancel()
+            return await asyncio.gather(*rest)
+
+        results = asyncio.run(main())
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [{"ok": True}, {"ok": True}])
+        self.assertEqual(group.stats()["m"]["coalesced"], 2)
+        self.assertEqual(group.waiters(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+Tests for the shared multi-node work queue
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from work_queue import DirectoryWorkQueue, SQLiteWorkQueue, open_work_queue
+
+
+class _WorkQueueCases:
+
+    def make_queue(self, lease_seconds=60, max_attempts=3):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_enqueue_is_idempotent(self):
+        queue = self.make_queue()
+        self.assertTrue(queue.enqueue('a.json', {'path': '/x/a.json'}))
+        self.assertFalse(queue.enqueue('a.json', {'path': '/x/a.json'}))
+        self.assertEqual(queue.enqueue_many([('a.json', None), ('b.json', None)]), 1)
+        self.assertEqual(queue.stats()['pending'], 2)
+
+    def test_claim_complete_and_results(self):
+        queue = self.make_queue()
+        queue.enqueue('a/b c.json', {'n': 1})
+        lease = queue.claim('w1')
+        self.assertEqual(lease.item_id, 'a/b c.json')
+        self.assertEqual(lease.payload, {'n': 1})
+        self.assertIsNone(queue.claim('w2'))
+        self.assertTrue(queue.complete(lease, {'score': 3}))
+        self.assertFalse(queue.enqueue('a/b c.json'))
+        self.assertEqual(queue.results(), [('a/b c.json', {'score': 3})])
+        self.assertTrue(queue.is_drained())
+
+    def test_concurrent_claims_are_exclusive(self):
+        queue = self.make_queue()
+        queue.enqueue_many((f"item{i:03d}", None) for i in range(40))
+        claimed = []
+        lock = threading.Lock()
+
+        def worker(name):
+            own = self.make_queue()
+            while True:
+                lease = own.claim(name)
+                if lease is None:
+                    break
+                with lock:
+                    claimed.append(lease.item_id)
+                own.complete(lease, lease.item_id)
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claimed), [f"item{i:03d}" for i in range(40)])
+        self.assertEqual(len(queue.results()), 40)
+
+    def test_expired_lease_is_reclaimed(self):
+        queue = self.make_queue(lease_seconds=0.2)
+        queue.enqueue('a')
+        crashed = queue.claim('w1')
+        time.sleep(0.3)
+        lease = queue.claim('w2')
+        self.assertEqual(lease.item_id, 'a')
+        self.assertEqual(lease.attempts, 2)
+        self.assertFalse(queue.heartbeat(crashed))
+        self.assertFalse(queue.complete(crashed, 'stale'))
+        self.assertTrue(queue.complete(lease, 'fresh'))
+        self.assertEqual(queue.results(), [('a', 'fresh')])
+
+    def test_heartbeat_keeps_lease(self):
+        queue = self.make_queue(lease_seconds=0.3)
+        queue.enqueue('a')
+        lease = queue.claim('w1')
+        with queue.keep_alive(lease, interval=0.05) as keeper:
+            time.sleep(0.5)
+            self.assertIsNone(self.make_queue(lease_seconds=0.3).claim('w2'))
+        self.assertFalse(keeper.lost)
+        self.assertTrue(queue.complete(lease))
+
+    def test_max_attempts_moves_to_failed(self):
+        queue = self.make_queue(max_attempts=2)
+        queue.enqueue('a')
+        lease = queue.claim('w1')
+        self.assertTrue(queue.fail(lease, 'boom'))
+        lease = queue.claim('w1')
+        self.assertEqual(lease.attempts, 2)
+        queue.fail(lease, 'boom again')
+        self.assertIsNone(queue.claim('w1'))
+        self.assertEqual(queue.failures(), [('a', 'boom again')])
+        self.assertTrue(queue.is_drained())
+
+    def test_release_does_not_count_attempt(self):
+        queue = self.make_queue(max_attempts=1)
+        queue.enqueue('a')
+        lease = queue.claim('w1')
+        self.assertTrue(queue.release(lease))
+        self.assertFalse(queue.release(lease))
+        lease = queue.claim('w2')
+        self.assertEqual(lease.attempts, 1)
+        self.assertTrue(queue.complete(lease, 'done'))
+        self.assertEqual(queue.failures(), [])
+
+    def test_claim_skips_unhandled_items(self):
+        queue = self.make_queue()
+        queue.enqueue_many([('a', None), ('b', None)])
+        lease = queue.claim('w1', skip={'a'})
+        self.assertEqual(lease.item_id, 'b')
+        self.assertIsNone(queue.claim('w1', skip={'a'}))
+        self.assertEqual(queue.claim('w2').item_id, 'a')
+
+
+class TestDirectoryWorkQueue(_WorkQueueCases, unittest.TestCase):
+
+    def make_queue(self, lease_seconds=60, max_attempts=3):
+        return DirectoryWorkQueue(os.path.join(self.temp_dir, 'queue'), lease_seconds, max_attempts)
+
+    def _claim_while_returning(self, queue, other):
+        """在条目写回待处理目录之后、临时租约文件删除之前由其他节点领取"""
+        claimed = []
+        write = queue._write
+
+        def write_then_claim(path, record):
+            write(path, record)
+            if os.path.dirname(path) == queue.dirs['pending']:
+                claimed.append(other.claim('w2'))
+        queue._write = write_then_claim
+        return claimed
+
+    def test_concurrent_claim_during_release_keeps_item(self):
+        queue, other = self.make_queue(), self.make_queue()
+        queue.enqueue('a')
+        lease = queue.claim('w1')
+        claimed = self._claim_while_returning(queue, other)
+        self.assertTrue(queue.release(lease))
+        self.assertEqual([l.item_id for l in claimed], ['a'])
+        self.assertEqual(queue.stats()['leased'], 1)
+        self.assertFalse(queue.is_drained())
+        self.assertTrue(other.complete(claimed[0], 'done'))
+        self.assertEqual(queue.results(), [('a', 'done')])
+
+    def test_concurrent_claim_during_fail_keeps_item(self):
+        queue, other = self.make_queue(), self.make_queue()
+        queue.enqueue('a')
+        lease = queue.claim('w1')
+        claimed = self._claim_while_returning(queue, other)
+        self.assertTrue(queue.fail(lease, 'boom'))
+        self.assertEqual(claimed[0].attempts, 2)
+        self.assertEqual(queue.stats()['leased'], 1)
+
+    def test_claim_keeps_pending_copy_of_leased_item(self):
+        queue = self.make_queue()
+        queue.enqueue('a')
+        lease = queue.claim('w1')
+        # 与租约同名的待处理文件（例如并发加入）不应被领取方删除
+        queue._write(queue._path('pending', 'a'), {'id': 'a', 'attempts': 0})
+        self.assertIsNone(queue.claim('w2'))
+        self.assertEqual(queue.stats()['pending'], 1)
+        self.assertTrue(queue.complete(lease, 'done'))
+        self.assertIsNone(queue.claim('w2'))
+        self.assertTrue(queue.is_drained())
+
+
+class TestSQLiteWorkQueue(_WorkQueueCases, unittest.TestCase):
+
+    def make_queue(self, lease_seconds=60, max_attempts=3):
+        return SQLiteWorkQueue(os.path.join(self.temp_dir, 'queue.db'), lease_seconds, max_attempts)
+
+
+class TestOpenWorkQueue(unittest.TestCase):
+
+    def test_backend_selection(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            self.assertIsInstance(open_work_queue(os.path.join(temp_dir, 'q')), DirectoryWorkQueue)
+            self.assertIsInstance(open_work_queue(os.path.join(temp_dir, 'q.db')), SQLiteWorkQueue)
+            self.assertIsInstance(open_work_queue('sqlite:///' + os.path.join(temp_dir, 'x')), SQLiteWorkQueue)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,9 +11,23 @@ from typing import Dict, List, Any
 from .context_generator import ContextGenerator
 from .reverse_scoring_processor import ReverseScoringProcessor
 from .input_parser import InputParser
+from .scoring_core import (
+    BIG5_TRAITS, report_arrays, weighted_trait_means, array_to_dict,
+    valid_score_mask, primary_dimension_mask, mbti_types
+)
+from .model_residency import ModelResidencyManager, is_cloud_model
 import time
 import statistics
 import re
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracing import (
+    span, annotate, traced, STAGE_PROMPT_BUILD, STAGE_QUEUE_WAIT, STAGE_MODEL, STAGE_PARSE,
+    STAGE_SCORING, STAGE_IO, STAGE_QUESTION, STAGE_FILE
+)
 
 
 class TransparentPipeline:
@@ -67,7 +81,12 @@ class TransparentPipeline:
         self.input_parser = InputParser()
         self.max_dispute_rounds = 3
         self.dispute_threshold = 1.0
+
+        # 本地模式下管理模型驻留，并按模型分组预先完成初始评估
+        self.residency = None if use_cloud else ModelResidencyManager()
+        self._primary_score_cache: Dict[tuple, Dict[str, int]] = {}
     
+    @traced(STAGE_PARSE)
     def parse_scores_from_response(self, response: str) -> Dict[str, int]:
         """从模型响应中解析评分"""
         import json
@@ -138,12 +157,21 @@ class TransparentPipeline:
                 print(f"      尝试使用模型: {attempt_model}")
 
                 # 添加延迟避免API过载
-                if attempt_model.endswith('-cloud'):
-                    time.sleep(2)
-                else:
-                    time.sleep(0.5)
+                with span(STAGE_QUEUE_WAIT, 'throttle'):
+                    if attempt_model.endswith('-cloud'):
+                        time.sleep(2)
+                    else:
+                        time.sleep(0.5)
 
-                response = ollama.generate(model=attempt_model, prompt=context, options={'num_predict': 2000})
+                if self.residency and not is_cloud_model(attempt_model):
+                    with span(STAGE_MODEL, 'ensure_loaded', model=attempt_model):
+                        self.residency.ensure_loaded(attempt_model)
+                    with span(STAGE_MODEL, 'generate', model=attempt_model, question_id=question_id):
+                        response = ollama.generate(model=attempt_model, prompt=context, options={'num_predict': 2000},
+                                                   keep_alive=self.residency.keep_alive)
+                else:
+                    with span(STAGE_MODEL, 'generate', model=attempt_model, question_id=question_id):
+                        response = ollama.generate(model=attempt_model, prompt=context, options={'num_predict': 2000})
                 scores = self.parse_scores_from_response(response['response'])
 
                 # 验证评分有效性
@@ -198,6 +226,7 @@ class TransparentPipeline:
         """
         return self.evaluate_single_question_with_fallback(context, model, question_id)
     
+    @traced(STAGE_SCORING)
     def detect_disputes(self, scores_list: List[Dict[str, int]], threshold: float = 1.0) -> Dict[str, List]:
         """检测评分争议（所有维度）"""
         disputes = {}
@@ -222,6 +251,7 @@ class TransparentPipeline:
         
         return disputes
     
+    @traced(STAGE_SCORING)
     def detect_major_dimension_disputes(self, scores_list: List[Dict[str, int]], question: Dict, threshold: float = 1.0) -> Dict[str, List]:
         """检测主要维度评分争议（只检查题目所属的主要维度）"""
         # 获取题目主要维度
@@ -263,11 +293,13 @@ class TransparentPipeline:
         
         return disputes
     
+    @traced(STAGE_QUESTION)
     def process_single_question(self, question: Dict, question_idx: int) -> Dict[str, Any]:
         """
         处理单道题，提供详细反馈
         """
         question_id = question.get('question_id', 'Unknown')
+        annotate(question_id=question_id, question_index=question_idx)
         question_concept = question['question_data'].get('mapped_ipip_concept', 'Unknown')
         
         # 确保question_id是字符串
@@ -283,19 +315,26 @@ class TransparentPipeline:
         print(f"  被试回答: {question['extracted_response'][:100]}...")
         
         # 生成评估上下文
-        context = self.context_generator.generate_evaluation_prompt(question)
+        with span(STAGE_PROMPT_BUILD, 'generate_evaluation_prompt'):
+            context = self.context_generator.generate_evaluation_prompt(question)
         
         # 初始评估（使用3个主要模型）
         print(f"  初始评估 (使用 {len(self.primary_models)} 个模型):")
         initial_scores = []
         for model in self.primary_models:
-            scores = self.evaluate_single_question(context, model, question_id)
+            cached_scores = self._primary_score_cache.pop((question_idx, model), None)
+            if cached_scores is not None:
+                print(f"    └─ 模型 {model} 已按模型分组预评估: {cached_scores}")
+                scores = cached_scores
+            else:
+                scores = self.evaluate_single_question(context, model, question_id)
+                with span(STAGE_QUEUE_WAIT, 'throttle'):
+                    time.sleep(0.5)  # 防止API过载
             initial_scores.append({
                 'model': model,
                 'scores': scores,
                 'raw_scores': scores.copy()  # 保存原始评分
             })
-            time.sleep(0.5)  # 防止API过载
         
         # 检查是否存在争议（只检查主要维度）
         all_initial_scores = [item['scores'] for item in initial_scores]
@@ -530,86 +569,37 @@ class TransparentPipeline:
             }
         }
     
+    @traced(STAGE_SCORING)
     def calculate_big5_scores(self, question_results: List[Dict]) -> Dict[str, float]:
         """计算大五人格各维度得分（带权重）"""
         print("开始计算大五人格得分（带权重）:")
         
-        # 按维度收集分数和权重
-        scores_by_dimension = {
-            'openness_to_experience': [],
-            'conscientiousness': [],
-            'extraversion': [],
-            'agreeableness': [],
-            'neuroticism': []
-        }
-        
-        # 收集每道题的主要维度信息
-        for result in question_results:
-            scores = result['final_adjusted_scores']  # 使用调整后分数
-            question_info = result.get('question_info', {})
-            question_data = question_info.get('question_data', {})
-            primary_dimension = question_data.get('dimension', '')  # 题目主要维度
-            
-            # 将主要维度映射到标准名称
-            dimension_map = {
-                'Openness to Experience': 'openness_to_experience',
-                'Conscientiousness': 'conscientiousness',
-                'Extraversion': 'extraversion',
-                'Agreeableness': 'agreeableness',
-                'Neuroticism': 'neuroticism'
-            }
-            
-            standard_primary_dimension = dimension_map.get(primary_dimension, '')
-            
-            # 为每个维度添加带权重的分数
-            for dimension in scores_by_dimension:
-                if dimension in scores:
-                    score = scores[dimension]
-                    if score in [1, 3, 5]:  # 确保是有效分数
-                        # 计算权重：主要维度70%，其他维度各7.5%
-                        if dimension == standard_primary_dimension and standard_primary_dimension:
-                            weight = 0.7  # 主要维度高权重
-                        else:
-                            weight = 0.075  # 其他维度低权重
-                        
-                        scores_by_dimension[dimension].append({
-                            'score': score,
-                            'weight': weight,
-                            'is_primary': (dimension == standard_primary_dimension and standard_primary_dimension)
-                        })
-        
-        # 计算加权平均分
-        big5_scores = {}
-        for dimension, weighted_scores in scores_by_dimension.items():
-            if weighted_scores:
-                # 计算加权平均
-                total_weighted_score = sum(item['score'] * item['weight'] for item in weighted_scores)
-                total_weight = sum(item['weight'] for item in weighted_scores)
-                
-                if total_weight > 0:
-                    weighted_avg = total_weighted_score / total_weight
-                    big5_scores[dimension] = round(weighted_avg, 2)
-                    
-                    # 统计信息
-                    primary_scores = [item['score'] for item in weighted_scores if item['is_primary']]
-                    other_scores = [item['score'] for item in weighted_scores if not item['is_primary']]
-                    
-                    print(f"  {dimension}:")
-                    if primary_scores:
-                        primary_avg = sum(primary_scores) / len(primary_scores)
-                        print(f"    主要维度平均: {primary_avg:.2f} (n={len(primary_scores)})")
-                    if other_scores:
-                        other_avg = sum(other_scores) / len(other_scores)
-                        print(f"    其他维度平均: {other_avg:.2f} (n={len(other_scores)})")
-                    print(f"    加权总分: {weighted_avg:.2f}")
-                else:
-                    big5_scores[dimension] = 3.0  # 默认中性分
-            else:
+        # 组装 (题目 × 特质) 调整后评分与主要维度索引
+        scores, primary_idx = report_arrays(question_results, 'final_adjusted_scores')
+        big5_means = weighted_trait_means(scores, primary_idx, default=3.0, decimals=None)
+        big5_scores = array_to_dict(big5_means, decimals=2)
+        
+        # 统计信息：主要维度与其他维度的有效评分
+        valid = valid_score_mask(scores)
+        primary = primary_dimension_mask(primary_idx) & valid
+        other = ~primary_dimension_mask(primary_idx) & valid
+        for t_idx, dimension in enumerate(BIG5_TRAITS):
+            if not valid[:, t_idx].any():
                 print(f"  {dimension}: 无评分数据")
-                big5_scores[dimension] = 3.0  # 默认中性分
+                continue
+            
+            print(f"  {dimension}:")
+            primary_scores = scores[primary[:, t_idx], t_idx]
+            other_scores = scores[other[:, t_idx], t_idx]
+            if primary_scores.size:
+                print(f"    主要维度平均: {primary_scores.mean():.2f} (n={primary_scores.size})")
+            if other_scores.size:
+                print(f"    其他维度平均: {other_scores.mean():.2f} (n={other_scores.size})")
+            print(f"    加权总分: {big5_means[t_idx]:.2f}")
         
         return big5_scores
     
+    @traced(STAGE_SCORING)
     def calculate_mbti_type(self, big5_scores: Dict[str, float]) -> str:
         """基于大五分数推断MBTI类型"""
         # 简化的MBTI推断逻辑
@@ -619,21 +609,8 @@ class TransparentPipeline:
         A = big5_scores.get('agreeableness', 3)
         N = big5_scores.get('neuroticism', 3)
         
-        # E/I: 外向性 vs 神经质
-        e_score = E + (5 - N)  # 高外向性+低神经质=更外向
-        i_score = (5 - E) + N
-        E_preference = 'E' if e_score > i_score else 'I'
-        
-        # S/N: 感觉 vs 直觉 (基于开放性)
-        S_preference = 'S' if O <= 3 else 'N'
-        
-        # T/F: 思考 vs 情感 (基于宜人性)
-        T_preference = 'T' if A <= 3 else 'F'
-        
-        # J/P: 判断 vs 知觉 (基于尽责性)
-        J_preference = 'J' if C > 3 else 'P'
-        
-        mbti_type = f"{E_preference}{S_preference}{T_preference}{J_preference}"
+        mbti_type = str(mbti_types([O, C, E, A, N], rule='transparent'))
+        E_preference, S_preference, T_preference, J_preference = mbti_type
         print(f"推断MBTI类型: {mbti_type}")
         print(f"  E/I: E({E}) vs I({5-E}) + N({N}) → {E_preference}")
         print(f"  S/N: O({O}) → {S_preference}")
@@ -642,10 +619,30 @@ class TransparentPipeline:
         
         return mbti_type
     
+    def prefetch_primary_scores(self, questions: List[Dict]):
+        """
+        按模型分组完成所有题目的初始评估：每个主要模型只加载一次，
+        依次评估全部题目，避免逐题轮换模型造成的反复加载
+        """
+        self._primary_score_cache = {}
+        self.residency.preload(self.primary_models)
+
+        for model in self.primary_models:
+            print(f"  按模型分组预评估: {model} ({len(questions)} 道题)")
+            self.residency.ensure_loaded(model)
+            for i, question in enumerate(questions):
+                question_id = str(question.get('question_id', 'Unknown'))
+                with span(STAGE_PROMPT_BUILD, 'generate_evaluation_prompt'):
+                    context = self.context_generator.generate_evaluation_prompt(question)
+                self._primary_score_cache[(i, model)] = self.evaluate_single_question(context, model, question_id)
+        print()
+
+    @traced(STAGE_FILE)
     def process_single_report(self, file_path: str) -> Dict[str, Any]:
         """
         处理单个测评报告，提供完整透明的反馈
         """
+        annotate(file=os.path.basename(file_path))
         print("=" * 80)
         print("单文件测评流水线 - 透明化处理报告")
         print("=" * 80)
@@ -654,7 +651,8 @@ class TransparentPipeline:
         
         # 1. 解析输入文件
         print("步骤1: 解析输入文件")
-        questions = self.input_parser.parse_assessment_json(file_path)
+        with span(STAGE_IO, 'parse_assessment_json'):
+            questions = self.input_parser.parse_assessment_json(file_path)
         print(f"  解析完成: {len(questions)} 道题目")
         print()
         
@@ -662,6 +660,9 @@ class TransparentPipeline:
         print("步骤2: 逐题处理与评估")
         print("-" * 80)
         
+        if self.residency:
+            self.prefetch_primary_scores(questions)
+
         all_question_results = []
         for i, question in enumerate(questions):
             result = self.process_single_question(question, i)
@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多节点共享工作队列
+在共享目录（NFS/SMB 等）或 SQLite 数据库上提供 claim / lease / heartbeat / complete 语义，
+多台机器（各自使用本地Ollama）可以同时消费同一批测评报告而不重复处理；
+工作进程崩溃后其租约到期，条目自动回到待处理状态。结果随条目保存，结束时统一合并。
+
+两种后端：
+    DirectoryWorkQueue  共享目录，条目为 pending/ leases/ done/ failed/ 下的 JSON 文件，
+                        领取依赖 os.link 的原子性（目标已存在即失败）
+    SQLiteWorkQueue     SQLite 数据库（BEGIN IMMEDIATE 事务领取），适合单机多进程或支持文件锁的共享存储
+
+租约到期时间使用各节点的墙钟时间，节点间需要时钟同步（NTP）；
+处理时用 LeaseKeeper 在后台定期续租，续租间隔须远小于租约时长。
+
+命令行：
+    python -m single_report_pipeline.work_queue status QUEUE
+    python -m single_report_pipeline.work_queue merge QUEUE merged_results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+STATE_PENDING = 'pending'
+STATE_LEASED = 'leased'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+STATES = (STATE_PENDING, STATE_LEASED, STATE_DONE, STATE_FAILED)
+
+DEFAULT_LEASE_SECONDS = 600.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    """默认工作进程标识：主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class Lease:
+    """一次领取得到的租约"""
+    item_id: str
+    payload: Any
+    worker_id: str
+    token: str
+    attempts: int
+    lease_until: float
+
+
+class WorkQueue:
+    """工作队列接口"""
+
+    def __init__(self, lease_seconds: float = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            lease_seconds: 租约时长（秒），超过该时长未续租的条目可被其他工作进程重新领取
+            max_attempts: 每个条目最多领取次数，超过后转为 failed
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def enqueue(self, item_id: str, payload: Any = None) -> bool:
+        """加入条目；已存在（任意状态）时不重复加入，返回False"""
+        raise NotImplementedError
+
+    def enqueue_many(self, items: Iterable[Tuple[str, Any]]) -> int:
+        """批量加入条目，返回新加入的数量"""
+        return sum(1 for item_id, payload in items if self.enqueue(item_id, payload))
+
+    def claim(self, worker_id: Optional[str] = None, skip: Optional[Iterable[str]] = None) -> Optional[Lease]:
+        """
+        领取一个待处理条目（含租约已过期的条目）；没有可领取条目时返回None
+
+        Args:
+            worker_id: 工作进程标识，默认 主机名-进程号
+            skip: 本工作进程无法处理、不再领取的条目ID
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """续租；租约已丢失（被回收或已完成）时返回False"""
+        raise NotImplementedError
+
+    def complete(self, lease: Lease, result: Any = None) -> bool:
+        """标记完成并保存结果；租约已丢失时返回False（结果不写入）"""
+        raise NotImplementedError
+
+    def fail(self, lease: Lease, error: str, retry: bool = True) -> bool:
+        """处理失败：未超过最多领取次数且 retry 时放回待处理，否则转为 failed"""
+        raise NotImplementedError
+
+    def release(self, lease: Lease) -> bool:
+        """交还租约：条目放回待处理且不计入领取次数；租约已丢失时返回False"""
+        raise NotImplementedError
+
+    def reclaim_expired(self) -> int:
+        """回收租约已过期的条目，返回回收数量"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """各状态条目数量"""
+        raise NotImplementedError
+
+    def results(self) -> List[Tuple[str, Any]]:
+        """已完成条目的 (item_id, result)，按 item_id 排序"""
+        raise NotImplementedError
+
+    def failures(self) -> List[Tuple[str, str]]:
+        """失败条目的 (item_id, error)，按 item_id 排序"""
+        raise NotImplementedError
+
+    def is_drained(self) -> bool:
+        """没有待处理或处理中的条目"""
+        stats = self.stats()
+        return stats[STATE_PENDING] == 0 and stats[STATE_LEASED] == 0
+
+    def keep_alive(self, lease: Lease, interval: Optional[float] = None) -> 'LeaseKeeper':
+        """返回在后台定期续租的上下文管理器"""
+        return LeaseKeeper(self, lease, interval)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class LeaseKeeper:
+    """处理期间在后台线程中定期续租"""
+
+    def __init__(self, queue: WorkQueue, lease: Lease, interval: Optional[float] = None):
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval or max(1.0, queue.lease_seconds / 3)
+        self.lost = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'LeaseKeeper':
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.lease.item_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop_event.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                alive = self.queue.heartbeat(self.lease)
+            except Exception as e:
+                logger.warning(f"续租失败 {self.lease.item_id}: {e}")
+                continue
+            if not alive:
+                self.lost = True
+                logger.warning(f"⚠️ 租约已丢失: {self.lease.item_id}（可能已被其他工作进程回收）")
+                return
+
+
+class DirectoryWorkQueue(WorkQueue):
+    """基于共享目录的工作队列"""
+
+    def __init__(self, root: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            root: 队列目录（所有节点挂载的共享目录）
+            lease_seconds: 租约时长（秒）
+            max_attempts: 每个条目最多领取次数
+        """
+        super().__init__(lease_seconds, max_attempts)
+        self.root = os.path.abspath(root)
+        self.dirs = {state: os.path.join(self.root, state if state != STATE_LEASED else 'leases') for state in STATES}
+        for directory in self.dirs.values():
+            os.makedirs(directory, exist_ok=True)
+
+    # ---- 文件辅助 ----
+
+    @staticmethod
+    def _file_name(item_id: str) -> str:
+        return quote(item_id, safe='') + '.json'
+
+    def _path(self, state: str, item_id: str) -> str:
+        return os.path.join(self.dirs[state], self._file_name(item_id))
+
+    def _names(self, state: str) -> List[str]:
+        try:
+            return sorted(name for name in os.listdir(self.dirs[state]) if name.endswith('.json'))
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path: str, record: Dict[str, Any]):
+        """先写临时文件再原子替换，读取方不会看到半写的文件"""
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, path)
+
+    def _exists_finished(self, name: str) -> bool:
+        return any(os.path.exists(os.path.join(self.dirs[state], name)) for state in (STATE_DONE, STATE_FAILED))
+
+    # ---- 队列操作 ----
+
+    def enqueue(self, item_id: str, payload: Any = None) -> bool:
+        name = self._file_name(item_id)
+        if any(os.path.exists(os.path.join(directory, name)) for directory in self.dirs.values()):
+            return False
+        self._write(os.path.join(self.dirs[STATE_PENDING], name),
+                    {'id': item_id, 'payload': payload, 'attempts': 0, 'enqueued_at': time.time()})
+        return True
+
+    def claim(self, worker_id: Optional[str] = None, skip: Optional[Iterable[str]] = None) -> Optional[Lease]:
+        worker_id = worker_id or default_worker_id()
+        skipped = {self._file_name(item_id) for item_id in skip or ()}
+        self.reclaim_expired()
+
+        for name in self._names(STATE_PENDING):
+            if name in skipped:
+                continue
+            source = os.path.join(self.dirs[STATE_PENDING], name)
+            target = os.path.join(self.dirs[STATE_LEASED], name)
+            try:
+                # 硬链接在目标已存在时失败，保证同一条目只有一个工作进程领取成功
+                os.link(source, target)
+            except FileExistsError:
+                # 已有租约（其他进程正在处理）：保留待处理副本，租约交还或失败重试时会覆盖它，完成后由下面的检查丢弃
+                continue
+            except FileNotFoundError:
+                continue
+            self._remove(source)
+
+            if self._exists_finished(name):
+                # 条目已经完成（完成后被并发重复加入）
+                self._remove(target)
+                continue
+
+            record = self._read(target) or {'id': unquote(name[:-len('.json')]), 'attempts': 0}
+            now = time.time()
+            lease = Lease(
+                item_id=record['id'],
+                payload=record.get('payload'),
+                worker_id=worker_id,
+                token=uuid.uuid4().hex,
+                attempts=record.get('attempts', 0) + 1,
+                lease_until=now + self.lease_seconds
+            )
+            record.update(worker=worker_id, token=lease.token, attempts=lease.attempts,
+                          claimed_at=now, lease_until=lease.lease_until)
+            self._write(target, record)
+            return lease
+        return None
+
+    def _owned_record(self, lease: Lease) -> Optional[Dict[str, Any]]:
+        record = self._read(self._path(STATE_LEASED, lease.item_id))
+        if record is None or record.get('token') != lease.token:
+            return None
+        return record
+
+    def heartbeat(self, lease: Lease) -> bool:
+        record = self._owned_record(lease)
+        if record is None:
+            return False
+        lease.lease_until = time.time() + self.lease_seconds
+        record['lease_until'] = lease.lease_until
+        record['heartbeat_at'] = time.time()
+        self._write(self._path(STATE_LEASED, lease.item_id), record)
+        return True
+
+    def complete(self, lease: Lease, result: Any = None) -> bool:
+        record = self._owned_record(lease)
+        if record is None:
+            return False
+        record.update(result=result, completed_at=time.time(), lease_until=None, token=None)
+        # 先写 done 再删除租约；中途崩溃时 claim 会发现条目已完成并丢弃租约
+        self._write(self._path(STATE_DONE, lease.item_id), record)
+        self._remove(self._path(STATE_LEASED, lease.item_id))
+        return True
+
+    def _take_lease(self, lease: Lease) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        把租约文件改名到唯一的临时文件后再放回待处理/失败目录：先写待处理文件再删除租约时，
+        并发的 claim 会因租约仍存在而领取失败，条目可能从所有状态中消失
+
+        Returns:
+            (临时文件路径, 记录)；租约已丢失时返回None
+        """
+        if self._owned_record(lease) is None:
+            return None
+        path = self._path(STATE_LEASED, lease.item_id)
+        taken_path = f"{path}.{uuid.uuid4().hex}.return"
+        try:
+            os.rename(path, taken_path)
+        except FileNotFoundError:
+            return None
+        record = self._read(taken_path)
+        if record is None or record.get('token') != lease.token:
+            # 改名前租约刚好被回收并被其他进程重新领取
+            os.rename(taken_path, path)
+            return None
+        return taken_path, record
+
+    def fail(self, lease: Lease, error: str, retry: bool = True) -> bool:
+        taken = self._take_lease(lease)
+        if taken is None:
+            return False
+        taken_path, record = taken
+        state = STATE_PENDING if retry and lease.attempts < self.max_attempts else STATE_FAILED
+        record.update(error=error, worker=None, token=None, lease_until=None, failed_at=time.time())
+        self._write(self._path(state, lease.item_id), record)
+        self._remove(taken_path)
+        return True
+
+    def release(self, lease: Lease) -> bool:
+        taken = self._take_lease(lease)
+        if taken is None:
+            return False
+        taken_path, record = taken
+        record.update(attempts=lease.attempts - 1, worker=None, token=None, lease_until=None)
+        self._write(self._path(STATE_PENDING, lease.item_id), record)
+        self._remove(taken_path)
+        return True
+
+    def reclaim_expired(self) -> int:
+        reclaimed = 0
+        now = time.time()
+        for name in self._names(STATE_LEASED):
+            path = os.path.join(self.dirs[STATE_LEASED], name)
+            if not self._is_expired(path, now):
+                continue
+
+            # 改名到唯一的临时文件，多个回收者中只有一个成功
+            claimed_path = f"{path}.{uuid.uuid4().hex}.reclaim"
+            try:
+                os.rename(path, claimed_path)
+            except FileNotFoundError:
+                continue
+            if not self._is_expired(claimed_path, time.time()):
+                # 回收前刚好续租
+                os.rename(claimed_path, path)
+                continue
+
+            record = self._read(claimed_path) or {'id': unquote(name[:-len('.json')]), 'attempts': self.max_attempts}
+            state = STATE_PENDING if record.get('attempts', 0) < self.max_attempts else STATE_FAILED
+            record.update(worker=None, token=None, lease_until=None,
+                          error=f"租约过期（工作进程 {record.get('worker')}）")
+            self._write(os.path.join(self.dirs[state], name), record)
+            self._remove(claimed_path)
+            reclaimed += 1
+            logger.info(f"♻️ 回收过期租约: {record['id']} -> {state}")
+        return reclaimed
+
+    def _is_expired(self, path: str, now: float) -> bool:
+        record = self._read(path)
+        if record is not None and record.get('lease_until'):
+            return record['lease_until'] < now
+        # 领取后尚未写入租约信息（或文件损坏）：以改名时间（ctime）计算租约
+        try:
+            return os.stat(path).st_ctime + self.lease_seconds < now
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {state: len(self._names(state)) for state in STATES}
+
+    def results(self) -> List[Tuple[str, Any]]:
+        results = []
+        for name in self._names(STATE_DONE):
+            record = self._read(os.path.join(self.dirs[STATE_DONE], name))
+            if record is not None:
+                results.append((record['id'], record.get('result')))
+        return sorted(results, key=lambda item: item[0])
+
+    def failures(self) -> List[Tuple[str, str]]:
+        failures = []
+        for name in self._names(STATE_FAILED):
+            record = self._read(os.path.join(self.dirs[STATE_FAILED], name))
+            if record is not None:
+                failures.append((record['id'], record.get('error')))
+        return sorted(failures, key=lambda item: item[0])
+
+    def __str__(self) -> str:
+        return f"DirectoryWorkQueue(root={self.root}, lease={self.lease_seconds}s)"
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """基于SQLite的工作队列"""
+
+    def __init__(self, db_path: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            db_path: 数据库文件路径
+            lease_seconds: 租约时长（秒）
+            max_attempts: 每个条目最多领取次数
+        """
+        super().__init__(lease_seconds, max_attempts)
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        # LeaseKeeper 在后台线程续租，连接需跨线程使用（以 _lock 串行化）
+        self._conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS work_items (
+                id TEXT PRIMARY KEY,
+                payload TEXT,
+                state TEXT NOT NULL,
+                worker TEXT,
+                token TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_work_items_state ON work_items (state, lease_until)")
+
+    def _transaction(self, statements):
+        """在 BEGIN IMMEDIATE 事务中执行 statements(cursor) 并返回其结果"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                value = statements(cursor)
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return value
+
+    def enqueue(self, item_id: str, payload: Any = None) -> bool:
+        def insert(cursor):
+            cursor.execute(
+                "INSERT OR IGNORE INTO work_items (id, payload, state, updated_at) VALUES (?, ?, ?, ?)",
+                (item_id, json.dumps(payload, ensure_ascii=False, default=str), STATE_PENDING, time.time()))
+            return cursor.rowcount == 1
+        return self._transaction(insert)
+
+    def enqueue_many(self, items: Iterable[Tuple[str, Any]]) -> int:
+        rows = [(item_id, json.dumps(payload, ensure_ascii=False, default=str), STATE_PENDING, time.time())
+                for item_id, payload in items]
+
+        def insert(cursor):
+            before = self._conn.total_changes
+            cursor.executemany(
+                "INSERT OR IGNORE INTO work_items (id, payload, state, updated_at) VALUES (?, ?, ?, ?)", rows)
+            return self._conn.total_changes - before
+        return self._transaction(insert)
+
+    def claim(self, worker_id: Optional[str] = None, skip: Optional[Iterable[str]] = None) -> Optional[Lease]:
+        worker_id = worker_id or default_worker_id()
+        skipped = set(skip or ())
+
+        def take(cursor):
+            now = time.time()
+            self._reclaim(cursor, now)
+            rows = cursor.execute(
+                "SELECT id, payload, attempts FROM work_items WHERE state = ? ORDER BY id", (STATE_PENDING,))
+            row = next((row for row in rows if row[0] not in skipped), None)
+            if row is None:
+                return None
+            item_id, payload, attempts = row
+            lease = Lease(item_id=item_id, payload=json.loads(payload) if payload else None, worker_id=worker_id,
+                          token=uuid.uuid4().hex, attempts=attempts + 1, lease_until=now + self.lease_seconds)
+            cursor.execute(
+                "UPDATE work_items SET state = ?, worker = ?, token = ?, attempts = ?, lease_until = ?, updated_at = ? "
+                "WHERE id = ?",
+                (STATE_LEASED, worker_id, lease.token, lease.attempts, lease.lease_until, now, item_id))
+            return lease
+        return self._transaction(take)
+
+    def _reclaim(self, cursor, now: float) -> int:
+        error = '租约过期'
+        cursor.execute(
+            "UPDATE work_items SET state = ?, worker = NULL, token = NULL, lease_until = NULL, error = ?, updated_at = ? "
+            "WHERE state = ? AND lease_until < ? AND attempts >= ?",
+            (STATE_FAILED, error, now, STATE_LEASED, now, self.max_attempts))
+        failed = cursor.rowcount
+        cursor.execute(
+            "UPDATE work_items SET state = ?, worker = NULL, token = NULL, lease_until = NULL, error = ?, updated_at = ? "
+            "WHERE state = ? AND lease_until < ?",
+            (STATE_PENDING, error, now, STATE_LEASED, now))
+        return failed + cursor.rowcount
+
+    def reclaim_expired(self) -> int:
+        return self._transaction(lambda cursor: self._reclaim(cursor, time.time()))
+
+    def heartbeat(self, lease: Lease) -> bool:
+        lease_until = time.time() + self.lease_seconds
+
+        def extend(cursor):
+            cursor.execute(
+                "UPDATE work_items SET lease_until = ?, updated_at = ? WHERE id = ? AND token = ? AND state = ?",
+                (lease_until, time.time(), lease.item_id, lease.token, STATE_LEASED))
+            return cursor.rowcount == 1
+        alive = self._transaction(extend)
+        if alive:
+            lease.lease_until = lease_until
+        return alive
+
+    def complete(self, lease: Lease, result: Any = None) -> bool:
+        def finish(cursor):
+            cursor.execute(
+                "UPDATE work_items SET state = ?, result = ?, token = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND token = ? AND state = ?",
+                (STATE_DONE, json.dumps(result, ensure_ascii=False, default=str), time.time(),
+                 lease.item_id, lease.token, STATE_LEASED))
+            return cursor.rowcount == 1
+        return self._transaction(finish)
+
+    def fail(self, lease: Lease, error: str, retry: bool = True) -> bool:
+        state = STATE_PENDING if retry and lease.attempts < self.max_attempts else STATE_FAILED
+
+        def mark(cursor):
+            cursor.execute(
+                "UPDATE work_items SET state = ?, error = ?, worker = NULL, token = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE id = ? AND token = ? AND state = ?",
+                (state, error, time.time(), lease.item_id, lease.token, STATE_LEASED))
+            return cursor.rowcount == 1
+        return self._transaction(mark)
+
+    def release(self, lease: Lease) -> bool:
+        def give_back(cursor):
+            cursor.execute(
+                "UPDATE work_items SET state = ?, attempts = ?, worker = NULL, token = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE id = ? AND token = ? AND state = ?",
+                (STATE_PENDING, lease.attempts - 1, time.time(), lease.item_id, lease.token, STATE_LEASED))
+            return cursor.rowcount == 1
+        return self._transaction(give_back)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM work_items GROUP BY state").fetchall()
+        stats = {state: 0 for state in STATES}
+        stats.update(dict(rows))
+        return stats
+
+    def results(self) -> List[Tuple[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, result FROM work_items WHERE state = ? ORDER BY id", (STATE_DONE,)).fetchall()
+        return [(item_id, json.loads(result) if result else None) for item_id, result in rows]
+
+    def failures(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, error FROM work_items WHERE state = ? ORDER BY id", (STATE_FAILED,)).fetchall()
+        return [(item_id, error) for item_id, error in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __str__(self) -> str:
+        return f"SQLiteWorkQueue(db_path={self.db_path}, lease={self.lease_seconds}s)"
+
+
+def open_work_queue(location: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                    max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> WorkQueue:
+    """
+    按位置打开工作队列：sqlite:///path、*.db、*.sqlite 使用 SQLite，其余视为共享目录
+
+    Args:
+        location: 队列位置
+        lease_seconds: 租约时长（秒）
+        max_attempts: 每个条目最多领取次数
+    """
+    if location.startswith('sqlite:///'):
+        return SQLiteWorkQueue(location[len('sqlite:///'):], lease_seconds, max_attempts)
+    if location.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SQLiteWorkQueue(location, lease_seconds, max_attempts)
+    return DirectoryWorkQueue(location, lease_seconds, max_attempts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多节点共享工作队列')
+    commands = parser.add_subparsers(dest='command', required=True)
+    status_parser = commands.add_parser('status', help='各状态条目数量与失败条目')
+    status_parser.add_argument('queue', help='队列目录或SQLite数据库')
+    merge_parser = commands.add_parser('merge', help='合并所有已完成条目的结果')
+    merge_parser.add_argument('queue', help='队列目录或SQLite数据库')
+    merge_parser.add_argument('output', help='输出JSON文件')
+    args = parser.parse_args()
+
+    with open_work_queue(args.queue) as queue:
+        if args.command == 'status':
+            for state, count in queue.stats().items():
+                print(f"{state:<10}{count:>8}")
+            for item_id, error in queue.failures():
+                print(f"  ❌ {item_id}: {error}")
+        else:
+            merged = {
+                'queue': str(queue),
+                'stats': queue.stats(),
+                'results': [result for _, result in queue.results()],
+                'failures': [{'id': item_id, 'error': error} for item_id, error in queue.failures()]
+            }
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, indent=2, ensure_ascii=False, default=str)
+            print(f"已合并 {len(merged['results'])} 个结果 -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@
 """
 
 import statistics
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 from collections import Counter
 import random
@@ -22,6 +23,7 @@ class AdaptiveConsensusAlgorithm:
     3. 动态增加评估器直到达成共识
     4. 智能偏差检测和排除
     5. 最多扩展到7个评估器
+    6. 顺序早停模式：初始评估器中已有过半数给出同一分数时不再调用剩余评估器
     """
 
     def __init__(self):
@@ -38,6 +40,15 @@ class AdaptiveConsensusAlgorithm:
             'evaluator_d', 'evaluator_e', 'evaluator_f', 'evaluator_g'
         ]
 
+        # 顺序早停统计（跨题目累计；流水线可能并发处理多道题）
+        self._stats_lock = threading.Lock()
+        self.sequential_stats = {
+            'questions': 0,
+            'early_stops': 0,
+            'evaluator_calls': 0,
+            'calls_saved': 0
+        }
+
     def adaptive_consensus(self, initial_scores: List[int],
                           get_additional_scores: callable) -> Dict[str, Any]:
         """
@@ -59,6 +70,71 @@ class AdaptiveConsensusAlgorithm:
 
         return self._adaptive_consensus_process(initial_scores, get_additional_scores)
 
+    def sequential_consensus(self, get_initial_scores: callable,
+                             get_additional_scores: callable,
+                             first_batch: int = 2) -> Dict[str, Any]:
+        """
+        顺序早停共识（多数规则）
+
+        按顺序获取初始评估器评分（首批默认2个，可并行获取）。顺序模式以多数评分为共识分数：
+        某个分数已获得初始评估器的过半数（3个中的2个）时，剩余评估器无论给出什么分数都无法改变多数结果，
+        停止调用；3个初始评分各不相同（1,3,5）时没有多数，进入常规自适应共识流程（调用额外评估器）。
+        注意有多数时结果取多数分数而非平均分，例如 [3,3,5] 的共识分数为3
+
+        Args:
+            get_initial_scores: 获取下n个初始评估器评分的函数
+            get_additional_scores: 获取额外评估器评分的函数
+            first_batch: 首批获取的初始评估器数量（1或2）
+
+        Returns:
+            共识结果字典，quality_metrics 中包含停止规则统计
+        """
+        scores = self._validate_scores(get_initial_scores(min(first_batch, self.initial_evaluators)))
+
+        majority_score = self._majority_score(scores, self.initial_evaluators)
+        while len(scores) < self.initial_evaluators and majority_score is None:
+            scores += self._validate_scores(get_initial_scores(1))
+            majority_score = self._majority_score(scores, self.initial_evaluators)
+
+        calls_saved = self.initial_evaluators - len(scores)
+        with self._stats_lock:
+            self.sequential_stats['questions'] += 1
+            self.sequential_stats['evaluator_calls'] += len(scores)
+            self.sequential_stats['calls_saved'] += calls_saved
+            if calls_saved > 0:
+                self.sequential_stats['early_stops'] += 1
+
+        stopping = {
+            'stopping_rule': 'majority',
+            'early_stopped': calls_saved > 0,
+            'initial_evaluators_queried': len(scores),
+            'initial_calls_saved': calls_saved
+        }
+
+        if majority_score is not None:
+            if calls_saved > 0:
+                print(f"⏹️ 顺序早停: {scores} 已有多数评分 {majority_score}，节省 {calls_saved} 次评估器调用")
+            else:
+                print(f"✅ 多数共识: {scores} -> {majority_score}")
+            return self._create_result(scores, majority_score, "majority_consensus", 1, stopping)
+
+        result = self._adaptive_consensus_process(scores, get_additional_scores)
+        result['quality_metrics'] = self._calculate_quality_metrics(result['final_scores'], stopping)
+        return result
+
+    def _validate_scores(self, scores: List[int]) -> List[int]:
+        scores = list(scores)
+        if not all(score in self.allowed_scores for score in scores):
+            raise ValueError("评分只能是1, 3, 5")
+        return scores
+
+    def _majority_score(self, scores: List[int], planned: int) -> Optional[int]:
+        """已获得 planned 个评估器中过半数的分数；尚无多数时返回None"""
+        if not scores:
+            return None
+        score, count = Counter(scores).most_common(1)[0]
+        return score if count > planned // 2 else None
+
     def _adaptive_consensus_process(self, scores: List[int],
                                   get_additional_scores: callable,
                                   round_num: int = 1) -> Dict[str, Any]:
@@ -263,7 +339,8 @@ class AdaptiveConsensusAlgorithm:
         return kept_scores
 
     def _create_result(self, scores: List[int], consensus_score: float,
-                      method: str, round_num: int) -> Dict[str, Any]:
+                      method: str, round_num: int,
+                      stopping: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """创建共识结果"""
 
         return {
@@ -273,14 +350,24 @@ class AdaptiveConsensusAlgorithm:
             'consensus_method': method,
             'processing_rounds': round_num,
             'score_distribution': dict(Counter(scores)),
-            'quality_metrics': self._calculate_quality_metrics(scores)
+            'quality_metrics': self._calculate_quality_metrics(scores, stopping)
         }
 
-    def _calculate_quality_metrics(self, scores: List[int]) -> Dict[str, Any]:
-        """计算质量指标"""
+    def _calculate_quality_metrics(self, scores: List[int],
+                                   stopping: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """计算质量指标（顺序模式下附带停止规则及累计节省统计）"""
+
+        stopping_metrics = {}
+        if stopping is not None:
+            with self._stats_lock:
+                stats = dict(self.sequential_stats)
+            stopping_metrics = dict(stopping)
+            stopping_metrics['session_early_stop_rate'] = round(
+                stats['early_stops'] / stats['questions'], 3) if stats['questions'] else 0.0
+            stopping_metrics['session_calls_saved'] = stats['calls_saved']
 
         if len(scores) < 2:
-            return {'consensus_strength': 1.0, 'agreement_level': 'perfect'}
+            return {'consensus_strength': 1.0, 'agreement_level': 'perfect', **stopping_metrics}
 
         # 共识强度（基于标准差）
         std_dev = statistics.stdev(scores) if len(scores) > 1 else 0
@@ -301,7 +388,8 @@ class AdaptiveConsensusAlgorithm:
             'consensus_strength': round(consensus_strength, 3),
             'agreement_level': agreement_level,
             'agreement_ratio': round(agreement_ratio, 3),
-            'evaluator_diversity': len(set(scores))
+            'evaluator_diversity': len(set(scores)),
+            **stopping_metrics
         }
 
 
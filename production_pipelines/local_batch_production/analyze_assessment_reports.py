@@ -12,6 +12,8 @@ from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import math
 
+from result_file_reader import ResultFileReader, RESULTS_KEY
+
 class BigFiveEvaluator:
     """大五人格评估器"""
     
@@ -44,10 +46,12 @@ class BigFiveEvaluator:
         }
 
     def parse_assessment_file(self, filepath: str) -> Optional[Dict]:
-        """解析测评报告文件"""
+        """解析测评报告文件（只解码元数据及评分所需的条目字段）"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with ResultFileReader(filepath) as reader:
+                data = {'assessment_metadata': reader.metadata}
+                if RESULTS_KEY in reader.keys():
+                    data[RESULTS_KEY] = list(reader.iter_items(fields=['question_data', 'extracted_response']))
             return data
         except Exception as e:
             print(f"解析文件失败 {filepath}: {e}")
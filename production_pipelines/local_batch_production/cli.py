@@ -8,6 +8,7 @@ import sys
 import os
 from llm_assessment.run_assessment_unified import main as run_assessment_main
 from llm_assessment.run_batch_suite import main as run_batch_main
+from llm_assessment.services.profiling import add_profile_arguments, start_profiling
 # Import analysis functions
 try:
     from analysis.analyze_results import run_analysis
@@ -26,6 +27,7 @@ Examples:
   %(prog)s analyze --input results/asses_gpt-4o_def_*.json
   %(prog)s batch --model claude-3-5-sonnet --roles a1,a2,b1
   %(prog)s assess --model llama3.1 --ollama
+  %(prog)s --profile cpu,memory --profile-stages model,parse assess --model llama3.1 --ollama
         """
     )
     
@@ -55,12 +57,17 @@ Examples:
     batch_parser.add_argument('--ollama', action='store_true', help='Use Ollama models')
     batch_parser.add_argument('--host', type=str, default='http://localhost:11434', help='Ollama host')
     
+    # Profiling applies to whichever command runs
+    add_profile_arguments(parser)
+
     # Parse arguments
     args = parser.parse_args()
     
     if args.command is None:
         parser.print_help()
         sys.exit(1)
+
+    start_profiling(args)
     
     # Set environment variables based on arguments
     if args.ollama:
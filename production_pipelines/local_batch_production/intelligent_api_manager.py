@@ -7,10 +7,15 @@
 import os
 import json
 import time
+import heapq
+import atexit
 import random
 import hashlib
 import logging
-from typing import Dict, List, Optional, Tuple
+import itertools
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
 import requests
@@ -40,15 +45,214 @@ class APIKey:
     error_count: int = 0
     rate_limit_reset_time: Optional[datetime] = None
     metadata: Dict = None
+    in_flight: int = 0  # 当前并发请求数（不持久化）
+
+class KeyRing:
+    """
+    单个提供商的密钥队列（线程安全）
+
+    就绪密钥按 (并发数, 使用次数, 最近使用时间) 组成小顶堆，速率限制密钥按解除时间组成定时堆；
+    密钥状态变化时重新入堆并递增版本号，堆中的旧条目在弹出时惰性丢弃，选取密钥为 O(log n)
+    """
+
+    def __init__(self, provider: str, keys: List[APIKey]):
+        self.provider = provider
+        self.keys = keys
+        self.lock = threading.RLock()
+        self._by_id: Dict[str, APIKey] = {}
+        self._order: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._ready: List[tuple] = []
+        self._limited: List[tuple] = []
+        self.rebuild()
+
+    def rebuild(self):
+        """密钥列表增删后重建索引与堆"""
+        with self.lock:
+            self._by_id = {api_key.id: api_key for api_key in self.keys}
+            self._order = {api_key.id: i for i, api_key in enumerate(self.keys)}
+            self._ready = []
+            self._limited = []
+            for api_key in self.keys:
+                self._schedule(api_key)
+
+    def get(self, key_id: str) -> Optional[APIKey]:
+        return self._by_id.get(key_id)
+
+    def _schedule(self, api_key: APIKey):
+        """按当前状态把密钥放入对应的堆，并使其旧条目失效"""
+        version = self._versions.get(api_key.id, 0) + 1
+        self._versions[api_key.id] = version
+
+        if api_key.status == APIStatus.ACTIVE:
+            last_used = api_key.last_used.timestamp() if api_key.last_used else 0.0
+            heapq.heappush(self._ready, (api_key.in_flight, api_key.usage_count, last_used,
+                                         self._order[api_key.id], version, api_key.id))
+        elif api_key.status == APIStatus.RATE_LIMITED and api_key.rate_limit_reset_time:
+            heapq.heappush(self._limited, (api_key.rate_limit_reset_time.timestamp(), version, api_key.id))
+
+    def refresh(self, api_key: APIKey):
+        """密钥状态被外部修改后重新入堆"""
+        with self.lock:
+            self._schedule(api_key)
+
+    def _is_current(self, key_id: str, version: int) -> bool:
+        return key_id in self._by_id and self._versions.get(key_id) == version
+
+    def release_expired_rate_limits(self, now: Optional[float] = None) -> bool:
+        """解除已到期的速率限制，返回是否有密钥恢复"""
+        now = time.time() if now is None else now
+        released = False
+        with self.lock:
+            while self._limited and self._limited[0][0] <= now:
+                _, version, key_id = heapq.heappop(self._limited)
+                if not self._is_current(key_id, version):
+                    continue
+                api_key = self._by_id[key_id]
+                api_key.status = APIStatus.ACTIVE
+                api_key.rate_limit_reset_time = None
+                self._schedule(api_key)
+                released = True
+                logger.info(f"API密钥 {api_key.id} 速率限制已解除")
+        return released
 
-class IntelligentAPIManager:
-    """智能API管理器"""
+    def _restore_degraded(self, exclude: frozenset = frozenset()) -> Optional[APIKey]:
+        """没有可用密钥时恢复列表中第一个降级密钥"""
+        for api_key in self.keys:
+            if api_key.status == APIStatus.DEGRADED and api_key.id not in exclude:
+                api_key.status = APIStatus.ACTIVE
+                logger.info(f"恢复降级密钥: {api_key.id}")
+                return api_key
+        return None
+
+    def acquire(self, track_in_flight: bool = False,
+                exclude: Optional[Iterable[str]] = None) -> Optional[APIKey]:
+        """
+        选取负载最低的可用密钥并更新使用记录
+
+        Args:
+            track_in_flight: 计入并发数（调用方须在请求结束后调用 release）
+            exclude: 不选取的密钥ID（例如本次请求已经试过的密钥）
+        """
+        exclude = frozenset(exclude or ())
+        with self.lock:
+            self.release_expired_rate_limits()
+
+            api_key = None
+            skipped = []
+            while self._ready:
+                *_, version, key_id = self._ready[0]
+                candidate = self._by_id.get(key_id)
+                if (self._is_current(key_id, version) and candidate.status == APIStatus.ACTIVE):
+                    if key_id not in exclude:
+                        api_key = candidate
+                        break
+                    # 被排除的有效条目暂时取出，选取结束后放回
+                    skipped.append(self._ready[0])
+                heapq.heappop(self._ready)
+            for entry in skipped:
+                heapq.heappush(self._ready, entry)
+
+            if api_key is None:
+                api_key = self._restore_degraded(exclude)
+                if api_key is None:
+                    return None
+
+            api_key.last_used = datetime.now()
+            api_key.usage_count += 1
+            if track_in_flight:
+                api_key.in_flight += 1
+            self._schedule(api_key)
+            return api_key
+
+    def release(self, key_id: str):
+        """请求结束，减少密钥并发数"""
+        with self.lock:
+            api_key = self._by_id.get(key_id)
+            if api_key is None or api_key.in_flight <= 0:
+                return
+            api_key.in_flight -= 1
+            self._schedule(api_key)
+
+    def mark_error(self, key_id: str, error_message: str) -> bool:
+        """记录密钥错误并按错误类型更新状态，返回密钥是否存在"""
+        with self.lock:
+            api_key = self._by_id.get(key_id)
+            if api_key is None:
+                return False
 
-    def __init__(self, config_file: str = "api_keys_config.json"):
+            api_key.error_count += 1
+
+            # 检查错误类型
+            error_lower = error_message.lower()
+            if any(keyword in error_lower for keyword in [
+                'rate limit', '429', 'too many requests', 'quota'
+            ]):
+                api_key.status = APIStatus.RATE_LIMITED
+                api_key.rate_limit_reset_time = datetime.now() + timedelta(hours=1)
+                logger.warning(f"API密钥 {key_id} 触发速率限制")
+
+            elif api_key.error_count >= 5:
+                api_key.status = APIStatus.FAILED
+                logger.error(f"API密钥 {key_id} 标记为失败 (错误次数: {api_key.error_count})")
+
+            elif api_key.error_count >= 2:
+                api_key.status = APIStatus.DEGRADED
+                logger.warning(f"API密钥 {key_id} 降级 (错误次数: {api_key.error_count})")
+
+            self._schedule(api_key)
+            return True
+
+class IntelligentAPIManager:
+    """智能API管理器（线程安全，使用记录批量延迟写盘）"""
+
+    def __init__(self, config_file: str = "api_keys_config.json", save_interval: float = 5.0):
+        """
+        Args:
+            config_file: 密钥配置文件
+            save_interval: 使用记录与状态变化的合并写盘间隔（秒），<= 0 表示每次变化立即写盘
+        """
         self.config_file = config_file
-        self.api_keys: Dict[str, APIKey] = {}
+        self.save_interval = save_interval
+        self.api_keys: Dict[str, List[APIKey]] = {}
         self.current_index: Dict[str, int] = {}
+        self._rings: Dict[str, KeyRing] = {}
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
         self.load_configuration()
+        atexit.register(self.flush)
+
+    def _rebuild_ring(self, provider: str):
+        """为提供商建立（或重建）密钥队列"""
+        ring = self._rings.get(provider)
+        if ring is None or ring.keys is not self.api_keys[provider]:
+            self._rings[provider] = KeyRing(provider, self.api_keys[provider])
+        else:
+            ring.rebuild()
+
+    def _mark_dirty(self):
+        """记录待写盘的变化，在 save_interval 内合并为一次写入"""
+        if self.save_interval <= 0:
+            self.save_configuration()
+            return
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_interval, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """立即写出尚未保存的变化"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save_configuration()
 
     def load_configuration(self):
         """加载API密钥配置"""
@@ -76,6 +280,7 @@ class IntelligentAPIManager:
                             metadata=key_data.get('metadata', {})
                         )
                         self.api_keys[provider].append(api_key)
+                    self._rebuild_ring(provider)
 
                 logger.info(f"从配置文件加载了 {sum(len(keys) for keys in self.api_keys.values())} 个API密钥")
             else:
@@ -110,6 +315,7 @@ class IntelligentAPIManager:
                     metadata={'source': 'environment'}
                 )
                 self.api_keys[provider].append(api_key)
+            self._rebuild_ring(provider)
 
         self.save_configuration()
 
@@ -145,128 +351,107 @@ class IntelligentAPIManager:
         return env_keys
 
     def save_configuration(self):
-        """保存配置到文件"""
-        try:
-            # 创建配置目录
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-
-            # 转换为可序列化的格式
-            config_data = {
-                'providers': {}
-            }
-
-            for provider, keys in self.api_keys.items():
-                config_data['providers'][provider] = []
-                for api_key in keys:
-                    config_data['providers'][provider].append({
-                        'id': api_key.id,
-                        'key': api_key.key,  # 在实际部署时应该加密
-                        'provider': api_key.provider,
-                        'status': api_key.status.value,
-                        'created_at': api_key.created_at.isoformat(),
-                        'last_used': api_key.last_used.isoformat() if api_key.last_used else None,
-                        'usage_count': api_key.usage_count,
-                        'error_count': api_key.error_count,
-                        'rate_limit_reset_time': api_key.rate_limit_reset_time.isoformat() if api_key.rate_limit_reset_time else None,
-                        'metadata': api_key.metadata or {}
-                    })
-
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
-
-            logger.info(f"配置已保存到: {self.config_file}")
-
-        except Exception as e:
-            logger.error(f"保存配置失败: {e}")
+        """保存配置到文件（先写临时文件再替换，避免并发读到半截文件）"""
+        with self._save_lock:
+            try:
+                with self._lock:
+                    self._dirty = False
+                    providers = list(self.api_keys.items())
+
+                # 转换为可序列化的格式
+                config_data = {
+                    'providers': {}
+                }
+
+                for provider, keys in providers:
+                    ring = self._rings.get(provider)
+                    with ring.lock if ring else nullcontext():
+                        config_data['providers'][provider] = [self._serialize_key(api_key) for api_key in keys]
+
+                # 创建配置目录
+                config_dir = os.path.dirname(self.config_file)
+                if config_dir:
+                    os.makedirs(config_dir, exist_ok=True)
+
+                tmp_file = f"{self.config_file}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(config_data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_file, self.config_file)
+
+                logger.debug(f"配置已保存到: {self.config_file}")
+
+            except Exception as e:
+                logger.error(f"保存配置失败: {e}")
+
+    @staticmethod
+    def _serialize_key(api_key: APIKey) -> Dict:
+        return {
+            'id': api_key.id,
+            'key': api_key.key,  # 在实际部署时应该加密
+            'provider': api_key.provider,
+            'status': api_key.status.value,
+            'created_at': api_key.created_at.isoformat(),
+            'last_used': api_key.last_used.isoformat() if api_key.last_used else None,
+            'usage_count': api_key.usage_count,
+            'error_count': api_key.error_count,
+            'rate_limit_reset_time': api_key.rate_limit_reset_time.isoformat() if api_key.rate_limit_reset_time else None,
+            'metadata': api_key.metadata or {}
+        }
 
-    def get_available_key(self, provider: str) -> Optional[APIKey]:
-        """获取可用的API密钥"""
-        if provider not in self.api_keys or not self.api_keys[provider]:
+    def get_available_key(self, provider: str, exclude: Optional[Iterable[str]] = None) -> Optional[APIKey]:
+        """获取可用的API密钥（使用次数最少、最久未用者优先；不计入并发数，请求期间占用请用 lease_key）"""
+        ring = self._rings.get(provider)
+        if ring is None or not ring.keys:
             logger.warning(f"未找到提供商 {provider} 的API密钥")
             return None
 
-        # 清理过期的速率限制
-        self._cleanup_expired_rate_limits(provider)
-
-        # 获取可用的密钥
-        available_keys = [
-            key for key in self.api_keys[provider]
-            if key.status == APIStatus.ACTIVE
-        ]
-
-        if not available_keys:
-            # 如果没有可用的密钥，尝试恢复降级的密钥
-            degraded_keys = [
-                key for key in self.api_keys[provider]
-                if key.status == APIStatus.DEGRADED
-            ]
-            if degraded_keys:
-                # 恢复第一个降级的密钥
-                degraded_keys[0].status = APIStatus.ACTIVE
-                available_keys = degraded_keys
-                logger.info(f"恢复降级密钥: {degraded_keys[0].id}")
-
-        if not available_keys:
+        selected_key = ring.acquire(exclude=exclude)
+        if selected_key is None:
             logger.error(f"提供商 {provider} 没有可用的API密钥")
             return None
 
-        # 选择使用次数最少的密钥（负载均衡）
-        selected_key = min(available_keys, key=lambda k: k.usage_count)
-
-        # 更新使用记录
-        selected_key.last_used = datetime.now()
-        selected_key.usage_count += 1
-
+        self._mark_dirty()
         return selected_key
 
+    @contextmanager
+    def lease_key(self, provider: str, exclude: Optional[Iterable[str]] = None) -> Iterator[Optional[APIKey]]:
+        """
+        在请求期间占用一个密钥并计入其并发数，优先选择并发数最低的密钥
+
+        Args:
+            provider: 提供商
+            exclude: 不选取的密钥ID（例如本次请求已经试过的密钥）
+
+        用法:
+            with manager.lease_key('openrouter') as api_key:
+                if api_key: ...
+        """
+        ring = self._rings.get(provider)
+        api_key = ring.acquire(track_in_flight=True, exclude=exclude) if ring is not None else None
+        if api_key is None and not exclude:
+            logger.error(f"提供商 {provider} 没有可用的API密钥")
+        else:
+            self._mark_dirty()
+        try:
+            yield api_key
+        finally:
+            if api_key is not None:
+                ring.release(api_key.id)
+
     def mark_key_error(self, provider: str, key_id: str, error_message: str):
         """标记密钥错误"""
-        if provider not in self.api_keys:
-            return
-
-        for api_key in self.api_keys[provider]:
-            if api_key.id == key_id:
-                api_key.error_count += 1
-
-                # 检查错误类型
-                error_lower = error_message.lower()
-                if any(keyword in error_lower for keyword in [
-                    'rate limit', '429', 'too many requests', 'quota'
-                ]):
-                    api_key.status = APIStatus.RATE_LIMITED
-                    api_key.rate_limit_reset_time = datetime.now() + timedelta(hours=1)
-                    logger.warning(f"API密钥 {key_id} 触发速率限制")
-
-                elif api_key.error_count >= 5:
-                    api_key.status = APIStatus.FAILED
-                    logger.error(f"API密钥 {key_id} 标记为失败 (错误次数: {api_key.error_count})")
-
-                elif api_key.error_count >= 2:
-                    api_key.status = APIStatus.DEGRADED
-                    logger.warning(f"API密钥 {key_id} 降级 (错误次数: {api_key.error_count})")
-
-                break
+        ring = self._rings.get(provider)
+        if ring is not None and ring.mark_error(key_id, error_message):
+            self._mark_dirty()
 
     def _cleanup_expired_rate_limits(self, provider: str):
         """清理过期的速率限制"""
-        if provider not in self.api_keys:
-            return
-
-        current_time = datetime.now()
-        for api_key in self.api_keys[provider]:
-            if (api_key.status == APIStatus.RATE_LIMITED and
-                api_key.rate_limit_reset_time and
-                current_time >= api_key.rate_limit_reset_time):
-                api_key.status = APIStatus.ACTIVE
-                api_key.rate_limit_reset_time = None
-                logger.info(f"API密钥 {api_key.id} 速率限制已解除")
+        ring = self._rings.get(provider)
+        if ring is not None and ring.release_expired_rate_limits():
+            self._mark_dirty()
 
     def add_api_key(self, provider: str, key: str, metadata: Dict = None) -> str:
         """添加新的API密钥"""
-        if provider not in self.api_keys:
-            self.api_keys[provider] = []
-            self.current_index[provider] = 0
-
         api_key = APIKey(
             id=f"{provider}_key_{int(time.time())}_{random.randint(1000, 9999)}",
             key=key,
@@ -276,7 +461,15 @@ class IntelligentAPIManager:
             metadata=metadata or {}
         )
 
-        self.api_keys[provider].append(api_key)
+        with self._lock:
+            if provider not in self.api_keys:
+                self.api_keys[provider] = []
+                self.current_index[provider] = 0
+                self._rebuild_ring(provider)
+            ring = self._rings[provider]
+            with ring.lock:
+                ring.keys.append(api_key)
+                ring.rebuild()
         self.save_configuration()
 
         logger.info(f"添加新API密钥: {api_key.id}")
@@ -284,16 +477,22 @@ class IntelligentAPIManager:
 
     def remove_api_key(self, provider: str, key_id: str) -> bool:
         """移除API密钥"""
-        if provider not in self.api_keys:
-            return False
-
-        original_count = len(self.api_keys[provider])
-        self.api_keys[provider] = [
-            key for key in self.api_keys[provider]
-            if key.id != key_id
-        ]
+        with self._lock:
+            ring = self._rings.get(provider)
+            if ring is None:
+                return False
 
-        if len(self.api_keys[provider]) < original_count:
+            with ring.lock:
+                original_count = len(ring.keys)
+                # 原地修改，KeyRing 与 api_keys 共享同一列表
+                ring.keys[:] = [key for key in ring.keys if key.id != key_id]
+                removed = len(ring.keys) < original_count
+                if removed:
+                    ring.rebuild()
+                    self.current_index[provider] = min(self.current_index.get(provider, 0),
+                                                       max(len(ring.keys) - 1, 0))
+
+        if removed:
             self.save_configuration()
             logger.info(f"移除API密钥: {key_id}")
             return True
@@ -306,19 +505,23 @@ class IntelligentAPIManager:
             logger.warning(f"提供商 {provider} 密钥数量不足，无法轮换")
             return False
 
-        # 将当前密钥状态降级，激活下一个密钥
-        current_index = self.current_index[provider]
-        current_key = self.api_keys[provider][current_index]
+        ring = self._rings[provider]
+        with ring.lock:
+            # 将当前密钥状态降级，激活下一个密钥
+            current_index = self.current_index[provider]
+            current_key = self.api_keys[provider][current_index]
 
-        # 标记当前密钥为降级
-        current_key.status = APIStatus.DEGRADED
-        current_key.error_count = 0  # 重置错误计数
+            # 标记当前密钥为降级
+            current_key.status = APIStatus.DEGRADED
+            current_key.error_count = 0  # 重置错误计数
+            ring.refresh(current_key)
 
-        # 切换到下一个密钥
-        next_index = (current_index + 1) % len(self.api_keys[provider])
-        self.current_index[provider] = next_index
-        next_key = self.api_keys[provider][next_index]
-        next_key.status = APIStatus.ACTIVE
+            # 切换到下一个密钥
+            next_index = (current_index + 1) % len(self.api_keys[provider])
+            self.current_index[provider] = next_index
+            next_key = self.api_keys[provider][next_index]
+            next_key.status = APIStatus.ACTIVE
+            ring.refresh(next_key)
 
         self.save_configuration()
 
@@ -332,31 +535,38 @@ class IntelligentAPIManager:
             'providers': {}
         }
 
-        for provider, keys in self.api_keys.items():
-            status_counts = {status.value: 0 for status in APIStatus}
-            total_usage = sum(key.usage_count for key in keys)
-            total_errors = sum(key.error_count for key in keys)
-
-            for key in keys:
-                status_counts[key.status.value] += 1
-
-            report['providers'][provider] = {
-                'total_keys': len(keys),
-                'status_distribution': status_counts,
-                'total_usage': total_usage,
-                'total_errors': total_errors,
-                'keys': [
-                    {
-                        'id': key.id,
-                        'status': key.status.value,
-                        'usage_count': key.usage_count,
-                        'error_count': key.error_count,
-                        'last_used': key.last_used.isoformat() if key.last_used else None,
-                        'created_at': key.created_at.isoformat()
-                    }
-                    for key in keys
-                ]
-            }
+        for provider, keys in list(self.api_keys.items()):
+            ring = self._rings.get(provider)
+            if ring is not None:
+                ring.release_expired_rate_limits()
+
+            with ring.lock if ring else nullcontext():
+                status_counts = {status.value: 0 for status in APIStatus}
+                total_usage = sum(key.usage_count for key in keys)
+                total_errors = sum(key.error_count for key in keys)
+
+                for key in keys:
+                    status_counts[key.status.value] += 1
+
+                report['providers'][provider] = {
+                    'total_keys': len(keys),
+                    'status_distribution': status_counts,
+                    'total_usage': total_usage,
+                    'total_errors': total_errors,
+                    'in_flight': sum(key.in_flight for key in keys),
+                    'keys': [
+                        {
+                            'id': key.id,
+                            'status': key.status.value,
+                            'usage_count': key.usage_count,
+                            'error_count': key.error_count,
+                            'in_flight': key.in_flight,
+                            'last_used': key.last_used.isoformat() if key.last_used else None,
+                            'created_at': key.created_at.isoformat()
+                        }
+                        for key in keys
+                    ]
+                }
 
         return report
 
@@ -6,24 +6,10 @@ from datetime import datetime
 from typing import Dict, List
 import argparse
 
-def get_role_mbti_type(role_name):
-    """获取角色对应的MBTI类型"""
-    # 角色到MBTI类型的映射字典
-    role_mbti_mapping = {
-        # A系列角色
-        'a1': 'ISTJ', 'a2': 'INFP', 'a3': 'INTJ', 'a4': 'ENTJ', 'a5': 'ESFP',
-        'a6': 'ENFP', 'a7': 'ESTP', 'a8': 'ISFP', 'a9': 'INFJ', 'a10': 'ENFJ',
-        # B系列角色
-        'b1': 'INFJ', 'b2': 'INTP', 'b3': 'ENTJ', 'b4': 'ENTP', 'b5': 'ISTJ',
-        'b6': 'ISFJ', 'b7': 'ESTJ', 'b8': 'ESFJ', 'b9': 'ESTP', 'b10': 'ISTP'
-    }
-    
-    # 处理英文版本角色文件
-    if role_name and '_en' in role_name:
-        base_role = role_name.replace('_en', '')
-        return role_mbti_mapping.get(base_role, 'Unknown')
-    
-    return role_mbti_mapping.get(role_name, 'Unknown')
+from results_warehouse import (
+    BIG5_COLUMNS, ResultsWarehouse, get_role_mbti_type,
+    extract_big_five_scores, parse_run_directory
+)
 
 def collect_analysis_results(analysis_reports_dir: str) -> List[Dict]:
     """收集所有分析结果文件"""
@@ -38,87 +24,101 @@ def collect_analysis_results(analysis_reports_dir: str) -> List[Dict]:
                     with open(file_path, 'r', encoding='utf-8') as f:
                         data = json.load(f)
                     
-                    # 提取关键信息
+                    # 提取关键信息，并从目录路径中解析测试条件
                     agent_info = data.get('agent_info', {})
-                    # 从目录名中提取测试条件信息
-                    dir_name = os.path.basename(root)
-                    
-                    # 解析目录名获取模型、角色等信息
-                    parts = dir_name.split('_')
-                    model_id = parts[0] if len(parts) > 0 else 'Unknown'
-                    role_name = parts[1] if len(parts) > 1 else 'default'
-                    
-                    # 尝试从目录名中查找更准确的角色信息
-                    for part in parts:
-                        if part.startswith('a') and part[1:].isdigit():
-                            role_name = part
-                            break
-                        elif part.startswith('b') and part[1:].isdigit():
-                            role_name = part
-                            break
-                    
-                    # 尝试从文件路径中提取更多测试条件信息
-                    # 例如：results/Interactive_Suite_20250826_175341/gemma3_latest_agent-big-five-50-complete2_b10_3i
-                    path_parts = root.split(os.sep)
-                    stress_level = 0
-                    temperature = 0.7  # 默认温度
-                    
-                    # 检查路径中是否包含压力信息
-                    for part in path_parts:
-                        if part.endswith('i') and part[:-1].isdigit():
-                            try:
-                                stress_level = int(part[:-1])
-                            except:
-                                pass
-                    
-                    # 检查目录名中是否包含温度信息
-                    for part in parts:
-                        if 'tmp' in part and part.replace('tmp', '').replace('.', '').isdigit():
-                            try:
-                                temperature = float(part.replace('tmp', ''))
-                            except:
-                                pass
+                    params = parse_run_directory(root)
+                    role_name = params['role_name']
                     
                     results.append({
                         'file_path': file_path,
-                        'model_id': agent_info.get('model', model_id),
+                        'model_id': agent_info.get('model', params['model_id']),
                         'test_name': agent_info.get('test_name', 'Unknown'),
                         'role_name': role_name,  # 使用从目录名解析出的角色名
                         'role_mbti_type': get_role_mbti_type(role_name),  # 使用从目录名解析出的角色名获取MBTI类型
                         'scores_data': data,
-                        'directory_name': dir_name,
-                        'stress_level': stress_level,
-                        'temperature': temperature
+                        'directory_name': params['directory_name'],
+                        'stress_level': params['stress_level'],
+                        'temperature': params['temperature']
                     })
                 except Exception as e:
                     print(f"Error loading {file_path}: {e}")
     
     return results
 
-def extract_big_five_scores(scores_data: Dict) -> Dict[str, float]:
-    """从评分数据中提取Big Five分数"""
-    try:
-        # 使用第一个评估器的平均分数
-        evaluator_names = list(scores_data["evaluator_scores"].keys())
-        if not evaluator_names:
-            return None
-            
-        evaluator_name = evaluator_names[0]
-        full_scores = scores_data["evaluator_scores"][evaluator_name]["average_scores"]
-        
-        # 转换为单字母键
-        converted_scores = {
-            "E": full_scores.get("Extraversion", 0),
-            "A": full_scores.get("Agreeableness", 0),
-            "C": full_scores.get("Conscientiousness", 0),
-            "N": full_scores.get("Neuroticism", 0),
-            "O": full_scores.get("Openness to Experience", 0)
+def results_to_frame(results) -> pd.DataFrame:
+    """
+    将结果列表转换为扁平DataFrame（Big Five分数展开为 E/A/C/N/O 列）
+    
+    已经是DataFrame（如来自结果仓库）时直接返回
+    """
+    if isinstance(results, pd.DataFrame):
+        return results
+    
+    rows = []
+    for result in results:
+        big_five_scores = extract_big_five_scores(result.get('scores_data', {})) or {}
+        row = {
+            'model_id': result.get('model_id'),
+            'test_name': result.get('test_name'),
+            'role_name': result.get('role_name'),
+            'role_mbti_type': result.get('role_mbti_type'),
+            'stress_level': result.get('stress_level', 0),
+            'temperature': result.get('temperature', 0.7)
         }
+        row.update({dim: big_five_scores.get(dim) for dim in BIG5_COLUMNS})
+        rows.append(row)
+    
+    columns = ['model_id', 'test_name', 'role_name', 'role_mbti_type', 'stress_level', 'temperature'] + BIG5_COLUMNS
+    return pd.DataFrame(rows, columns=columns)
+
+def _present(series: pd.Series) -> pd.Series:
+    """非空且非空字符串的掩码"""
+    return series.notna() & (series != '')
+
+def _scored_frame(results) -> pd.DataFrame:
+    """只保留成功提取Big Five分数的记录"""
+    df = results_to_frame(results)
+    return df.dropna(subset=BIG5_COLUMNS).astype({dim: float for dim in BIG5_COLUMNS})
+
+def _grouped_comparison(df: pd.DataFrame, group_keys: List[str], pivot: str,
+                        min_rows: int = 2, min_unique: int = 1, sort_pivot: bool = False) -> List[Dict]:
+    """
+    按 group_keys 分组、在组内按 pivot 求各维度平均分
+    
+    Args:
+        df: 已提取分数的扁平DataFrame
+        group_keys: 外层分组列
+        pivot: 组内对比的列（模型、温度、压力或角色）
+        min_rows: 组内最少记录数
+        min_unique: 组内 pivot 最少取值数
+        sort_pivot: 是否按 pivot 排序（否则按首次出现顺序）
         
-        return converted_scores
-    except Exception as e:
-        print(f"Error extracting Big Five scores: {e}")
-        return None
+    Returns:
+        每个分组一项: {**分组键, 'pivot_values': [...], 'scores': {pivot值: {维度: 平均分}}}
+    """
+    if df.empty:
+        return []
+    
+    keys = group_keys + [pivot]
+    grouped = df.groupby(group_keys)
+    eligible = (grouped[pivot].transform('size') >= min_rows) & (grouped[pivot].transform('nunique') >= min_unique)
+    df = df[eligible]
+    if df.empty:
+        return []
+    
+    means = df.groupby(keys, sort=sort_pivot)[BIG5_COLUMNS].mean()
+    
+    comparisons = []
+    for group_values, group_means in means.groupby(level=list(range(len(group_keys))), sort=True):
+        if not isinstance(group_values, tuple):
+            group_values = (group_values,)
+        pivot_means = group_means.droplevel(list(range(len(group_keys))))
+        comparisons.append({
+            **dict(zip(group_keys, group_values)),
+            'pivot_values': pivot_means.index.tolist(),
+            'scores': pivot_means.to_dict('index')
+        })
+    return comparisons
 
 def map_to_mbti(big_five_scores: Dict[str, float]) -> str:
     """将Big Five分数映射到MBTI类型"""
@@ -140,6 +140,14 @@ def map_to_mbti(big_five_scores: Dict[str, float]) -> str:
     
     return f"{ei}{sn}{tf}{jp}"
 
+def map_to_mbti_frame(df: pd.DataFrame) -> pd.Series:
+    """map_to_mbti 的向量化版本，缺少分数的记录为 'Unknown'"""
+    mbti = pd.Series(np.where(df['E'] >= 3, 'E', 'I'), index=df.index)
+    mbti = mbti + np.where(df['N'] >= 3, 'N', 'S')
+    mbti = mbti + np.where(df['A'] >= 3, 'F', 'T')
+    mbti = mbti + np.where(df['O'] >= 3, 'P', 'J')
+    return mbti.where(df[BIG5_COLUMNS].notna().all(axis=1), 'Unknown')
+
 def analyze_role_playing_ability(result_entry: Dict) -> Dict:
     """评估角色扮演能力"""
     role_mbti = result_entry.get('role_mbti_type')
@@ -164,254 +172,93 @@ def analyze_role_playing_ability(result_entry: Dict) -> Dict:
         'big_five_scores': big_five_scores
     }
 
-def compare_models_under_same_conditions(results: List[Dict]) -> pd.DataFrame:
+def compare_models_under_same_conditions(results) -> pd.DataFrame:
     """在相同条件下对比不同模型"""
-    # 提取标准化数据
-    standardized_results = []
-    for result in results:
-        scores_data = result.get('scores_data', {})
-        big_five_scores = extract_big_five_scores(scores_data)
-        if big_five_scores:
-            standardized_results.append({
-                'model_id': result.get('model_id'),
-                'test_name': result.get('test_name'),
-                'role_name': result.get('role_name'),
-                'role_mbti_type': result.get('role_mbti_type'),
-                'big_five_scores': big_five_scores,
-                'stress_level': result.get('stress_level', 0),
-                'temperature': result.get('temperature', 0.7)
-            })
-    
-    if not standardized_results:
-        return pd.DataFrame()
-    
-    # 转换为DataFrame便于分析
-    df = pd.DataFrame(standardized_results)
-    
-    # 按测试和角色分组，比较不同模型的表现
-    grouped = df.groupby(['test_name', 'role_name'])
-    
-    comparison_results = []
-    for (test, role), group in grouped:
-        if len(group) > 1:  # 只有当有多个模型时才进行对比
-            # 计算每个模型的平均分数
-            model_scores = {}
-            for _, row in group.iterrows():
-                model_id = row['model_id']
-                scores = row['big_five_scores']
-                if model_id not in model_scores:
-                    model_scores[model_id] = []
-                model_scores[model_id].append(scores)
-            
-            # 计算平均值
-            avg_scores = {}
-            for model_id, scores_list in model_scores.items():
-                avg_scores[model_id] = {
-                    dim: sum(s[dim] for s in scores_list) / len(scores_list)
-                    for dim in ['E', 'A', 'C', 'N', 'O']
-                }
-            
-            comparison_results.append({
-                'test_name': test,
-                'role_name': role,
-                'models': list(avg_scores.keys()),
-                'scores': avg_scores
-            })
+    df = _scored_frame(results)
+    
+    # 按测试和角色分组，比较不同模型的表现（只有当有多个模型结果时才进行对比）
+    comparison_results = [
+        {
+            'test_name': item['test_name'],
+            'role_name': item['role_name'],
+            'models': item['pivot_values'],
+            'scores': item['scores']
+        }
+        for item in _grouped_comparison(df, ['test_name', 'role_name'], 'model_id', min_rows=2)
+    ]
     
     return pd.DataFrame(comparison_results)
 
-def compare_temperature_effects(results: List[Dict]) -> pd.DataFrame:
+def compare_temperature_effects(results) -> pd.DataFrame:
     """分析不同温度设置对模型表现的影响"""
-    # 提取标准化数据
-    standardized_results = []
-    for result in results:
-        scores_data = result.get('scores_data', {})
-        big_five_scores = extract_big_five_scores(scores_data)
-        if big_five_scores:
-            standardized_results.append({
-                'model_id': result.get('model_id'),
-                'test_name': result.get('test_name'),
-                'role_name': result.get('role_name'),
-                'big_five_scores': big_five_scores,
-                'temperature': result.get('temperature', 0.7)
-            })
-    
-    if not standardized_results:
-        return pd.DataFrame()
-    
-    # 转换为DataFrame便于分析
-    df = pd.DataFrame(standardized_results)
-    
-    # 按模型、测试和角色分组，比较不同温度下的表现
-    grouped = df.groupby(['model_id', 'test_name', 'role_name'])
-    
-    temp_comparison_results = []
-    for (model, test, role), group in grouped:
-        # 按温度排序
-        group_sorted = group.sort_values('temperature')
-        if len(group_sorted) > 1:  # 只有当有多个温度设置时才进行对比
-            # 计算每个温度下的平均分数
-            temp_scores = {}
-            for _, row in group_sorted.iterrows():
-                temp = row['temperature']
-                scores = row['big_five_scores']
-                if temp not in temp_scores:
-                    temp_scores[temp] = []
-                temp_scores[temp].append(scores)
-            
-            # 计算平均值
-            avg_temp_scores = {}
-            for temp, scores_list in temp_scores.items():
-                avg_temp_scores[temp] = {
-                    dim: sum(s[dim] for s in scores_list) / len(scores_list)
-                    for dim in ['E', 'A', 'C', 'N', 'O']
-                }
-            
-            temp_comparison_results.append({
-                'model_id': model,
-                'test_name': test,
-                'role_name': role,
-                'temperatures': list(avg_temp_scores.keys()),
-                'scores': avg_temp_scores
-            })
+    df = _scored_frame(results)
+    
+    # 按模型、测试和角色分组，按温度排序比较不同温度下的表现
+    temp_comparison_results = [
+        {
+            'model_id': item['model_id'],
+            'test_name': item['test_name'],
+            'role_name': item['role_name'],
+            'temperatures': item['pivot_values'],
+            'scores': item['scores']
+        }
+        for item in _grouped_comparison(df, ['model_id', 'test_name', 'role_name'], 'temperature',
+                                        min_rows=2, sort_pivot=True)
+    ]
     
     return pd.DataFrame(temp_comparison_results)
 
-def compare_stress_effects(results: List[Dict]) -> pd.DataFrame:
+def compare_stress_effects(results) -> pd.DataFrame:
     """分析不同压力参数对模型表现的影响"""
-    # 提取标准化数据
-    standardized_results = []
-    for result in results:
-        scores_data = result.get('scores_data', {})
-        big_five_scores = extract_big_five_scores(scores_data)
-        if big_five_scores:
-            standardized_results.append({
-                'model_id': result.get('model_id'),
-                'test_name': result.get('test_name'),
-                'role_name': result.get('role_name'),
-                'big_five_scores': big_five_scores,
-                'stress_level': result.get('stress_level', 0)
-            })
-    
-    if not standardized_results:
-        return pd.DataFrame()
-    
-    # 转换为DataFrame便于分析
-    df = pd.DataFrame(standardized_results)
+    df = _scored_frame(results)
     
     # 按模型、测试和角色分组，比较不同压力参数下的表现
-    grouped = df.groupby(['model_id', 'test_name', 'role_name'])
-    
-    stress_comparison_results = []
-    for (model, test, role), group in grouped:
-        # 检查是否有不同的压力设置
-        if len(group['stress_level'].unique()) > 1:
-            # 计算每个压力水平下的平均分数
-            stress_scores = {}
-            for _, row in group.iterrows():
-                stress_level = row['stress_level']
-                scores = row['big_five_scores']
-                if stress_level not in stress_scores:
-                    stress_scores[stress_level] = []
-                stress_scores[stress_level].append(scores)
-            
-            # 计算平均值
-            avg_stress_scores = {}
-            for stress_level, scores_list in stress_scores.items():
-                avg_stress_scores[stress_level] = {
-                    dim: sum(s[dim] for s in scores_list) / len(scores_list)
-                    for dim in ['E', 'A', 'C', 'N', 'O']
-                }
-            
-            stress_comparison_results.append({
-                'model_id': model,
-                'test_name': test,
-                'role_name': role,
-                'stress_levels': list(avg_stress_scores.keys()),
-                'scores': avg_stress_scores
-            })
+    stress_comparison_results = [
+        {
+            'model_id': item['model_id'],
+            'test_name': item['test_name'],
+            'role_name': item['role_name'],
+            'stress_levels': item['pivot_values'],
+            'scores': item['scores']
+        }
+        for item in _grouped_comparison(df, ['model_id', 'test_name', 'role_name'], 'stress_level',
+                                        min_rows=1, min_unique=2)
+    ]
     
     return pd.DataFrame(stress_comparison_results)
 
-def compare_role_effects(results: List[Dict]) -> pd.DataFrame:
+def compare_role_effects(results) -> pd.DataFrame:
     """分析不同角色对模型表现的影响"""
-    # 提取标准化数据
-    standardized_results = []
-    for result in results:
-        scores_data = result.get('scores_data', {})
-        big_five_scores = extract_big_five_scores(scores_data)
-        if big_five_scores:
-            standardized_results.append({
-                'model_id': result.get('model_id'),
-                'test_name': result.get('test_name'),
-                'role_name': result.get('role_name'),
-                'role_mbti_type': result.get('role_mbti_type'),
-                'big_five_scores': big_five_scores
-            })
-    
-    if not standardized_results:
-        return pd.DataFrame()
-    
-    # 转换为DataFrame便于分析
-    df = pd.DataFrame(standardized_results)
+    df = _scored_frame(results)
     
     # 按模型和测试分组，比较不同角色下的表现
-    grouped = df.groupby(['model_id', 'test_name'])
-    
-    role_comparison_results = []
-    for (model, test), group in grouped:
-        # 检查是否有不同的角色
-        if len(group['role_name'].unique()) > 1:
-            # 计算每个角色的平均分数
-            role_scores = {}
-            for _, row in group.iterrows():
-                role_name = row['role_name']
-                scores = row['big_five_scores']
-                if role_name not in role_scores:
-                    role_scores[role_name] = []
-                role_scores[role_name].append(scores)
-            
-            # 计算平均值
-            avg_role_scores = {}
-            for role_name, scores_list in role_scores.items():
-                avg_role_scores[role_name] = {
-                    dim: sum(s[dim] for s in scores_list) / len(scores_list)
-                    for dim in ['E', 'A', 'C', 'N', 'O']
-                }
-            
-            role_comparison_results.append({
-                'model_id': model,
-                'test_name': test,
-                'roles': list(avg_role_scores.keys()),
-                'scores': avg_role_scores
-            })
+    role_comparison_results = [
+        {
+            'model_id': item['model_id'],
+            'test_name': item['test_name'],
+            'roles': item['pivot_values'],
+            'scores': item['scores']
+        }
+        for item in _grouped_comparison(df, ['model_id', 'test_name'], 'role_name',
+                                        min_rows=1, min_unique=2)
+    ]
     
     return pd.DataFrame(role_comparison_results)
 
-def generate_summary_statistics(results: List[Dict]) -> str:
+def generate_summary_statistics(results) -> str:
     """生成汇总统计"""
-    if not results:
+    df = results_to_frame(results)
+    if df.empty:
         return "No results available."
     
-    # 模型统计
-    models = [r['model_id'] for r in results if r['model_id']]
-    model_counts = pd.Series(models).value_counts()
+    # 模型、角色、角色MBTI类型统计（忽略空值）
+    model_counts = df['model_id'][_present(df['model_id'])].value_counts()
+    role_counts = df['role_name'][_present(df['role_name'])].value_counts()
+    mbti_counts = df['role_mbti_type'][_present(df['role_mbti_type'])].value_counts()
     
-    # 角色统计
-    roles = [r['role_name'] for r in results if r['role_name']]
-    role_counts = pd.Series(roles).value_counts()
-    
-    # 角色MBTI类型统计
-    mbti_types = [r['role_mbti_type'] for r in results if r['role_mbti_type']]
-    mbti_counts = pd.Series(mbti_types).value_counts()
-    
-    # 温度设置统计
-    temperatures = [r['temperature'] for r in results if 'temperature' in r]
-    temp_counts = pd.Series(temperatures).value_counts()
-    
-    # 压力水平统计
-    stress_levels = [r['stress_level'] for r in results if 'stress_level' in r]
-    stress_counts = pd.Series(stress_levels).value_counts()
+    # 温度设置与压力水平统计
+    temp_counts = df['temperature'].value_counts()
+    stress_counts = df['stress_level'].value_counts()
     
     stats = f"""
 ### 模型使用统计
@@ -432,34 +279,36 @@ def generate_summary_statistics(results: List[Dict]) -> str:
     
     return stats
 
-def analyze_role_playing_abilities(results: List[Dict]) -> str:
+def analyze_role_playing_abilities(results) -> str:
     """分析角色扮演能力"""
-    role_stats = {}
-    
-    for result in results:
-        role_name = result.get('role_name')
-        if not role_name:
-            continue
-            
-        # 评估角色扮演能力
-        ability_result = analyze_role_playing_ability(result)
-        ability = ability_result['ability']
-        
-        if role_name not in role_stats:
-            role_stats[role_name] = {'Successful': 0, 'Failed': 0, 'Unknown': 0}
-        role_stats[role_name][ability] += 1
+    df = results_to_frame(results)
+    df = df[_present(df['role_name'])]
+    if df.empty:
+        return "### 角色扮演能力统计\n"
+    
+    # 评估角色扮演能力：设定角色与分析得出的MBTI类型是否一致
+    played_mbti = map_to_mbti_frame(df)
+    unknown = df['role_mbti_type'].isna() | (df['role_mbti_type'] == 'Unknown') | (played_mbti == 'Unknown')
+    ability = pd.Series(np.select([unknown, df['role_mbti_type'] == played_mbti],
+                                  ['Unknown', 'Successful'], default='Failed'), index=df.index)
+    role_stats = pd.crosstab(df['role_name'], ability).reindex(
+        index=df['role_name'].unique(), columns=['Successful', 'Failed', 'Unknown'], fill_value=0
+    )
     
     # 生成统计报告
     report = "### 角色扮演能力统计\n"
-    for role, stats in role_stats.items():
-        total = sum(stats.values())
+    for role, stats in role_stats.iterrows():
+        total = int(stats.sum())
         success_rate = (stats['Successful'] / total * 100) if total > 0 else 0
         report += f"- {role}: 成功率 {success_rate:.1f}% ({stats['Successful']}/{total})\n"
     
     return report
 
-def generate_comprehensive_report(results: List[Dict], output_dir: str):
+def generate_comprehensive_report(results, output_dir: str):
     """生成综合分析报告"""
+    # 统一转换为扁平DataFrame，后续分析均为分组向量化运算
+    results = results_to_frame(results)
+    
     # 创建报告目录
     report_dir = os.path.join(output_dir, f"comprehensive_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
     os.makedirs(report_dir, exist_ok=True)
@@ -482,7 +331,7 @@ def generate_comprehensive_report(results: List[Dict], output_dir: str):
 
 ## 概述
 - 总测试数量: {len(results)}
-- 涉及模型数量: {len(set(r['model_id'] for r in results if r['model_id']))}
+- 涉及模型数量: {results['model_id'][_present(results['model_id'])].nunique()}
 - 分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ## 模型对比分析
@@ -506,8 +355,11 @@ def generate_comprehensive_report(results: List[Dict], output_dir: str):
     print(f"综合分析报告已保存到: {report_path}")
     return report_path
 
-def generate_batch_analysis_report(results: List[Dict], output_dir: str):
+def generate_batch_analysis_report(results, output_dir: str):
     """生成批量分析报告"""
+    # 统一转换为扁平DataFrame，后续分析均为分组向量化运算
+    results = results_to_frame(results)
+    
     # 创建报告目录
     report_dir = os.path.join(output_dir, f"batch_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
     os.makedirs(report_dir, exist_ok=True)
@@ -536,7 +388,7 @@ def generate_batch_analysis_report(results: List[Dict], output_dir: str):
 
 ## 概述
 - 总测试数量: {len(results)}
-- 涉及模型数量: {len(set(r['model_id'] for r in results if r['model_id']))}
+- 涉及模型数量: {results['model_id'][_present(results['model_id'])].nunique()}
 - 分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ## 汇总统计
@@ -576,13 +428,26 @@ def main():
                        help='分析报告目录')
     parser.add_argument('--output-dir', type=str, default='analysis_reports', 
                        help='分析报告输出目录')
+    parser.add_argument('--warehouse', type=str, default=None,
+                       help='结果仓库SQLite文件（默认: <analysis-reports-dir>/results_warehouse.sqlite）')
+    parser.add_argument('--full-scan', action='store_true',
+                       help='不使用结果仓库，每次重新遍历并解析全部 scores.json')
     
     args = parser.parse_args()
     
-    # 收集分析结果
-    results = collect_analysis_results(args.analysis_reports_dir)
-    
-    if not results:
+    if args.full_scan:
+        # 收集分析结果
+        results = collect_analysis_results(args.analysis_reports_dir)
+    else:
+        # 增量导入新结果，再从仓库读取列式数据
+        warehouse_path = args.warehouse or os.path.join(args.analysis_reports_dir, 'results_warehouse.sqlite')
+        with ResultsWarehouse(warehouse_path) as warehouse:
+            ingest_stats = warehouse.ingest(args.analysis_reports_dir)
+            print(f"结果仓库已更新: 新增 {ingest_stats['added']}, 更新 {ingest_stats['updated']}, "
+                  f"未变化 {ingest_stats['unchanged']}, 移除 {ingest_stats['removed']}, 失败 {ingest_stats['failed']}")
+            results = warehouse.load_frame(kind='scores', root=args.analysis_reports_dir)
+    
+    if len(results) == 0:
         print("未找到分析结果文件")
         return
     
@@ -591,4 +456,4 @@ def main():
     print(f"分析完成，报告已生成: {report_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,3 +1,24 @@
+try:
+    from llm_assessment.services.model_metadata import (
+        get_metadata_service, normalize_ollama_model, served_context_length
+    )
+except ImportError:
+    from services.model_metadata import get_metadata_service, normalize_ollama_model, served_context_length
+
+
+# Fallback context windows used when Ollama cannot describe the model (cloud models, server offline)
+MODEL_CONTEXT_DEFAULTS = {
+    'gemma': 8192,
+    'gemma3': 8192,
+    'llama3': 8192,
+    'mixtral': 32768,
+    'phi': 4096,
+    'mistral': 32768,
+    'qwen': 32768,
+    'qwen3': 32768,
+}
+
+
 def parse_tmpr_and_context_args(args):
     """
     Parse tmpr and context length arguments from CLI.
@@ -46,7 +67,9 @@ def apply_model_settings(client, tmpr=None, context_length=None):
 def get_model_max_context_length(model_id):
     """
     Get the maximum context length for a given model.
-    This is a placeholder that would need to be implemented based on model info.
+    Local models are looked up via Ollama's /api/show (cached on disk with a TTL) and capped
+    at the window Ollama actually serves; otherwise the model name is matched against
+    MODEL_CONTEXT_DEFAULTS.
     
     Args:
         model_id (str): Model identifier
@@ -54,28 +77,38 @@ def get_model_max_context_length(model_id):
     Returns:
         int: Maximum context length in tokens, or None if unknown
     """
-    # This would need to be implemented based on actual model information
-    # For now, we'll return some common defaults based on model name
-    model_defaults = {
-        'gemma': 8192,
-        'gemma3': 8192,
-        'llama3': 8192,
-        'mixtral': 32768,
-        'phi': 4096,
-        'mistral': 32768,
-        'qwen': 32768,
-        'qwen3': 32768,
-    }
-    
+    if not model_id:
+        return None
+
+    context_length = get_metadata_service().get_context_length(model_id)
+    if context_length:
+        return context_length
+
     # Try to match model name
-    for model_prefix, max_context in model_defaults.items():
+    for model_prefix, max_context in MODEL_CONTEXT_DEFAULTS.items():
         if model_prefix in model_id.lower():
+            if normalize_ollama_model(model_id) is not None:
+                # Served by local Ollama without num_ctx in the request
+                return min(max_context, served_context_length())
             return max_context
     
     # For unknown models, return None to indicate we don't know the context length
     return None
 
 
+def get_model_metadata(model_id):
+    """
+    Get cached model metadata (context length, parameter size, quantization level).
+    
+    Args:
+        model_id (str): Model identifier
+        
+    Returns:
+        dict: Metadata dictionary, or None if the model cannot be described
+    """
+    return get_metadata_service().get(model_id)
+
+
 def calculate_dynamic_context_length(model_id, dynamic_setting):
     """
     Calculate dynamic context length based on model's maximum context length.
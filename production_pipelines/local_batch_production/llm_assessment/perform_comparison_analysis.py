@@ -9,49 +9,88 @@ import os
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
 
+TRAIT_COLUMNS = [
+    'Extraversion', 'Agreeableness', 'Conscientiousness',
+    'Neuroticism', 'Openness_to_Experience'
+]
+RESULT_DIMENSIONS = ['extraversion', 'agreeableness', 'conscientiousness', 'neuroticism', 'openness']
+
+# 结果仓库列名到CSV列名的映射
+WAREHOUSE_COLUMN_MAPPING = {
+    'model_id': 'Model',
+    'role_name': 'Role',
+    'stress_level': 'Interference_Level',
+    'E': 'Extraversion',
+    'A': 'Agreeableness',
+    'C': 'Conscientiousness',
+    'N': 'Neuroticism',
+    'O': 'Openness_to_Experience'
+}
+
 def load_data(csv_path):
     """加载评分数据"""
     df = pd.read_csv(csv_path)
     return df
 
+def load_warehouse_data(db_path, root=None):
+    """从结果仓库加载评分数据，列名与CSV保持一致"""
+    from results_warehouse import ResultsWarehouse
+
+    with ResultsWarehouse(db_path) as warehouse:
+        df = warehouse.load_frame(kind='scores', root=root)
+    return df.rename(columns=WAREHOUSE_COLUMN_MAPPING)[list(WAREHOUSE_COLUMN_MAPPING.values())]
+
+def grouped_trait_stats(df, outer_keys, inner_key, min_rows=1, min_unique=1):
+    """
+    一次分组计算所有 (外层分组, 内层取值) 的均值和标准差
+
+    Args:
+        outer_keys: 外层分组列，例如 ['Model', 'Role']
+        inner_key: 外层分组内对比的列，例如 'Interference_Level'
+        min_rows: 外层分组的最少记录数
+        min_unique: 外层分组内 inner_key 的最少不同取值数
+
+    Yields:
+        (外层分组键, 内层取值列表, 均值DataFrame, 标准差DataFrame)
+    """
+    stats = df.groupby(outer_keys + [inner_key])[TRAIT_COLUMNS].agg(['mean', 'std'])
+    outer_groups = df.groupby(outer_keys)
+    sizes = outer_groups.size()
+    uniques = outer_groups[inner_key].nunique()
+    selected = set(sizes.index[(sizes >= min_rows) & (uniques >= min_unique)])
+
+    outer_levels = list(range(len(outer_keys)))
+    for outer, block in stats.groupby(level=outer_levels, sort=True):
+        if outer not in selected:
+            continue
+        block = block.droplevel(outer_levels)
+        yield outer, block.index.tolist(), block.xs('mean', axis=1, level=1), block.xs('std', axis=1, level=1)
+
+def _trait_lists(avg, std):
+    """将均值/标准差表展开为 <维度>_avg / <维度>_std 列表"""
+    result = {}
+    for dim, column in zip(RESULT_DIMENSIONS, TRAIT_COLUMNS):
+        result[f'{dim}_avg'] = avg[column].tolist()
+    for dim, column in zip(RESULT_DIMENSIONS, TRAIT_COLUMNS):
+        result[f'{dim}_std'] = std[column].tolist()
+    return result
+
 def analysis_1_same_model_same_role_different_stress(df):
     """同模型同角色不同压力等级的对比分析"""
     print("=== 分析1: 同模型同角色不同压力等级的对比分析 ===")
     
-    # 按模型和角色分组，查看不同压力等级下的表现
-    grouped = df.groupby(['Model', 'Role'])
-    
+    # 按模型和角色分组，一次性计算各压力等级下的均值和标准差
     analysis_results = []
     
-    for (model, role), group in grouped:
-        if len(group) > 1:  # 只分析有多个压力等级的数据
-            # 计算每个压力等级下的平均分
-            stress_avg = group.groupby('Interference_Level')[[
-                'Extraversion', 'Agreeableness', 'Conscientiousness', 
-                'Neuroticism', 'Openness_to_Experience'
-            ]].mean()
-            
-            # 计算标准差
-            stress_std = group.groupby('Interference_Level')[[
-                'Extraversion', 'Agreeableness', 'Conscientiousness', 
-                'Neuroticism', 'Openness_to_Experience'
-            ]].std()
-            
-            analysis_results.append({
-                'model': model,
-                'role': role,
-                'stress_levels': stress_avg.index.tolist(),
-                'extraversion_avg': stress_avg['Extraversion'].tolist(),
-                'agreeableness_avg': stress_avg['Agreeableness'].tolist(),
-                'conscientiousness_avg': stress_avg['Conscientiousness'].tolist(),
-                'neuroticism_avg': stress_avg['Neuroticism'].tolist(),
-                'openness_avg': stress_avg['Openness_to_Experience'].tolist(),
-                'extraversion_std': stress_std['Extraversion'].tolist(),
-                'agreeableness_std': stress_std['Agreeableness'].tolist(),
-                'conscientiousness_std': stress_std['Conscientiousness'].tolist(),
-                'neuroticism_std': stress_std['Neuroticism'].tolist(),
-                'openness_std': stress_std['Openness_to_Experience'].tolist()
-            })
+    # 只分析有多个压力等级的数据
+    for (model, role), levels, stress_avg, stress_std in grouped_trait_stats(
+            df, ['Model', 'Role'], 'Interference_Level', min_rows=2):
+        analysis_results.append({
+            'model': model,
+            'role': role,
+            'stress_levels': levels,
+            **_trait_lists(stress_avg, stress_std)
+        })
     
     # 生成分析报告
     report = "# 分析1: 同模型同角色不同压力等级的对比分析\n\n"
@@ -110,40 +149,18 @@ def analysis_2_same_model_different_roles_same_stress(df):
     """同模型不同角色同压力等级的对比分析"""
     print("=== 分析2: 同模型不同角色同压力等级的对比分析 ===")
     
-    # 按模型和压力等级分组，查看不同角色下的表现
-    grouped = df.groupby(['Model', 'Interference_Level'])
-    
+    # 按模型和压力等级分组，一次性计算各角色下的均值和标准差
     analysis_results = []
     
-    for (model, stress_level), group in grouped:
-        if len(group['Role'].unique()) > 1:  # 只分析有多个角色的数据
-            # 计算每个角色下的平均分
-            role_avg = group.groupby('Role')[[
-                'Extraversion', 'Agreeableness', 'Conscientiousness', 
-                'Neuroticism', 'Openness_to_Experience'
-            ]].mean()
-            
-            # 计算标准差
-            role_std = group.groupby('Role')[[
-                'Extraversion', 'Agreeableness', 'Conscientiousness', 
-                'Neuroticism', 'Openness_to_Experience'
-            ]].std()
-            
-            analysis_results.append({
-                'model': model,
-                'stress_level': stress_level,
-                'roles': role_avg.index.tolist(),
-                'extraversion_avg': role_avg['Extraversion'].tolist(),
-                'agreeableness_avg': role_avg['Agreeableness'].tolist(),
-                'conscientiousness_avg': role_avg['Conscientiousness'].tolist(),
-                'neuroticism_avg': role_avg['Neuroticism'].tolist(),
-                'openness_avg': role_avg['Openness_to_Experience'].tolist(),
-                'extraversion_std': role_std['Extraversion'].tolist(),
-                'agreeableness_std': role_std['Agreeableness'].tolist(),
-                'conscientiousness_std': role_std['Conscientiousness'].tolist(),
-                'neuroticism_std': role_std['Neuroticism'].tolist(),
-                'openness_std': role_std['Openness_to_Experience'].tolist()
-            })
+    # 只分析有多个角色的数据
+    for (model, stress_level), roles, role_avg, role_std in grouped_trait_stats(
+            df, ['Model', 'Interference_Level'], 'Role', min_unique=2):
+        analysis_results.append({
+            'model': model,
+            'stress_level': stress_level,
+            'roles': roles,
+            **_trait_lists(role_avg, role_std)
+        })
     
     # 生成分析报告
     report = "# 分析2: 同模型不同角色同压力等级的对比分析\n\n"
@@ -192,40 +209,18 @@ def analysis_3_different_models_same_role_same_stress(df):
     """不同模型同角色同压力等级的对比分析"""
     print("=== 分析3: 不同模型同角色同压力等级的对比分析 ===")
     
-    # 按角色和压力等级分组，查看不同模型下的表现
-    grouped = df.groupby(['Role', 'Interference_Level'])
-    
+    # 按角色和压力等级分组，一次性计算各模型下的均值和标准差
     analysis_results = []
     
-    for (role, stress_level), group in grouped:
-        if len(group['Model'].unique()) > 1:  # 只分析有多个模型的数据
-            # 计算每个模型下的平均分
-            model_avg = group.groupby('Model')[[
-                'Extraversion', 'Agreeableness', 'Conscientiousness', 
-                'Neuroticism', 'Openness_to_Experience'
-            ]].mean()
-            
-            # 计算标准差
-            model_std = group.groupby('Model')[[
-                'Extraversion', 'Agreeableness', 'Conscientiousness', 
-                'Neuroticism', 'Openness_to_Experience'
-            ]].std()
-            
-            analysis_results.append({
-                'role': role,
-                'stress_level': stress_level,
-                'models': model_avg.index.tolist(),
-                'extraversion_avg': model_avg['Extraversion'].tolist(),
-                'agreeableness_avg': model_avg['Agreeableness'].tolist(),
-                'conscientiousness_avg': model_avg['Conscientiousness'].tolist(),
-                'neuroticism_avg': model_avg['Neuroticism'].tolist(),
-                'openness_avg': model_avg['Openness_to_Experience'].tolist(),
-                'extraversion_std': model_std['Extraversion'].tolist(),
-                'agreeableness_std': model_std['Agreeableness'].tolist(),
-                'conscientiousness_std': model_std['Conscientiousness'].tolist(),
-                'neuroticism_std': model_std['Neuroticism'].tolist(),
-                'openness_std': model_std['Openness_to_Experience'].tolist()
-            })
+    # 只分析有多个模型的数据
+    for (role, stress_level), models, model_avg, model_std in grouped_trait_stats(
+            df, ['Role', 'Interference_Level'], 'Model', min_unique=2):
+        analysis_results.append({
+            'role': role,
+            'stress_level': stress_level,
+            'models': models,
+            **_trait_lists(model_avg, model_std)
+        })
     
     # 生成分析报告
     report = "# 分析3: 不同模型同角色同压力等级的对比分析\n\n"
@@ -343,9 +338,19 @@ def generate_visualizations(df):
     print(f"图表已保存到: {viz_dir}")
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='大五人格测试三类对比分析')
+    parser.add_argument('--csv', default="/home/user1/xbots/psy/big5_summary_scores.csv",
+                        help='评分汇总CSV路径')
+    parser.add_argument('--warehouse', help='结果仓库SQLite路径（指定后代替CSV）')
+    args = parser.parse_args()
+
     # 加载数据
-    csv_path = "/home/user1/xbots/psy/big5_summary_scores.csv"
-    df = load_data(csv_path)
+    if args.warehouse:
+        df = load_warehouse_data(args.warehouse)
+    else:
+        df = load_data(args.csv)
     
     print(f"数据加载完成，共 {len(df)} 条记录")
     print(f"包含 {len(df['Model'].unique())} 个模型")
@@ -0,0 +1,320 @@
+"""
+结果数据仓库
+将 scores.json 分析结果与 asses_*.json 测评结果增量导入SQLite列式表，
+运行参数（模型、角色、压力、温度等）解析为强类型列，
+对比分析直接在表上做分组向量化查询，无需每次重新遍历和解析全部文件
+"""
+
+import os
+import json
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Big Five 单字母列名
+BIG5_COLUMNS = ['E', 'A', 'C', 'N', 'O']
+
+# 角色到MBTI类型的映射字典
+ROLE_MBTI_MAPPING = {
+    # A系列角色
+    'a1': 'ISTJ', 'a2': 'INFP', 'a3': 'INTJ', 'a4': 'ENTJ', 'a5': 'ESFP',
+    'a6': 'ENFP', 'a7': 'ESTP', 'a8': 'ISFP', 'a9': 'INFJ', 'a10': 'ENFJ',
+    # B系列角色
+    'b1': 'INFJ', 'b2': 'INTP', 'b3': 'ENTJ', 'b4': 'ENTP', 'b5': 'ISTJ',
+    'b6': 'ISFJ', 'b7': 'ESTJ', 'b8': 'ESFJ', 'b9': 'ESTP', 'b10': 'ISTP'
+}
+
+DEFAULT_TEMPERATURE = 0.7
+
+RUN_COLUMNS = [
+    ('path', 'TEXT PRIMARY KEY'),
+    ('kind', 'TEXT NOT NULL'),
+    ('mtime', 'REAL NOT NULL'),
+    ('size', 'INTEGER NOT NULL'),
+    ('directory_name', 'TEXT'),
+    ('model_id', 'TEXT'),
+    ('test_name', 'TEXT'),
+    ('role_name', 'TEXT'),
+    ('role_mbti_type', 'TEXT'),
+    ('stress_level', 'INTEGER'),
+    ('temperature', 'REAL'),
+    ('cognitive_trap', 'TEXT'),
+    ('context_load_tokens', 'INTEGER'),
+    ('assessment_status', 'TEXT'),
+    ('question_count', 'INTEGER'),
+    ('E', 'REAL'),
+    ('A', 'REAL'),
+    ('C', 'REAL'),
+    ('N', 'REAL'),
+    ('O', 'REAL'),
+]
+
+
+def get_role_mbti_type(role_name):
+    """获取角色对应的MBTI类型"""
+    # 处理英文版本角色文件
+    if role_name and '_en' in role_name:
+        base_role = role_name.replace('_en', '')
+        return ROLE_MBTI_MAPPING.get(base_role, 'Unknown')
+
+    return ROLE_MBTI_MAPPING.get(role_name, 'Unknown')
+
+
+def extract_big_five_scores(scores_data: Dict) -> Optional[Dict[str, float]]:
+    """从评分数据中提取Big Five分数"""
+    try:
+        # 使用第一个评估器的平均分数
+        evaluator_names = list(scores_data["evaluator_scores"].keys())
+        if not evaluator_names:
+            return None
+
+        evaluator_name = evaluator_names[0]
+        full_scores = scores_data["evaluator_scores"][evaluator_name]["average_scores"]
+
+        # 转换为单字母键
+        converted_scores = {
+            "E": full_scores.get("Extraversion", 0),
+            "A": full_scores.get("Agreeableness", 0),
+            "C": full_scores.get("Conscientiousness", 0),
+            "N": full_scores.get("Neuroticism", 0),
+            "O": full_scores.get("Openness to Experience", 0)
+        }
+
+        return converted_scores
+    except Exception as e:
+        print(f"Error extracting Big Five scores: {e}")
+        return None
+
+
+def parse_run_directory(root: str) -> Dict:
+    """
+    从结果目录路径解析测试条件
+
+    例如：results/Interactive_Suite_20250826_175341/gemma3_latest_agent-big-five-50-complete2_b10_3i
+
+    Returns:
+        包含 directory_name, model_id, role_name, stress_level, temperature 的字典
+    """
+    dir_name = os.path.basename(root)
+
+    # 解析目录名获取模型、角色等信息
+    parts = dir_name.split('_')
+    model_id = parts[0] if len(parts) > 0 else 'Unknown'
+    role_name = parts[1] if len(parts) > 1 else 'default'
+
+    # 尝试从目录名中查找更准确的角色信息
+    for part in parts:
+        if (part.startswith('a') or part.startswith('b')) and part[1:].isdigit():
+            role_name = part
+            break
+
+    # 检查路径中是否包含压力信息
+    stress_level = 0
+    for part in root.split(os.sep):
+        if part.endswith('i') and part[:-1].isdigit():
+            stress_level = int(part[:-1])
+
+    # 检查目录名中是否包含温度信息
+    temperature = DEFAULT_TEMPERATURE
+    for part in parts:
+        if 'tmp' in part and part.replace('tmp', '').replace('.', '').isdigit():
+            try:
+                temperature = float(part.replace('tmp', ''))
+            except ValueError:
+                pass
+
+    return {
+        'directory_name': dir_name,
+        'model_id': model_id,
+        'role_name': role_name,
+        'stress_level': stress_level,
+        'temperature': temperature
+    }
+
+
+def scores_file_record(file_path: str, data: Dict) -> Dict:
+    """将 scores.json 转换为仓库行"""
+    agent_info = data.get('agent_info', {})
+    params = parse_run_directory(os.path.dirname(file_path))
+    big_five_scores = extract_big_five_scores(data) or {}
+
+    record = {
+        'kind': 'scores',
+        'directory_name': params['directory_name'],
+        'model_id': agent_info.get('model', params['model_id']),
+        'test_name': agent_info.get('test_name', 'Unknown'),
+        'role_name': params['role_name'],
+        'role_mbti_type': get_role_mbti_type(params['role_name']),
+        'stress_level': params['stress_level'],
+        'temperature': params['temperature'],
+        'cognitive_trap': None,
+        'context_load_tokens': None,
+        'assessment_status': None,
+        'question_count': None,
+    }
+    for column in BIG5_COLUMNS:
+        record[column] = big_five_scores.get(column)
+    return record
+
+
+def assessment_file_record(file_path: str, data: Dict) -> Dict:
+    """将 asses_*.json 测评结果转换为仓库行（只有运行参数，无Big Five得分）"""
+    metadata = data.get('assessment_metadata', {})
+    stress = metadata.get('stress_factors_applied', {}) or {}
+    role_name = metadata.get('role_applied') or metadata.get('role_name') or 'default'
+    temperature = stress.get('tmpr')
+
+    record = {
+        'kind': 'assessment',
+        'directory_name': os.path.basename(os.path.dirname(file_path)),
+        'model_id': metadata.get('tested_model') or metadata.get('model_id'),
+        'test_name': metadata.get('test_name', 'Unknown'),
+        'role_name': role_name,
+        'role_mbti_type': metadata.get('role_mbti_type') or get_role_mbti_type(role_name),
+        'stress_level': int(stress.get('emotional_stress_level') or 0),
+        'temperature': float(temperature) if temperature is not None else DEFAULT_TEMPERATURE,
+        'cognitive_trap': stress.get('cognitive_trap_type'),
+        'context_load_tokens': int(stress.get('context_load_tokens') or 0),
+        'assessment_status': metadata.get('assessment_status'),
+        'question_count': len(data.get('assessment_results', []) or []),
+    }
+    for column in BIG5_COLUMNS:
+        record[column] = None
+    return record
+
+
+def classify_result_file(file_name: str) -> Optional[str]:
+    """判断文件类型：'scores'、'assessment' 或 None（不导入）"""
+    if file_name == 'scores.json':
+        return 'scores'
+    if file_name.startswith('asses_') and file_name.endswith('.json'):
+        return 'assessment'
+    return None
+
+
+class ResultsWarehouse:
+    """基于SQLite的结果仓库，按 (mtime, size) 增量导入"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self._create_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _create_schema(self):
+        columns = ', '.join(f'{name} {column_type}' for name, column_type in RUN_COLUMNS)
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS runs ({columns})')
+        for column in ('model_id', 'test_name', 'role_name', 'kind'):
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_runs_{column} ON runs ({column})')
+        self.conn.commit()
+
+    def _known_files(self, root: str) -> Dict[str, Tuple[float, int]]:
+        prefix = os.path.join(root, '')
+        rows = self.conn.execute(
+            'SELECT path, mtime, size FROM runs WHERE substr(path, 1, ?) = ?',
+            (len(prefix), prefix)
+        ).fetchall()
+        return {path: (mtime, size) for path, mtime, size in rows}
+
+    def ingest(self, analysis_reports_dir: str) -> Dict[str, int]:
+        """
+        增量导入目录下的 scores.json 与 asses_*.json
+
+        只对新增或 (mtime, size) 变化的文件做JSON解析，已删除文件的行同步移除
+
+        Args:
+            analysis_reports_dir: 结果根目录
+
+        Returns:
+            导入统计 {'scanned', 'added', 'updated', 'unchanged', 'removed', 'failed'}
+        """
+        root = os.path.abspath(analysis_reports_dir)
+        known = self._known_files(root)
+        stats = {'scanned': 0, 'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        seen = set()
+        pending = []
+
+        for dir_path, _, files in os.walk(root):
+            for file_name in files:
+                kind = classify_result_file(file_name)
+                if kind is None:
+                    continue
+
+                file_path = os.path.join(dir_path, file_name)
+                stats['scanned'] += 1
+                seen.add(file_path)
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    continue
+
+                signature = (file_stat.st_mtime, file_stat.st_size)
+                if known.get(file_path) == signature:
+                    stats['unchanged'] += 1
+                    continue
+
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if kind == 'scores':
+                        record = scores_file_record(file_path, data)
+                    else:
+                        record = assessment_file_record(file_path, data)
+                except Exception as e:
+                    print(f"Error loading {file_path}: {e}")
+                    stats['failed'] += 1
+                    continue
+
+                record.update({'path': file_path, 'mtime': signature[0], 'size': signature[1]})
+                pending.append(record)
+                stats['updated' if file_path in known else 'added'] += 1
+
+        removed = [(path,) for path in known if path not in seen]
+        column_names = [name for name, _ in RUN_COLUMNS]
+        placeholders = ', '.join('?' for _ in column_names)
+        with self.conn:
+            self.conn.executemany(
+                f'INSERT OR REPLACE INTO runs ({", ".join(column_names)}) VALUES ({placeholders})',
+                [tuple(record.get(name) for name in column_names) for record in pending]
+            )
+            self.conn.executemany('DELETE FROM runs WHERE path = ?', removed)
+        stats['removed'] = len(removed)
+        return stats
+
+    def query(self, sql: str, params: Tuple = ()) -> pd.DataFrame:
+        """在仓库上执行SQL查询并返回DataFrame"""
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def load_frame(self, kind: Optional[str] = 'scores', root: Optional[str] = None) -> pd.DataFrame:
+        """
+        读取运行记录为DataFrame
+
+        Args:
+            kind: 'scores'、'assessment' 或 None（全部）
+            root: 只读取该目录下的结果
+        """
+        conditions: List[str] = []
+        params: List = []
+        if kind is not None:
+            conditions.append('kind = ?')
+            params.append(kind)
+        if root is not None:
+            prefix = os.path.join(os.path.abspath(root), '')
+            conditions.append('substr(path, 1, ?) = ?')
+            params.extend([len(prefix), prefix])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self.query(f'SELECT * FROM runs{where} ORDER BY path', tuple(params))
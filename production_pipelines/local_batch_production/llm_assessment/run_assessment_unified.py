@@ -32,12 +32,22 @@ try:
     from llm_assessment.services.model_manager import ModelManager
     from llm_assessment.services.stress_injector import StressInjector
     from llm_assessment.services.prompt_builder import PromptBuilder
+    from llm_assessment.services.result_journal import ResultJournal
+    from llm_assessment.services.tracing import (
+        configure_tracing, span, traced, STAGE_PROMPT_BUILD, STAGE_PARSE, STAGE_CHECKPOINT, STAGE_IO, STAGE_BATCH
+    )
+    from llm_assessment.services.profiling import add_profile_arguments, start_profiling
 except ImportError:
     # Fallback to direct imports when run as a script
     from services.llm_client import LLMClient
     from services.model_manager import ModelManager
     from services.stress_injector import StressInjector
     from services.prompt_builder import PromptBuilder
+    from services.result_journal import ResultJournal
+    from services.tracing import (
+        configure_tracing, span, traced, STAGE_PROMPT_BUILD, STAGE_PARSE, STAGE_CHECKPOINT, STAGE_IO, STAGE_BATCH
+    )
+    from services.profiling import add_profile_arguments, start_profiling
 
 # Import model settings utilities
 from llm_assessment.model_settings import (
@@ -53,6 +63,7 @@ from llm_assessment.model_settings import (
 ROLES_DIR = os.path.join(os.path.dirname(__file__), "roles")
 TESTS_DIR = os.path.join(os.path.dirname(__file__), "test_files")
 RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+RESULTS_JOURNAL_DIR = os.path.join(RESULTS_DIR, "journals")
 INTERFERENCE_DIR = os.path.join(os.path.dirname(__file__), "..", "interference_materials")
 COGNITIVE_TRAPS_DIR = os.path.join(os.path.dirname(__file__), "..", "interference_materials")
 CONTEXT_MATERIALS_DIR = os.path.join(os.path.dirname(__file__), "..", "interference_materials")
@@ -195,6 +206,7 @@ def is_empty_result(results):
     
     return False
 
+@traced(STAGE_IO)
 def save_results(results: dict, model: str, test_name: str, role_name: str, 
                 emotional_stress_level: int = 0, cognitive_trap_type: str = None, 
                 context_load_tokens: int = 0, log_file: str = None, error_info: str = None):
@@ -360,7 +372,9 @@ def get_role_mbti_type(role_name):
     
     return role_mbti_mapping.get(role_name, 'Unknown')
 
-def run_assessment(client, model_id, test_data, config: dict, debug=False, timeout=0, logger=None):
+@traced(STAGE_BATCH)
+def run_assessment(client, model_id, test_data, config: dict, debug=False, timeout=0, logger=None,
+                   journal=None, resume=False):
     """
     Runs the assessment with stress testing capabilities.
 
@@ -372,6 +386,9 @@ def run_assessment(client, model_id, test_data, config: dict, debug=False, timeo
         debug (bool): Whether to run in debug mode.
         timeout (int): Timeout for model response in seconds (0 for no timeout).
         logger: AssessmentLogger instance for logging.
+        journal (ResultJournal): Optional journal; each completed question is appended to it
+            and the returned results are assembled from it.
+        resume (bool): Reuse results already in the journal and only run the missing questions.
 
     Returns:
         dict: Complete assessment results.
@@ -453,7 +470,17 @@ def run_assessment(client, model_id, test_data, config: dict, debug=False, timeo
         'cognitive_trap_type': cognitive_trap_type,
         'context_load_tokens': context_load_tokens
     }
+    completed_entries = journal.start(resume=resume) if journal else {}
+    if completed_entries:
+        print(i18n.t("Resuming: {count} completed questions loaded from {path}").format(
+            count=len(completed_entries), path=journal.path))
+
     for i, question in enumerate(test_data['test_bank']):
+        # 断点续跑：跳过日志中已完成且题目未变的问题
+        completed_entry = completed_entries.get(i)
+        if completed_entry is not None and completed_entry.get('question_data') == question:
+            continue
+
         # 显示基本进度信息，即使在非调试模式下
         if i % 5 == 0 or i == 0 or i == len(test_data['test_bank']) - 1:  # 每5个问题或第一个/最后一个问题显示进度
             print(i18n.t("Processing question {current}/{total}").format(current=i+1, total=len(test_data['test_bank'])))
@@ -463,8 +490,9 @@ def run_assessment(client, model_id, test_data, config: dict, debug=False, timeo
             print(f"Question Text: {question.get('question', '')[:100]}...")
         
         # Build conversation with stress injection
-        builder = PromptBuilder(base_prompt, question, stress_config, stress_injector)
-        conversation_to_send = builder.build_conversation()
+        with span(STAGE_PROMPT_BUILD, 'build_conversation', question_index=i):
+            builder = PromptBuilder(base_prompt, question, stress_config, stress_injector)
+            conversation_to_send = builder.build_conversation()
         
         # 调试模式下显示发送给模型的对话
         if debug_mode:
@@ -496,7 +524,7 @@ def run_assessment(client, model_id, test_data, config: dict, debug=False, timeo
                 if not context_response:
                     context_response = "我已经理解了您分享的内容。"
                 if debug_mode:
-                    print(f"CONTEXT RESPONSE: {context_response[:200]}{"..." if len(context_response) > 200 else ""}")
+                    print(f"CONTEXT RESPONSE: {context_response[:200]}{'...' if len(context_response) > 200 else ''}")
                     print(f"Context response generated in {elapsed_time:.2f}s")
             except Exception as e:
                 elapsed_time = time.time() - start_time
@@ -548,7 +576,7 @@ def run_assessment(client, model_id, test_data, config: dict, debug=False, timeo
                         break  # Exit retry loop on valid response
                         
                     if debug_mode:
-                        print(f"FINAL RESPONSE: {final_response[:200]}{"..." if len(final_response) > 200 else ""}")
+                        print(f"FINAL RESPONSE: {final_response[:200]}{'...' if len(final_response) > 200 else ''}")
                         # 增强显示：显示完整响应
                         print(f"FULL FINAL RESPONSE: {final_response}")
                         print(f"Final response generated in {elapsed_time:.2f}s")
@@ -603,7 +631,7 @@ def run_assessment(client, model_id, test_data, config: dict, debug=False, timeo
                         break  # Exit retry loop on valid response
                         
                     if debug_mode:
-                        print(f"RESPONSE: {final_response[:200]}{"..." if len(final_response) > 200 else ""}")
+                        print(f"RESPONSE: {final_response[:200]}{'...' if len(final_response) > 200 else ''}")
                         # 增强显示：显示完整响应
                         print(f"FULL RESPONSE: {final_response}")
                         print(f"Response generated in {elapsed_time:.2f}s")
@@ -635,24 +663,26 @@ def run_assessment(client, model_id, test_data, config: dict, debug=False, timeo
             print("-" * 50)
         
         # Extract final response using ResponseExtractor
-        final_extracted_response = response_extractor.extract_final_response(conversation_log)
+        with span(STAGE_PARSE, 'extract_final_response', question_index=i):
+            final_extracted_response = response_extractor.extract_final_response(conversation_log)
         
         # Log the complete session with full details
         session_id = f"question_{i}_{question.get('id', i)}"
         if logger:
-            logger.log_complete_session(
-                session_id=session_id,
-                conversation=conversation_log,
-                extracted_response=final_extracted_response,
-                metadata={
-                    'question_id': question.get('id', i),
-                    'stress_level': config.get('emotional_stress_level', 0),
-                    'cognitive_trap': config.get('cognitive_trap_type'),
-                    'context_tokens': config.get('context_load_tokens', 0),
-                    'role_name': role_name,
-                    'model_id': model_id
-                }
-            )
+            with span(STAGE_IO, 'log_complete_session', question_index=i):
+                logger.log_complete_session(
+                    session_id=session_id,
+                    conversation=conversation_log,
+                    extracted_response=final_extracted_response,
+                    metadata={
+                        'question_id': question.get('id', i),
+                        'stress_level': config.get('emotional_stress_level', 0),
+                        'cognitive_trap': config.get('cognitive_trap_type'),
+                        'context_tokens': config.get('context_load_tokens', 0),
+                        'role_name': role_name,
+                        'model_id': model_id
+                    }
+                )
         
         # Store results with extracted response
         result_entry = {
@@ -662,7 +692,16 @@ def run_assessment(client, model_id, test_data, config: dict, debug=False, timeo
             'extracted_response': final_extracted_response,
             'session_id': session_id
         }
-        results['assessment_results'].append(result_entry)
+        if journal:
+            with span(STAGE_CHECKPOINT, 'journal_append', question_index=i):
+                journal.append(i, result_entry)
+        else:
+            results['assessment_results'].append(result_entry)
+    
+    # Assemble the final results from the journal (includes questions completed before a resume)
+    if journal:
+        results['assessment_results'] = journal.results()
+        journal.close()
     
     # 显示完成信息
     print(i18n.t("Completed processing all questions. Generating results..."))
@@ -723,8 +762,19 @@ def main():
                        help='Dynamic context length ratio')
     parser.add_argument('--timeout', type=int, default=0,
                        help='Timeout for model response in seconds (0 for no timeout)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Resume an interrupted run with the same model, test, role and stress settings, running only the missing questions')
+    parser.add_argument('--trace', type=str, default=None,
+                       help='Write stage timing spans (prompt build, model, parse, I/O) to this JSONL file')
+    parser.add_argument('--trace-chrome', type=str, default=None,
+                       help='Also export the spans in Chrome trace-event format to this file')
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+
+    if args.trace:
+        configure_tracing(args.trace, chrome_path=args.trace_chrome)
+    start_profiling(args)
     
     # 添加调试信息
     # print(f"Debug mode: {args.debug}")
@@ -808,8 +858,22 @@ def main():
     session_manager = SessionManager()
     log_file = logger.start_new_log(args.model_name, args.test_file, args.role_name)
     
+    # Completed questions are journaled so an interrupted run can be resumed with --resume
+    journal = ResultJournal(RESULTS_JOURNAL_DIR, {
+        'model_name': args.model_name,
+        'test_file': args.test_file,
+        'role_name': args.role_name,
+        'emotional_stress_level': args.emotional_stress_level,
+        'cognitive_trap_type': args.cognitive_trap_type,
+        'tmpr': args.tmpr,
+        'context_length_mode': args.context_length_mode,
+        'context_length_static': args.context_length_static,
+        'context_length_dynamic': args.context_length_dynamic
+    })
+    
     try:
-        results = run_assessment(client, args.model_name, test_data, config, args.debug, args.timeout, logger)
+        results = run_assessment(client, args.model_name, test_data, config, args.debug, args.timeout, logger,
+                                 journal=journal, resume=args.resume)
         
         # Save results
         saved_file = save_results(
@@ -828,11 +892,18 @@ def main():
         
         if saved_file:
             print(i18n.t("Results saved to: {saved_file}").format(saved_file=saved_file))
+            journal.discard()
         else:
             print(i18n.t("Failed to save results."))
         print(i18n.t("Log file: {log_file}").format(log_file=log_file))
+    
+    except KeyboardInterrupt:
+        journal.close()
+        print(i18n.t("Assessment interrupted. Completed questions are kept in {path}; rerun with --resume to continue.").format(path=journal.path))
+        sys.exit(130)
             
     except Exception as e:
+        journal.close()
         print(i18n.t("Error during assessment: {e}").format(e=e))
         if args.debug:
             import traceback
@@ -857,6 +928,7 @@ def main():
         
         print(i18n.t("Assessment failed. Error information saved to: {saved_file}").format(saved_file=saved_file))
         print(i18n.t("Log file: {log_file}").format(log_file=log_file))
+        print(i18n.t("Completed questions are kept in {path}; rerun with --resume to continue.").format(path=journal.path))
         
         # 清理空目录
         cleanup_empty_directories()
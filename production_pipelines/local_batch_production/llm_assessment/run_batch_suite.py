@@ -19,6 +19,10 @@ from i18n import i18n
 # Use absolute import with the correct module path
 from llm_assessment.run_assessment_unified import test_model_connectivity
 
+# How long Ollama keeps a warmed-up model resident between tasks
+BATCH_KEEP_ALIVE = os.getenv("BATCH_OLLAMA_KEEP_ALIVE", "30m")
+CLOUD_PROVIDER_PREFIXES = ('openai/', 'together/', 'openrouter/', 'glm/', 'deepseek/', 'gemini/', 'anthropic/')
+
 # Load config.json
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.json")
 try:
@@ -82,10 +86,14 @@ def main():
             print(i18n.t("--- Connectivity OK for {model_id} ---").format(model_id=actual_model_id), flush=True)
 
             model_config["name"] = actual_model_id
+            set_model_residency(actual_model_id, BATCH_KEEP_ALIVE)
             
             for task in suite.get("tasks", []):
                 result_summary = run_task(task, model_config, suite_output_dir, debug=debug_mode)
                 all_run_results.append(result_summary)
+
+            # Free memory for the next model instead of waiting for keep_alive to expire
+            set_model_residency(actual_model_id, 0)
     
     aggregate_results(all_run_results, start_time)
 
@@ -94,6 +102,28 @@ def main():
     print(i18n.t("**Total execution time:** {duration}").format(duration=end_time - start_time), flush=True)
 
 
+def set_model_residency(model_id, keep_alive):
+    """
+    Loads (keep_alive > 0) or unloads (keep_alive = 0) a local Ollama model.
+
+    Tasks for one model run back to back, so the model is warmed up once before its
+    tasks and released afterwards instead of being reloaded by each task subprocess.
+    Cloud models are ignored.
+    """
+    if model_id.startswith(CLOUD_PROVIDER_PREFIXES) or model_id.endswith('-cloud'):
+        return False
+
+    model_name = model_id[len('ollama/'):] if model_id.startswith('ollama/') else model_id
+    try:
+        import ollama
+        client = ollama.Client(host=os.getenv("LOCAL_API_BASE", "http://localhost:11434"))
+        client.generate(model=model_name, keep_alive=keep_alive)
+        return True
+    except Exception as e:
+        print(i18n.t("Warning: could not set residency for {model_id}: {e}").format(model_id=model_id, e=e), flush=True)
+        return False
+
+
 def normalize_task_config(task_config):
     """Ensures all task parameters have appropriate default values."""
     normalized = task_config.copy()
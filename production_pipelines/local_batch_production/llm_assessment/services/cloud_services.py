@@ -8,9 +8,12 @@ import requests
 import json
 import time
 import logging
-from typing import Dict, List, Any, Optional
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Any, Optional, Set, Tuple
 from dotenv import load_dotenv
 
+from .http_session_pool import get_session_pool
+
 # Load environment variables
 load_dotenv()
 
@@ -69,46 +72,123 @@ CLOUD_SERVICES = {
     }
 }
 
-def _call_openai_compatible(config: Dict, model_name: str, messages: List) -> str:
-    """Call OpenAI compatible API"""
+# Optional key manager (e.g. IntelligentAPIManager) used for key selection and rotation
+_api_key_manager = None
+
+# Statuses after which the request is retried with another key from the key manager
+KEY_ROTATION_STATUS_CODES = (401, 403, 429)
+
+
+def set_api_key_manager(manager) -> None:
+    """
+    Route API key selection through a key manager.
+
+    The manager must provide lease_key(provider, exclude), a context manager yielding an
+    object with ``id`` and ``key`` (or None) that holds the key for the duration of the
+    request and skips the key ids in ``exclude``, and mark_key_error(provider, key_id, message).
+    Providers the manager has no key for fall back to the environment variable.
+    Pass None to go back to environment variables only.
+    """
+    global _api_key_manager
+    _api_key_manager = manager
+
+
+@contextmanager
+def _lease_api_key(provider: str, config: Dict, exclude: Set[str]) -> Iterator[Optional[Tuple[str, Optional[str]]]]:
+    """
+    Hold (api_key, key_id) for one request; key_id is None when the key comes from the environment.
+    Yields None once every managed key in ``exclude`` has been tried and none is left.
+    Managed keys count as in flight until the block exits, so the manager spreads concurrent requests.
+    """
+    if _api_key_manager is not None:
+        with _api_key_manager.lease_key(provider, exclude=exclude) as managed_key:
+            if managed_key is not None:
+                yield managed_key.key, managed_key.id
+                return
+        if exclude:
+            yield None
+            return
+
     api_key = os.getenv(config["api_key_env"])
     if not api_key:
         raise ValueError(f"API key not set: {config['api_key_env']}")
+    yield api_key, None
 
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
-    payload = {"model": model_name, "messages": messages, "max_tokens": 1024}
 
-    # Increase timeout to 120 seconds
-    logger.debug(f"Calling {config["name"]} API with 120s timeout")
-    start_time = time.time()
-    try:
-        response = requests.post(config["api_url"], headers=headers, json=payload, timeout=120)
-        elapsed_time = time.time() - start_time
-        logger.debug(f"{config["name"]} API response received in {elapsed_time:.2f}s")
-    except Exception as e:
-        elapsed_time = time.time() - start_time
-        logger.error(f"{config["name"]} API call failed after {elapsed_time:.2f}s: {e}")
-        raise
-    
+def _post_json(provider: str, config: Dict, payload: Dict,
+               build_request: Callable[[str], Tuple[str, Dict, Dict]]) -> requests.Response:
+    """
+    POST a JSON payload through the provider's pooled session.
+
+    Args:
+        provider (str): Service name
+        config (dict): Service configuration
+        payload (dict): JSON body
+        build_request (callable): api_key -> (url, headers, query params)
+
+    Returns:
+        requests.Response: Final response (429/5xx already retried with backoff)
+    """
+    pool = get_session_pool()
+    tried_keys: Set[str] = set()
+    response = None
+
+    while True:
+        with _lease_api_key(provider, config, tried_keys) as leased:
+            if leased is None:
+                # Every managed key was tried: hand back the last rejection
+                return response
+            api_key, key_id = leased
+            url, headers, params = build_request(api_key)
+
+            logger.debug(f"Calling {config['name']} API (timeout {pool.timeout(provider)})")
+            start_time = time.time()
+            try:
+                response = pool.post(provider, url, headers=headers, params=params, json=payload)
+                elapsed_time = time.time() - start_time
+                logger.debug(f"{config['name']} API response received in {elapsed_time:.2f}s")
+            except Exception as e:
+                elapsed_time = time.time() - start_time
+                logger.error(f"{config['name']} API call failed after {elapsed_time:.2f}s: {e}")
+                raise
+
+        if key_id is None or response.status_code not in KEY_ROTATION_STATUS_CODES:
+            return response
+
+        # Rate-limited or rejected key: the next attempt takes a key not tried yet
+        _api_key_manager.mark_key_error(provider, key_id, f"HTTP {response.status_code}: {response.text[:200]}")
+        tried_keys.add(key_id)
+        logger.warning(f"{config['name']} key {key_id} returned HTTP {response.status_code}, rotating key")
+
+
+def _check_response(response: requests.Response, model_name: str) -> Dict:
+    """Raise on error statuses and return the JSON body"""
     # Better error handling
     if response.status_code == 404:
         raise ValueError(f"Model {model_name} not found. API response: {response.text}")
     elif response.status_code != 200:
         raise ValueError(f"API request failed with status {response.status_code}. Response: {response.text}")
-    
+
     response.raise_for_status()
-    data = response.json()
+    return response.json()
+
+
+def _call_openai_compatible(config: Dict, model_name: str, messages: List, provider: Optional[str] = None) -> str:
+    """Call OpenAI compatible API"""
+    provider = provider or config["name"]
+    payload = {"model": model_name, "messages": messages, "max_tokens": 1024}
+
+    def build_request(api_key: str):
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+        return config["api_url"], headers, None
+
+    data = _check_response(_post_json(provider, config, payload, build_request), model_name)
     return data["choices"][0]["message"]["content"]
 
-def _call_gemini(config: Dict, model_name: str, messages: List) -> str:
+def _call_gemini(config: Dict, model_name: str, messages: List, provider: Optional[str] = None) -> str:
     """Call Google Gemini API"""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError(f"API key not set: {config['api_key_env']}")
+    provider = provider or "gemini"
 
-    url = f"{config['api_url']}/{model_name}:generateContent?key={api_key}"
-    headers = {"Content-Type": "application/json"}
-    
     # Gemini needs different format
     gemini_contents = []
     for msg in messages:
@@ -120,27 +200,12 @@ def _call_gemini(config: Dict, model_name: str, messages: List) -> str:
         })
 
     payload = {"contents": gemini_contents}
-    
-    # Increase timeout to 120 seconds
-    logger.debug(f"Calling {config["name"]} API with 120s timeout")
-    start_time = time.time()
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=120)
-        elapsed_time = time.time() - start_time
-        logger.debug(f"{config["name"]} API response received in {elapsed_time:.2f}s")
-    except Exception as e:
-        elapsed_time = time.time() - start_time
-        logger.error(f"{config["name"]} API call failed after {elapsed_time:.2f}s: {e}")
-        raise
-    
-    # Better error handling
-    if response.status_code == 404:
-        raise ValueError(f"Model {model_name} not found. API response: {response.text}")
-    elif response.status_code != 200:
-        raise ValueError(f"API request failed with status {response.status_code}. Response: {response.text}")
-    
-    response.raise_for_status()
-    data = response.json()
+
+    def build_request(api_key: str):
+        url = f"{config['api_url']}/{model_name}:generateContent"
+        return url, {"Content-Type": "application/json"}, {"key": api_key}
+
+    data = _check_response(_post_json(provider, config, payload, build_request), model_name)
     return data['candidates'][0]['content']['parts'][0]['text']
 
 def call_cloud_service(service_name: str, model_name: str, prompt: str, system_prompt: Optional[str] = None) -> str:
@@ -158,9 +223,9 @@ def call_cloud_service(service_name: str, model_name: str, prompt: str, system_p
 
     try:
         if service_type == "openai_compatible":
-            return _call_openai_compatible(config, model_name, messages)
+            return _call_openai_compatible(config, model_name, messages, provider=service_name)
         elif service_type == "gemini":
-            return _call_gemini(config, model_name, messages)
+            return _call_gemini(config, model_name, messages, provider=service_name)
         else:
             raise ValueError(f"Unknown service type: {service_type}")
     except Exception as e:
@@ -0,0 +1,462 @@
+"""
+Ollama endpoint pool for AgentPsy
+Spreads local-model requests over several Ollama hosts: least-outstanding (or latency-weighted)
+routing, health checks, ejection and re-admission of failing hosts, and model affinity so that
+requests go to hosts that already have the model loaded
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+STRATEGY_LATENCY = "latency"
+STRATEGIES = (STRATEGY_LEAST_OUTSTANDING, STRATEGY_LATENCY)
+
+# Comma-separated list of Ollama hosts, e.g. "http://gpu1:11434,http://gpu2:11434"
+ENDPOINTS_ENV = "LOCAL_API_BASES"
+
+
+class NoHealthyEndpointError(RuntimeError):
+    """Raised when no endpoint in the pool can serve a model"""
+
+
+class _RetryableResponse(Exception):
+    """Wraps a 5xx response so that it fails over like a connection error"""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def model_key(model: str) -> str:
+    """Normalize a model name the way Ollama lists it ("llama3" -> "llama3:latest")"""
+    return model if ":" in model else f"{model}:latest"
+
+
+def endpoint_root(url: str) -> str:
+    """Ollama native API root for a base URL (drops a trailing /v1)"""
+    url = url.rstrip("/")
+    return url[:-3] if url.endswith("/v1") else url
+
+
+@dataclass
+class Endpoint:
+    """One Ollama host and its routing state"""
+    url: str
+    allowed_models: Optional[Set[str]] = None  # configured restriction; None = any model
+    weight: float = 1.0
+    installed_models: Optional[Set[str]] = None  # from /api/tags; None = not checked yet
+    warm_models: Set[str] = field(default_factory=set)  # loaded in memory (from /api/ps and recent successes)
+    inflight: int = 0
+    latency_ewma: Optional[float] = None
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+
+    @property
+    def root(self) -> str:
+        """Ollama native API root (no /v1 suffix)"""
+        return endpoint_root(self.url)
+
+    def serves(self, model: Optional[str]) -> bool:
+        """Whether this host is configured for and has installed the model"""
+        if model is None:
+            return True
+        key = model_key(model)
+        if self.allowed_models is not None and key not in self.allowed_models:
+            return False
+        return self.installed_models is None or key in self.installed_models
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = now or time.time()
+        return {
+            "url": self.url,
+            "available": self.is_available(now),
+            "ejected_for": max(0.0, self.ejected_until - now),
+            "inflight": self.inflight,
+            "latency_ewma": self.latency_ewma,
+            "requests": self.requests,
+            "failures": self.failures,
+            "warm_models": sorted(self.warm_models),
+        }
+
+
+class EndpointLease:
+    """
+    A checked-out endpoint. Use as a context manager (sync or async); leaving the block
+    with an exception records a failure, otherwise a success.
+    """
+
+    def __init__(self, pool: "EndpointPool", endpoint: Endpoint, model: Optional[str]):
+        self.pool = pool
+        self.endpoint = endpoint
+        self.model = model
+        self.started = time.monotonic()
+        self._released = False
+
+    @property
+    def url(self) -> str:
+        return self.endpoint.url
+
+    @property
+    def root(self) -> str:
+        return self.endpoint.root
+
+    def success(self):
+        """Record a successful request on this endpoint"""
+        if not self._released:
+            self._released = True
+            self.pool._release(self.endpoint, self.model, time.monotonic() - self.started, None)
+
+    def failure(self, error: Union[BaseException, str]):
+        """Record a failed request on this endpoint (counts toward ejection)"""
+        if not self._released:
+            self._released = True
+            self.pool._release(self.endpoint, self.model, time.monotonic() - self.started, error)
+
+    def __enter__(self) -> "EndpointLease":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_val is not None:
+            self.failure(exc_val)
+        else:
+            self.success()
+        return False
+
+    async def __aenter__(self) -> "EndpointLease":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return self.__exit__(exc_type, exc_val, exc_tb)
+
+
+class EndpointPool:
+    """Client-side load balancer over several Ollama hosts"""
+
+    def __init__(self, endpoints: Iterable[Union[str, Dict[str, Any]]],
+                 strategy: str = STRATEGY_LEAST_OUTSTANDING,
+                 failure_threshold: int = 3, eject_seconds: float = 30.0, max_eject_seconds: float = 300.0,
+                 affinity_slack: int = 2, latency_alpha: float = 0.3, health_timeout: float = 5.0):
+        """
+        Initialize the pool.
+
+        Args:
+            endpoints: Base URLs, or dicts with "url" and optional "models" / "weight"
+            strategy (str): "least_outstanding" (fewest in-flight requests) or "latency"
+                (recent latency weighted by in-flight requests)
+            failure_threshold (int): Consecutive failures before a host is ejected
+            eject_seconds (float): First ejection period; doubles on each repeat ejection
+            max_eject_seconds (float): Upper bound for an ejection period
+            affinity_slack (int): Extra in-flight requests tolerated to stay on a host with the model loaded
+            latency_alpha (float): Smoothing factor of the latency moving average
+            health_timeout (float): Timeout in seconds for health-check requests
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy} (expected one of {', '.join(STRATEGIES)})")
+        self._endpoints: List[Endpoint] = []
+        for spec in endpoints:
+            if isinstance(spec, str):
+                spec = {"url": spec}
+            models = spec.get("models")
+            self._endpoints.append(Endpoint(
+                url=spec["url"].rstrip("/"),
+                allowed_models={model_key(m) for m in models} if models else None,
+                weight=float(spec.get("weight", 1.0)),
+            ))
+        if not self._endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.affinity_slack = affinity_slack
+        self.latency_alpha = latency_alpha
+        self.health_timeout = health_timeout
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+        self._health_stop = threading.Event()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> Optional["EndpointPool"]:
+        """Pool from the LOCAL_API_BASES environment variable, or None when it is not set"""
+        urls = [url.strip() for url in os.getenv(ENDPOINTS_ENV, "").split(",") if url.strip()]
+        return cls(urls, **kwargs) if urls else None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], **kwargs) -> Optional["EndpointPool"]:
+        """
+        Pool from an "ollama" config section: "endpoints" (list of URLs or {"url", "models", "weight"})
+        or "base_urls". Returns None when neither is configured.
+        """
+        endpoints = config.get("endpoints") or config.get("base_urls")
+        if not endpoints:
+            return None
+        for option in ("strategy", "failure_threshold", "eject_seconds", "max_eject_seconds", "affinity_slack"):
+            if option in config:
+                kwargs.setdefault(option, config[option])
+        return cls(endpoints, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._endpoints)
+
+    @property
+    def endpoints(self) -> List[Endpoint]:
+        return list(self._endpoints)
+
+    # ---- routing ----
+
+    def _score(self, endpoint: Endpoint, fallback_latency: float) -> float:
+        # A recent failure ranks a host as if it had one more request in flight
+        load = endpoint.inflight + endpoint.consecutive_failures
+        if self.strategy == STRATEGY_LATENCY:
+            latency = endpoint.latency_ewma if endpoint.latency_ewma is not None else fallback_latency
+            return latency * (load + 1) / endpoint.weight
+        return load / endpoint.weight
+
+    def _select(self, model: Optional[str], exclude: Set[str]) -> Endpoint:
+        now = time.time()
+        candidates = [e for e in self._endpoints if e.url not in exclude and e.serves(model)]
+        if not candidates:
+            raise NoHealthyEndpointError(f"No endpoint serves model {model}" if model else "No endpoint left to try")
+
+        available = [e for e in candidates if e.is_available(now)]
+        if not available:
+            # Every host is ejected: probe the one whose ejection ends first rather than fail outright
+            return min(candidates, key=lambda e: e.ejected_until)
+
+        # Hosts without latency data yet are scored with the fastest known latency, so they get tried
+        known = [e.latency_ewma for e in available if e.latency_ewma is not None]
+        fallback_latency = min(known) if known else 1.0
+        random.shuffle(available)
+        best = min(available, key=lambda e: self._score(e, fallback_latency))
+
+        if model:
+            key = model_key(model)
+            warm = [e for e in available if key in e.warm_models]
+            if warm:
+                best_warm = min(warm, key=lambda e: self._score(e, fallback_latency))
+                if best_warm.inflight - best.inflight <= self.affinity_slack:
+                    return best_warm
+        return best
+
+    def acquire(self, model: Optional[str] = None, exclude: Optional[Set[str]] = None) -> EndpointLease:
+        """
+        Check out the best endpoint for a model.
+
+        Args:
+            model (str): Model the request is for (enables model filtering and affinity)
+            exclude (set): Endpoint URLs not to pick (already tried)
+
+        Returns:
+            EndpointLease: Report the outcome via the context manager or success()/failure()
+
+        Raises:
+            NoHealthyEndpointError: If no endpoint can serve the model
+        """
+        with self._lock:
+            endpoint = self._select(model, exclude or set())
+            endpoint.inflight += 1
+            endpoint.requests += 1
+        return EndpointLease(self, endpoint, model)
+
+    def _release(self, endpoint: Endpoint, model: Optional[str], latency: float,
+                 error: Optional[Union[BaseException, str]]):
+        with self._lock:
+            endpoint.inflight = max(0, endpoint.inflight - 1)
+            if error is None:
+                endpoint.consecutive_failures = 0
+                endpoint.ejections = 0
+                endpoint.ejected_until = 0.0
+                if endpoint.latency_ewma is None:
+                    endpoint.latency_ewma = latency
+                else:
+                    endpoint.latency_ewma += self.latency_alpha * (latency - endpoint.latency_ewma)
+                if model:
+                    endpoint.warm_models.add(model_key(model))
+                return
+            endpoint.failures += 1
+            self._record_failure(endpoint, error)
+
+    def _record_failure(self, endpoint: Endpoint, error: Union[BaseException, str]):
+        """Count a failure and eject the host once it reaches the threshold (lock held)"""
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures < self.failure_threshold:
+            return
+        # consecutive_failures stays at the threshold, so a failed probe after re-admission ejects again
+        endpoint.ejections += 1
+        period = min(self.max_eject_seconds, self.eject_seconds * 2 ** (endpoint.ejections - 1))
+        endpoint.ejected_until = time.time() + period
+        logger.warning(f"Ejecting Ollama endpoint {endpoint.url} for {period:.0f}s "
+                       f"after {endpoint.consecutive_failures} consecutive failures: {error}")
+
+    # ---- calls with failover ----
+
+    def call(self, fn: Callable[[Endpoint], Any], model: Optional[str] = None,
+             retry_on: Tuple[Type[BaseException], ...] = (Exception,)) -> Any:
+        """
+        Call fn(endpoint), failing over to the next best endpoint on retry_on exceptions.
+
+        Raises:
+            The last error once every eligible endpoint has failed
+        """
+        tried: Set[str] = set()
+        last_error: Optional[BaseException] = None
+        while True:
+            try:
+                lease = self.acquire(model, exclude=tried)
+            except NoHealthyEndpointError:
+                if tried:
+                    raise last_error
+                raise
+            tried.add(lease.url)
+            try:
+                result = fn(lease.endpoint)
+            except retry_on as e:
+                lease.failure(e)
+                last_error = e
+                logger.warning(f"Ollama endpoint {lease.url} failed ({e}), trying next endpoint")
+                continue
+            except BaseException:
+                lease.success()
+                raise
+            lease.success()
+            return result
+
+    async def call_async(self, fn: Callable[[Endpoint], Any], model: Optional[str] = None,
+                         retry_on: Tuple[Type[BaseException], ...] = (Exception,)) -> Any:
+        """Async variant of call(): fn(endpoint) returns an awaitable"""
+        tried: Set[str] = set()
+        last_error: Optional[BaseException] = None
+        while True:
+            try:
+                lease = self.acquire(model, exclude=tried)
+            except NoHealthyEndpointError:
+                if tried:
+                    raise last_error
+                raise
+            tried.add(lease.url)
+            try:
+                result = await fn(lease.endpoint)
+            except retry_on as e:
+                lease.failure(e)
+                last_error = e
+                logger.warning(f"Ollama endpoint {lease.url} failed ({e}), trying next endpoint")
+                continue
+            except BaseException:
+                lease.success()
+                raise
+            lease.success()
+            return result
+
+    def request(self, method: str, path: str, model: Optional[str] = None,
+                session: Optional[requests.Session] = None, **kwargs) -> requests.Response:
+        """
+        Send an HTTP request to "<endpoint root><path>", failing over on connection errors,
+        timeouts and 5xx responses.
+
+        Returns:
+            requests.Response: The first non-5xx response, or the last 5xx response
+
+        Raises:
+            requests.RequestException: If every endpoint failed without a response
+        """
+        sender = session or requests
+
+        def send(endpoint: Endpoint) -> requests.Response:
+            response = sender.request(method, f"{endpoint.root}{path}", **kwargs)
+            if response.status_code >= 500:
+                raise _RetryableResponse(response)
+            return response
+
+        try:
+            return self.call(send, model, retry_on=(requests.ConnectionError, requests.Timeout, _RetryableResponse))
+        except _RetryableResponse as e:
+            return e.response
+
+    # ---- health checks ----
+
+    def check_endpoint(self, endpoint: Endpoint) -> bool:
+        """Refresh one host's installed and loaded models; re-admit it if healthy"""
+        try:
+            tags = requests.get(f"{endpoint.root}/api/tags", timeout=self.health_timeout)
+            tags.raise_for_status()
+            installed = {model_key(m["name"]) for m in tags.json().get("models", [])}
+            try:
+                ps = requests.get(f"{endpoint.root}/api/ps", timeout=self.health_timeout)
+                loaded = {model_key(m["name"]) for m in ps.json().get("models", [])} if ps.ok else None
+            except (requests.RequestException, ValueError):
+                loaded = None
+        except (requests.RequestException, ValueError) as e:
+            with self._lock:
+                self._record_failure(endpoint, f"health check: {e}")
+            return False
+
+        with self._lock:
+            endpoint.installed_models = installed
+            if loaded is not None:
+                endpoint.warm_models = loaded
+            if endpoint.ejected_until:
+                logger.info(f"Re-admitting Ollama endpoint {endpoint.url}")
+            endpoint.consecutive_failures = 0
+            endpoint.ejections = 0
+            endpoint.ejected_until = 0.0
+        return True
+
+    def check_health(self) -> Dict[str, bool]:
+        """Health-check every host; returns {url: healthy}"""
+        return {endpoint.url: self.check_endpoint(endpoint) for endpoint in self._endpoints}
+
+    def start_health_checks(self, interval: float = 30.0):
+        """Run check_health() every interval seconds in a daemon thread"""
+        if self._health_thread is not None:
+            return
+        self._health_stop.clear()
+
+        def loop():
+            while not self._health_stop.wait(interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, name="ollama-endpoint-health", daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self):
+        """Stop the background health checks"""
+        if self._health_thread is not None:
+            self._health_stop.set()
+            self._health_thread.join()
+            self._health_thread = None
+
+    def available_models(self) -> List[str]:
+        """Models installed on at least one non-ejected host (after a health check)"""
+        now = time.time()
+        with self._lock:
+            models = set()
+            for endpoint in self._endpoints:
+                if endpoint.is_available(now) and endpoint.installed_models:
+                    models |= endpoint.installed_models
+        return sorted(models)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Routing state of every host"""
+        now = time.time()
+        with self._lock:
+            return [endpoint.to_dict(now) for endpoint in self._endpoints]
+
+    def __str__(self) -> str:
+        return f"EndpointPool({', '.join(e.url for e in self._endpoints)}; {self.strategy})"
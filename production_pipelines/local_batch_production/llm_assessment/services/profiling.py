@@ -0,0 +1,400 @@
+"""
+Profiling Module
+On-demand profiling for the assessment entry points (--profile): deterministic (cProfile) or
+sampling CPU profiles and tracemalloc memory snapshots, optionally limited to selected stages
+(the stage names of the tracing module) or to a single worker thread of a pool.
+
+Modes (--profile, comma separated):
+    cpu     deterministic  -> cpu.pstats (python -m pstats / snakeviz) and cpu_top.txt
+    sample  sampling       -> sample.collapsed (folded stacks for flamegraph.pl / speedscope) and sample_top.txt
+    memory  tracemalloc    -> memory.snapshot (tracemalloc.Snapshot.load) and memory_top.txt
+"""
+
+import argparse
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from .tracing import add_stage_listener, remove_stage_listener
+
+PROFILE_MODES = ('cpu', 'sample', 'memory')
+DEFAULT_PROFILE_DIR = 'profiles'
+
+# From Python 3.12 cProfile is built on sys.monitoring and applies to all threads at once,
+# so a single shared Profile is enabled while any thread is inside the profiled scope
+_PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+
+
+class Profiler:
+    """CPU / memory profiler for the whole run, or only inside selected stages or one worker thread"""
+
+    def __init__(self, modes: Sequence[str], output_dir: str, stages: Optional[Sequence[str]] = None,
+                 worker: Optional[int] = None, interval: float = 0.005, top: int = 30):
+        """
+        Initialize the profiler
+
+        Args:
+            modes: Profiling modes (any of cpu / sample / memory)
+            output_dir: Directory the results are written to
+            stages: Only profile inside spans of these stages; the whole run when empty
+            worker: Only profile worker N of a thread pool (thread name ending in _N, as named by ThreadPoolExecutor)
+            interval: Sampling interval in seconds
+            top: Number of entries in the text reports
+        """
+        unknown = set(modes) - set(PROFILE_MODES)
+        if unknown or not modes:
+            raise ValueError(f"Unknown profiling mode: {', '.join(sorted(unknown)) or '(empty)'}; "
+                             f"choose from {', '.join(PROFILE_MODES)}")
+
+        self.modes = tuple(dict.fromkeys(modes))
+        self.output_dir = output_dir
+        self.stages = frozenset(stages) if stages else None
+        self.worker = worker
+        self.interval = interval
+        self.top = top
+        # Unscoped cProfile only covers the thread calling start() (all threads from 3.12);
+        # pool workers need stages or the sample mode
+        self.scoped = self.stages is not None or worker is not None
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        self._shared_profile: Optional[cProfile.Profile] = None
+        self._shared_depth = 0
+        self._active_threads = set()
+        self._samples: Counter = Counter()
+        self._sample_ticks = 0
+        self._labels: Dict[object, str] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._owns_tracemalloc = False
+        self._started = False
+        self._stopped = False
+
+    def start(self) -> 'Profiler':
+        """Start profiling; results are written at process exit at the latest"""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+
+        if 'sample' in self.modes:
+            self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+            self._sampler.start()
+
+        if self.scoped:
+            add_stage_listener(self._on_stage)
+        else:
+            if 'memory' in self.modes:
+                self._start_memory()
+            if 'cpu' in self.modes:
+                self._begin_cpu()
+
+        atexit.register(self.stop)
+        return self
+
+    def stop(self) -> List[str]:
+        """
+        Stop profiling and write the results
+
+        Returns:
+            List[str]: Paths of the written files
+        """
+        with self._lock:
+            if not self._started or self._stopped:
+                return []
+            self._stopped = True
+
+        if self.scoped:
+            remove_stage_listener(self._on_stage)
+        elif 'cpu' in self.modes:
+            self._end_cpu()
+        if self._sampler is not None:
+            self._stop_event.set()
+            self._sampler.join()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        written = []
+        # Snapshot memory first so writing the CPU results is not counted
+        if 'memory' in self.modes:
+            written.extend(self._write_memory())
+        if 'cpu' in self.modes:
+            written.extend(self._write_cpu())
+        if 'sample' in self.modes:
+            written.extend(self._write_samples())
+
+        if written:
+            print(f"Profiling results written to {self.output_dir}")
+        else:
+            print(f"Nothing ran inside the profiled scope (stages: {', '.join(sorted(self.stages or ())) or 'all'}, "
+                  f"worker: {self.worker})")
+        return written
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    # ---- Stage scope ----
+
+    def _on_stage(self, stage: str, entering: bool):
+        if self.stages is not None and stage not in self.stages:
+            return
+        local = self._local
+        selected = getattr(local, 'selected', None)
+        if selected is None:
+            selected = local.selected = self._thread_selected()
+        if not selected:
+            return
+
+        depth = getattr(local, 'depth', 0)
+        if entering:
+            local.depth = depth + 1
+            if depth == 0:
+                self._enter_scope()
+        elif depth > 0:
+            # Stages entered before profiling started leave with depth 0 and are ignored
+            local.depth = depth - 1
+            if depth == 1:
+                self._leave_scope()
+
+    def _thread_selected(self) -> bool:
+        if self.worker is None:
+            return True
+        return threading.current_thread().name.endswith(f'_{self.worker}')
+
+    def _enter_scope(self):
+        if 'cpu' in self.modes:
+            self._begin_cpu()
+        if 'sample' in self.modes:
+            with self._lock:
+                self._active_threads.add(threading.get_ident())
+        if 'memory' in self.modes:
+            self._start_memory()
+
+    def _leave_scope(self):
+        if 'cpu' in self.modes:
+            self._end_cpu()
+        if 'sample' in self.modes:
+            with self._lock:
+                self._active_threads.discard(threading.get_ident())
+
+    # ---- Deterministic CPU profile ----
+
+    def _begin_cpu(self):
+        if _PER_THREAD_CPROFILE:
+            profile = getattr(self._local, 'profile', None)
+            if profile is None:
+                profile = self._local.profile = cProfile.Profile()
+                with self._lock:
+                    self._profiles.append(profile)
+            profile.enable()
+            return
+
+        with self._lock:
+            if self._shared_profile is None:
+                self._shared_profile = cProfile.Profile()
+                self._profiles.append(self._shared_profile)
+            self._shared_depth += 1
+            if self._shared_depth == 1:
+                self._shared_profile.enable()
+
+    def _end_cpu(self):
+        if _PER_THREAD_CPROFILE:
+            profile = getattr(self._local, 'profile', None)
+            if profile is not None:
+                profile.disable()
+            return
+
+        with self._lock:
+            self._shared_depth = max(0, self._shared_depth - 1)
+            if self._shared_depth == 0 and self._shared_profile is not None:
+                self._shared_profile.disable()
+
+    def _write_cpu(self) -> List[str]:
+        profiles = [profile for profile in self._profiles if _has_stats(profile)]
+        if not profiles:
+            return []
+
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        pstats_path = os.path.join(self.output_dir, 'cpu.pstats')
+        stats.dump_stats(pstats_path)
+
+        report = io.StringIO()
+        stats.stream = report
+        report.write(self._header('cpu'))
+        report.write(f"Threads: {len(profiles)}\n\nBy cumulative time:\n")
+        stats.sort_stats('cumulative').print_stats(self.top)
+        report.write("\nBy own time:\n")
+        stats.sort_stats('tottime').print_stats(self.top)
+        top_path = os.path.join(self.output_dir, 'cpu_top.txt')
+        with open(top_path, 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        return [pstats_path, top_path]
+
+    # ---- Sampling CPU profile ----
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            if self.scoped:
+                with self._lock:
+                    thread_ids = list(self._active_threads)
+            else:
+                thread_ids = [thread_id for thread_id in frames if thread_id != own_id]
+
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self._samples[self._collapse(frame)] += 1
+            self._sample_ticks += 1
+
+    def _collapse(self, frame) -> str:
+        """Fold a stack into root;...;leaf form"""
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                label = self._labels[code] = label.replace(';', ':')
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return ';'.join(labels)
+
+    def _write_samples(self) -> List[str]:
+        if not self._samples:
+            return []
+
+        collapsed_path = os.path.join(self.output_dir, 'sample.collapsed')
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self._samples.items():
+            frames = stack.split(';')
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        total = sum(self._samples.values())
+
+        top_path = os.path.join(self.output_dir, 'sample_top.txt')
+        with open(top_path, 'w', encoding='utf-8') as f:
+            f.write(self._header('sample'))
+            f.write(f"Interval: {self.interval * 1000:.1f} ms, ticks: {self._sample_ticks}, stack samples: {total}\n\n")
+            f.write(f"{'self %':>8}{'total %':>9}  function\n")
+            for label, count in self_counts.most_common(self.top):
+                f.write(f"{count / total * 100:>7.1f}%{total_counts[label] / total * 100:>8.1f}%  {label}\n")
+        return [collapsed_path, top_path]
+
+    # ---- Memory ----
+
+    def _start_memory(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+
+    def _write_memory(self) -> List[str]:
+        if not tracemalloc.is_tracing():
+            return []
+
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        snapshot_path = os.path.join(self.output_dir, 'memory.snapshot')
+        snapshot.dump(snapshot_path)
+
+        top_path = os.path.join(self.output_dir, 'memory_top.txt')
+        with open(top_path, 'w', encoding='utf-8') as f:
+            f.write(self._header('memory'))
+            f.write(f"Current: {current / 1024 / 1024:.2f} MiB, peak: {peak / 1024 / 1024:.2f} MiB\n\n")
+            f.write("Live allocations by line:\n")
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                f.write(f"  {stat}\n")
+            f.write("\nLive allocations by file:\n")
+            for stat in snapshot.statistics('filename')[:self.top]:
+                f.write(f"  {stat}\n")
+        return [snapshot_path, top_path]
+
+    def _header(self, mode: str) -> str:
+        return (f"Mode: {mode}\n"
+                f"Stages: {', '.join(sorted(self.stages)) if self.stages else 'all'}\n"
+                f"Worker: {self.worker if self.worker is not None else 'all'}\n"
+                f"Generated: {datetime.now().isoformat()}\n")
+
+    def __str__(self) -> str:
+        return f"Profiler(modes={','.join(self.modes)}, output_dir={self.output_dir}, stages={self.stages}, worker={self.worker})"
+
+
+def _has_stats(profile: cProfile.Profile) -> bool:
+    profile.create_stats()
+    return bool(profile.stats)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def default_profile_dir() -> str:
+    return os.path.join(DEFAULT_PROFILE_DIR, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Add the --profile options to an entry point's parser"""
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', type=str, default=None, metavar='MODES',
+                       help='Enable profiling: cpu (deterministic), sample (sampling), memory (tracemalloc); comma separated')
+    group.add_argument('--profile-dir', type=str, default=None,
+                       help='Directory for profiling results (default: profiles/profile_<timestamp>_<pid>)')
+    group.add_argument('--profile-stages', type=str, default=None,
+                       help='Only profile inside these stages, comma separated (prompt_build, model, parse, io, checkpoint, batch, ...)')
+    group.add_argument('--profile-worker', type=int, default=None,
+                       help='Only profile worker N of a thread pool')
+    group.add_argument('--profile-interval', type=float, default=5.0,
+                       help='Sampling interval in milliseconds (sample mode)')
+
+
+def profiler_from_args(args: argparse.Namespace) -> Optional[Profiler]:
+    """Create a profiler from parsed arguments; None without --profile"""
+    if not getattr(args, 'profile', None):
+        return None
+    return Profiler(
+        _split(args.profile),
+        args.profile_dir or default_profile_dir(),
+        stages=_split(args.profile_stages) or None,
+        worker=args.profile_worker,
+        interval=args.profile_interval / 1000
+    )
+
+
+def start_profiling(args: argparse.Namespace) -> Optional[Profiler]:
+    """Create and start a profiler from parsed arguments"""
+    profiler = profiler_from_args(args)
+    if profiler is not None:
+        profiler.start()
+        print(f"Profiling enabled: {profiler}")
+    return profiler
@@ -0,0 +1,135 @@
+"""
+Result Journal Module
+Appends each completed question result to an on-disk JSONL journal so an
+interrupted assessment can resume with only the missing questions
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, Any, List
+
+
+class ResultJournal:
+    """
+    Append-only journal of question results for one assessment run
+
+    The journal file is named after a hash of the run identity (model, test,
+    role and stress configuration), so a rerun with the same settings finds it.
+    The first line is a header with the identity; every following line holds
+    one result entry together with its index in the test bank.
+    """
+
+    def __init__(self, journal_dir: str, identity: Dict[str, Any]):
+        """
+        Initialize the journal
+
+        Args:
+            journal_dir: Directory holding journal files
+            identity: Settings that identify the run; any change starts a new journal
+        """
+        self.journal_dir = journal_dir
+        canonical = json.dumps(identity, sort_keys=True, ensure_ascii=False, default=str)
+        # Normalized through JSON so it compares equal to the identity read back from the header
+        self.identity = json.loads(canonical)
+        self.key = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(journal_dir, f"{self.key}.jsonl")
+        self._file = None
+
+    def start(self, resume: bool = False) -> Dict[int, Dict[str, Any]]:
+        """
+        Open the journal for appending
+
+        Args:
+            resume: Keep existing entries; otherwise the journal is started over
+
+        Returns:
+            Completed result entries by test bank index (empty unless resuming)
+        """
+        self.close()
+        os.makedirs(self.journal_dir, exist_ok=True)
+
+        completed = self.load() if resume else {}
+        if completed:
+            self._truncate_torn_tail()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._write({'type': 'header', 'identity': self.identity})
+        return completed
+
+    def append(self, index: int, entry: Dict[str, Any]):
+        """
+        Record a completed question result (flushed to disk before returning)
+
+        Args:
+            index: Position of the question in the test bank
+            entry: The result entry
+        """
+        if self._file is None:
+            raise RuntimeError("Result journal is not started")
+        self._write({'type': 'result', 'index': index, 'entry': entry})
+
+    def load(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Read completed entries; a torn final line from a crash is ignored
+
+        Returns:
+            Result entries by test bank index (a later entry for the same index wins)
+        """
+        entries: Dict[int, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return entries
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if line_number == 0:
+                    if record.get('type') != 'header' or record.get('identity') != self.identity:
+                        return {}
+                    continue
+                if record.get('type') == 'result':
+                    entries[record['index']] = record['entry']
+        return entries
+
+    def results(self) -> List[Dict[str, Any]]:
+        """Assemble the journaled entries in test bank order"""
+        completed = self.load()
+        return [completed[index] for index in sorted(completed)]
+
+    def close(self):
+        """Close the journal file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Close and delete the journal (after the final results were saved)"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _truncate_torn_tail(self):
+        """Drop a partially written last line so appended records start on a new line"""
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self) -> str:
+        return f"ResultJournal({self.path})"
+
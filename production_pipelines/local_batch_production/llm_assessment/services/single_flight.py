@@ -0,0 +1,227 @@
+"""
+Single-flight request coalescing for AgentPsy model calls
+Concurrent identical requests (same normalized payload) share one upstream call: the first
+caller runs it, later callers wait for its result instead of issuing a duplicate. Unlike a
+response cache nothing is kept once the call completes, so only truly concurrent duplicates
+(repeated context prompts, connectivity probes, duplicate reports) are merged.
+One process-wide group is shared by every client; LLM_SINGLE_FLIGHT=0 turns it off.
+"""
+
+import os
+import copy
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_IMMUTABLE = (str, bytes, int, float, bool, type(None), tuple, frozenset)
+
+
+def request_key(*parts: Any) -> str:
+    """
+    Normalize a request payload into a coalescing key.
+
+    Args:
+        *parts: JSON-serializable request parts (model, messages, options, ...);
+            dict key order and whitespace between tokens do not matter
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _share(result: Any) -> Any:
+    """Hand a follower its own copy of mutable results (parsed JSON bodies)"""
+    return result if isinstance(result, _IMMUTABLE) else copy.deepcopy(result)
+
+
+class _Call:
+    """A pending sync call and the callers attached to it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+
+
+class _AsyncCall:
+    """A pending async call (one task per event loop) and the callers attached to it"""
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 1
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls, with per-key waiter counts and per-label stats"""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled (bool): When False every call runs on its own (stats are still kept)
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[tuple, _AsyncCall] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._metrics: Optional[Dict[str, Any]] = None
+
+    # ---- bookkeeping (lock held) ----
+
+    def _record(self, label: str, field: str, waiters: int = 0):
+        stats = self._stats.setdefault(label, {"calls": 0, "executed": 0, "coalesced": 0,
+                                               "errors": 0, "max_waiters": 0})
+        stats[field] += 1
+        if field != "errors":
+            stats["calls"] += 1
+        stats["max_waiters"] = max(stats["max_waiters"], waiters)
+        if self._metrics is not None and field in ("executed", "coalesced"):
+            self._metrics["calls"].inc(1, label=label, outcome=field)
+
+    # ---- sync ----
+
+    def do(self, key: str, fn: Callable[[], Any], label: str = "") -> Any:
+        """
+        Run fn, or wait for an identical call already in flight.
+
+        Args:
+            key (str): Coalescing key (see request_key)
+            fn: Zero-argument callable performing the request
+            label (str): Stats bucket, e.g. the model id
+
+        Returns:
+            Any: fn's result (followers get a copy of mutable results); fn's exception
+            is raised in every attached caller
+        """
+        if not self.enabled:
+            with self._lock:
+                self._record(label, "executed", 1)
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._record(label, "coalesced", call.waiters)
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._record(label, "executed", 1)
+                leader = True
+
+        if not leader:
+            logger.debug(f"Coalesced duplicate request {key[:12]} ({label}), {call.waiters} callers waiting")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._record(label, "errors")
+            raise
+        finally:
+            # Detach before waking followers so later arrivals start a fresh call
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    # ---- async ----
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        """
+        Await fn(), or attach to an identical call already in flight on the same event loop.
+        The shared call runs as its own task, so a cancelled caller does not cancel it for the others.
+
+        Args:
+            key (str): Coalescing key (see request_key)
+            fn: Zero-argument coroutine function performing the request
+            label (str): Stats bucket, e.g. the model id
+
+        Returns:
+            Any: The call's result (followers get a copy of mutable results)
+        """
+        if not self.enabled:
+            with self._lock:
+                self._record(label, "executed", 1)
+            return await fn()
+
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            call = self._async_calls.get(loop_key)
+            if call is not None and call.task.get_loop() is loop:
+                call.waiters += 1
+                self._record(label, "coalesced", call.waiters)
+                leader = False
+            else:
+                call = self._async_calls[loop_key] = _AsyncCall(loop.create_task(fn()))
+                self._record(label, "executed", 1)
+                call.task.add_done_callback(lambda task: self._finish_async(loop_key, task, label))
+                leader = True
+
+        if not leader:
+            logger.debug(f"Coalesced duplicate request {key[:12]} ({label}), {call.waiters} callers waiting")
+        result = await asyncio.shield(call.task)
+        return result if leader else _share(result)
+
+    def _finish_async(self, loop_key: tuple, task: "asyncio.Task", label: str):
+        with self._lock:
+            if self._async_calls.get(loop_key) is not None and self._async_calls[loop_key].task is task:
+                del self._async_calls[loop_key]
+            if task.cancelled() or task.exception() is not None:
+                self._record(label, "errors")
+
+    # ---- metrics / introspection ----
+
+    def bind_metrics(self, registry: Any):
+        """
+        Publish coalescing counts through a metrics registry with gauge()/counter() factories
+        (e.g. metrics_exporter.MetricsRegistry in the production pipelines).
+        """
+        with self._lock:
+            self._metrics = {
+                "calls": registry.counter("agentpsy_single_flight_calls_total",
+                                          "Model requests by outcome (executed upstream or coalesced)",
+                                          ("label", "outcome")),
+            }
+        registry.gauge("agentpsy_single_flight_waiters", "Callers attached to in-flight requests").set_function(
+            lambda: sum(self.waiters().values()))
+
+    def waiters(self, key: Optional[str] = None) -> Any:
+        """Callers attached to one in-flight key, or a {key: callers} map of every in-flight key"""
+        with self._lock:
+            counts: Dict[str, int] = {k: c.waiters for k, c in self._calls.items()}
+            for (_, k), c in self._async_calls.items():
+                counts[k] = counts.get(k, 0) + c.waiters
+        return counts.get(key, 0) if key is not None else counts
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Calls, upstream executions, coalesced callers, errors and peak waiters per label"""
+        with self._lock:
+            return {label: dict(stats) for label, stats in self._stats.items()}
+
+
+_group: Optional[SingleFlight] = None
+_group_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """The process-wide group (disabled when LLM_SINGLE_FLIGHT is 0/false)"""
+    global _group
+    with _group_lock:
+        if _group is None:
+            _group = SingleFlight(enabled=os.getenv("LLM_SINGLE_FLIGHT", "1").lower() not in ("0", "false", "no"))
+        return _group
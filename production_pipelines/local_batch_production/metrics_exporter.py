@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地实时指标导出
+为 FallbackPerformanceMonitor 与批处理进度提供计数器、仪表和直方图，
+在本地 HTTP 端点以 Prometheus 文本格式提供，并定期快照到磁盘，
+长时间运行时可随时观察吞吐、熔断器状态和进度，及时发现停滞。
+
+    registry = get_registry()
+    exporter = MetricsExporter(registry, port=9464, snapshot_path='live_metrics.json')
+    exporter.start()
+    # curl http://127.0.0.1:9464/metrics       Prometheus 文本格式
+    # curl http://127.0.0.1:9464/metrics.json  JSON 格式
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 请求耗时（秒）的默认分桶，覆盖本地模型到慢速云端模型
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    """指标基类：按标签值保存样本"""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.label_names}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        """返回 (样本名, 标签值, 数值) 列表"""
+        with self._lock:
+            return [(self.name, key, float(value)) for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for sample_name, key, value in self.samples():
+            names = self.label_names
+            if len(key) > len(names):
+                names = names + ('le',)
+            lines.append(f"{sample_name}{_format_labels(names, key)} {_format_value(value)}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = []
+        for sample_name, key, value in self.samples():
+            names = self.label_names + (('le',) if len(key) > len(self.label_names) else ())
+            samples.append({'name': sample_name, 'labels': dict(zip(names, key)), 'value': value})
+        return {'type': self.metric_type, 'help': self.documentation, 'samples': samples}
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """可增可减的仪表；也可绑定一个在读取时求值的函数"""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        if self._function is not None:
+            return self._function()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def set_function(self, function: Callable[[], float]):
+        """读取时调用 function 取值（仅用于无标签仪表）"""
+        if self.label_names:
+            raise ValueError(f"带标签的仪表 {self.name} 不能绑定函数")
+        self._function = function
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        if self._function is not None:
+            try:
+                return [(self.name, (), float(self._function()))]
+            except Exception:
+                return []
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """累计分桶直方图"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        with self._lock:
+            entries = [(key, list(entry['counts']), entry['sum'], entry['count']) for key, entry in self._values.items()]
+
+        samples = []
+        for key, counts, total, count in entries:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key + (_format_value(bound),), float(cumulative)))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, float(count)))
+        return samples
+
+
+class RateWindow:
+    """滑动时间窗口内的事件速率（如每秒完成题数）"""
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+
+    def mark(self, count: int = 1):
+        now = time.monotonic()
+        with self._lock:
+            self._events.append((now, count))
+            self._trim(now)
+
+    def rate(self) -> float:
+        """窗口内每秒事件数"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if not self._events:
+                return 0.0
+            total = sum(count for _, count in self._events)
+        return total / self.window
+
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        while self._events and self._events[0][0] < cutoff:
+            self._events.popleft()
+
+
+class MetricsRegistry:
+    """指标注册表：同名指标重复注册时返回已有实例，便于多个组件共享"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labels: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labels, **kwargs)
+            elif not isinstance(metric, cls) or metric.label_names != tuple(labels):
+                raise ValueError(f"指标 {name} 已以不同类型或标签注册")
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labels)
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'metrics': {metric.name: metric.snapshot() for metric in metrics}
+        }
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """进程内共享的默认注册表"""
+    return _default_registry
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path in ('/metrics', '/'):
+            body = self.registry.render().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif path == '/metrics.json':
+            body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """在后台线程提供 HTTP 指标端点，并定期把指标快照写入磁盘"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, port: Optional[int] = None,
+                 host: str = '127.0.0.1', snapshot_path: Optional[str] = None, snapshot_interval: float = 30.0):
+        """
+        初始化指标导出器
+
+        Args:
+            registry: 指标注册表，默认使用进程共享注册表
+            port: HTTP 端口；为 None 时不启动 HTTP 端点，为 0 时自动分配
+            host: 监听地址（默认仅本机）
+            snapshot_path: JSON 快照路径，同目录另写一份同名 .prom 文本；为 None 时不写快照
+            snapshot_interval: 快照间隔（秒）
+        """
+        self.registry = registry or get_registry()
+        self.port = port
+        self.host = host
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = max(1.0, snapshot_interval)
+        self.logger = logging.getLogger("MetricsExporter")
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._server_thread: Optional[threading.Thread] = None
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def url(self) -> Optional[str]:
+        if self._server is None:
+            return None
+        return f"http://{self.host}:{self._server.server_address[1]}/metrics"
+
+    def start(self) -> 'MetricsExporter':
+        if self.port is not None and self._server is None:
+            handler = type('MetricsHandler', (_MetricsHandler,), {'registry': self.registry})
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+            self._server.daemon_threads = True
+            self._server_thread = threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True)
+            self._server_thread.start()
+            self.logger.info(f"📡 指标端点: {self.url}")
+
+        if self.snapshot_path and self._snapshot_thread is None:
+            self._stop_event.clear()
+            self._snapshot_thread = threading.Thread(target=self._snapshot_loop, name='metrics-snapshot', daemon=True)
+            self._snapshot_thread.start()
+        return self
+
+    def stop(self):
+        """停止 HTTP 端点与快照线程，并写出最后一次快照"""
+        self._stop_event.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+            self.write_snapshot()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def write_snapshot(self):
+        """原子地写出 JSON 快照与 Prometheus 文本快照"""
+        if not self.snapshot_path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+            os.makedirs(directory, exist_ok=True)
+            prom_path = os.path.splitext(self.snapshot_path)[0] + '.prom'
+            for path, content in ((self.snapshot_path, json.dumps(self.registry.snapshot(), indent=2, ensure_ascii=False)),
+                                  (prom_path, self.registry.render())):
+                temp_path = f"{path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(temp_path, path)
+        except OSError as e:
+            self.logger.warning(f"⚠️ 写入指标快照失败: {e}")
+
+    def _snapshot_loop(self):
+        while not self._stop_event.wait(self.snapshot_interval):
+            self.write_snapshot()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    def __str__(self) -> str:
+        return f"MetricsExporter(url={self.url}, snapshot_path={self.snapshot_path}, interval={self.snapshot_interval}s)"
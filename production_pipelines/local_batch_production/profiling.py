@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按需性能剖析
+为批处理入口提供 --profile 选项：确定性（cProfile）或采样式 CPU 剖析，以及 tracemalloc 内存快照。
+可以只剖析指定阶段（阶段名与 tracing 模块一致）或线程池中的某一个工作线程，不必再手工修改脚本。
+
+剖析模式（--profile，可逗号组合）：
+    cpu     确定性剖析   -> cpu.pstats（python -m pstats / snakeviz 打开）与 cpu_top.txt
+    sample  采样式剖析   -> sample.collapsed（折叠调用栈，flamegraph.pl / speedscope 可直接使用）与 sample_top.txt
+    memory  内存快照     -> memory.snapshot（tracemalloc.Snapshot.load 读取）与 memory_top.txt
+
+用法：
+    python cloud_fallback_batch_processor.py --input ... --profile cpu,memory --profile-stages parse,scoring
+    python profiling.py run --profile sample --profile-worker 0 three_model_ollama_evaluator.py
+"""
+
+import argparse
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import runpy
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from tracing import add_stage_listener, remove_stage_listener
+
+PROFILE_MODES = ('cpu', 'sample', 'memory')
+DEFAULT_PROFILE_DIR = 'profiles'
+
+# Python 3.12 起 cProfile 基于 sys.monitoring，对所有线程全局生效，无法按线程启停；
+# 此时共用一个 Profile，在任一线程处于剖析范围内时开启
+_PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+
+
+class Profiler:
+    """CPU / 内存剖析器：默认剖析整个运行过程，指定阶段或工作线程时只在其范围内生效"""
+
+    def __init__(self, modes: Sequence[str], output_dir: str, stages: Optional[Sequence[str]] = None,
+                 worker: Optional[int] = None, interval: float = 0.005, top: int = 30):
+        """
+        初始化剖析器
+
+        Args:
+            modes: 剖析模式（cpu / sample / memory 的组合）
+            output_dir: 结果输出目录
+            stages: 只在这些阶段的 span 内剖析；为空时剖析整个运行过程
+            worker: 只剖析线程池中编号为 N 的工作线程（线程名以 _N 结尾，即 ThreadPoolExecutor 的第 N 个线程）
+            interval: 采样间隔（秒）
+            top: 文本报告中列出的条目数
+        """
+        unknown = set(modes) - set(PROFILE_MODES)
+        if unknown or not modes:
+            raise ValueError(f"未知剖析模式: {', '.join(sorted(unknown)) or '(空)'}，可选: {', '.join(PROFILE_MODES)}")
+
+        self.modes = tuple(dict.fromkeys(modes))
+        self.output_dir = output_dir
+        self.stages = frozenset(stages) if stages else None
+        self.worker = worker
+        self.interval = interval
+        self.top = top
+        # 整体剖析时 cProfile 只覆盖调用 start() 的线程（3.12 起为全部线程），线程池内的工作需配合阶段或 sample 模式
+        self.scoped = self.stages is not None or worker is not None
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        self._shared_profile: Optional[cProfile.Profile] = None
+        self._shared_depth = 0
+        self._active_threads = set()
+        self._samples: Counter = Counter()
+        self._sample_ticks = 0
+        self._labels: Dict[object, str] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._owns_tracemalloc = False
+        self._started = False
+        self._stopped = False
+
+    def start(self) -> 'Profiler':
+        """开始剖析；进程退出时自动写出结果"""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+
+        if 'sample' in self.modes:
+            self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+            self._sampler.start()
+
+        if self.scoped:
+            add_stage_listener(self._on_stage)
+        else:
+            if 'memory' in self.modes:
+                self._start_memory()
+            if 'cpu' in self.modes:
+                self._begin_cpu()
+
+        atexit.register(self.stop)
+        return self
+
+    def stop(self) -> List[str]:
+        """
+        停止剖析并写出结果
+
+        Returns:
+            写出的文件路径列表
+        """
+        with self._lock:
+            if not self._started or self._stopped:
+                return []
+            self._stopped = True
+
+        if self.scoped:
+            remove_stage_listener(self._on_stage)
+        elif 'cpu' in self.modes:
+            self._end_cpu()
+        if self._sampler is not None:
+            self._stop_event.set()
+            self._sampler.join()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        written = []
+        # 先取内存快照，避免把写出 CPU 结果时的分配计入
+        if 'memory' in self.modes:
+            written.extend(self._write_memory())
+        if 'cpu' in self.modes:
+            written.extend(self._write_cpu())
+        if 'sample' in self.modes:
+            written.extend(self._write_samples())
+
+        if written:
+            print(f"📈 剖析结果已写入: {self.output_dir}")
+        else:
+            print(f"⚠️ 剖析范围内没有执行任何代码（阶段: {', '.join(sorted(self.stages or ())) or '全部'}，工作线程: {self.worker}）")
+        return written
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    # ---- 阶段范围 ----
+
+    def _on_stage(self, stage: str, entering: bool):
+        if self.stages is not None and stage not in self.stages:
+            return
+        local = self._local
+        selected = getattr(local, 'selected', None)
+        if selected is None:
+            selected = local.selected = self._thread_selected()
+        if not selected:
+            return
+
+        depth = getattr(local, 'depth', 0)
+        if entering:
+            local.depth = depth + 1
+            if depth == 0:
+                self._enter_scope()
+        elif depth > 0:
+            # 剖析开始前已进入的阶段离开时 depth 为 0，直接忽略
+            local.depth = depth - 1
+            if depth == 1:
+                self._leave_scope()
+
+    def _thread_selected(self) -> bool:
+        if self.worker is None:
+            return True
+        return threading.current_thread().name.endswith(f'_{self.worker}')
+
+    def _enter_scope(self):
+        if 'cpu' in self.modes:
+            self._begin_cpu()
+        if 'sample' in self.modes:
+            with self._lock:
+                self._active_threads.add(threading.get_ident())
+        if 'memory' in self.modes:
+            self._start_memory()
+
+    def _leave_scope(self):
+        if 'cpu' in self.modes:
+            self._end_cpu()
+        if 'sample' in self.modes:
+            with self._lock:
+                self._active_threads.discard(threading.get_ident())
+
+    # ---- 确定性 CPU 剖析 ----
+
+    def _begin_cpu(self):
+        if _PER_THREAD_CPROFILE:
+            profile = getattr(self._local, 'profile', None)
+            if profile is None:
+                profile = self._local.profile = cProfile.Profile()
+                with self._lock:
+                    self._profiles.append(profile)
+            profile.enable()
+            return
+
+        with self._lock:
+            if self._shared_profile is None:
+                self._shared_profile = cProfile.Profile()
+                self._profiles.append(self._shared_profile)
+            self._shared_depth += 1
+            if self._shared_depth == 1:
+                self._shared_profile.enable()
+
+    def _end_cpu(self):
+        if _PER_THREAD_CPROFILE:
+            profile = getattr(self._local, 'profile', None)
+            if profile is not None:
+                profile.disable()
+            return
+
+        with self._lock:
+            self._shared_depth = max(0, self._shared_depth - 1)
+            if self._shared_depth == 0 and self._shared_profile is not None:
+                self._shared_profile.disable()
+
+    def _write_cpu(self) -> List[str]:
+        profiles = [profile for profile in self._profiles if _has_stats(profile)]
+        if not profiles:
+            return []
+
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        pstats_path = os.path.join(self.output_dir, 'cpu.pstats')
+        stats.dump_stats(pstats_path)
+
+        report = io.StringIO()
+        stats.stream = report
+        report.write(self._header('cpu'))
+        report.write(f"线程数: {len(profiles)}\n\n按累计耗时排序:\n")
+        stats.sort_stats('cumulative').print_stats(self.top)
+        report.write("\n按自身耗时排序:\n")
+        stats.sort_stats('tottime').print_stats(self.top)
+        top_path = os.path.join(self.output_dir, 'cpu_top.txt')
+        with open(top_path, 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        return [pstats_path, top_path]
+
+    # ---- 采样式 CPU 剖析 ----
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            if self.scoped:
+                with self._lock:
+                    thread_ids = list(self._active_threads)
+            else:
+                thread_ids = [thread_id for thread_id in frames if thread_id != own_id]
+
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self._samples[self._collapse(frame)] += 1
+            self._sample_ticks += 1
+
+    def _collapse(self, frame) -> str:
+        """把调用栈折叠为 root;...;leaf 形式"""
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                label = self._labels[code] = label.replace(';', ':')
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return ';'.join(labels)
+
+    def _write_samples(self) -> List[str]:
+        if not self._samples:
+            return []
+
+        collapsed_path = os.path.join(self.output_dir, 'sample.collapsed')
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self._samples.items():
+            frames = stack.split(';')
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        total = sum(self._samples.values())
+
+        top_path = os.path.join(self.output_dir, 'sample_top.txt')
+        with open(top_path, 'w', encoding='utf-8') as f:
+            f.write(self._header('sample'))
+            f.write(f"采样间隔: {self.interval * 1000:.1f} ms，采样轮数: {self._sample_ticks}，栈样本: {total}\n\n")
+            f.write(f"{'self %':>8}{'total %':>9}  函数\n")
+            for label, count in self_counts.most_common(self.top):
+                f.write(f"{count / total * 100:>7.1f}%{total_counts[label] / total * 100:>8.1f}%  {label}\n")
+        return [collapsed_path, top_path]
+
+    # ---- 内存 ----
+
+    def _start_memory(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+
+    def _write_memory(self) -> List[str]:
+        if not tracemalloc.is_tracing():
+            return []
+
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        snapshot_path = os.path.join(self.output_dir, 'memory.snapshot')
+        snapshot.dump(snapshot_path)
+
+        top_path = os.path.join(self.output_dir, 'memory_top.txt')
+        with open(top_path, 'w', encoding='utf-8') as f:
+            f.write(self._header('memory'))
+            f.write(f"当前占用: {current / 1024 / 1024:.2f} MiB，峰值: {peak / 1024 / 1024:.2f} MiB\n\n")
+            f.write("存活分配（按代码行）:\n")
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                f.write(f"  {stat}\n")
+            f.write("\n存活分配（按文件）:\n")
+            for stat in snapshot.statistics('filename')[:self.top]:
+                f.write(f"  {stat}\n")
+        return [snapshot_path, top_path]
+
+    def _header(self, mode: str) -> str:
+        return (f"剖析模式: {mode}\n"
+                f"阶段: {', '.join(sorted(self.stages)) if self.stages else '全部'}\n"
+                f"工作线程: {self.worker if self.worker is not None else '全部'}\n"
+                f"生成时间: {datetime.now().isoformat()}\n")
+
+    def __str__(self) -> str:
+        return f"Profiler(modes={','.join(self.modes)}, output_dir={self.output_dir}, stages={self.stages}, worker={self.worker})"
+
+
+def _has_stats(profile: cProfile.Profile) -> bool:
+    profile.create_stats()
+    return bool(profile.stats)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def default_profile_dir() -> str:
+    return os.path.join(DEFAULT_PROFILE_DIR, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """给入口脚本添加 --profile 相关参数"""
+    group = parser.add_argument_group('性能剖析')
+    group.add_argument('--profile', type=str, default=None, metavar='MODES',
+                       help='启用剖析：cpu（确定性）、sample（采样）、memory（tracemalloc），可逗号组合')
+    group.add_argument('--profile-dir', type=str, default=None,
+                       help='剖析结果目录（默认 profiles/profile_<时间戳>_<pid>）')
+    group.add_argument('--profile-stages', type=str, default=None,
+                       help='只在这些阶段内剖析，逗号分隔（prompt_build, queue_wait, model, parse, scoring, checkpoint, io, question, file 等）')
+    group.add_argument('--profile-worker', type=int, default=None,
+                       help='只剖析线程池中编号为 N 的工作线程')
+    group.add_argument('--profile-interval', type=float, default=5.0,
+                       help='采样间隔（毫秒，sample 模式）')
+
+
+def profiler_from_args(args: argparse.Namespace) -> Optional[Profiler]:
+    """按命令行参数创建剖析器；未指定 --profile 时返回None"""
+    if not getattr(args, 'profile', None):
+        return None
+    return Profiler(
+        _split(args.profile),
+        args.profile_dir or default_profile_dir(),
+        stages=_split(args.profile_stages) or None,
+        worker=args.profile_worker,
+        interval=args.profile_interval / 1000
+    )
+
+
+def start_profiling(args: argparse.Namespace) -> Optional[Profiler]:
+    """按命令行参数创建并启动剖析器"""
+    profiler = profiler_from_args(args)
+    if profiler is not None:
+        profiler.start()
+        print(f"📈 性能剖析已启用: {profiler}")
+    return profiler
+
+
+def profile_command(args: argparse.Namespace, script: str, script_args: Sequence[str]) -> List[str]:
+    """
+    构造启动子进程脚本的命令；指定了 --profile 时经 profiling.py run 启动，在子进程内剖析
+
+    Args:
+        args: 含 --profile 参数的命令行参数
+        script: 子进程脚本
+        script_args: 脚本参数
+    """
+    if not getattr(args, 'profile', None):
+        return [sys.executable, str(script), *script_args]
+
+    cmd = [sys.executable, os.path.abspath(__file__), 'run',
+           '--profile', args.profile,
+           '--profile-dir', os.path.abspath(args.profile_dir or default_profile_dir()),
+           '--profile-interval', str(args.profile_interval)]
+    if args.profile_stages:
+        cmd.extend(['--profile-stages', args.profile_stages])
+    if args.profile_worker is not None:
+        cmd.extend(['--profile-worker', str(args.profile_worker)])
+    return cmd + [str(script), *script_args]
+
+
+def _run_script(args: argparse.Namespace):
+    profiler = profiler_from_args(args)
+    script = os.path.abspath(args.script)
+    sys.argv = [script, *args.script_args]
+    sys.path.insert(0, os.path.dirname(script))
+
+    profiler.start()
+    try:
+        runpy.run_path(script, run_name='__main__')
+    finally:
+        profiler.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按需性能剖析')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='在剖析下运行脚本')
+    add_profile_arguments(run_parser)
+    run_parser.add_argument('script', help='要运行的脚本')
+    run_parser.add_argument('script_args', nargs=argparse.REMAINDER, help='脚本参数')
+    args = parser.parse_args()
+
+    if not args.profile:
+        parser.error('run 需要 --profile')
+    _run_script(args)
+
+
+if __name__ == '__main__':
+    main()
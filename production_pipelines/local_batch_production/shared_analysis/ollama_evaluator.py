@@ -7,21 +7,41 @@ Ollama本地大模型评估器
 import json
 import requests
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, TYPE_CHECKING
 from datetime import datetime
 import re
 
+if TYPE_CHECKING:
+    from llm_assessment.services.endpoint_pool import EndpointPool
+
 
 class OllamaEvaluator:
     """Ollama评估器类"""
     
-    def __init__(self, base_url: str = "http://localhost:11434", timeout: int = 120):
+    def __init__(self, base_url: str = "http://localhost:11434", timeout: int = 120,
+                 endpoint_pool: Optional['EndpointPool'] = None):
+        """
+        Args:
+            base_url: Ollama服务地址
+            timeout: 请求超时（秒）
+            endpoint_pool: 多个Ollama主机的负载均衡池；指定时请求按池路由，忽略 base_url
+        """
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
         self.session = requests.Session()
+        self.endpoint_pool = endpoint_pool
+        
+    def _post(self, path: str, model_name: str, request_data: Dict[str, Any]) -> requests.Response:
+        """发送请求；使用主机池时路由到负载最低的健康主机，连接失败或5xx时换下一台"""
+        if self.endpoint_pool is None:
+            return self.session.post(f"{self.base_url}{path}", json=request_data, timeout=self.timeout)
+        return self.endpoint_pool.request('POST', path, model=model_name, session=self.session,
+                                          json=request_data, timeout=self.timeout)
         
     def check_connection(self) -> bool:
         """检查Ollama服务连接"""
+        if self.endpoint_pool is not None:
+            return any(self.endpoint_pool.check_health().values())
         try:
             response = self.session.get(f"{self.base_url}/api/tags", timeout=10)
             return response.status_code == 200
@@ -31,6 +51,9 @@ class OllamaEvaluator:
     
     def list_models(self) -> Dict[str, Any]:
         """获取可用模型列表"""
+        if self.endpoint_pool is not None:
+            # 池中至少一台可用主机已安装的模型（依赖 check_connection 时的健康检查结果）
+            return {"models": [{"name": name} for name in self.endpoint_pool.available_models()]}
         try:
             response = self.session.get(f"{self.base_url}/api/tags", timeout=10)
             if response.status_code == 200:
@@ -61,11 +84,7 @@ class OllamaEvaluator:
             print(f"    [DEBUG] Calling Ollama Chat API with model: {model_name}")
             print(f"    [DEBUG] Messages count: {len(messages)}")
             
-            response = self.session.post(
-                f"{self.base_url}/api/chat",
-                json=request_data,
-                timeout=self.timeout
-            )
+            response = self._post("/api/chat", model_name, request_data)
             
             if response.status_code == 200:
                 result = response.json()
@@ -135,11 +154,7 @@ class OllamaEvaluator:
             print(f"    [DEBUG] System prompt length: {len(system_prompt) if system_prompt else 0} chars")
             print(f"    [DEBUG] User prompt length: {len(prompt)} chars")
             
-            response = self.session.post(
-                f"{self.base_url}/api/generate",
-                json=request_data,
-                timeout=self.timeout
-            )
+            response = self._post("/api/generate", model_name, request_data)
             
             if response.status_code == 200:
                 result = response.json()
@@ -489,6 +504,29 @@ def get_ollama_model_config(model_name: str) -> Dict[str, Any]:
     return config.get("ollama", {}).get("models", {}).get(model_name, {})
 
 
+_endpoint_pool: Optional['EndpointPool'] = None
+
+
+def get_endpoint_pool(ollama_config: Dict[str, Any]) -> Optional['EndpointPool']:
+    """
+    按配置创建（进程内共享）Ollama主机池：ollama.endpoints / ollama.base_urls 配置了多台主机时启用，
+    并在后台定期做健康检查。未配置主机池时不导入 llm_assessment，脚本方式运行不依赖项目根目录
+    """
+    global _endpoint_pool
+    if _endpoint_pool is None and (ollama_config.get("endpoints") or ollama_config.get("base_urls")):
+        try:
+            from llm_assessment.services.endpoint_pool import EndpointPool
+        except ImportError as e:
+            print(f"无法加载Ollama主机池（{e}），使用单一服务地址")
+            return None
+        _endpoint_pool = EndpointPool.from_config(ollama_config)
+        if _endpoint_pool is not None:
+            _endpoint_pool.check_health()
+            _endpoint_pool.start_health_checks(ollama_config.get("health_check_interval", 30))
+            print(f"使用Ollama主机池: {_endpoint_pool}")
+    return _endpoint_pool
+
+
 def create_ollama_evaluator(evaluator_name: str) -> Optional[OllamaEvaluator]:
     """创建Ollama评估器实例"""
     config = load_ollama_config()
@@ -516,11 +554,12 @@ def create_ollama_evaluator(evaluator_name: str) -> Optional[OllamaEvaluator]:
 
     print(f"创建评估器 {evaluator_name}，模型 {model_name}，超时 {timeout}秒")
 
-    evaluator = OllamaEvaluator(base_url, timeout)
+    endpoint_pool = get_endpoint_pool(ollama_config)
+    evaluator = OllamaEvaluator(base_url, timeout, endpoint_pool=endpoint_pool)
     
     # 检查连接
     if not evaluator.check_connection():
-        print(f"无法连接到Ollama服务: {base_url}")
+        print(f"无法连接到Ollama服务: {endpoint_pool or base_url}")
         return None
     
     # 检查模型是否存在
@@ -14,6 +14,8 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 import logging
 
+import numpy as np
+
 # 添加包目录到路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -21,6 +23,9 @@ from smart_evaluator import SmartEvaluator
 from single_report_pipeline.input_parser import InputParser
 from single_report_pipeline.context_generator import ContextGenerator
 from single_report_pipeline.reverse_scoring_processor import ReverseScoringProcessor
+from single_report_pipeline.scoring_core import (
+    BIG5_TRAITS, scores_to_array, trait_means, array_to_dict, mbti_types
+)
 
 class SmartTransparentPipeline:
     """智能透明流水线 - 集成智能回退评估器"""
@@ -266,53 +271,25 @@ class SmartTransparentPipeline:
         if not question_results:
             return {}
 
-        big5_sums = {
-            'openness_to_experience': 0,
-            'conscientiousness': 0,
-            'extraversion': 0,
-            'agreeableness': 0,
-            'neuroticism': 0
-        }
-
-        valid_count = 0
-        for result in question_results:
-            if result.get('success', True) and 'final_scores' in result:
-                scores = result['final_scores']
-                for trait in big5_sums:
-                    big5_sums[trait] += scores.get(trait, 3)
-                valid_count += 1
-
-        if valid_count == 0:
+        # 只统计成功的题目，缺失维度按中性分3计入
+        valid_results = [
+            result for result in question_results
+            if result.get('success', True) and 'final_scores' in result
+        ]
+        if not valid_results:
             return {}
 
-        return {trait: sum_score / valid_count for trait, sum_score in big5_sums.items()}
+        scores = scores_to_array([result['final_scores'] for result in valid_results])
+        scores = np.where(np.isnan(scores), 3.0, scores)
+        return array_to_dict(trait_means(scores, decimals=None, valid_scores=None))
 
     def infer_mbti_type(self, big5_scores: Dict[str, float]) -> str:
         """从Big Five得分推断MBTI类型"""
         if not big5_scores:
             return "Unknown"
 
-        E = big5_scores.get('extraversion', 3)
-        O = big5_scores.get('openness_to_experience', 3)
-        C = big5_scores.get('conscientiousness', 3)
-        A = big5_scores.get('agreeableness', 3)
-        N = big5_scores.get('neuroticism', 3)
-
-        # E/I: 外向性 vs 神经质
-        e_score = E + (5 - N)
-        i_score = (5 - E) + N
-        E_preference = 'E' if e_score > i_score else 'I'
-
-        # S/N: 感觉 vs 直觉
-        S_preference = 'S' if O <= 3 else 'N'
-
-        # T/F: 思考 vs 情感
-        T_preference = 'T' if A <= 3 else 'F'
-
-        # J/P: 判断 vs 知觉
-        J_preference = 'J' if C > 3 else 'P'
-
-        return f"{E_preference}{S_preference}{T_preference}{J_preference}"
+        big5 = [big5_scores.get(trait, 3) for trait in BIG5_TRAITS]
+        return str(mbti_types(big5, rule='transparent'))
 
     def process_single_question(self, question: Dict, question_idx: int) -> Dict[str, Any]:
         """
@@ -18,9 +18,22 @@ from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from collections import Counter
 import concurrent.futures
+import argparse
+
+import numpy as np
 
 # 导入弹性JSON序列化器
 from resilient_json_serializer import safe_json_dumps, safe_json_loads, EnhancedJSONFileHandler
+from scoring_core import scores_to_array, model_statistics, consistency_grades, mbti_types as map_mbti_types
+from model_residency import ModelResidencyManager
+from work_queue import DEFAULT_LEASE_SECONDS, default_worker_id, open_work_queue
+from adaptive_concurrency import (
+    add_concurrency_arguments, concurrency_from_args, concurrency_slot, get_concurrency_controller
+)
+from tracing import (
+    traced, STAGE_MODEL, STAGE_PARSE, STAGE_PROMPT_BUILD, STAGE_SCORING, STAGE_EVALUATION, STAGE_FILE, STAGE_BATCH
+)
+from profiling import add_profile_arguments, start_profiling
 
 # 设置环境变量
 os.environ['PYTHONUNBUFFERED'] = '1'
@@ -48,6 +61,9 @@ class ThreeModelOllamaEvaluator:
             }
         ]
 
+        # 本地模型驻留管理（云端模型自动跳过）
+        self.residency = ModelResidencyManager()
+
         # 质量控制设置 - 90%最低成功率阈值
         self.min_success_rate = 0.9
         self.quality_stats = {
@@ -191,21 +207,25 @@ class ThreeModelOllamaEvaluator:
 
         return result
 
+    @traced(STAGE_MODEL)
     def execute_ollama_command(self, model_name: str, prompt: str, timeout: int = 300) -> Tuple[bool, str, float]:
         """执行Ollama命令"""
         try:
-            cmd = ['ollama', 'run', model_name, prompt, '--format', 'json']
+            cmd = ['ollama', 'run', model_name, prompt, '--format', 'json',
+                   '--keepalive', self.residency.keep_alive]
 
             start_time = time.time()
 
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                encoding='utf-8',
-                errors='ignore'
-            )
+            # 三个模型共用同一Ollama主机：超时即视为过载，由自适应并发控制器收紧在途调用数
+            with concurrency_slot(f"ollama:{os.environ.get('OLLAMA_HOST', 'local')}"):
+                result = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout,
+                    encoding='utf-8',
+                    errors='ignore'
+                )
 
             end_time = time.time()
             processing_time = end_time - start_time
@@ -235,6 +255,7 @@ class ThreeModelOllamaEvaluator:
 
         return cleaned.strip()
 
+    @traced(STAGE_PARSE)
     def parse_json_response(self, response_text: str) -> Dict:
         """多策略JSON解析器"""
         if not response_text:
@@ -421,6 +442,7 @@ class ThreeModelOllamaEvaluator:
 
         return True
 
+    @traced(STAGE_PROMPT_BUILD)
     def create_5segment_prompt(self, segment: List[Dict], segment_number: int, total_segments: int) -> str:
         """创建5题分段分析提示"""
         prompt = f"""你是专业的心理评估分析师，专门分析AI代理的人格特征。你的任务是**分析**以下问卷回答，评估回答者展现的Big5人格特质。
@@ -489,6 +511,7 @@ class ThreeModelOllamaEvaluator:
 
         return prompt
 
+    @traced(STAGE_EVALUATION)
     def analyze_segment_with_model(self, model_name: str, segment: List[Dict], segment_number: int, total_segments: int) -> Dict:
         """使用指定模型分析单个分段"""
         prompt = self.create_5segment_prompt(segment, segment_number, total_segments)
@@ -549,25 +572,16 @@ class ThreeModelOllamaEvaluator:
     def calculate_mbti_type(self, scores: Dict) -> str:
         """根据Big5评分计算MBTI类型"""
         try:
-            openness = scores.get('openness_to_experience', 3)
-            conscientiousness = scores.get('conscientiousness', 3)
-            extraversion = scores.get('extraversion', 3)
-            agreeableness = scores.get('agreeableness', 3)
-            neuroticism = scores.get('neuroticism', 3)
-
-            # I/E维度
-            I_E = 'I' if extraversion <= 3 else 'E'
-
-            # S/N维度
-            S_N = 'N' if openness >= 4 else 'S'
-
-            # T/F维度
-            T_F = 'F' if agreeableness >= 4 else 'T'
-
-            # J/P维度
-            J_P = 'J' if conscientiousness >= 4 else 'P'
-
-            return f"{I_E}{S_N}{T_F}{J_P}"
+            big5 = [
+                scores.get('openness_to_experience', 3),
+                scores.get('conscientiousness', 3),
+                scores.get('extraversion', 3),
+                scores.get('agreeableness', 3),
+                scores.get('neuroticism', 3)
+            ]
+
+            # I/E: E<=3→I；S/N: O>=4→N；T/F: A>=4→F；J/P: C>=4→J
+            return str(map_mbti_types(big5, rule='threshold'))
         except Exception:
             return "UNKNOWN"
 
@@ -606,6 +620,7 @@ class ThreeModelOllamaEvaluator:
             print(f"  ❌ 提取问题失败: {e}")
             return []
 
+    @traced(STAGE_SCORING)
     def calculate_three_model_consistency(self, model_results: Dict) -> Dict:
         """计算三个模型间的一致性作为可信度"""
         if len(model_results) < 2:
@@ -613,17 +628,18 @@ class ThreeModelOllamaEvaluator:
 
         # 收集MBTI类型
         mbti_types = []
-        scores_data = {}
+        final_scores_list = []
 
         for model, results in model_results.items():
             if 'mbti_type' in results and results['mbti_type'] != 'UNKNOWN':
                 mbti_types.append(results['mbti_type'])
 
             if 'final_scores' in results:
-                for trait, score in results['final_scores'].items():
-                    if trait not in scores_data:
-                        scores_data[trait] = []
-                    scores_data[trait].append(score)
+                final_scores_list.append(results['final_scores'])
+
+        # 组装 (模型 × 特质) 评分数组，缺失评分为NaN
+        traits = list(dict.fromkeys(trait for scores in final_scores_list for trait in scores))
+        scores_array = scores_to_array(final_scores_list, traits)
 
         # 计算MBTI一致性
         mbti_consensus = "UNKNOWN"
@@ -644,34 +660,21 @@ class ThreeModelOllamaEvaluator:
         trait_consistency = {}
         total_consistency_score = 0
 
-        for trait, scores in scores_data.items():
-            if len(scores) >= 2:
-                std_dev = statistics.stdev(scores) if len(scores) > 1 else 0
-                mean_score = statistics.mean(scores)
+        stats = model_statistics(scores_array, axis=0)
+        consistency_scores, consistency_levels = consistency_grades(stats['std'])
 
+        for t_idx, trait in enumerate(traits):
+            if stats['count'][t_idx] >= 2:
+                present = ~np.isnan(scores_array[:, t_idx])
                 # 一致性评分：标准差越小，一致性越高
-                if std_dev == 0:
-                    consistency_score = 100  # 完全一致
-                    consistency_level = "完美"
-                elif std_dev <= 0.5:
-                    consistency_score = 90  # 高度一致
-                    consistency_level = "高"
-                elif std_dev <= 1.0:
-                    consistency_score = 70  # 中等一致
-                    consistency_level = "中"
-                elif std_dev <= 1.5:
-                    consistency_score = 40  # 低度一致
-                    consistency_level = "低"
-                else:
-                    consistency_score = 10  # 不一致
-                    consistency_level = "极低"
+                consistency_score = int(consistency_scores[t_idx])
 
                 trait_consistency[trait] = {
-                    "mean_score": mean_score,
-                    "std_deviation": std_dev,
-                    "consistency_level": consistency_level,
+                    "mean_score": float(stats['mean'][t_idx]),
+                    "std_deviation": float(stats['std'][t_idx]),
+                    "consistency_level": str(consistency_levels[t_idx]),
                     "consistency_score": consistency_score,
-                    "scores": scores
+                    "scores": [final_scores_list[m_idx][trait] for m_idx in np.flatnonzero(present)]
                 }
 
                 total_consistency_score += consistency_score
@@ -704,6 +707,7 @@ class ThreeModelOllamaEvaluator:
             "analysis_timestamp": datetime.now().isoformat()
         }
 
+    @traced(STAGE_FILE)
     def analyze_file_with_three_models(self, file_path: str, output_dir: str) -> Dict:
         """使用三个模型独立分析单个文件"""
         print(f"📈 开始三模型独立分析: {Path(file_path).name}")
@@ -732,7 +736,10 @@ class ThreeModelOllamaEvaluator:
             model_analysis_results = {}
             total_start_time = time.time()
 
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            # 启用自适应并发时线程数设为 MAX，实际在途调用数由每主机槽位限制
+            controller = get_concurrency_controller()
+            max_workers = controller.max_limit if controller is not None else 3
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
                 future_to_model = {}
 
                 for model in self.models:
@@ -903,8 +910,15 @@ class ThreeModelOllamaEvaluator:
                 'error': str(e)
             }
 
-    def batch_analyze(self, input_dir: str, output_dir: str = "three_model_consistency_results", max_files: int = None):
-        """批量分析多个文件"""
+    @traced(STAGE_BATCH)
+    def batch_analyze(self, input_dir: str, output_dir: str = "three_model_consistency_results", max_files: int = None,
+                      work_queue: str = None, worker_id: str = None, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        """
+        批量分析多个文件
+
+        指定 work_queue（共享目录或SQLite路径）时，多个节点从同一队列领取文件，
+        队列排空后由最后完成的节点合并全部结果生成批量报告
+        """
         print("🚀 三模型Ollama独立评估器")
         print("=" * 50)
         print(f"📁 输入目录: {input_dir}")
@@ -924,6 +938,11 @@ class ThreeModelOllamaEvaluator:
             return
 
         print(f"✅ 所有3个模型都可用")
+
+        # 三个模型在每个文件上并发调用，批次开始前统一预加载本地模型
+        preloaded = self.residency.preload([m['name'] for m in self.models])
+        if preloaded:
+            print(f"🔥 已预加载本地模型: {', '.join(preloaded)}")
         print()
 
         self.stats['processing_start'] = datetime.now()
@@ -952,23 +971,28 @@ class ThreeModelOllamaEvaluator:
             return
 
         # 批量处理
-        batch_results = []
+        if work_queue:
+            batch_results = self._analyze_from_work_queue(files, output_dir, work_queue, worker_id, lease_seconds)
+            if batch_results is None:
+                return None
+        else:
+            batch_results = []
 
-        for i, file_path in enumerate(files, 1):
-            print(f"📈 [{i}/{len(files)}] 处理: {file_path.name}")
+            for i, file_path in enumerate(files, 1):
+                print(f"📈 [{i}/{len(files)}] 处理: {file_path.name}")
 
-            result = self.analyze_file_with_three_models(str(file_path), output_dir)
-            batch_results.append(result)
+                result = self.analyze_file_with_three_models(str(file_path), output_dir)
+                batch_results.append(result)
 
-            if result['success']:
-                self.stats['processed_files'] += 1
-            else:
-                self.stats['failed_files'] += 1
+                if result['success']:
+                    self.stats['processed_files'] += 1
+                else:
+                    self.stats['failed_files'] += 1
 
-            # 显示进度
-            successful = len([r for r in batch_results if r.get('success', False)])
-            print(f"   进度: {successful}/{len(batch_results)} 成功")
-            print()
+                # 显示进度
+                successful = len([r for r in batch_results if r.get('success', False)])
+                print(f"   进度: {successful}/{len(batch_results)} 成功")
+                print()
 
         # 完成统计
         self.stats['processing_end'] = datetime.now()
@@ -1058,16 +1082,95 @@ class ThreeModelOllamaEvaluator:
 
         return batch_report
 
+    def _analyze_from_work_queue(self, files: List[Path], output_dir: str, location: str,
+                                 worker_id: Optional[str], lease_seconds: float) -> Optional[List[Dict]]:
+        """从共享工作队列领取文件处理；队列排空时返回全部节点的结果，否则返回None"""
+        worker_id = worker_id or default_worker_id()
+        queue = open_work_queue(location, lease_seconds=lease_seconds)
+        try:
+            # 以文件名为条目标识，各节点挂载共享目录的路径可以不同
+            files_by_name = {f.name: f for f in files}
+            added = queue.enqueue_many((name, None) for name in files_by_name)
+            print(f"🗂️ 共享工作队列: {queue}（工作进程 {worker_id}）")
+            print(f"   新加入队列: {added} 个, 队列状态: {queue.stats()}")
+            print()
+
+            processed = 0
+            skipped = set()
+            while True:
+                lease = queue.claim(worker_id, skip=skipped)
+                if lease is None:
+                    break
+
+                file_path = files_by_name.get(lease.item_id)
+                if file_path is None:
+                    # 本节点没有该文件：交还给其他节点（不计入领取次数），本节点不再领取
+                    queue.release(lease)
+                    skipped.add(lease.item_id)
+                    continue
+
+                processed += 1
+                print(f"📈 [本节点第{processed}个] 处理: {file_path.name}（第{lease.attempts}次领取）")
+                try:
+                    with queue.keep_alive(lease) as keeper:
+                        result = self.analyze_file_with_three_models(str(file_path), output_dir)
+                except Exception as e:
+                    # 立即放回队列（计入领取次数），不必等租约过期
+                    print(f"   ❌ 处理异常: {e}")
+                    queue.fail(lease, str(e))
+                    continue
+                if keeper.lost or not queue.complete(lease, result):
+                    print(f"   ⚠️ 租约已丢失，结果不写入队列: {lease.item_id}")
+                    continue
+                print(f"   {'✅ 成功' if result.get('success') else '❌ 失败'}")
+                print()
+
+            stats = queue.stats()
+            print(f"🗂️ 本节点处理 {processed} 个文件, 队列状态: {stats}")
+            if not queue.is_drained():
+                print("ℹ️ 其他节点仍在处理，批量报告将由最后完成的节点生成")
+                return None
+
+            batch_results = [result for _, result in queue.results()]
+        finally:
+            queue.close()
+
+        # 文件级统计以合并后的结果为准；分段与质量控制统计仍为本节点数据
+        self.stats['total_files'] = len(batch_results) + stats['failed']
+        self.stats['processed_files'] = sum(1 for r in batch_results if r.get('success'))
+        self.stats['failed_files'] = self.stats['total_files'] - self.stats['processed_files']
+        confidence_levels = [r.get('consistency_analysis', {}).get('overall_confidence', '极低')
+                             for r in batch_results if r.get('success')]
+        self.stats['high_confidence_files'] = confidence_levels.count('高')
+        self.stats['medium_confidence_files'] = confidence_levels.count('中')
+        self.stats['low_confidence_files'] = len(confidence_levels) - confidence_levels.count('高') - confidence_levels.count('中')
+        return batch_results
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='三模型Ollama独立评估器')
+    parser.add_argument('--input-dir', type=str, default='results/results', help='测评报告目录')
+    parser.add_argument('--output-dir', type=str, default='three_model_consistency_results', help='输出目录')
+    parser.add_argument('--max-files', type=int, default=None, help='最多处理的文件数（默认全部）')
+    parser.add_argument('--work-queue', type=str, default=None,
+                        help='多节点共享工作队列：共享目录，或 .db / sqlite:/// 形式的SQLite数据库')
+    parser.add_argument('--worker-id', type=str, default=None, help='工作进程标识（默认 主机名:进程号）')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS,
+                        help='工作队列租约时长（秒），工作进程崩溃后条目在租约到期后被重新领取')
+    add_profile_arguments(parser)
+    add_concurrency_arguments(parser)
+    args = parser.parse_args()
+
+    start_profiling(args)
+    controller = concurrency_from_args(args)
     evaluator = ThreeModelOllamaEvaluator()
 
-    # 输入输出目录
-    input_dir = "results/results"  # 可根据实际情况修改
-    output_dir = "three_model_consistency_results"
-
-    # 批量分析 - 处理全部文件
-    evaluator.batch_analyze(input_dir, output_dir, max_files=None)  # 处理所有文件
+    # 批量分析
+    evaluator.batch_analyze(args.input_dir, args.output_dir, max_files=args.max_files,
+                            work_queue=args.work_queue, worker_id=args.worker_id, lease_seconds=args.lease_seconds)
+    if controller:
+        for key, state in controller.snapshot().items():
+            print(f"⚡ 并发上限 {key}: {state['limit']} (降档 {state['decreases']} 次)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阶段级追踪
+以嵌套 span 记录各阶段耗时（提示构建、排队等待、模型调用、解析、计分、检查点、文件读写），
+导出为 JSONL 与 Chrome trace-event 格式（chrome://tracing 或 Perfetto 可直接打开）。
+
+未启用追踪时 span() 返回共享的空操作对象，开销可忽略。
+
+启用方式：
+    - 代码中调用 configure_tracing('trace.jsonl', chrome_path='trace.json')
+    - 或设置环境变量 AGENTPSY_TRACE=trace.jsonl（可选 AGENTPSY_TRACE_CHROME=trace.json）
+
+分析：
+    python tracing.py summary trace.jsonl          各阶段自身耗时占比
+    python tracing.py chrome trace.jsonl out.json  转换为 Chrome trace-event 格式
+"""
+
+import argparse
+import asyncio
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# 叶子阶段：耗时归因的对象
+STAGE_PROMPT_BUILD = 'prompt_build'
+STAGE_QUEUE_WAIT = 'queue_wait'
+STAGE_MODEL = 'model'
+STAGE_PARSE = 'parse'
+STAGE_SCORING = 'scoring'
+STAGE_CHECKPOINT = 'checkpoint'
+STAGE_IO = 'io'
+STAGES = (STAGE_PROMPT_BUILD, STAGE_QUEUE_WAIT, STAGE_MODEL, STAGE_PARSE, STAGE_SCORING, STAGE_CHECKPOINT, STAGE_IO)
+
+# 容器阶段：包住一组叶子阶段（题目、多模型评估、文件、批次），自身耗时计为 other
+STAGE_QUESTION = 'question'
+STAGE_EVALUATION = 'evaluation'
+STAGE_FILE = 'file'
+STAGE_BATCH = 'batch'
+
+TRACE_ENV = 'AGENTPSY_TRACE'
+TRACE_CHROME_ENV = 'AGENTPSY_TRACE_CHROME'
+
+_tracer: Optional['Tracer'] = None
+_current_span: contextvars.ContextVar = contextvars.ContextVar('agentpsy_current_span', default=None)
+# span 编号在进程内唯一（重新配置追踪器后也不重复）
+_span_ids = itertools.count(1)
+# 阶段监听器 listener(stage, entering)，在进入/离开 span 的线程中调用（如按阶段启停性能剖析）
+_stage_listeners: tuple = ()
+
+
+class _NoopSpan:
+    """未启用追踪时使用的空操作 span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _ListenedSpan(_NoopSpan):
+    """未启用追踪但注册了阶段监听器时使用：只通知监听器，不记录耗时"""
+
+    __slots__ = ('stage',)
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        for listener in _stage_listeners:
+            listener(self.stage, True)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for listener in _stage_listeners:
+            listener(self.stage, False)
+        return False
+
+
+class Span:
+    """一次阶段耗时记录，作为上下文管理器使用"""
+
+    __slots__ = ('tracer', 'stage', 'name', 'attrs', 'id', 'parent', '_start', '_token')
+
+    def __init__(self, tracer: 'Tracer', stage: str, name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.stage = stage
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_span_ids)
+        self.parent = None
+        self._start = 0
+        self._token = None
+
+    def set(self, **attrs):
+        """补充属性（如结果状态、重试次数）"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent = parent.id if parent is not None else None
+        self._token = _current_span.set(self)
+        for listener in _stage_listeners:
+            listener(self.stage, True)
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        end = time.perf_counter_ns()
+        for listener in _stage_listeners:
+            listener(self.stage, False)
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self, self._start, end)
+        return False
+
+
+class Tracer:
+    """收集 span 并以 JSONL 追加写出；关闭时可另外导出 Chrome trace-event 文件"""
+
+    def __init__(self, path: str, chrome_path: Optional[str] = None, buffer_size: int = 256):
+        """
+        初始化追踪器
+
+        Args:
+            path: JSONL 输出路径（追加写入）
+            chrome_path: 关闭时导出的 Chrome trace-event 文件路径
+            buffer_size: 缓冲多少个 span 后写一次文件
+        """
+        self.path = path
+        self.chrome_path = chrome_path
+        self.buffer_size = max(1, buffer_size)
+        self.pid = os.getpid()
+        self.span_count = 0
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # perf_counter 单调且精度高；换算到墙钟时间便于跨进程对齐
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def span(self, stage: str, name: Optional[str], attrs: Dict[str, Any]) -> Span:
+        return Span(self, stage, name or stage, attrs)
+
+    def record(self, span: Span, start_ns: int, end_ns: int):
+        event = {
+            'name': span.name,
+            'stage': span.stage,
+            'ts_us': (start_ns + self._epoch_offset_ns) // 1000,
+            'dur_us': (end_ns - start_ns) // 1000,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'thread': threading.current_thread().name,
+            'id': span.id,
+            'parent': span.parent,
+        }
+        if span.attrs:
+            event['attrs'] = span.attrs
+
+        with self._lock:
+            self._buffer.append(event)
+            self.span_count += 1
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        """把缓冲的 span 写入文件"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """写出剩余 span，并按需导出 Chrome trace-event 文件"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_locked()
+        if self.chrome_path:
+            export_chrome(self.path, self.chrome_path)
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in self._buffer:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+        self._buffer.clear()
+
+    def __str__(self) -> str:
+        return f"Tracer(path={self.path}, chrome_path={self.chrome_path}, spans={self.span_count})"
+
+
+def configure_tracing(path: Optional[str] = None, chrome_path: Optional[str] = None) -> Optional[Tracer]:
+    """
+    启用追踪（替换已有的追踪器）
+
+    Args:
+        path: JSONL 输出路径；为空时读取 AGENTPSY_TRACE 环境变量
+        chrome_path: Chrome trace-event 输出路径；为空时读取 AGENTPSY_TRACE_CHROME 环境变量
+
+    Returns:
+        追踪器；未提供路径时返回None（追踪保持关闭）
+    """
+    global _tracer
+    path = path or os.environ.get(TRACE_ENV)
+    chrome_path = chrome_path or os.environ.get(TRACE_CHROME_ENV)
+    if not path:
+        return None
+
+    disable_tracing()
+    _tracer = Tracer(path, chrome_path)
+    return _tracer
+
+
+def disable_tracing():
+    """关闭追踪，写出剩余数据"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def add_stage_listener(listener: Callable[[str, bool], None]):
+    """
+    注册阶段监听器：每次进入/离开 span 时以 listener(stage, entering) 调用，
+    未启用追踪时同样生效
+    """
+    global _stage_listeners
+    _stage_listeners = _stage_listeners + (listener,)
+
+
+def remove_stage_listener(listener: Callable[[str, bool], None]):
+    """移除阶段监听器"""
+    global _stage_listeners
+    _stage_listeners = tuple(l for l in _stage_listeners if l is not listener)
+
+
+def span(stage: str, name: Optional[str] = None, **attrs):
+    """
+    创建一个阶段 span（with 语句使用）
+
+    Args:
+        stage: 阶段（STAGES 之一，或 question / file / batch 等容器阶段）
+        name: 具体操作名称，默认与阶段相同
+        **attrs: 附加属性
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _ListenedSpan(stage) if _stage_listeners else _NOOP_SPAN
+    return tracer.span(stage, name, attrs)
+
+
+def annotate(**attrs):
+    """给当前 span 补充属性；未启用追踪时不做任何事"""
+    if _tracer is None:
+        return
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def traced(stage: str, name: Optional[str] = None) -> Callable:
+    """
+    装饰器：把整个函数调用记录为一个 span（支持 async 函数）
+
+    Args:
+        stage: 阶段
+        name: 操作名称，默认使用函数名
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                tracer = _tracer
+                if tracer is None:
+                    if not _stage_listeners:
+                        return await func(*args, **kwargs)
+                    with _ListenedSpan(stage):
+                        return await func(*args, **kwargs)
+                with tracer.span(stage, span_name, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                if not _stage_listeners:
+                    return func(*args, **kwargs)
+                with _ListenedSpan(stage):
+                    return func(*args, **kwargs)
+            with tracer.span(stage, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def read_trace(path: str) -> List[Dict[str, Any]]:
+    """读取 JSONL 追踪文件（忽略损坏的行）"""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def export_chrome(jsonl_path: str, chrome_path: str):
+    """
+    把 JSONL 追踪转换为 Chrome trace-event 格式
+
+    Args:
+        jsonl_path: JSONL 追踪文件
+        chrome_path: 输出文件路径
+    """
+    trace_events = []
+    thread_names = {}
+    for event in read_trace(jsonl_path):
+        args = dict(event.get('attrs') or {})
+        args['span_id'] = event.get('id')
+        if event.get('parent') is not None:
+            args['parent_id'] = event['parent']
+        trace_events.append({
+            'name': event['name'],
+            'cat': event['stage'],
+            'ph': 'X',
+            'ts': event['ts_us'],
+            'dur': event['dur_us'],
+            'pid': event['pid'],
+            'tid': event['tid'],
+            'args': args
+        })
+        thread_names[(event['pid'], event['tid'])] = event.get('thread')
+
+    for (pid, tid), thread_name in thread_names.items():
+        if thread_name:
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                                 'args': {'name': thread_name}})
+
+    with open(chrome_path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+
+def summarize(events: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    按阶段统计自身耗时（span 耗时减去其子 span 耗时），用于判断瓶颈所在
+
+    Returns:
+        {阶段: {'count', 'self_ms', 'share'}}；容器阶段的自身耗时计入 other
+    """
+    child_time: Dict[tuple, int] = {}
+    for event in events:
+        if event.get('parent') is not None:
+            key = (event['pid'], event['parent'])
+            child_time[key] = child_time.get(key, 0) + event['dur_us']
+
+    totals: Dict[str, Dict[str, float]] = {}
+    for event in events:
+        stage = event['stage'] if event['stage'] in STAGES else 'other'
+        self_us = max(0, event['dur_us'] - child_time.get((event['pid'], event['id']), 0))
+        entry = totals.setdefault(stage, {'count': 0, 'self_ms': 0.0})
+        entry['count'] += 1
+        entry['self_ms'] += self_us / 1000
+
+    overall = sum(entry['self_ms'] for entry in totals.values())
+    for entry in totals.values():
+        entry['self_ms'] = round(entry['self_ms'], 3)
+        entry['share'] = round(entry['self_ms'] / overall, 4) if overall else 0.0
+    return dict(sorted(totals.items(), key=lambda item: item[1]['self_ms'], reverse=True))
+
+
+def _print_summary(path: str):
+    summary = summarize(read_trace(path))
+    print(f"{'stage':<14}{'spans':>8}{'self ms':>14}{'share':>9}")
+    print('-' * 45)
+    for stage, entry in summary.items():
+        print(f"{stage:<14}{entry['count']:>8}{entry['self_ms']:>14.1f}{entry['share'] * 100:>8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='阶段级追踪文件工具')
+    commands = parser.add_subparsers(dest='command', required=True)
+    summary_parser = commands.add_parser('summary', help='各阶段自身耗时占比')
+    summary_parser.add_argument('trace', help='JSONL 追踪文件')
+    chrome_parser = commands.add_parser('chrome', help='转换为 Chrome trace-event 格式')
+    chrome_parser.add_argument('trace', help='JSONL 追踪文件')
+    chrome_parser.add_argument('output', help='输出文件路径')
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        _print_summary(args.trace)
+    else:
+        export_chrome(args.trace, args.output)
+        print(f"Chrome trace written to {args.output}")
+
+
+atexit.register(disable_tracing)
+
+# 通过环境变量启用（子进程、未提供命令行参数的脚本）
+if os.environ.get(TRACE_ENV):
+    configure_tracing()
+
+
+if __name__ == '__main__':
+    main()
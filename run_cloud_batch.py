@@ -35,6 +35,10 @@ PROJECT_ROOT = Path(__file__).parent.absolute()
 CLOUD_FALLBACK_DIR = PROJECT_ROOT / "production_pipelines" / "cloud_fallback_enterprise"
 BATCH_PROCESSOR_SCRIPT = CLOUD_FALLBACK_DIR / "cloud_fallback_batch_processor.py"
 
+# 性能剖析参数由子进程脚本所在目录的 profiling 模块提供
+sys.path.append(str(CLOUD_FALLBACK_DIR))
+from profiling import add_profile_arguments, profile_command
+
 # 默认路径配置
 DEFAULT_INPUT_DIR = PROJECT_ROOT / "results" / "readonly-original"
 DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "results" / "cloud-fallback-batch-analysis"
@@ -113,6 +117,14 @@ def run_batch_processing(args):
             cmd.extend(["--max-evaluators", str(args.max_evaluators)])
             print(f"🔧 最大评估器数量: {args.max_evaluators}")
 
+        if args.metrics_port is not None:
+            cmd.extend(["--metrics-port", str(args.metrics_port)])
+            print(f"📡 实时指标: http://127.0.0.1:{args.metrics_port}/metrics")
+
+        if args.work_queue:
+            cmd.extend(["--work-queue", str(args.work_queue)])
+            print(f"🗂️  共享工作队列: {args.work_queue}")
+
         if args.skip_problem_filter:
             print("⚠️  跳过问题报告筛选（处理所有文件）")
             # 注意：cloud_fallback_batch_processor.py 没有这个参数
@@ -146,7 +158,9 @@ def run_batch_processing(args):
         print()
 
         # 运行命令
-        result = subprocess.run(cmd, cwd=str(CLOUD_FALLBACK_DIR))
+        if args.profile:
+            print(f"📈 性能剖析: {args.profile}（阶段: {args.profile_stages or '全部'}）")
+        result = subprocess.run(profile_command(args, cmd[1], cmd[2:]), cwd=str(CLOUD_FALLBACK_DIR))
 
         if result.returncode == 0:
             print()
@@ -183,6 +197,7 @@ def main():
   python run_cloud_batch.py --quick            # 快速测试（3个文件）
   python run_cloud_batch.py --no-cloud         # 仅本地模型
   python run_cloud_batch.py --output-dir custom_output  # 自定义输出目录
+  python run_cloud_batch.py --quick --profile cpu,memory --profile-stages model,parse  # 性能剖析
 
 注意 / Notes:
   - 输入目录固定为: results/readonly-original
@@ -242,6 +257,22 @@ def main():
         version="Portable PsyAgent v1.0 - Enterprise Cloud Batch Processor"
     )
 
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="在本机该端口提供实时指标（Prometheus 文本格式）"
+    )
+
+    parser.add_argument(
+        "--work-queue",
+        type=str,
+        default=None,
+        help="多节点共享工作队列（共享目录或SQLite数据库），多台机器可同时处理同一批报告"
+    )
+
+    add_profile_arguments(parser)
+
     args = parser.parse_args()
 
     # 显示标题信息
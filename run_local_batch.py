@@ -36,6 +36,10 @@ PROJECT_ROOT = Path(__file__).parent.absolute()
 LOCAL_BATCH_DIR = PROJECT_ROOT / "production_pipelines" / "local_batch_production"
 BATCH_PROCESSOR_SCRIPT = LOCAL_BATCH_DIR / "batch_processor_original.py"
 
+# 性能剖析参数由子进程脚本所在目录的 profiling 模块提供
+sys.path.append(str(LOCAL_BATCH_DIR))
+from profiling import add_profile_arguments, profile_command
+
 # 默认路径配置
 DEFAULT_INPUT_DIR = PROJECT_ROOT / "results" / "readonly-original"
 DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "results" / "local-batch-analysis"
@@ -136,7 +140,9 @@ def run_batch_processing(args):
         print()
 
         # 运行命令
-        result = subprocess.run(cmd, cwd=str(LOCAL_BATCH_DIR))
+        if args.profile:
+            print(f"📈 性能剖析: {args.profile}（阶段: {args.profile_stages or '全部'}）")
+        result = subprocess.run(profile_command(args, cmd[1], cmd[2:]), cwd=str(LOCAL_BATCH_DIR))
 
         if result.returncode == 0:
             print()
@@ -173,6 +179,7 @@ def main():
   python run_local_batch.py --quick            # 快速测试（3个文件）
   python run_local_batch.py --resume           # 从检查点恢复
   python run_local_batch.py --output-dir custom_output  # 自定义输出目录
+  python run_local_batch.py --quick --profile cpu,memory --profile-stages model,parse  # 性能剖析
 
 注意 / Notes:
   - 输入目录固定为: results/readonly-original
@@ -221,6 +228,8 @@ def main():
         version="Portable PsyAgent v1.0 - Local Batch Processor"
     )
 
+    add_profile_arguments(parser)
+
     args = parser.parse_args()
 
     # 显示标题信息
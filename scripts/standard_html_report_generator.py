@@ -5,19 +5,160 @@
 统一所有人格类型的HTML报告格式，确保一致的用户体验
 """
 
+import argparse
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
+from string import Template
+from typing import Dict, List, Any, Optional
+
+# 渲染逻辑版本号，修改标签页内容生成方法后需要递增，使缓存失效
+RENDERER_VERSION = "2"
+
+ASSETS_DIR_NAME = "assets"
+CSS_FILE_NAME = "report.css"
+JS_FILE_NAME = "report.js"
+MANIFEST_FILE_NAME = ".report_manifest.json"
+
+# 所有报告共享的CSS样式，只输出一次到 assets/report.css
+REPORT_CSS = """@import url('https://fonts.googleapis.com/css2?family=Noto+Sans+SC:wght@300;400;500;700&display=swap');
+
+* {
+    font-family: 'Noto Sans SC', sans-serif;
+}
+
+.tab {
+    @apply px-6 py-3 font-semibold border-b-2 cursor-pointer transition-colors duration-200;
+}
+
+.tab.active {
+    @apply text-blue-600 border-blue-600;
+}
+
+.tab:not(.active) {
+    @apply text-gray-600 border-transparent hover:text-blue-600;
+}
+
+.tab-content {
+    display: none;
+}
+
+.tab-content.active {
+    display: block;
+}
+
+.gradient-bg {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+}
+
+.card-hover {
+    @apply transition-transform duration-200 hover:scale-105;
+}
+"""
+
+# 所有报告共享的JavaScript，只输出一次到 assets/report.js
+REPORT_JS = """function showTab(tabName) {
+    // 隐藏所有标签页内容
+    const tabContents = document.querySelectorAll('.tab-content');
+    tabContents.forEach(content => {
+        content.classList.remove('active');
+    });
+
+    // 移除所有标签页按钮的active状态
+    const tabButtons = document.querySelectorAll('.tab');
+    tabButtons.forEach(button => {
+        button.classList.remove('active');
+    });
+
+    // 显示选中的标签页内容
+    document.getElementById(tabName).classList.add('active');
+
+    // 添加active状态到点击的标签页按钮
+    const activeBtn = document.querySelector(`[onclick="showTab('${tabName}')"]`);
+    if (activeBtn) {
+        activeBtn.classList.add('active');
+    }
+}
+
+// 页面加载时显示第一个标签页
+document.addEventListener('DOMContentLoaded', function() {
+    showTab('overview');
+});
+"""
+
+# 预编译的页面模板
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>${personality_type}人格类型国情知识评估报告</title>
+    <script src="https://cdn.tailwindcss.com"></script>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    ${css_styles}
+</head>
+<body class="bg-gray-50">
+    <!-- 头部导航 -->
+    <header class="bg-gradient-to-r from-blue-600 to-purple-600 text-white">
+        <div class="container mx-auto px-4 py-6">
+            <div class="flex items-center justify-between">
+                <div>
+                    <h1 class="text-3xl font-bold">${personality_type}人格类型评估报告</h1>
+                    <p class="mt-2 text-blue-100">基于MBTI理论的公民知识综合评估</p>
+                </div>
+                <div class="text-right">
+                    <div class="text-2xl font-bold">总评分: ${total_score}</div>
+                    <div class="text-lg">等级: ${grade}</div>
+                </div>
+            </div>
+        </div>
+    </header>
+
+    <!-- 主要内容 -->
+    <main class="container mx-auto px-4 py-8">
+        <div class="bg-white rounded-lg shadow-lg p-6">
+            ${tabs_html}
+            ${tabs_content}
+        </div>
+    </main>
+
+    <!-- 页脚 -->
+    <footer class="bg-gray-800 text-white mt-12 py-8">
+        <div class="container mx-auto px-4 text-center">
+            <p class="mb-2">🧠 AI人格实验室 - 专业心理评估平台</p>
+            <p class="text-gray-400">
+                <a href="https://cn.agentpsy.com" target="_blank" class="hover:text-white transition">
+                    https://cn.agentpsy.com
+                </a>
+            </p>
+            <p class="text-sm text-gray-500 mt-2">
+                评估时间: ${generated_at}
+            </p>
+        </div>
+    </footer>
+
+    ${javascript}
+</body>
+</html>""")
+
+
+def _render_report(html_dir: str, personality_type: str) -> bool:
+    """进程池工作函数：在子进程中渲染单个报告"""
+    return StandardHTMLReportGenerator(html_dir).generate_standard_html_report(personality_type)
+
 
 class StandardHTMLReportGenerator:
     """标准化HTML报告生成器"""
 
-    def __init__(self):
-        self.html_dir = Path("html")
+    def __init__(self, html_dir: str = "html"):
+        self.html_dir = Path(html_dir)
         self.exam_dir = self.html_dir / "exam"
         self.stat_dir = self.html_dir / "stat"
+        self.assets_dir = self.html_dir / ASSETS_DIR_NAME
+        self.manifest_file = self.html_dir / MANIFEST_FILE_NAME
 
         # 标准化的7个标签页结构
         self.standard_tabs = [
@@ -30,9 +171,21 @@ class StandardHTMLReportGenerator:
             {"id": "conclusion", "name": "结论总结", "icon": "🏆"}
         ]
 
+        # 标签页导航与所有报告无关，只生成一次
+        self._tabs_html = None
+
+    def _responses_file(self, personality_type: str) -> Path:
+        return self.exam_dir / f"{personality_type.lower()}_citizenship_responses.json"
+
+    def _evaluation_file(self, personality_type: str) -> Path:
+        return self.stat_dir / f"{personality_type.lower()}_citizenship_evaluation.json"
+
+    def _output_file(self, personality_type: str) -> Path:
+        return self.html_dir / f"{personality_type.lower()}_citizenship_assessment.html"
+
     def load_personality_responses(self, personality_type: str) -> Dict:
         """加载人格回答数据"""
-        response_file = self.exam_dir / f"{personality_type.lower()}_citizenship_responses.json"
+        response_file = self._responses_file(personality_type)
 
         if not response_file.exists():
             return {}
@@ -46,7 +199,7 @@ class StandardHTMLReportGenerator:
 
     def load_evaluation_data(self, personality_type: str) -> Dict:
         """加载评估数据"""
-        eval_file = self.stat_dir / f"{personality_type.lower()}_citizenship_evaluation.json"
+        eval_file = self._evaluation_file(personality_type)
 
         if not eval_file.exists():
             return {}
@@ -74,7 +227,7 @@ class StandardHTMLReportGenerator:
         html_content = self._build_html_structure(personality_type, responses, evaluation)
 
         # 保存文件
-        output_file = self.html_dir / f"{personality_type.lower()}_citizenship_assessment.html"
+        output_file = self._output_file(personality_type)
 
         try:
             with open(output_file, 'w', encoding='utf-8') as f:
@@ -107,102 +260,26 @@ class StandardHTMLReportGenerator:
         # 生成JavaScript
         javascript = self._generate_javascript()
 
-        return f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{personality_type}人格类型国情知识评估报告</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    {css_styles}
-</head>
-<body class="bg-gray-50">
-    <!-- 头部导航 -->
-    <header class="bg-gradient-to-r from-blue-600 to-purple-600 text-white">
-        <div class="container mx-auto px-4 py-6">
-            <div class="flex items-center justify-between">
-                <div>
-                    <h1 class="text-3xl font-bold">{personality_type}人格类型评估报告</h1>
-                    <p class="mt-2 text-blue-100">基于MBTI理论的公民知识综合评估</p>
-                </div>
-                <div class="text-right">
-                    <div class="text-2xl font-bold">总评分: {total_score}</div>
-                    <div class="text-lg">等级: {grade}</div>
-                </div>
-            </div>
-        </div>
-    </header>
-
-    <!-- 主要内容 -->
-    <main class="container mx-auto px-4 py-8">
-        <div class="bg-white rounded-lg shadow-lg p-6">
-            {tabs_html}
-            {tabs_content}
-        </div>
-    </main>
-
-    <!-- 页脚 -->
-    <footer class="bg-gray-800 text-white mt-12 py-8">
-        <div class="container mx-auto px-4 text-center">
-            <p class="mb-2">🧠 AI人格实验室 - 专业心理评估平台</p>
-            <p class="text-gray-400">
-                <a href="https://cn.agentpsy.com" target="_blank" class="hover:text-white transition">
-                    https://cn.agentpsy.com
-                </a>
-            </p>
-            <p class="text-sm text-gray-500 mt-2">
-                评估时间: {datetime.now().strftime('%Y年%m月%d日 %H:%M')}
-            </p>
-        </div>
-    </footer>
-
-    {javascript}
-</body>
-</html>"""
+        return PAGE_TEMPLATE.substitute(
+            personality_type=personality_type,
+            total_score=total_score,
+            grade=grade,
+            css_styles=css_styles,
+            tabs_html=tabs_html,
+            tabs_content=tabs_content,
+            javascript=javascript,
+            generated_at=datetime.now().strftime('%Y年%m月%d日 %H:%M')
+        )
 
     def _generate_css_styles(self) -> str:
-        """生成CSS样式"""
-        return """
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Noto+Sans+SC:wght@300;400;500;700&display=swap');
-
-            * {
-                font-family: 'Noto Sans SC', sans-serif;
-            }
-
-            .tab {
-                @apply px-6 py-3 font-semibold border-b-2 cursor-pointer transition-colors duration-200;
-            }
-
-            .tab.active {
-                @apply text-blue-600 border-blue-600;
-            }
-
-            .tab:not(.active) {
-                @apply text-gray-600 border-transparent hover:text-blue-600;
-            }
-
-            .tab-content {
-                display: none;
-            }
-
-            .tab-content.active {
-                display: block;
-            }
-
-            .gradient-bg {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            }
-
-            .card-hover {
-                @apply transition-transform duration-200 hover:scale-105;
-            }
-        </style>
-        """
+        """生成CSS样式引用（样式文件由 write_static_assets 统一输出）"""
+        return f'<link rel="stylesheet" href="{ASSETS_DIR_NAME}/{CSS_FILE_NAME}">'
 
     def _generate_tabs_structure(self) -> str:
         """生成标签页导航结构"""
+        if self._tabs_html is not None:
+            return self._tabs_html
+
         tabs_html = '<div class="tabs flex flex-wrap border-b mb-6">'
 
         for i, tab in enumerate(self.standard_tabs):
@@ -214,6 +291,7 @@ class StandardHTMLReportGenerator:
                 </button>'''
 
         tabs_html += '</div>'
+        self._tabs_html = tabs_html
         return tabs_html
 
     def _generate_tabs_content(self, personality_type: str, responses: Dict, evaluation: Dict) -> str:
@@ -383,63 +461,120 @@ class StandardHTMLReportGenerator:
         """
 
     def _generate_javascript(self) -> str:
-        """生成JavaScript代码"""
-        return """
-        <script>
-        function showTab(tabName) {
-            // 隐藏所有标签页内容
-            const tabContents = document.querySelectorAll('.tab-content');
-            tabContents.forEach(content => {
-                content.classList.remove('active');
-            });
-
-            // 移除所有标签页按钮的active状态
-            const tabButtons = document.querySelectorAll('.tab');
-            tabButtons.forEach(button => {
-                button.classList.remove('active');
-            });
-
-            // 显示选中的标签页内容
-            document.getElementById(tabName).classList.add('active');
-
-            // 添加active状态到点击的标签页按钮
-            const activeBtn = document.querySelector(`[onclick="showTab('${tabName}')"]`);
-            if (activeBtn) {
-                activeBtn.classList.add('active');
-            }
-        }
-
-        // 页面加载时显示第一个标签页
-        document.addEventListener('DOMContentLoaded', function() {
-            showTab('overview');
-        });
-        </script>
+        """生成JavaScript引用（脚本文件由 write_static_assets 统一输出）"""
+        return f'<script src="{ASSETS_DIR_NAME}/{JS_FILE_NAME}"></script>'
+
+    def write_static_assets(self) -> None:
+        """输出共享的CSS/JS文件，内容未变化时不重写"""
+        self.assets_dir.mkdir(parents=True, exist_ok=True)
+
+        for file_name, content in ((CSS_FILE_NAME, REPORT_CSS), (JS_FILE_NAME, REPORT_JS)):
+            asset_file = self.assets_dir / file_name
+            if asset_file.exists() and asset_file.read_text(encoding='utf-8') == content:
+                continue
+            asset_file.write_text(content, encoding='utf-8')
+
+    def compute_input_hash(self, personality_type: str) -> str:
+        """计算报告输入哈希：渲染版本、页面模板、标签页结构以及回答/评估文件内容"""
+        digest = hashlib.sha256()
+        digest.update(RENDERER_VERSION.encode('utf-8'))
+        digest.update(PAGE_TEMPLATE.template.encode('utf-8'))
+        digest.update(json.dumps(self.standard_tabs, ensure_ascii=False).encode('utf-8'))
+
+        for input_file in (self._responses_file(personality_type), self._evaluation_file(personality_type)):
+            digest.update(b'\0')
+            if input_file.exists():
+                digest.update(input_file.read_bytes())
+
+        return digest.hexdigest()
+
+    def _load_manifest(self) -> Dict[str, str]:
+        if not self.manifest_file.exists():
+            return {}
+
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ 读取报告缓存清单失败，将全部重新生成: {e}")
+            return {}
+
+    def _save_manifest(self, manifest: Dict[str, str]) -> None:
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    def generate_all_reports(self, workers: Optional[int] = None, force: bool = False) -> Dict[str, bool]:
         """
+        为所有已有人格数据生成标准化HTML报告
 
-    def generate_all_reports(self) -> Dict[str, bool]:
-        """为所有已有人格数据生成标准化HTML报告"""
-        results = {}
+        输入哈希未变化且报告已存在的人格类型直接跳过，其余报告在进程池中并行渲染
 
+        Args:
+            workers: 并行进程数，默认取待生成报告数与CPU核数的较小值；1表示串行
+            force: 忽略缓存，全部重新生成
+        """
         # 扫描exam目录获取所有人格类型
-        personality_files = list(self.exam_dir.glob("*_citizenship_responses.json"))
+        personality_files = sorted(self.exam_dir.glob("*_citizenship_responses.json"))
 
         print(f"🔍 发现 {len(personality_files)} 个人格回答文件")
 
+        self.write_static_assets()
+        manifest = {} if force else self._load_manifest()
+
+        results = {}
+        pending = {}
         for file_path in personality_files:
             # 从文件名提取人格类型
             personality_type = file_path.stem.replace('_citizenship_responses', '').upper()
-
-            success = self.generate_standard_html_report(personality_type)
-            results[personality_type] = success
-
-        return results
+            input_hash = self.compute_input_hash(personality_type)
+
+            if manifest.get(personality_type) == input_hash and self._output_file(personality_type).exists():
+                print(f"⏭️ {personality_type} 输入未变化，跳过生成")
+                results[personality_type] = True
+                continue
+
+            pending[personality_type] = input_hash
+
+        if workers is None:
+            workers = min(len(pending), os.cpu_count() or 1)
+
+        if workers <= 1:
+            for personality_type in pending:
+                results[personality_type] = self.generate_standard_html_report(personality_type)
+        elif pending:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(_render_report, str(self.html_dir), personality_type): personality_type
+                    for personality_type in pending
+                }
+                for future in as_completed(futures):
+                    personality_type = futures[future]
+                    try:
+                        results[personality_type] = future.result()
+                    except Exception as e:
+                        print(f"❌ 生成 {personality_type} HTML报告时出错: {e}")
+                        results[personality_type] = False
+
+        for personality_type, input_hash in pending.items():
+            if results.get(personality_type):
+                manifest[personality_type] = input_hash
+        self._save_manifest(manifest)
+
+        # 按人格类型顺序返回结果
+        return {personality_type: results[personality_type] for personality_type in sorted(results)}
 
 def main():
     """主函数"""
     print("🧠 Portable PsyAgent - 标准化HTML报告生成器")
     print("=" * 60)
 
-    generator = StandardHTMLReportGenerator()
+    parser = argparse.ArgumentParser(description='标准化HTML报告生成器')
+    parser.add_argument('--html-dir', default='html', help='HTML报告目录')
+    parser.add_argument('--workers', type=int, default=None, help='并行渲染进程数（默认按CPU核数）')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，重新生成全部报告')
+    args = parser.parse_args()
+
+    generator = StandardHTMLReportGenerator(args.html_dir)
 
     # 检查必要目录
     if not generator.exam_dir.exists():
@@ -447,7 +582,7 @@ def main():
         return
 
     # 生成所有报告
-    results = generator.generate_all_reports()
+    results = generator.generate_all_reports(workers=args.workers, force=args.force)
 
     # 统计结果
     success_count = sum(1 for success in results.values() if success)
@@ -1,8 +1,10 @@
 import argparse
+import glob
 import json
 import os
 import sys
-from typing import Dict, List, Any
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Tuple
 
 from config.config_loader import load_config
 from analyzers.in_character import InCharacterAnalyzer
@@ -12,63 +14,43 @@ from analyzers.response_quality import ResponseQualityAnalyzer
 from reporters.csv_reporter import CSVReporter
 from reporters.json_reporter import JSONReporter
 from reporters.md_reporter import MDReporter
+from reporters.batch_reporter import BatchReporter
 from i18n import i18n
 
 
-def main():
+# Analyzers built once per worker process in batch mode
+_worker_analyzers = None
+
+
+def build_analyzers(config: dict) -> list:
     """
-    TPE QA Analyzer Main Execution Function.
+    Build analyzer instances (loads keyword dictionaries).
+
+    Args:
+        config (dict): Configuration dictionary
+
+    Returns:
+        list: Analyzer instances
     """
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description=i18n.t('TPE QA Analyzer - Analyze TPE tool generated log files'))
-    parser.add_argument('--log_file', required=True, help=i18n.t('TPE generated JSON log file path'))
-    parser.add_argument('--output_dir', default='./analysis_reports', help=i18n.t('Analysis report output directory'))
-    parser.add_argument('--config', default='config/config.json', help=i18n.t('Custom configuration file path'))
-    
-    args = parser.parse_args()
-    
-    # Check if log file exists
-    if not os.path.exists(args.log_file):
-        print(f"{i18n.t('Error')}: {i18n.t('File not found')}: {args.log_file}")
-        sys.exit(1)
-    
-    # Check if output directory exists, create if not
-    if not os.path.exists(args.output_dir):
-        os.makedirs(args.output_dir)
-    
-    # Load configuration file
-    try:
-        config = load_config(args.config)
-    except FileNotFoundError as e:
-        print(f"{i18n.t('Error')}: {e}")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"{i18n.t('Error')}: {i18n.t('JSON decode error')}: {e}")
-        sys.exit(1)
-    
-    # Set language
-    language = config.get('language', 'en')
-    i18n.set_language(language)
-    
-    # Read and parse TPE log file
-    try:
-        with open(args.log_file, 'r', encoding='utf-8') as f:
-            log_data = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"{i18n.t('Error')}: {i18n.t('JSON decode error')}: {e}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"{i18n.t('Error')}: {e}")
-        sys.exit(1)
-    
-    # Initialize analyzer instances
-    analyzers = [
+    return [
         InCharacterAnalyzer(config),
         CharacterBreakAnalyzer(config),
         ConflictHandlerAnalyzer(config),
         ResponseQualityAnalyzer(config)
     ]
-    
+
+
+def analyze_log_data(log_data: dict, analyzers: list) -> Tuple[dict, list]:
+    """
+    Run every analyzer over the execution results of one TPE log.
+
+    Args:
+        log_data (dict): Parsed TPE log
+        analyzers (list): Analyzer instances
+
+    Returns:
+        tuple: (log metadata, analysis results)
+    """
     # Iterate through execution_results, call analyze method of each analyzer
     execution_results = log_data.get('execution_results', [])
     all_analysis_results = []
@@ -99,33 +81,187 @@ def main():
         'pressure_plan_file': log_data.get('pressure_plan_file', 'unknown'),
         'total_scenarios': len(execution_results)
     }
-    
-    # Call report generators to generate reports
+    return log_metadata, all_analysis_results
+
+
+def write_reports(config: dict, log_metadata: dict, analysis_results: list, output_dir: str):
+    """
+    Generate the CSV/JSON/Markdown reports enabled in the configuration.
+
+    Args:
+        config (dict): Configuration dictionary
+        log_metadata (dict): TPE log metadata
+        analysis_results (list): List of analysis results
+        output_dir (str): Report output directory
+    """
     output_config = config.get('output', {})
     
     if output_config.get('csv', True):
         csv_reporter = CSVReporter()
         csv_reporter.generate(
             log_metadata, 
-            all_analysis_results, 
-            os.path.join(args.output_dir, 'report.csv')
+            analysis_results, 
+            os.path.join(output_dir, 'report.csv')
         )
     
     if output_config.get('json', True):
         json_reporter = JSONReporter()
         json_reporter.generate(
             log_metadata, 
-            all_analysis_results, 
-            os.path.join(args.output_dir, 'report.json')
+            analysis_results, 
+            os.path.join(output_dir, 'report.json')
         )
     
     if output_config.get('markdown', True):
         md_reporter = MDReporter()
         md_reporter.generate(
             log_metadata, 
-            all_analysis_results, 
-            os.path.join(args.output_dir, 'report.md')
+            analysis_results, 
+            os.path.join(output_dir, 'report.md')
         )
+
+
+def collect_log_files(log_dir: str = None, log_glob: str = None) -> List[str]:
+    """
+    Collect TPE log files for batch mode.
+
+    Args:
+        log_dir (str): Directory scanned recursively for *.json logs
+        log_glob (str): Glob pattern (supports **)
+
+    Returns:
+        list: Sorted log file paths
+    """
+    if log_dir:
+        pattern = os.path.join(log_dir, '**', '*.json')
+    else:
+        pattern = log_glob
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+
+def _init_worker(config: dict):
+    global _worker_analyzers
+    i18n.set_language(config.get('language', 'en'))
+    _worker_analyzers = build_analyzers(config)
+
+
+def _analyze_log_file(log_file: str) -> Tuple[dict, list]:
+    with open(log_file, 'r', encoding='utf-8') as f:
+        log_data = json.load(f)
+    return analyze_log_data(log_data, _worker_analyzers)
+
+
+def run_batch(config: dict, log_files: List[str], output_dir: str, workers: int = None) -> dict:
+    """
+    Analyze many TPE logs, distributing files across a process pool.
+
+    Each worker builds the analyzers once. Per-log reports and the merged CSV are
+    written as soon as each log finishes; the cross-log summary is written at the end.
+
+    Args:
+        config (dict): Configuration dictionary
+        log_files (list): TPE log file paths
+        output_dir (str): Report output root directory
+        workers (int): Worker processes (defaults to CPU count; 1 runs in-process)
+
+    Returns:
+        dict: Cross-log summary
+    """
+    reporter = BatchReporter(output_dir, config.get('output', {}))
+    workers = workers or os.cpu_count() or 1
+    completed = 0
+
+    def record(log_file, future_result):
+        nonlocal completed
+        completed += 1
+        try:
+            log_metadata, analysis_results = future_result()
+        except Exception as e:
+            print(f"[{completed}/{len(log_files)}] {i18n.t('Error')}: {log_file}: {e}")
+            reporter.add_failure(log_file, str(e))
+            return
+        reporter.add_log(log_file, log_metadata, analysis_results)
+        print(f"[{completed}/{len(log_files)}] {log_file}")
+
+    if workers <= 1 or len(log_files) <= 1:
+        _init_worker(config)
+        for log_file in log_files:
+            record(log_file, lambda: _analyze_log_file(log_file))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as executor:
+            futures = {executor.submit(_analyze_log_file, log_file): log_file for log_file in log_files}
+            for future in as_completed(futures):
+                record(futures[future], future.result)
+
+    return reporter.close()
+
+
+def main():
+    """
+    TPE QA Analyzer Main Execution Function.
+    """
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description=i18n.t('TPE QA Analyzer - Analyze TPE tool generated log files'))
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--log_file', help=i18n.t('TPE generated JSON log file path'))
+    source.add_argument('--log_dir', help=i18n.t('Directory of TPE log files (batch mode)'))
+    source.add_argument('--log_glob', help=i18n.t('Glob pattern of TPE log files (batch mode)'))
+    parser.add_argument('--output_dir', default='./analysis_reports', help=i18n.t('Analysis report output directory'))
+    parser.add_argument('--config', default='config/config.json', help=i18n.t('Custom configuration file path'))
+    parser.add_argument('--workers', type=int, default=None, help=i18n.t('Worker processes for batch mode'))
+    
+    args = parser.parse_args()
+    
+    # Check if log file exists
+    if args.log_file and not os.path.exists(args.log_file):
+        print(f"{i18n.t('Error')}: {i18n.t('File not found')}: {args.log_file}")
+        sys.exit(1)
+    
+    # Check if output directory exists, create if not
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+    
+    # Load configuration file
+    try:
+        config = load_config(args.config)
+    except FileNotFoundError as e:
+        print(f"{i18n.t('Error')}: {e}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"{i18n.t('Error')}: {i18n.t('JSON decode error')}: {e}")
+        sys.exit(1)
+    
+    # Set language
+    language = config.get('language', 'en')
+    i18n.set_language(language)
+    
+    # Batch mode: analyze every matching log file
+    if not args.log_file:
+        log_files = collect_log_files(args.log_dir, args.log_glob)
+        if not log_files:
+            print(f"{i18n.t('Error')}: {i18n.t('No log files found')}")
+            sys.exit(1)
+        summary = run_batch(config, log_files, args.output_dir, args.workers)
+        print(f"{i18n.t('Analysis complete, reports saved to')}: {args.output_dir} "
+              f"({summary['overall']['logs']}/{len(log_files)})")
+        return
+    
+    # Read and parse TPE log file
+    try:
+        with open(args.log_file, 'r', encoding='utf-8') as f:
+            log_data = json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"{i18n.t('Error')}: {i18n.t('JSON decode error')}: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"{i18n.t('Error')}: {e}")
+        sys.exit(1)
+    
+    analyzers = build_analyzers(config)
+    log_metadata, all_analysis_results = analyze_log_data(log_data, analyzers)
+    
+    # Call report generators to generate reports
+    write_reports(config, log_metadata, all_analysis_results, args.output_dir)
     
     print(f"{i18n.t('Analysis complete, reports saved to')}: {args.output_dir}")
 
@@ -1,6 +1,7 @@
 import os
 from typing import Dict, List, Any
 from analyzers.base_analyzer import BaseAnalyzer
+from utils.keyword_matcher import get_keyword_matcher
 
 
 class CharacterBreakAnalyzer(BaseAnalyzer):
@@ -18,6 +19,7 @@ class CharacterBreakAnalyzer(BaseAnalyzer):
         super().__init__(config)
         self.global_break_keywords = []
         self._load_global_break_keywords()
+        self.break_matcher = get_keyword_matcher(self.global_break_keywords)
 
     def _load_global_break_keywords(self):
         """
@@ -68,10 +70,7 @@ class CharacterBreakAnalyzer(BaseAnalyzer):
         model_response = result_item.get('model_response', '')
         
         # Detect forbidden phrases
-        break_words = []
-        for keyword in self.global_break_keywords:
-            if keyword in model_response:
-                break_words.append(keyword)
+        break_words = self.break_matcher.matched(model_response)
         
         detected = len(break_words) > 0
         
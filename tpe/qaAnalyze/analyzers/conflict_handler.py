@@ -2,6 +2,7 @@ import os
 import json
 from typing import Dict, List, Any
 from analyzers.base_analyzer import BaseAnalyzer
+from utils.keyword_matcher import get_keyword_matcher
 
 
 class ConflictHandlerAnalyzer(BaseAnalyzer):
@@ -19,6 +20,13 @@ class ConflictHandlerAnalyzer(BaseAnalyzer):
         super().__init__(config)
         self.conflict_keywords = {}
         self._load_conflict_keywords()
+        # One matcher per conflict covering the keywords of all its sides
+        self.conflict_matchers = {
+            conflict_name: get_keyword_matcher(
+                keyword for keywords in conflict_dict.values() for keyword in keywords
+            )
+            for conflict_name, conflict_dict in self.conflict_keywords.items()
+        }
 
     def _load_conflict_keywords(self):
         """
@@ -82,11 +90,10 @@ class ConflictHandlerAnalyzer(BaseAnalyzer):
         
         # Count keywords for each side of the conflict
         side_counts = {}
-        for side, keywords in conflict_dict.items():
-            count = 0
-            for keyword in keywords:
-                count += model_response.count(keyword)
-            side_counts[side] = count
+        if conflict_dict:
+            keyword_counts = self.conflict_matchers[targeted_conflict].count(model_response)
+            for side, keywords in conflict_dict.items():
+                side_counts[side] = sum(keyword_counts.get(keyword, 0) for keyword in keywords)
         
         # Simple tendency judgment
         sides = list(side_counts.keys())
@@ -1,6 +1,7 @@
 import os
 from typing import Dict, List, Any
 from analyzers.base_analyzer import BaseAnalyzer
+from utils.keyword_matcher import get_keyword_matcher
 
 
 class InCharacterAnalyzer(BaseAnalyzer):
@@ -18,6 +19,10 @@ class InCharacterAnalyzer(BaseAnalyzer):
         super().__init__(config)
         self.role_keywords = {}
         self._load_role_keywords()
+        self.role_matchers = {
+            role_name: get_keyword_matcher(keywords)
+            for role_name, keywords in self.role_keywords.items()
+        }
 
     def _load_role_keywords(self):
         """
@@ -79,10 +84,8 @@ class InCharacterAnalyzer(BaseAnalyzer):
         keywords = self.role_keywords.get(role_applied, [])
         
         # Count matching keywords
-        matched_words = []
-        for keyword in keywords:
-            if keyword in model_response:
-                matched_words.append(keyword)
+        matcher = self.role_matchers.get(role_applied)
+        matched_words = matcher.matched(model_response) if matcher else []
         
         # Calculate score
         score = len(matched_words) / len(keywords) if keywords else 0.0
@@ -35,6 +35,10 @@ TRANSLATIONS = {
         'TPE generated JSON log file path': 'TPE generated JSON log file path',
         'Analysis report output directory': 'Analysis report output directory',
         'Custom configuration file path': 'Custom configuration file path',
+        'Directory of TPE log files (batch mode)': 'Directory of TPE log files (batch mode)',
+        'Glob pattern of TPE log files (batch mode)': 'Glob pattern of TPE log files (batch mode)',
+        'Worker processes for batch mode': 'Worker processes for batch mode',
+        'No log files found': 'No log files found',
     },
     'zh': {
         # Analyzer names
@@ -63,6 +67,10 @@ TRANSLATIONS = {
         'TPE generated JSON log file path': 'TPE生成的JSON日志文件路径',
         'Analysis report output directory': '分析报告的输出目录',
         'Custom configuration file path': '自定义配置文件路径',
+        'Directory of TPE log files (batch mode)': 'TPE日志文件目录（批量模式）',
+        'Glob pattern of TPE log files (batch mode)': 'TPE日志文件通配模式（批量模式）',
+        'Worker processes for batch mode': '批量模式的工作进程数',
+        'No log files found': '未找到日志文件',
     }
 }
 
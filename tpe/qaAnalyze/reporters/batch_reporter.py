@@ -0,0 +1,239 @@
+import csv
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Any
+
+from reporters.csv_reporter import CSVReporter, FIELDNAMES, flatten_result
+from reporters.json_reporter import JSONReporter
+from reporters.md_reporter import MDReporter
+
+
+class ResultSummary:
+    """
+    分析结果汇总，可逐条累加并与其他汇总合并。
+    """
+
+    def __init__(self):
+        self.logs = 0
+        self.scenarios = 0
+        self.in_character_count = 0
+        self.in_character_score = 0.0
+        self.break_count = 0
+        self.break_detected = 0
+        self.break_words = Counter()
+        self.tendencies = Counter()
+        self.quality_count = 0
+        self.quality_chars = 0
+        self.quality_sentences = 0
+
+    def add_log(self, log_metadata: dict, analysis_results: list):
+        """
+        累加单个日志的分析结果。
+
+        Args:
+            log_metadata (dict): TPE日志的元数据
+            analysis_results (list): 分析结果列表
+        """
+        self.logs += 1
+        self.scenarios += log_metadata.get('total_scenarios', 0)
+        for result in analysis_results:
+            analyzer = result.get('analyzer')
+            details = result.get('details', {})
+            if analyzer == 'InCharacter':
+                self.in_character_count += 1
+                self.in_character_score += result.get('score', 0.0)
+            elif analyzer == 'CharacterBreak':
+                self.break_count += 1
+                self.break_detected += 1 if result.get('detected') else 0
+                self.break_words.update(details.get('break_words', []))
+            elif analyzer == 'ConflictHandler':
+                self.tendencies[result.get('tendency', 'Unknown')] += 1
+            elif analyzer == 'ResponseQuality':
+                self.quality_count += 1
+                self.quality_chars += details.get('chars', 0)
+                self.quality_sentences += details.get('sentences', 0)
+
+    def merge(self, other: 'ResultSummary'):
+        """
+        合并另一个汇总。
+
+        Args:
+            other (ResultSummary): 待合并的汇总
+        """
+        for name, value in vars(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self) -> dict:
+        """
+        输出汇总指标。
+
+        Returns:
+            dict: 汇总指标
+        """
+        return {
+            'logs': self.logs,
+            'scenarios': self.scenarios,
+            'in_character_mean_score': (
+                round(self.in_character_score / self.in_character_count, 4) if self.in_character_count else None
+            ),
+            'character_break_rate': (
+                round(self.break_detected / self.break_count, 4) if self.break_count else None
+            ),
+            'top_break_words': dict(self.break_words.most_common(10)),
+            'conflict_tendencies': dict(self.tendencies),
+            'mean_response_chars': (
+                round(self.quality_chars / self.quality_count, 1) if self.quality_count else None
+            ),
+            'mean_response_sentences': (
+                round(self.quality_sentences / self.quality_count, 2) if self.quality_count else None
+            )
+        }
+
+
+class BatchReporter:
+    """
+    批量模式报告生成器：每完成一个日志即写出其单日志报告并追加到合并CSV，
+    结束时生成跨日志汇总。
+    """
+
+    def __init__(self, output_dir: str, output_config: dict):
+        """
+        初始化批量报告生成器。
+
+        Args:
+            output_dir (str): 报告输出根目录
+            output_config (dict): 配置中的 output 段（csv/json/markdown 开关）
+        """
+        self.output_dir = output_dir
+        self.output_config = output_config
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.logs = []
+        self.failures = []
+        self.overall = ResultSummary()
+        self.by_model: Dict[str, ResultSummary] = {}
+        self.by_role: Dict[str, ResultSummary] = {}
+        self._report_names = set()
+
+        self._csv_file = None
+        self._csv_writer = None
+        if output_config.get('csv', True):
+            self._csv_file = open(os.path.join(output_dir, 'batch_report.csv'), 'w', newline='', encoding='utf-8')
+            self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=['log_file'] + FIELDNAMES)
+            self._csv_writer.writeheader()
+
+    def _report_name(self, log_file: str) -> str:
+        base_name = os.path.splitext(os.path.basename(log_file))[0]
+        name = base_name
+        suffix = 2
+        while name in self._report_names:
+            name = f"{base_name}_{suffix}"
+            suffix += 1
+        self._report_names.add(name)
+        return name
+
+    def add_log(self, log_file: str, log_metadata: dict, analysis_results: list) -> str:
+        """
+        写出单个日志的报告，并把分析结果追加到合并CSV与汇总。
+
+        Args:
+            log_file (str): TPE日志文件路径
+            log_metadata (dict): TPE日志的元数据
+            analysis_results (list): 分析结果列表
+
+        Returns:
+            str: 该日志报告所在目录
+        """
+        report_dir = os.path.join(self.output_dir, self._report_name(log_file))
+        if self.output_config.get('csv', True):
+            CSVReporter().generate(log_metadata, analysis_results, os.path.join(report_dir, 'report.csv'))
+        if self.output_config.get('json', True):
+            JSONReporter().generate(log_metadata, analysis_results, os.path.join(report_dir, 'report.json'))
+        if self.output_config.get('markdown', True):
+            MDReporter().generate(log_metadata, analysis_results, os.path.join(report_dir, 'report.md'))
+
+        if self._csv_writer is not None:
+            for result in analysis_results:
+                row = flatten_result(result)
+                row['log_file'] = log_file
+                self._csv_writer.writerow(row)
+            self._csv_file.flush()
+
+        summary = ResultSummary()
+        summary.add_log(log_metadata, analysis_results)
+        self.overall.merge(summary)
+        self.by_model.setdefault(str(log_metadata.get('tested_model', 'unknown')), ResultSummary()).merge(summary)
+        self.by_role.setdefault(str(log_metadata.get('role_applied', 'unknown')), ResultSummary()).merge(summary)
+
+        self.logs.append({
+            'log_file': log_file,
+            'report_dir': report_dir,
+            'metadata': log_metadata,
+            'summary': summary.to_dict()
+        })
+        return report_dir
+
+    def add_failure(self, log_file: str, error: str):
+        """
+        记录无法分析的日志。
+
+        Args:
+            log_file (str): TPE日志文件路径
+            error (str): 错误信息
+        """
+        self.failures.append({'log_file': log_file, 'error': error})
+
+    def close(self) -> dict:
+        """
+        关闭合并CSV并写出跨日志汇总。
+
+        Returns:
+            dict: 汇总数据
+        """
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+
+        summary = {
+            'overall': self.overall.to_dict(),
+            'by_model': {name: item.to_dict() for name, item in sorted(self.by_model.items())},
+            'by_role': {name: item.to_dict() for name, item in sorted(self.by_role.items())},
+            'logs': sorted(self.logs, key=lambda item: item['log_file']),
+            'failures': sorted(self.failures, key=lambda item: item['log_file'])
+        }
+
+        if self.output_config.get('json', True):
+            with open(os.path.join(self.output_dir, 'batch_summary.json'), 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        if self.output_config.get('markdown', True):
+            with open(os.path.join(self.output_dir, 'batch_summary.md'), 'w', encoding='utf-8') as f:
+                f.write(self._summary_markdown(summary))
+
+        return summary
+
+    def _summary_markdown(self, summary: dict) -> str:
+        columns = ['logs', 'scenarios', 'in_character_mean_score', 'character_break_rate',
+                   'mean_response_chars', 'conflict_tendencies']
+        content = ["# TPE QA Batch Summary", ""]
+
+        sections = [('Overall', {'all': summary['overall']}),
+                    ('By Model', summary['by_model']),
+                    ('By Role', summary['by_role'])]
+        for title, groups in sections:
+            content.append(f"## {title}")
+            content.append("| group | " + " | ".join(columns) + " |")
+            content.append("|" + "---|" * (len(columns) + 1))
+            for name, stats in groups.items():
+                values = [str(stats.get(column, '')) for column in columns]
+                content.append(f"| {name} | " + " | ".join(values) + " |")
+            content.append("")
+
+        if summary['failures']:
+            content.append("## Failures")
+            for failure in summary['failures']:
+                content.append(f"- {failure['log_file']}: {failure['error']}")
+            content.append("")
+
+        return '\n'.join(content)
@@ -3,6 +3,30 @@ import os
 from typing import Dict, List, Any
 
 
+# CSV字段
+FIELDNAMES = ['scenario_id', 'analyzer', 'score', 'detected', 'tendency', 'details']
+
+
+def flatten_result(result: dict) -> dict:
+    """
+    将单条分析结果展平为CSV行。
+
+    Args:
+        result (dict): 分析结果
+
+    Returns:
+        dict: CSV行
+    """
+    return {
+        'scenario_id': result.get('scenario_id', ''),
+        'analyzer': result.get('analyzer', ''),
+        'score': result.get('score', ''),
+        'detected': result.get('detected', ''),
+        'tendency': result.get('tendency', ''),
+        'details': str(result.get('details', ''))
+    }
+
+
 class CSVReporter:
     """
     CSV报告生成器，生成CSV格式的详细数据表。
@@ -20,21 +44,10 @@ class CSVReporter:
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # 准备CSV字段
-        fieldnames = ['scenario_id', 'analyzer', 'score', 'detected', 'tendency', 'details']
-        
         with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
             writer.writeheader()
             
             for result in analysis_results:
                 # 展平分析结果
-                row = {
-                    'scenario_id': result.get('scenario_id', ''),
-                    'analyzer': result.get('analyzer', ''),
-                    'score': result.get('score', ''),
-                    'detected': result.get('detected', ''),
-                    'tendency': result.get('tendency', ''),
-                    'details': str(result.get('details', ''))
-                }
-                writer.writerow(row)
\ No newline at end of file
+                writer.writerow(flatten_result(result))
\ No newline at end of file
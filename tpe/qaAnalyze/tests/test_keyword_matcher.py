@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+
+def reference_matched(keywords, text):
+    """Per-keyword scan the analyzers used before the shared matcher."""
+    return [keyword for keyword in keywords if keyword in text]
+
+
+def reference_count(keywords, text):
+    """Per-keyword str.count the conflict handler used before the shared matcher."""
+    return {keyword: text.count(keyword) for keyword in keywords}
+
+
+def assert_equivalent(keywords, text):
+    matcher = KeywordMatcher(keywords)
+    assert matcher.matched(text) == reference_matched(keywords, text), (keywords, text)
+    assert matcher.count(text) == reference_count(keywords, text), (keywords, text)
+
+
+def test_overlapping_keywords():
+    keywords = ['aa', 'aaa', 'aba', 'bab']
+    for text in ['aaaa', 'aaaaa', 'ababab', 'abababa', 'baab']:
+        assert_equivalent(keywords, text)
+
+    # str.count semantics: occurrences of one keyword never overlap
+    assert KeywordMatcher(['aa']).count('aaaaa') == {'aa': 2}
+    assert KeywordMatcher(['aba']).count('ababa') == {'aba': 1}
+
+
+def test_nested_keywords():
+    keywords = ['he', 'she', 'hers', 'his', 'e']
+    for text in ['ushers', 'she sells his hers', 'hhhe', 'h']:
+        assert_equivalent(keywords, text)
+
+    matches = KeywordMatcher(keywords).find_all('ushers')
+    assert sorted(matches) == [(1, 'she'), (2, 'he'), (2, 'hers'), (3, 'e')]
+
+
+def test_cjk_keywords():
+    keywords = ['助手', '人工智能', '智能', 'AI助手', '我是', '作为一个', '一个']
+    text = '作为一个人工智能助手，我是AI助手。作为一个智能体，我不是人工智能。'
+    assert_equivalent(keywords, text)
+    assert KeywordMatcher(keywords).count(text)['智能'] == 3
+
+    assert_equivalent(['谢谢', '谢谢谢'], '谢谢谢谢谢')
+    assert_equivalent(['不', '不是', '是不是'], '是不是不是是不是')
+
+
+def test_keyword_order_duplicates_and_empty_input():
+    keywords = ['b', 'a', '', 'b']
+    assert KeywordMatcher(keywords).matched('abc') == ['b', 'a', 'b']
+    assert KeywordMatcher(keywords).count('abab') == {'b': 2, 'a': 2}
+    assert KeywordMatcher(keywords).matched('') == []
+    assert KeywordMatcher([]).matched('abc') == []
+    assert KeywordMatcher([]).count('abc') == {}
+
+
+def test_random_texts_match_reference():
+    rng = random.Random(34)
+    alphabet = 'ab人工智能'
+    for _ in range(500):
+        keywords = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                    for _ in range(rng.randint(1, 6))]
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert_equivalent(keywords, text)
+
+
+def test_matchers_are_shared_per_keyword_list():
+    assert get_keyword_matcher(['助手', '智能']) is get_keyword_matcher(iter(['助手', '智能']))
+    assert get_keyword_matcher(['助手', '智能']) is not get_keyword_matcher(['智能', '助手'])
@@ -0,0 +1,129 @@
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern keyword matcher based on an Aho-Corasick automaton.
+
+    The keyword list is compiled once; each call scans the text a single time
+    regardless of how many keywords there are.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Compile the keyword list.
+
+        Args:
+            keywords (Iterable[str]): Keywords to match; empty strings are ignored
+        """
+        self.keywords = [keyword for keyword in keywords if keyword]
+        # Trie nodes: goto transitions, failure link and keywords ending at the node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._build()
+
+    def _build(self):
+        for keyword in dict.fromkeys(self.keywords):
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][char] = next_node
+                node = next_node
+            self._output[node].append(keyword)
+
+        # Breadth-first pass to set failure links and merge outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """
+        Find every (possibly overlapping) keyword occurrence in one pass.
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            list[tuple[int, str]]: (start position, keyword) pairs ordered by end position
+        """
+        matches = []
+        if not self.keywords or not text:
+            return matches
+
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword in output[node]:
+                matches.append((index - len(keyword) + 1, keyword))
+        return matches
+
+    def matched(self, text: str) -> List[str]:
+        """
+        Return the keywords present in the text, in keyword-list order.
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            list[str]: Matched keywords
+        """
+        found = {keyword for _, keyword in self.find_all(text)}
+        return [keyword for keyword in self.keywords if keyword in found]
+
+    def count(self, text: str) -> Dict[str, int]:
+        """
+        Count non-overlapping occurrences of each keyword, like str.count.
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            dict[str, int]: Occurrence count for every keyword
+        """
+        counts = {keyword: 0 for keyword in self.keywords}
+        next_allowed = {}
+        for start, keyword in sorted(self.find_all(text)):
+            if start >= next_allowed.get(keyword, 0):
+                counts[keyword] += 1
+                next_allowed[keyword] = start + len(keyword)
+        return counts
+
+
+_matcher_cache: Dict[Tuple[str, ...], KeywordMatcher] = {}
+
+
+def get_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """
+    Return a shared compiled matcher for a keyword list.
+
+    Analyzers loading the same list reuse one automaton.
+
+    Args:
+        keywords (Iterable[str]): Keywords to match
+
+    Returns:
+        KeywordMatcher: Compiled matcher
+    """
+    key = tuple(keywords)
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        matcher = KeywordMatcher(key)
+        _matcher_cache[key] = matcher
+    return matcher
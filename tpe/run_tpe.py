@@ -3,6 +3,7 @@
 Main entry point for the Targeted Pressure Executor (TPE).
 """
 import argparse
+import logging
 import sys
 import os
 import json
@@ -59,14 +60,16 @@ def main():
     parser.add_argument(
         '--model_name', 
         type=str, 
+        nargs='+',
         required=True,
-        help='Model identifier (e.g., ollama/gemma3:latest)'
+        help='Model identifier(s) (e.g., ollama/gemma3:latest); every model is run with every role'
     )
     parser.add_argument(
         '--role_name', 
         type=str, 
+        nargs='+',
         required=True,
-        help='Role name (e.g., a1, b2)'
+        help='Role name(s) (e.g., a1, b2)'
     )
     parser.add_argument(
         '--plan_file', 
@@ -74,35 +77,65 @@ def main():
         required=True,
         help='Path to the Markdown plan file'
     )
+    parser.add_argument(
+        '--max_workers',
+        type=int,
+        default=4,
+        help='Maximum number of scenarios executed concurrently (default: 4)'
+    )
+    parser.add_argument(
+        '--max_retries',
+        type=int,
+        default=2,
+        help='Retries for a scenario whose call returns no response (default: 2)'
+    )
+    parser.add_argument(
+        '--api_base',
+        type=str,
+        default='http://localhost:11434/v1',
+        help='OpenAI-compatible API base (default: local Ollama)'
+    )
+    parser.add_argument(
+        '--log_level',
+        type=str,
+        default='INFO',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+        help='Logging verbosity; DEBUG also logs full messages and responses (default: INFO)'
+    )
     
     args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(asctime)s - %(levelname)s - %(message)s')
     
-    print(f"Starting TPE with model '{args.model_name}', role '{args.role_name}', plan '{args.plan_file}'")
+    pairs = [(model_name, role_name) for model_name in args.model_name for role_name in args.role_name]
+    print(f"Starting TPE with {len(pairs)} (model, role) pair(s), plan '{args.plan_file}'")
     
     # --- T-1.3 Integration Steps ---
     
-    # 2. Load role
-    print("Loading role prompt...")
-    system_prompt = load_role_prompt(args.role_name)
-    print(f"Role prompt loaded (length: {len(system_prompt)} chars).")
+    # 2. Load roles (once per role)
+    print("Loading role prompts...")
+    role_prompts = {role_name: load_role_prompt(role_name) for role_name in args.role_name}
+    for role_name, system_prompt in role_prompts.items():
+        print(f"Role '{role_name}' prompt loaded (length: {len(system_prompt)} chars).")
     
-    # 3. Parse plan
+    # 3. Parse plan (once for all pairs)
     print("Parsing plan file...")
     parser_instance = PlanParser(args.plan_file)
     test_cases = parser_instance.parse()
     print(f"Plan parsed successfully. Found {len(test_cases)} test cases.")
     
-    # 4. Execute tests
-    print("Executing test plan...")
-    # Use default Ollama settings
-    client = LLMClient() 
-    executor = TestExecutor(client, args.model_name, system_prompt)
-    execution_results = executor.execute_plan(test_cases)
-    print("Test plan execution completed.")
-    
-    # 5. Save results (using our new save_results function)
-    print("Saving results...")
-    save_results(execution_results, args.model_name, args.role_name, args.plan_file)
+    # 4. Execute tests; pairs are grouped by model so each model stays loaded across its roles
+    client = LLMClient(api_base=args.api_base)
+    for model_name, role_name in pairs:
+        print(f"Executing test plan with model '{model_name}', role '{role_name}'...")
+        executor = TestExecutor(client, model_name, role_prompts[role_name],
+                                max_workers=args.max_workers, max_retries=args.max_retries)
+        execution_results = executor.execute_plan(test_cases)
+        failed = sum(1 for result in execution_results if not result['success'])
+        print(f"Test plan execution completed ({len(execution_results) - failed}/{len(execution_results)} succeeded).")
+        
+        # 5. Save results (one log per pair)
+        print("Saving results...")
+        save_results(execution_results, model_name, role_name, args.plan_file)
     print("TPE run completed successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+"""
+Module for executing pressure test scenarios against an LLM.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TestExecutor:
+    """
+    Runs the scenarios of a parsed pressure test plan for one (model, role) pair.
+
+    Scenarios are independent single-turn conversations, so they are sent
+    concurrently through one shared LLMClient with a bounded worker count.
+    """
+    def __init__(self, llm_client, model_name: str, system_prompt: str,
+                 max_workers: int = 4, max_retries: int = 2,
+                 options: Optional[Dict[str, Any]] = None):
+        """
+        Initializes the executor.
+
+        Args:
+            llm_client (LLMClient): Shared client used for every scenario.
+            model_name (str): Model identifier (e.g., ollama/gemma3:latest).
+            system_prompt (str): Role prompt; empty string applies no role.
+            max_workers (int): Maximum number of scenarios in flight. Defaults to 4.
+            max_retries (int): Extra attempts when a call returns no response. Defaults to 2.
+            options (Optional[Dict[str, Any]]): Generation options passed to the client.
+        """
+        self.llm_client = llm_client
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(0, max_retries)
+        self.options = options
+
+    def build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """
+        Builds the chat messages for one scenario.
+
+        Args:
+            prompt (str): Scenario prompt.
+
+        Returns:
+            List[Dict[str, str]]: Messages in OpenAI format.
+        """
+        messages = []
+        if self.system_prompt:
+            messages.append({"role": "system", "content": self.system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def execute_scenario(self, scenario: dict) -> dict:
+        """
+        Executes a single scenario, retrying with backoff when the call fails.
+
+        Args:
+            scenario (dict): Scenario from PlanParser.parse ({'id', 'conflict', 'prompt'}).
+
+        Returns:
+            dict: Result entry for the execution log.
+        """
+        messages = self.build_messages(scenario['prompt'])
+        start_time = time.time()
+        response = None
+        attempts = 0
+
+        while attempts <= self.max_retries:
+            attempts += 1
+            response = self.llm_client.generate_response(messages, self.model_name, self.options)
+            if response is not None:
+                break
+            if attempts <= self.max_retries:
+                logger.warning("%s: no response from %s (attempt %d), retrying",
+                               scenario['id'], self.model_name, attempts)
+                time.sleep(min(2 ** (attempts - 1), 8))
+
+        duration = time.time() - start_time
+        if response is None:
+            logger.error("%s: failed after %d attempts", scenario['id'], attempts)
+        else:
+            logger.info("%s completed in %.1fs", scenario['id'], duration)
+
+        return {
+            "scenario_id": scenario['id'],
+            "targeted_conflict": scenario['conflict'],
+            "prompt": scenario['prompt'],
+            "model_response": response if response is not None else "",
+            "success": response is not None,
+            "attempts": attempts,
+            "duration_seconds": round(duration, 3)
+        }
+
+    def execute_plan(self, test_cases: List[dict]) -> List[dict]:
+        """
+        Executes all scenarios of a plan concurrently.
+
+        Args:
+            test_cases (List[dict]): Scenarios from PlanParser.parse.
+
+        Returns:
+            List[dict]: Result entries in plan order.
+        """
+        if not test_cases:
+            return []
+
+        workers = min(self.max_workers, len(test_cases))
+        logger.info("Executing %d scenarios for %s with %d workers",
+                    len(test_cases), self.model_name, workers)
+        if workers == 1:
+            return [self.execute_scenario(scenario) for scenario in test_cases]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.execute_scenario, test_cases))